@@ -1,4 +1,5 @@
 from .enums import Side, OrderStatus, OrderType, TimeInForce
 from .order_types import Fill, PortfolioState, Order, require_finite
+from .array_state import ArrayPortfolioState
 
-__all__ =["Side", "OrderStatus", "OrderType", "TimeInForce","Fill", "PortfolioState", "Order", "require_finite" ]
\ No newline at end of file
+__all__ =["Side", "OrderStatus", "OrderType", "TimeInForce","Fill", "PortfolioState", "Order", "require_finite", "ArrayPortfolioState" ]
\ No newline at end of file
@@ -0,0 +1,180 @@
+from __future__ import annotations
+from typing import Mapping
+import numpy as np
+import pandas as pd
+from btlib.core.order_types import Position, require_finite
+
+_EPS = 1e-12
+
+"""
+Compact portfolio: contiguous qty / avg_price / realized_pnl arrays indexed by integer symbol id
+(the column position of the symbol in MarketData.symbols()).
+"""
+class ArrayPortfolioState:
+    def __init__(self, ts: pd.Timestamp, cash: float, symbols: list[str]) -> None:
+        self.ts = pd.Timestamp(ts)
+        if pd.isna(self.ts):
+            raise ValueError("ts must be a valid timestamp")
+        require_finite("cash", float(cash))
+        self.cash = float(cash)
+
+        self.symbols = [str(s) for s in symbols]
+        self.symbol_index = {s: j for j, s in enumerate(self.symbols)}
+        if len(self.symbol_index) != len(self.symbols):
+            raise ValueError("symbols must be unique")
+        m = len(self.symbols)
+        self.qty = np.zeros(m)
+        self.avg_price = np.zeros(m)
+        self.realized_pnl = np.zeros(m)
+
+    @classmethod
+    def from_market(cls, market, cash: float) -> ArrayPortfolioState:
+        """Empty portfolio over the market's symbol universe, starting at its first timestamp"""
+        return cls(ts=market.timestamps()[0], cash=cash, symbols=market.symbols())
+
+    def sid(self, symbol: str) -> int:
+        """Integer id of a symbol"""
+        try:
+            return self.symbol_index[symbol]
+        except KeyError:
+            raise KeyError(f"{symbol} not in symbol universe") from None
+
+    # ----------------------------
+    # Fills
+    # ----------------------------
+
+    def apply_fills(
+            self,
+            sids: np.ndarray,
+            qty: np.ndarray,
+            price: np.ndarray,
+            fees: np.ndarray | float = 0.0,
+            slippage: np.ndarray | float = 0.0) -> None:
+        """
+        Applies a batch of fills with the same open/add, reduce and flip rules as accounting.apply_fill.
+        Repeated symbol ids within one batch are applied in order.
+        """
+        sids = np.asarray(sids, dtype=np.intp).ravel()
+        qty = np.asarray(qty, dtype=float).ravel()
+        price = np.asarray(price, dtype=float).ravel()
+        fees = np.broadcast_to(np.asarray(fees, dtype=float), qty.shape)
+        slippage = np.broadcast_to(np.asarray(slippage, dtype=float), qty.shape)
+        if sids.size == 0:
+            return
+
+        if np.unique(sids).size != sids.size:
+            for k in range(sids.size):
+                self.apply_fills(sids[k:k + 1], qty[k:k + 1], price[k:k + 1], fees[k:k + 1], slippage[k:k + 1])
+            return
+
+        self.cash -= float(np.sum(qty * price + fees + slippage))
+
+        q0 = self.qty[sids]
+        p0 = self.avg_price[sids]
+        s0 = np.where(np.abs(q0) <= _EPS, 0.0, np.sign(q0))
+        s1 = np.where(np.abs(qty) <= _EPS, 0.0, np.sign(qty))
+        q1 = q0 + qty
+
+        add = (s0 == 0.0) | (s0 == s1)
+        reduce = ~add & (np.abs(qty) <= np.abs(q0))
+        flip = ~add & ~reduce
+
+        closed = np.where(reduce, np.abs(qty), np.where(flip, np.abs(q0), 0.0))
+        self.realized_pnl[sids] += closed * s0 * (price - p0)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            add_avg = (q0 * p0 + qty * price) / q1
+        p1 = np.where(add, add_avg, np.where(flip, price, p0))
+
+        dust = np.abs(q1) <= _EPS
+        self.qty[sids] = np.where(dust, 0.0, q1)
+        self.avg_price[sids] = np.where(dust, 0.0, p1)
+
+    def apply_fill(self, symbol: str, qty: float, price: float, fees: float = 0.0, slippage: float = 0.0) -> None:
+        self.apply_fills(np.array([self.sid(symbol)]), np.array([qty]), np.array([price]), fees, slippage)
+
+    # ----------------------------
+    # Mark to market
+    # ----------------------------
+
+    def _price_row(self, marks: np.ndarray | Mapping[str, float]) -> np.ndarray:
+        """Marks as an array over the symbol universe; dict marks must cover every held symbol"""
+        if isinstance(marks, np.ndarray):
+            if marks.shape != self.qty.shape:
+                raise ValueError(f"marks shape {marks.shape} does not match {len(self.symbols)} symbols")
+            return marks
+        row = np.full(len(self.symbols), np.nan)
+        for j in np.flatnonzero(self.qty):
+            px = marks.get(self.symbols[j])
+            if px is None:
+                raise KeyError(f"Market price for symbol {self.symbols[j]} not provided")
+            row[j] = px
+        return row
+
+    def mark(self, marks: np.ndarray | Mapping[str, float]) -> dict[str, float]:
+        """
+        All ledger aggregates in one vectorized pass over held symbols:
+        equity, gross/net exposure, unrealized/realized pnl, leverage and n_positions
+        """
+        row = self._price_row(marks)
+        held = np.flatnonzero(self.qty)
+        q = self.qty[held]
+        px = row[held]
+        if not np.isfinite(px).all() or (px <= 0.0).any():
+            bad = [self.symbols[j] for j in held[~(np.isfinite(px) & (px > 0.0))]]
+            raise ValueError(f"current_price must be a finite number > 0 for {bad}")
+
+        mv = q * px
+        net = float(mv.sum())
+        gross = float(np.abs(mv).sum())
+        equity = self.cash + net
+        if equity <= 0:
+            raise ValueError("Equity must be positive to calculate leverage")
+        return {
+            "equity": equity,
+            "gross_exposure": gross,
+            "net_exposure": net,
+            "unrealized_pnl": float(np.sum((px - self.avg_price[held]) * q)),
+            "realized_pnl": float(self.realized_pnl.sum()),
+            "leverage": gross / equity,
+            "n_positions": int(held.size),
+        }
+
+    # PortfolioState-compatible accessors (used by rebalance and strategies)
+
+    def held_symbols(self) -> list[str]:
+        return [self.symbols[j] for j in np.flatnonzero(self.qty)]
+
+    @property
+    def positions(self) -> dict[str, Position]:
+        """Snapshot of non-flat positions; edits do not write back to the arrays"""
+        return {
+            self.symbols[j]: Position(self.symbols[j], float(self.qty[j]), float(self.avg_price[j]), float(self.realized_pnl[j]))
+            for j in np.flatnonzero(self.qty)
+        }
+
+    def get_position(self, symbol: str) -> Position:
+        """Snapshot of one position (flat positions included)"""
+        j = self.sid(symbol)
+        return Position(symbol, float(self.qty[j]), float(self.avg_price[j]), float(self.realized_pnl[j]))
+
+    def equity(self, mark_prices: np.ndarray | Mapping[str, float]) -> float:
+        row = self._price_row(mark_prices)
+        held = np.flatnonzero(self.qty)
+        return self.cash + float(np.dot(self.qty[held], row[held]))
+
+    def gross_exposure(self, mark_prices: np.ndarray | Mapping[str, float]) -> float:
+        row = self._price_row(mark_prices)
+        held = np.flatnonzero(self.qty)
+        return float(np.abs(self.qty[held] * row[held]).sum())
+
+    def net_exposure(self, mark_prices: np.ndarray | Mapping[str, float]) -> float:
+        row = self._price_row(mark_prices)
+        held = np.flatnonzero(self.qty)
+        return float(np.dot(self.qty[held], row[held]))
+
+    def leverage(self, mark_prices: np.ndarray | Mapping[str, float]) -> float:
+        return self.mark(mark_prices)["leverage"]
+
+    def unrealized_pnl(self, mark_prices: np.ndarray | Mapping[str, float]) -> float:
+        return self.mark(mark_prices)["unrealized_pnl"]
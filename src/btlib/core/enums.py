@@ -5,10 +5,17 @@ class Side(Enum):
     SELL = "SELL"
 class OrderType(Enum):
     MARKET = "MARKET"
+    LIMIT = "LIMIT"
+    STOP = "STOP"
+    STOP_LIMIT = "STOP_LIMIT"
 class TimeInForce(Enum):
-    DAY = "DAY"
+    DAY = "DAY"  # until the end of the session (calendar date) of the first bar it can trade on
+    GTC = "GTC"  # until filled or cancelled
+    IOC = "IOC"  # only the first bar it can trade on
 class OrderStatus(Enum):
     FILLED = "FILLED"
     CANCELED = "CANCELLED"
     REJECTED = "REJECTED"
-    CREATED = "CREATED"
\ No newline at end of file
+    CREATED = "CREATED"
+    EXPIRED = "EXPIRED"
+    PARTIALLY_FILLED = "PARTIALLY_FILLED"
@@ -22,7 +22,10 @@ class Order:
     side: Side | None = None
     tag: str | None = None
     meta: dict[str, Any]=field(default_factory=dict)
-    
+    limit_price: float | None = None
+    stop_price: float | None = None
+    tif: TimeInForce = TimeInForce.DAY
+
         
     def __post_init__(self) -> None:
         object.__setattr__(self, "ts", pd.Timestamp(self.ts))
@@ -46,6 +49,22 @@ class Order:
                 raise ValueError("qty must be positive for buy")
             if self.side==Side.SELL and self.qty>0:
                 raise ValueError("qty must be negative for sell")
+
+        if not isinstance(self.tif, TimeInForce):
+            raise TypeError("tif must be a TimeInForce")
+        needs_limit = self.order_type in (OrderType.LIMIT, OrderType.STOP_LIMIT)
+        needs_stop = self.order_type in (OrderType.STOP, OrderType.STOP_LIMIT)
+        for name, needed in (("limit_price", needs_limit), ("stop_price", needs_stop)):
+            value = getattr(self, name)
+            if not needed:
+                if value is not None:
+                    raise ValueError(f"{name} is not used by {self.order_type.value} orders")
+                continue
+            if value is None:
+                raise ValueError(f"{self.order_type.value} orders need a {name}")
+            require_finite(name, float(value))
+            if float(value) <= 0.0:
+                raise ValueError(f"{name} must be a positive number")
         
 
         
@@ -178,10 +197,10 @@ class PortfolioState:
     
     def leverage(self, mark_prices: dict[str, float]) -> float:
         """Calculate the leverage of the portfolio based on the current market price."""
-        if self.equity(mark_prices) <= 0:
+        equity = self.equity(mark_prices)
+        if equity <= 0:
             raise ValueError("Equity must be positive to calculate leverage")
         gross_exposure = self.gross_exposure(mark_prices)
-        equity = self.equity(mark_prices)
         leverage = gross_exposure / equity
         return leverage
     def unrealized_pnl(self, mark_prices: dict[str, float]):
@@ -193,3 +212,37 @@ class PortfolioState:
             total += position.unrealized_pnl(mark_prices[symbol])
         return total
 
+    def held_symbols(self) -> list[str]:
+        """Symbols with an entry in positions"""
+        return list(self.positions.keys())
+
+    def mark(self, mark_prices: dict[str, float]) -> dict[str, float]:
+        """All ledger aggregates in a single pass over positions"""
+        net = 0.0
+        gross = 0.0
+        unrealized = 0.0
+        realized = 0.0
+        n_positions = 0
+        for symbol, position in self.positions.items():
+            current_price = mark_prices.get(symbol)
+            if current_price is None:
+                raise KeyError(f"Market price for symbol {symbol} not provided")
+            value = position.market_value(current_price)
+            net += value
+            gross += abs(value)
+            unrealized += position.unrealized_pnl(current_price)
+            realized += position.realized_pnl
+            if abs(position.qty) > 1e-12:
+                n_positions += 1
+        equity = self.cash + net
+        if equity <= 0:
+            raise ValueError("Equity must be positive to calculate leverage")
+        return {
+            "equity": equity,
+            "gross_exposure": gross,
+            "net_exposure": net,
+            "unrealized_pnl": unrealized,
+            "realized_pnl": realized,
+            "leverage": gross / equity,
+            "n_positions": n_positions,
+        }
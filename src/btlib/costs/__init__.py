@@ -1,4 +1,7 @@
 from .base import CostModel
 from.simple_bps import SimpleBpsCost
+from .impact import ImpactStats, rolling_impact_stats, SqrtImpactCost, SpreadImpactCost
+from .tiered import FeeTier, TieredFeeCost
 
-__all__ = ["CostModel", "SimpleBpsCost"]
\ No newline at end of file
+__all__ = ["CostModel", "SimpleBpsCost", "ImpactStats", "rolling_impact_stats", "SqrtImpactCost", "SpreadImpactCost",
+           "FeeTier", "TieredFeeCost"]
\ No newline at end of file
@@ -1,17 +1,89 @@
+from __future__ import annotations
 from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING
+import numpy as np
+import pandas as pd
 from btlib.core.order_types import Fill
 
+if TYPE_CHECKING:
+    from btlib.data.bar import BarPrices
+    from btlib.data.market_data import MarketData
+
 """Base Class for Cost Models"""
 class CostModel(ABC):
     @abstractmethod
     def compute(self, fill: Fill)-> tuple[float, float]:
         """
         Docstring for compute
-        
+
         :param self: Description
         :param fill: Takes a fill object
         :type fill: Fill
         :return: A tuple of fees, slippage
         :rtype: tuple[float, float]
         """
-        raise NotImplementedError
\ No newline at end of file
+        raise NotImplementedError
+
+    def prepare(self, market: MarketData) -> None:
+        """
+        Called by the engines once per run, before the first bar, with the market being replayed; models
+        that need market statistics precompute them here. No-op by default.
+
+        :param market: Market of the run (bar i of the run is row i of it)
+        :type market: MarketData
+        """
+
+    def prepare_stream(self, symbols: list[str]) -> None:
+        """
+        Called instead of prepare() by the incremental engines (StreamingEngine, run_chunked), which never
+        see the whole market: resets per-run state. Models that need market statistics build them bar by
+        bar from observe_bar(). No-op by default.
+
+        :param symbols: Symbol of each column id of the run
+        :type symbols: list[str]
+        """
+
+    def observe_bar(self, i: int, ts: pd.Timestamp, bar: BarPrices) -> None:
+        """
+        Called by the incremental engines once bar i has been processed (its fills are already charged),
+        so statistics built from it only reach the costs of later bars. No-op by default.
+
+        :param i: Bar number in the run
+        :type i: int
+        :param ts: Timestamp of the bar
+        :type ts: pd.Timestamp
+        :param bar: Prices (and other loaded fields) of the bar
+        :type bar: BarPrices
+        """
+
+    def compute_many(
+            self,
+            ts: pd.Timestamp,
+            symbols: np.ndarray,
+            qty: np.ndarray,
+            price: np.ndarray,
+            sids: np.ndarray | None = None,
+            bar: int | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Fees and slippage of a batch of fills executed at ts, aligned to the fills. The default calls
+        compute once per fill; override it with array arithmetic.
+
+        :param ts: Fill timestamp
+        :type ts: pd.Timestamp
+        :param symbols: Symbol of each fill
+        :type symbols: np.ndarray
+        :param qty: Signed quantity of each fill
+        :type qty: np.ndarray
+        :param price: Price of each fill
+        :type price: np.ndarray
+        :param sids: Column of each fill's symbol in the prepared market, when the caller has it
+        :type sids: np.ndarray | None
+        :param bar: Row of ts in the prepared market, when the caller has it
+        :type bar: int | None
+        :return: (fees, slippage) arrays
+        :rtype: tuple[np.ndarray, np.ndarray]
+        """
+        costs = [self.compute(Fill(ts, str(s), float(q), float(p))) for s, q, p in zip(symbols, qty, price)]
+        fees = np.array([c[0] for c in costs], dtype=float)
+        slippage = np.array([c[1] for c in costs], dtype=float)
+        return fees, slippage
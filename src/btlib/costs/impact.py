@@ -0,0 +1,287 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Mapping
+import weakref
+import numpy as np
+import pandas as pd
+from btlib.costs.base import CostModel
+from btlib.core.order_types import Fill
+from btlib.data.bar import BarPrices
+from btlib.data.market_data import MarketData
+
+"""
+Market-impact cost models. Slippage follows the square-root law: a fill of q shares moves the price by
+coefficient * volatility * sqrt(|q| / ADV). Rolling volatility and average daily volume are computed
+once per market (prepare) and looked up by bar index, so a batch of fills costs one gather and a few
+array operations. The incremental engines never see the whole market; there the same statistics are
+rolled forward one bar at a time (prepare_stream / observe_bar).
+"""
+
+
+@dataclass(frozen=True)
+class ImpactStats:
+    """
+    Rolling statistics of a market, (timestamps x symbols). Row i only uses bars before i, so costs
+    charged at bar i never look at bar i's own move or volume.
+    """
+    timestamps: pd.DatetimeIndex
+    symbols: list[str]
+    vol: np.ndarray  # std of log close-to-close returns per bar
+    adv: np.ndarray  # mean volume per bar, in shares
+
+    def covers(self, market: MarketData) -> int | None:
+        """Row of the market's first bar if its timeline is a contiguous slice of this one, else None"""
+        if list(market.symbols()) != self.symbols:
+            return None
+        ts = market.timestamps()
+        if len(ts) == 0:
+            return 0
+        k = int(self.timestamps.searchsorted(ts[0]))
+        if k + len(ts) > len(self.timestamps) or not self.timestamps[k:k + len(ts)].equals(ts):
+            return None
+        return k
+
+
+def _min_periods(window: int, min_periods: int | None) -> int:
+    if window < 2:
+        raise ValueError(f"window must be >= 2, got {window}")
+    return window if min_periods is None else max(int(min_periods), 2)
+
+
+class _RollingImpact:
+    """
+    rolling_impact_stats one bar at a time: after append(bar i), vol and adv hold row i + 1, from ring
+    buffers of the last `window` log returns and volumes
+    """
+    def __init__(self, m: int, window: int, min_periods: int) -> None:
+        self.window = int(window)
+        self.min_periods = int(min_periods)
+        self._ret = np.full((self.window, m), np.nan)
+        self._volume = np.full((self.window, m), np.nan)
+        self._log_close = np.full(m, np.nan)
+        self.n = 0
+        self.vol = np.full(m, np.nan)
+        self.adv = np.full(m, np.nan)
+
+    def append(self, close: np.ndarray, volume: np.ndarray) -> None:
+        close = np.asarray(close, dtype=float)
+        volume = np.asarray(volume, dtype=float)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            log_close = np.log(np.where(close > 0.0, close, np.nan))
+        p = self.n % self.window
+        self._ret[p] = log_close - self._log_close
+        self._log_close = log_close
+        self._volume[p] = np.where(volume >= 0.0, volume, np.nan)
+        self.n += 1
+
+        known = np.isfinite(self._ret)
+        count = known.sum(axis=0)
+        ret = np.where(known, self._ret, 0.0)
+        mean = ret.sum(axis=0) / np.maximum(count, 1)
+        var = (np.where(known, self._ret - mean, 0.0) ** 2).sum(axis=0) / np.maximum(count - 1, 1)
+        self.vol = np.where(count >= self.min_periods, np.sqrt(var), np.nan)
+        known = np.isfinite(self._volume)
+        count = known.sum(axis=0)
+        total = np.where(known, self._volume, 0.0).sum(axis=0)
+        self.adv = np.where(count >= self.min_periods, total / np.maximum(count, 1), np.nan)
+
+
+def rolling_impact_stats(
+        market: MarketData,
+        window: int = 20,
+        min_periods: int | None = None,
+        volume_field: str = "volume") -> ImpactStats:
+    """
+    Rolling volatility and ADV of every symbol at every bar, over the `window` bars before it.
+
+    :param market: Market with a close and a volume field
+    :type market: MarketData
+    :param window: Bars per rolling window
+    :type window: int
+    :param min_periods: Bars needed for a value (None -> window); earlier rows are NaN
+    :type min_periods: int | None
+    :param volume_field: MarketData field holding the volume
+    :type volume_field: str
+    :return: The statistics, aligned to market.timestamps() x market.symbols()
+    :rtype: ImpactStats
+    """
+    min_periods = _min_periods(window, min_periods)
+    if volume_field not in market.fields():
+        raise ValueError(f"Market impact needs a '{volume_field}' field (available: {market.fields()})")
+    close = market.field_frame("close").astype(float)
+    log_ret = np.log(close.where(close > 0.0)).diff()
+    vol = log_ret.rolling(window, min_periods=min_periods).std().shift(1)
+    volume = market.field_frame(volume_field).astype(float)
+    adv = volume.where(volume >= 0.0).rolling(window, min_periods=min_periods).mean().shift(1)
+    return ImpactStats(
+        timestamps=market.timestamps(),
+        symbols=list(market.symbols()),
+        vol=vol.to_numpy(dtype=float),
+        adv=adv.to_numpy(dtype=float),
+    )
+
+
+def _buffer_root(arr: np.ndarray) -> np.ndarray:
+    """The array owning the memory arr views (windows of one market share it)"""
+    while isinstance(arr.base, np.ndarray):
+        arr = arr.base
+    return arr
+
+
+@dataclass
+class SqrtImpactCost(CostModel):
+    """
+    Fees in bps of notional plus square-root impact as slippage:
+    notional * coefficient * vol * sqrt(|qty| / ADV), at most max_impact_bps. Until a symbol has enough
+    history for its statistics (or when its ADV is 0) the impact is fallback_bps of notional.
+    """
+    coefficient: float = 1.0
+    window: int = 20
+    min_periods: int | None = None
+    fees_bps: float = 0.0
+    max_impact_bps: float | None = None
+    fallback_bps: float = 0.0
+    volume_field: str = "volume"
+    _stats: ImpactStats | None = field(default=None, init=False, repr=False, compare=False)
+    _offset: int = field(default=0, init=False, repr=False, compare=False)
+    _source: weakref.ref | None = field(default=None, init=False, repr=False, compare=False)
+    _rolling: _RollingImpact | None = field(default=None, init=False, repr=False, compare=False)
+    _symbols: list[str] = field(default_factory=list, init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        for name in ("coefficient", "fees_bps", "fallback_bps", "max_impact_bps"):
+            v = getattr(self, name)
+            if v is None:
+                continue
+            v = float(v)
+            if not np.isfinite(v):
+                raise ValueError(f"{name} must be finite, got {v!r}")
+            if v < 0.0:
+                raise ValueError(f"{name} must be >= 0, got {v!r}")
+
+    def prepare(self, market: MarketData) -> None:
+        """
+        Computes the rolling statistics, unless the ones already held were computed on the same price
+        buffers (the market itself or a window of it) and cover the market's timeline
+        """
+        self._rolling = None
+        source = _buffer_root(market.values())
+        offset = None
+        if self._stats is not None and self._source is not None and self._source() is source:
+            offset = self._stats.covers(market)
+        if offset is None:
+            self._stats = rolling_impact_stats(market, self.window, self.min_periods, self.volume_field)
+            self._source = weakref.ref(source)
+            offset = 0
+        self._offset = offset
+        self._symbols = self._stats.symbols
+
+    def prepare_stream(self, symbols: list[str]) -> None:
+        """Starts rolling the statistics forward from observe_bar(), with no history yet"""
+        self._stats = self._source = None
+        self._offset = 0
+        self._symbols = [str(s) for s in symbols]
+        self._rolling = _RollingImpact(len(self._symbols), self.window, _min_periods(self.window, self.min_periods))
+
+    def observe_bar(self, i: int, ts: pd.Timestamp, bar: BarPrices) -> None:
+        """Adds bar i's close and volume to the rolling statistics (no-op after prepare())"""
+        if self._rolling is None:
+            return
+        volume = bar.field(self.volume_field)
+        if volume is None:
+            raise ValueError(f"Market impact needs a '{self.volume_field}' field in every bar")
+        self._rolling.append(bar.row, volume)
+
+    def _lookup(self, ts: pd.Timestamp, symbols: np.ndarray, sids: np.ndarray | None,
+                bar: int | None) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(vol, adv, sids) of the fills"""
+        stats = self._stats
+        if stats is None and self._rolling is None:
+            raise ValueError(f"{type(self).__name__} has no market statistics: call prepare(market) first")
+        if sids is None:
+            index = {s: j for j, s in enumerate(self._symbols)}
+            sids = np.array([index[str(s)] for s in symbols], dtype=np.intp)
+        if self._rolling is not None:
+            return self._rolling.vol[sids], self._rolling.adv[sids], sids
+        if bar is None:
+            row = int(stats.timestamps.get_indexer([pd.Timestamp(ts)])[0])
+            if row < 0:
+                raise ValueError(f"{ts} is not a bar of the prepared market")
+        else:
+            row = int(bar) + self._offset
+        return stats.vol[row, sids], stats.adv[row, sids], sids
+
+    def _impact(self, vol: np.ndarray, adv: np.ndarray, qty: np.ndarray) -> np.ndarray:
+        known = np.isfinite(vol) & np.isfinite(adv) & (adv > 0.0)
+        participation = np.divide(np.abs(qty), adv, out=np.zeros(len(vol)), where=known)
+        out = np.where(known, float(self.coefficient) * np.where(known, vol, 0.0) * np.sqrt(participation),
+                       float(self.fallback_bps) / 10_000.0)
+        if self.max_impact_bps is not None:
+            np.minimum(out, float(self.max_impact_bps) / 10_000.0, out=out)
+        return out
+
+    def impact(self, ts: pd.Timestamp, symbols: np.ndarray, qty: np.ndarray,
+               sids: np.ndarray | None = None, bar: int | None = None) -> np.ndarray:
+        """Price impact of each fill as a fraction of its price"""
+        vol, adv, _ = self._lookup(ts, symbols, sids, bar)
+        return self._impact(vol, adv, qty)
+
+    def compute_many(
+            self,
+            ts: pd.Timestamp,
+            symbols: np.ndarray,
+            qty: np.ndarray,
+            price: np.ndarray,
+            sids: np.ndarray | None = None,
+            bar: int | None = None) -> tuple[np.ndarray, np.ndarray]:
+        notional = np.abs(qty) * price
+        return notional * (float(self.fees_bps) / 10_000.0), notional * self.impact(ts, symbols, qty, sids, bar)
+
+    def compute(self, fill: Fill) -> tuple[float, float]:
+        fees, slippage = self.compute_many(fill.ts, np.array([fill.symbol], dtype=object),
+                                           np.array([float(fill.qty)]), np.array([float(fill.price)]))
+        return float(fees[0]), float(slippage[0])
+
+
+@dataclass
+class SpreadImpactCost(SqrtImpactCost):
+    """
+    SqrtImpactCost plus half the quoted spread: crossing from mid to the far side of the book costs
+    spread_bps / 2 of notional on top of the impact. spread_bps is one number or one per symbol.
+    """
+    spread_bps: float | Mapping[str, float] = 5.0
+    _half_spread: np.ndarray | None = field(default=None, init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        super().__post_init__()
+        values = self.spread_bps.values() if isinstance(self.spread_bps, Mapping) else [self.spread_bps]
+        for v in values:
+            v = float(v)
+            if not np.isfinite(v) or v < 0.0:
+                raise ValueError(f"spread_bps must be finite and >= 0, got {v!r}")
+
+    def prepare(self, market: MarketData) -> None:
+        super().prepare(market)
+        self._compile_spread()
+
+    def prepare_stream(self, symbols: list[str]) -> None:
+        super().prepare_stream(symbols)
+        self._compile_spread()
+
+    def _compile_spread(self) -> None:
+        symbols = self._symbols
+        if isinstance(self.spread_bps, Mapping):
+            missing = [s for s in symbols if s not in self.spread_bps]
+            if missing:
+                raise ValueError(f"spread_bps has no value for {missing[:10]}")
+            spread = np.array([float(self.spread_bps[s]) for s in symbols])
+        else:
+            spread = np.full(len(symbols), float(self.spread_bps))
+        self._half_spread = spread / 20_000.0
+
+    def impact(self, ts: pd.Timestamp, symbols: np.ndarray, qty: np.ndarray,
+               sids: np.ndarray | None = None, bar: int | None = None) -> np.ndarray:
+        """Half spread plus price impact of each fill, as a fraction of its price"""
+        vol, adv, sids = self._lookup(ts, symbols, sids, bar)
+        return self._half_spread[sids] + self._impact(vol, adv, qty)
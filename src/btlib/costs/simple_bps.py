@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 import numpy as np
+import pandas as pd
 from btlib.costs.base import CostModel
 from btlib.core.order_types import Fill
 
@@ -27,3 +28,14 @@ class SimpleBpsCost(CostModel):
         fees = notional * (float(self.fees_bps) / 10_000.0)
         slippage = notional * (float(self.slippage_bps) / 10_000.0)
         return fees, slippage
+
+    def compute_many(
+            self,
+            ts: pd.Timestamp,
+            symbols: np.ndarray,
+            qty: np.ndarray,
+            price: np.ndarray,
+            sids: np.ndarray | None = None,
+            bar: int | None = None) -> tuple[np.ndarray, np.ndarray]:
+        notional = np.abs(qty) * price
+        return notional * (float(self.fees_bps) / 10_000.0), notional * (float(self.slippage_bps) / 10_000.0)
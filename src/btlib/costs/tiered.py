@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Mapping, Sequence
+import numpy as np
+import pandas as pd
+from btlib.costs.base import CostModel
+from btlib.core.order_types import Fill
+from btlib.data.market_data import MarketData
+
+"""
+Tiered commission schedules: each venue has fee tiers (bps of notional, per share, minimum ticket) that
+apply once the month's traded volume at that venue passes the tier's break. The schedules are compiled
+into padded (venue x tier) arrays and symbols into a venue id per symbol id, so a batch of fills is
+priced with a gather and array arithmetic, while the monthly volume per venue is carried from batch
+to batch.
+"""
+
+
+@dataclass(frozen=True)
+class FeeTier:
+    """
+    One row of a fee schedule: applies from min_volume traded in the month (shares or notional, see
+    TieredFeeCost.volume_basis). Fee = max(bps of notional + per_share x shares, min_ticket).
+    """
+    min_volume: float = 0.0
+    bps: float = 0.0
+    per_share: float = 0.0
+    min_ticket: float = 0.0
+
+    def __post_init__(self) -> None:
+        for name in ("min_volume", "bps", "per_share", "min_ticket"):
+            v = float(getattr(self, name))
+            if not np.isfinite(v) or v < 0.0:
+                raise ValueError(f"{name} must be finite and >= 0, got {v!r}")
+
+
+@dataclass
+class TieredFeeCost(CostModel):
+    """
+    Commission from per-venue tiered schedules, plus slippage in bps like SimpleBpsCost.
+
+    Every symbol trades at a venue (symbol_venue, default_venue otherwise); every venue has a schedule in
+    venues. The tier of a fill is picked by the venue's volume traded earlier in the same calendar month
+    (fills of a batch count in batch order), and the whole fill is charged at that tier. max_bps caps a
+    fill's fee at that share of its notional (the cap wins over min_ticket).
+
+    The monthly volumes are state of the instance, reset by prepare() (prepare_stream() in the incremental
+    engines) at the start of every run: use one instance per run.
+
+    :param venues: Fee tiers of each venue
+    :param symbol_venue: Venue of each symbol that does not trade at default_venue
+    :param default_venue: Venue of the other symbols
+    :param volume_basis: "shares" or "notional": what the tier breaks count
+    :param max_bps: Optional cap on the fee, in bps of notional
+    :param slippage_bps: Slippage in bps of notional
+    """
+    venues: Mapping[str, Sequence[FeeTier]]
+    symbol_venue: Mapping[str, str] = field(default_factory=dict)
+    default_venue: str = "default"
+    volume_basis: str = "shares"
+    max_bps: float | None = None
+    slippage_bps: float = 0.0
+    _breaks: np.ndarray = field(init=False, repr=False, compare=False)
+    _table: dict[str, np.ndarray] = field(init=False, repr=False, compare=False)
+    _venue_index: dict[str, int] = field(init=False, repr=False, compare=False)
+    _venue_of_sid: np.ndarray | None = field(default=None, init=False, repr=False, compare=False)
+    _month: int | None = field(default=None, init=False, repr=False, compare=False)
+    _volume: np.ndarray = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        if self.volume_basis not in ("shares", "notional"):
+            raise ValueError(f"volume_basis must be 'shares' or 'notional', got {self.volume_basis!r}")
+        for name in ("max_bps", "slippage_bps"):
+            v = getattr(self, name)
+            if v is not None and (not np.isfinite(float(v)) or float(v) < 0.0):
+                raise ValueError(f"{name} must be finite and >= 0, got {v!r}")
+        unknown = sorted(set(self.symbol_venue.values()) - set(self.venues))
+        if unknown:
+            raise ValueError(f"Venues without a schedule: {unknown}")
+
+        # compile the schedules: (venue x tier) arrays, padded with unreachable breaks
+        names = list(self.venues)
+        width = max((len(tiers) for tiers in self.venues.values()), default=0)
+        breaks = np.full((len(names), width), np.inf)
+        table = {k: np.zeros((len(names), width)) for k in ("bps", "per_share", "min_ticket")}
+        for v, name in enumerate(names):
+            tiers = list(self.venues[name])
+            if not tiers:
+                raise ValueError(f"Venue {name!r} has no fee tiers")
+            starts = [float(t.min_volume) for t in tiers]
+            if starts[0] != 0.0 or any(b <= a for a, b in zip(starts, starts[1:])):
+                raise ValueError(f"Tiers of {name!r} must start at 0 and have increasing min_volume, got {starts}")
+            breaks[v, :len(tiers)] = starts
+            for k, col in table.items():
+                col[v, :len(tiers)] = [float(getattr(t, k)) for t in tiers]
+        self._breaks = breaks
+        self._table = table
+        self._venue_index = {name: v for v, name in enumerate(names)}
+        self._volume = np.zeros(len(names))
+
+    def venue_ids(self, symbols: Sequence[str]) -> np.ndarray:
+        """Venue id of each symbol"""
+        default = self._venue_index.get(self.default_venue, -1)
+        ids = np.array([self._venue_index[self.symbol_venue[s]] if s in self.symbol_venue else default
+                        for s in symbols], dtype=np.intp)
+        if (ids < 0).any():
+            missing = [s for s, v in zip(symbols, ids) if v < 0]
+            raise ValueError(f"No venue for {missing[:10]} (default venue {self.default_venue!r} has no schedule)")
+        return ids
+
+    def reset(self) -> None:
+        """Forgets the monthly volumes"""
+        self._volume[:] = 0.0
+        self._month = None
+
+    def prepare(self, market: MarketData) -> None:
+        """Compiles the venue of every symbol id of the market and starts from zero monthly volume"""
+        self._venue_of_sid = self.venue_ids([str(s) for s in market.symbols()])
+        self.reset()
+
+    def prepare_stream(self, symbols: list[str]) -> None:
+        """prepare() for the incremental engines: venues of the run's symbol ids, zero monthly volume"""
+        self._venue_of_sid = self.venue_ids([str(s) for s in symbols])
+        self.reset()
+
+    def monthly_volume(self) -> dict[str, float]:
+        """Volume traded so far this month, per venue"""
+        return {name: float(self._volume[v]) for name, v in self._venue_index.items()}
+
+    def compute_many(
+            self,
+            ts: pd.Timestamp,
+            symbols: np.ndarray,
+            qty: np.ndarray,
+            price: np.ndarray,
+            sids: np.ndarray | None = None,
+            bar: int | None = None) -> tuple[np.ndarray, np.ndarray]:
+        ts = pd.Timestamp(ts)
+        month = ts.year * 12 + ts.month
+        if month != self._month:
+            self._volume[:] = 0.0
+            self._month = month
+        if sids is not None and self._venue_of_sid is not None:
+            venue = self._venue_of_sid[sids]
+        else:
+            venue = self.venue_ids([str(s) for s in symbols])
+        if len(venue) == 0:
+            return np.zeros(0), np.zeros(0)
+
+        shares = np.abs(np.asarray(qty, dtype=float))
+        notional = shares * np.asarray(price, dtype=float)
+        size = shares if self.volume_basis == "shares" else notional
+
+        # venue volume before each fill: carried volume + earlier fills of the batch at the same venue
+        by_venue = np.argsort(venue, kind="stable")
+        v, sz = venue[by_venue], size[by_venue]
+        end = np.cumsum(sz)
+        first = np.flatnonzero(np.r_[True, v[1:] != v[:-1]])
+        start_of_group = np.repeat((end - sz)[first], np.diff(np.r_[first, len(v)]))
+        before = np.empty(len(v))
+        before[by_venue] = self._volume[v] + (end - sz - start_of_group)
+        self._volume[v[first]] += np.add.reduceat(sz, first)
+
+        # tier = last break <= volume before the fill (padding breaks are inf and never count)
+        tier = (self._breaks[venue] <= before[:, None]).sum(axis=1) - 1
+
+        t = self._table
+        fees = notional * (t["bps"][venue, tier] / 10_000.0) + shares * t["per_share"][venue, tier]
+        np.maximum(fees, t["min_ticket"][venue, tier], out=fees)
+        if self.max_bps is not None:
+            np.minimum(fees, notional * (float(self.max_bps) / 10_000.0), out=fees)
+        return fees, notional * (float(self.slippage_bps) / 10_000.0)
+
+    def compute(self, fill: Fill) -> tuple[float, float]:
+        fees, slippage = self.compute_many(fill.ts, np.array([fill.symbol], dtype=object),
+                                           np.array([float(fill.qty)]), np.array([float(fill.price)]))
+        return float(fees[0]), float(slippage[0])
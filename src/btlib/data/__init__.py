@@ -1,4 +1,21 @@
 from .market_data import MarketData
+from .bar import BarPrices
+from .quality import DataQualityIndex
+from .universe import Universe
+from .asof import align_asof
 from .validators import validate_price_frame, require_columns
+from .history import HistoryWindow, HistoryView, RingHistory
+from .shared import SharedMarketData, SharedMarketSpec, attach_market
+from .chunked import ChunkedMarketData, MarketBlock, BlockStore, BlockStoreWriter, write_block_store
+from .cache import PriceCache, frame_fetcher, yfinance_fetcher
+from .corporate_actions import AdjustedPrices, adjust_prices, adjustment_factors
+from .resample import BarResampler, ParquetBarWriter, resample_stream, read_bars, iter_csv, iter_parquet, bars_to_wide
+from .arrow_io import read_parquet, read_arrow, read_partitioned, write_parquet, write_arrow, write_partitioned, PartitionedSource
 
-__all__=["MarketData", "validate_price_frame", "require_columns"]
\ No newline at end of file
+__all__=["MarketData", "BarPrices", "DataQualityIndex", "Universe", "align_asof", "validate_price_frame", "require_columns", "HistoryWindow", "HistoryView", "RingHistory",
+         "SharedMarketData", "SharedMarketSpec", "attach_market",
+         "ChunkedMarketData", "MarketBlock", "BlockStore", "BlockStoreWriter", "write_block_store",
+         "PriceCache", "frame_fetcher", "yfinance_fetcher",
+         "AdjustedPrices", "adjust_prices", "adjustment_factors",
+         "BarResampler", "ParquetBarWriter", "resample_stream", "read_bars", "iter_csv", "iter_parquet", "bars_to_wide",
+         "read_parquet", "read_arrow", "read_partitioned", "write_parquet", "write_arrow", "write_partitioned", "PartitionedSource"]
\ No newline at end of file
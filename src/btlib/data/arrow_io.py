@@ -0,0 +1,370 @@
+from __future__ import annotations
+import os
+from pathlib import Path
+from typing import Any, Iterable
+import numpy as np
+import pandas as pd
+from btlib.data.market_data import MarketData
+
+"""
+Parquet / Arrow IPC storage for MarketData (needs the optional pyarrow dependency: pip install btlib[arrow]).
+
+Layouts:
+- wide file: one timestamp column plus one float column per symbol (write_parquet / write_arrow)
+- partitioned directory: root/symbol=<SYM>/year=<YYYY>/*.parquet, each file holding (ts, <field>...) rows
+  (write_partitioned, resample.ParquetBarWriter); read whole (read_partitioned) or block by block
+  (PartitionedSource, the out-of-core ChunkedMarketData source)
+
+Files are memory-mapped and only the requested symbols and date range are read: Parquet row groups
+outside the range are skipped from their statistics, Arrow IPC tables are sliced without copying.
+A price column that is one float64 chunk without nulls (an uncompressed IPC file, or a range within
+one record batch) is wrapped in place, so the loaded close frame sits on the mapping; other columns
+are copied once. MarketData.values() still builds its (timestamps x symbols) array on first use.
+Writers record that the rows are sorted by time (Parquet sorting_columns, Arrow schema metadata);
+readers that find the guarantee skip MarketData's sort_index() copy.
+"""
+
+TS_COLUMN = "ts"
+_SORTED_KEY = b"btlib.sorted_by"
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+    except ImportError as e:
+        raise ImportError("Parquet/Arrow support needs pyarrow: pip install btlib[arrow]") from e
+    return pyarrow
+
+
+def _ts_scalar(pa, ts, ts_type) -> Any:
+    """A bound as an Arrow scalar of the timestamp column's type (naive bounds take the column's tz)"""
+    ts = pd.Timestamp(ts)
+    tz = getattr(ts_type, "tz", None)
+    if tz is not None and ts.tz is None:
+        ts = ts.tz_localize(tz)
+    elif tz is None and ts.tz is not None:
+        raise ValueError(f"tz-aware bound {ts} for a tz-naive timestamp column")
+    return pa.scalar(ts, type=ts_type)
+
+
+def _check_symbols(available: list[str], symbols: Iterable[str] | None) -> list[str]:
+    if symbols is None:
+        return available
+    symbols = [str(s) for s in symbols]
+    missing = [s for s in symbols if s not in available]
+    if missing:
+        raise ValueError(f"{missing} not in file (available: {available[:10]}{'...' if len(available) > 10 else ''})")
+    return symbols
+
+
+def _float_column(column) -> np.ndarray:
+    """A price column as float64, viewing the Arrow buffer when that needs no copy"""
+    if column.num_chunks == 1 and column.null_count == 0 and column.type == "double":
+        return column.chunk(0).to_numpy(zero_copy_only=True)
+    return column.to_numpy().astype(float, copy=False)
+
+
+def _table_to_market(table, ts_column: str, symbols: list[str], is_sorted: bool) -> MarketData:
+    index = pd.DatetimeIndex(table.column(ts_column).to_pandas()).rename(None)
+    data = {s: _float_column(table.column(s)) for s in symbols}
+    close = pd.DataFrame(data, index=index, columns=symbols, copy=False)
+    if not is_sorted:
+        close = close.sort_index()
+    return MarketData(close, assume_sorted=True)
+
+
+# ----------------------------
+# Wide files
+# ----------------------------
+
+def _market_table(market: MarketData, ts_column: str):
+    pa = _pyarrow()
+    close = market.close
+    arrays = [pa.array(close.index)] + [pa.array(close[s].to_numpy(dtype=float)) for s in market.symbols()]
+    table = pa.Table.from_arrays(arrays, names=[ts_column] + market.symbols())
+    return table.replace_schema_metadata({_SORTED_KEY: ts_column.encode()})
+
+
+def write_parquet(market: MarketData, path: str | os.PathLike, ts_column: str = TS_COLUMN,
+                  row_group_size: int = 65_536) -> None:
+    """Wide Parquet file with row groups sorted by ts, so range reads skip whole row groups"""
+    _pyarrow()
+    import pyarrow.parquet as pq
+    table = _market_table(market, ts_column)
+    pq.write_table(
+        table, path, row_group_size=row_group_size,
+        sorting_columns=[pq.SortingColumn(0)],
+    )
+
+
+def write_arrow(market: MarketData, path: str | os.PathLike, ts_column: str = TS_COLUMN) -> None:
+    """Wide Arrow IPC (Feather v2) file, uncompressed so it can be memory-mapped without copying"""
+    pa = _pyarrow()
+    table = _market_table(market, ts_column)
+    with pa.OSFile(str(path), "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+
+
+def _parquet_sorted(pf, ts_column: str) -> bool:
+    """True if every row group is declared sorted ascending by ts and the groups follow each other"""
+    meta = pf.metadata
+    col = pf.schema_arrow.get_field_index(ts_column)
+    prev_max = None
+    for k in range(meta.num_row_groups):
+        rg = meta.row_group(k)
+        sorting = rg.sorting_columns or ()
+        if not sorting or sorting[0].column_index != col or sorting[0].descending:
+            return False
+        stats = rg.column(col).statistics
+        if stats is None or not stats.has_min_max:
+            return False
+        if prev_max is not None and stats.min < prev_max:
+            return False
+        prev_max = stats.max
+    return True
+
+
+def read_parquet(
+        path: str | os.PathLike,
+        symbols: Iterable[str] | None = None,
+        start: Any = None,
+        end: Any = None,
+        ts_column: str = TS_COLUMN) -> MarketData:
+    """
+    MarketData from a wide Parquet file, reading only the requested symbols and [start, end] range.
+
+    :param path: Parquet file with a timestamp column and one price column per symbol
+    :param symbols: Columns to load (None -> all)
+    :param start: First timestamp to load (inclusive, None -> from the beginning)
+    :param end: Last timestamp to load (inclusive, None -> to the end)
+    :param ts_column: Name of the timestamp column
+    """
+    pa = _pyarrow()
+    import pyarrow.parquet as pq
+    pf = pq.ParquetFile(path, memory_map=True)
+    schema = pf.schema_arrow
+    if ts_column not in schema.names:
+        raise ValueError(f"Timestamp column {ts_column!r} not in {path}")
+    available = [n for n in schema.names if n != ts_column and not n.startswith("__index_level_")]
+    symbols = _check_symbols(available, symbols)
+
+    filters = []
+    ts_type = schema.field(ts_column).type
+    if start is not None:
+        filters.append((ts_column, ">=", _ts_scalar(pa, start, ts_type)))
+    if end is not None:
+        filters.append((ts_column, "<=", _ts_scalar(pa, end, ts_type)))
+    table = pq.read_table(
+        path, columns=[ts_column] + symbols, filters=filters or None, memory_map=True,
+    )
+    return _table_to_market(table, ts_column, symbols, _parquet_sorted(pf, ts_column))
+
+
+def read_arrow(
+        path: str | os.PathLike,
+        symbols: Iterable[str] | None = None,
+        start: Any = None,
+        end: Any = None,
+        ts_column: str = TS_COLUMN) -> MarketData:
+    """
+    MarketData from a wide Arrow IPC file. The file is memory-mapped; when it is marked sorted the
+    date range is located by binary search and sliced without reading the other rows.
+    """
+    pa = _pyarrow()
+    import pyarrow.compute as pc
+    source = pa.memory_map(str(path), "r")
+    table = pa.ipc.open_file(source).read_all()  # zero-copy over the mapping
+    if ts_column not in table.schema.names:
+        raise ValueError(f"Timestamp column {ts_column!r} not in {path}")
+    available = [n for n in table.schema.names if n != ts_column]
+    symbols = _check_symbols(available, symbols)
+    table = table.select([ts_column] + symbols)
+
+    is_sorted = (table.schema.metadata or {}).get(_SORTED_KEY) == ts_column.encode()
+    if start is not None or end is not None:
+        ts_type = table.schema.field(ts_column).type
+        if is_sorted:
+            ts = table.column(ts_column).combine_chunks().cast(pa.int64()).to_numpy()
+            lo = 0 if start is None else int(np.searchsorted(ts, _ts_scalar(pa, start, ts_type).cast(pa.int64()).as_py(), "left"))
+            hi = len(ts) if end is None else int(np.searchsorted(ts, _ts_scalar(pa, end, ts_type).cast(pa.int64()).as_py(), "right"))
+            table = table.slice(lo, max(hi - lo, 0))
+        else:
+            mask = None
+            if start is not None:
+                mask = pc.greater_equal(table.column(ts_column), _ts_scalar(pa, start, ts_type))
+            if end is not None:
+                upper = pc.less_equal(table.column(ts_column), _ts_scalar(pa, end, ts_type))
+                mask = upper if mask is None else pc.and_(mask, upper)
+            table = table.filter(mask)
+    return _table_to_market(table, ts_column, symbols, is_sorted)
+
+
+# ----------------------------
+# Partitioned directories
+# ----------------------------
+
+def _partitioned_dataset(root: str | os.PathLike):
+    pa = _pyarrow()
+    import pyarrow.dataset as ds
+    return ds.dataset(
+        str(root), format="parquet",
+        partitioning=ds.partitioning(pa.schema([("symbol", pa.string()), ("year", pa.int32())]), flavor="hive"),
+    )
+
+
+def _range_filter(ds, pa, ts_column: str, ts_type, start, end):
+    """Row filter for [start, end], with the year bounds that prune whole partitions"""
+    expr = None
+    if start is not None:
+        expr = (ds.field("year") >= pd.Timestamp(start).year) & (ds.field(ts_column) >= _ts_scalar(pa, start, ts_type))
+    if end is not None:
+        upper = (ds.field("year") <= pd.Timestamp(end).year) & (ds.field(ts_column) <= _ts_scalar(pa, end, ts_type))
+        expr = upper if expr is None else expr & upper
+    return expr
+
+def write_partitioned(market: MarketData, root: str | os.PathLike, field: str = "close",
+                      ts_column: str = TS_COLUMN) -> None:
+    """One Parquet file per symbol and calendar year: root/symbol=<SYM>/year=<YYYY>/part-0.parquet"""
+    pa = _pyarrow()
+    import pyarrow.parquet as pq
+    root = Path(root)
+    close = market.close
+    years = close.index.year
+    for sym in market.symbols():
+        col = close[sym].to_numpy(dtype=float)
+        for year in np.unique(years):
+            mask = years == year
+            out = root / f"symbol={sym}" / f"year={int(year)}"
+            out.mkdir(parents=True, exist_ok=True)
+            table = pa.Table.from_arrays([pa.array(close.index[mask]), pa.array(col[mask])], names=[ts_column, field])
+            pq.write_table(table, out / "part-0.parquet", sorting_columns=[pq.SortingColumn(0)])
+
+
+def read_partitioned(
+        root: str | os.PathLike,
+        symbols: Iterable[str] | None = None,
+        start: Any = None,
+        end: Any = None,
+        field: str = "close",
+        ts_column: str = TS_COLUMN) -> MarketData:
+    """
+    MarketData from a symbol/year partitioned directory. Only the partitions of the requested symbols
+    and years are opened; rows are aligned on the union of their timestamps (missing bars -> NaN).
+    """
+    pa = _pyarrow()
+    import pyarrow.dataset as ds
+    dataset = _partitioned_dataset(root)
+    available = sorted(set(dataset.to_table(columns=["symbol"]).column("symbol").to_pylist())) if symbols is None else None
+    symbols = available if symbols is None else [str(s) for s in symbols]
+
+    ts_type = dataset.schema.field(ts_column).type
+    expr = ds.field("symbol").isin(symbols)
+    bounds = _range_filter(ds, pa, ts_column, ts_type, start, end)
+    if bounds is not None:
+        expr &= bounds
+    table = dataset.to_table(columns=[ts_column, "symbol", field], filter=expr)
+
+    found = set(table.column("symbol").to_pylist())
+    missing = [s for s in symbols if s not in found]
+    if missing:
+        raise ValueError(f"No data for {missing} in {root} for the requested range")
+    long = pd.DataFrame({
+        ts_column: table.column(ts_column).to_pandas(),
+        "symbol": table.column("symbol").to_numpy(zero_copy_only=False),
+        field: table.column(field).to_numpy().astype(float, copy=False),
+    })
+    close = long.pivot(index=ts_column, columns="symbol", values=field).reindex(columns=symbols)
+    close = close.set_axis(pd.DatetimeIndex(close.index).rename(None), axis=0).set_axis(pd.Index(symbols), axis=1)
+    return MarketData(close, assume_sorted=True)  # pivot returns a sorted index
+
+
+class PartitionedSource:
+    """
+    Block source (see btlib.data.chunked.BlockSource) over a symbol=/year= partitioned directory.
+
+    The timeline is the union of the partitions' timestamps, collected batch by batch when the source is
+    opened. read() loads the bars of one time range, pruning partitions by year and row groups by their
+    ts statistics, and scatters them onto a (bars x symbols) array (missing bars -> NaN). All the
+    fields of a range are read together and the last range is kept, so reading a block field by
+    field costs one scan.
+
+    :param root: Directory written by write_partitioned or resample.ParquetBarWriter
+    :param symbols: Symbols to load (None -> every symbol= partition)
+    :param start: First timestamp (inclusive, None -> from the beginning)
+    :param end: Last timestamp (inclusive, None -> to the end)
+    :param fields: Field columns to load; must include close
+    :param ts_column: Name of the timestamp column
+    :param dtype: Float dtype of the arrays read() returns
+    """
+    def __init__(
+            self,
+            root: str | os.PathLike,
+            symbols: Iterable[str] | None = None,
+            start: Any = None,
+            end: Any = None,
+            fields: Iterable[str] = ("close",),
+            ts_column: str = TS_COLUMN,
+            dtype=np.float64) -> None:
+        pa = _pyarrow()
+        import pyarrow.dataset as ds
+        from btlib.data.chunked import _check_fields
+        self.root = Path(root)
+        self.ts_column = ts_column
+        self.dtype = np.dtype(dtype)
+        self._fields = _check_fields(fields)
+        self._dataset = _partitioned_dataset(root)
+        missing = [f for f in self._fields if f not in self._dataset.schema.names]
+        if missing:
+            raise ValueError(f"Fields {missing} not in {root}")
+        if symbols is None:
+            symbols = sorted(set(self._dataset.to_table(columns=["symbol"]).column("symbol").to_pylist()))
+        self._symbols = [str(s) for s in symbols]
+        self._ts_type = self._dataset.schema.field(ts_column).type
+        self._filter = ds.field("symbol").isin(self._symbols)
+        bounds = _range_filter(ds, pa, ts_column, self._ts_type, start, end)
+        if bounds is not None:
+            self._filter &= bounds
+
+        ticks = np.empty(0, dtype=np.int64)
+        found = set()
+        for batch in self._dataset.to_batches(columns=[ts_column, "symbol"], filter=self._filter):
+            found.update(batch.column(1).unique().to_pylist())
+            ticks = np.union1d(ticks, batch.column(0).cast(pa.int64()).to_numpy())
+        absent = [s for s in self._symbols if s not in found]
+        if absent:
+            raise ValueError(f"No data for {absent} in {root} for the requested range")
+        self._ticks = ticks
+        self._index = pd.DatetimeIndex(pa.array(ticks).cast(self._ts_type).to_pandas()).rename(None)
+        self._cached: tuple[tuple[int, int], dict[str, np.ndarray]] | None = None
+
+    def timestamps(self) -> pd.DatetimeIndex:
+        return self._index
+
+    def symbols(self) -> list[str]:
+        return list(self._symbols)
+
+    def fields(self) -> list[str]:
+        return list(self._fields)
+
+    def read(self, start: int, stop: int, field: str = "close") -> np.ndarray:
+        if field not in self._fields:
+            raise KeyError(f"Field {field!r} not loaded (available: {self._fields})")
+        if self._cached is None or self._cached[0] != (start, stop):
+            self._cached = ((start, stop), self._read_range(start, stop))
+        return self._cached[1][field]
+
+    def _read_range(self, start: int, stop: int) -> dict[str, np.ndarray]:
+        pa = _pyarrow()
+        import pyarrow.compute as pc
+        import pyarrow.dataset as ds
+        out = {name: np.full((max(stop - start, 0), len(self._symbols)), np.nan, dtype=self.dtype) for name in self._fields}
+        if stop <= start:
+            return out
+        lo, hi = self._index[start], self._index[stop - 1]
+        expr = self._filter & _range_filter(ds, pa, self.ts_column, self._ts_type, lo, hi)
+        table = self._dataset.to_table(columns=[self.ts_column, "symbol"] + self._fields, filter=expr)
+        rows = np.searchsorted(self._ticks[start:stop], table.column(self.ts_column).cast(pa.int64()).to_numpy())
+        cols = pc.index_in(table.column("symbol"), value_set=pa.array(self._symbols)).to_numpy(zero_copy_only=False)
+        for name in self._fields:
+            out[name][rows, cols.astype(np.intp)] = table.column(name).to_numpy().astype(self.dtype, copy=False)
+        return out
@@ -0,0 +1,102 @@
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+from btlib.data.validators import require_columns
+
+"""
+As-of alignment of datasets sampled on their own schedule (fundamentals, alternative data) to a price
+timeline, once, when the data is attached to MarketData.
+
+Every observation becomes visible at its publication time: an explicit publication column, or the
+observation timestamp plus `lag`. Bar t sees, per symbol, the latest observation published at or before
+the bar's timestamp, so nothing published after a bar can reach it. The alignment is vectorized: each
+observation is placed on the first bar that can see it and the grid is forward-filled down each column.
+"""
+
+
+def _as_timeline_tz(ts: pd.DatetimeIndex, timeline: pd.DatetimeIndex) -> pd.DatetimeIndex:
+    if timeline.tz is not None and ts.tz is None:
+        return ts.tz_localize(timeline.tz)
+    if timeline.tz is None and ts.tz is not None:
+        return ts.tz_convert("UTC").tz_localize(None)
+    return ts
+
+
+def _wide_to_long(data: pd.DataFrame, ts_column: str, value_column: str) -> pd.DataFrame:
+    stacked = data.stack()
+    stacked.index = stacked.index.set_names([ts_column, "symbol"])
+    return stacked.rename(value_column).reset_index()
+
+
+def align_asof(
+        data: pd.DataFrame,
+        timeline: pd.DatetimeIndex,
+        symbols: list[str],
+        *,
+        lag: str | pd.Timedelta | pd.DateOffset = "0s",
+        ts_column: str = "ts",
+        value_column: str = "value",
+        available_column: str | None = None,
+        max_age: str | pd.Timedelta | None = None) -> np.ndarray:
+    """
+    (timeline x symbols) float array of the latest published value of each symbol at each bar (NaN before
+    the first one).
+
+    :param data: Long frame (symbol, ts_column, value_column[, available_column]) or a wide frame indexed
+        by observation time with one column per symbol
+    :param timeline: Bar timestamps (MarketData.timestamps())
+    :param symbols: Column order (MarketData.symbols()); other symbols in data are ignored
+    :param lag: Publication delay added to the observation time (ignored for rows with available_column)
+    :param available_column: Column holding the publication timestamp of each row
+    :param max_age: Values older than this (bar time - publication time) are dropped to NaN
+    """
+    timeline = pd.DatetimeIndex(timeline)
+    if isinstance(data.index, pd.DatetimeIndex) and "symbol" not in data.columns:
+        data = _wide_to_long(data, ts_column, value_column)
+    require_columns(data, ["symbol", ts_column, value_column])
+
+    sym_index = {str(s): j for j, s in enumerate(symbols)}
+    sid = np.array([sym_index.get(str(s), -1) for s in data["symbol"]], dtype=np.intp)
+    values = pd.to_numeric(data[value_column], errors="coerce").to_numpy(dtype=float)
+    observed = _as_timeline_tz(pd.DatetimeIndex(pd.to_datetime(data[ts_column])), timeline)
+    available = observed + (pd.Timedelta(lag) if not isinstance(lag, pd.DateOffset) else lag)
+    if available_column is not None:
+        published = _as_timeline_tz(pd.DatetimeIndex(pd.to_datetime(data[available_column])), timeline)
+        available = available.where(published.isna(), published)
+    if (available < observed).any():
+        raise ValueError("Publication times must not be before observation times")
+
+    keep = (sid >= 0) & np.isfinite(values) & ~available.isna()
+    sid, values, available = sid[keep], values[keep], available[keep]
+    n, m = len(timeline), len(symbols)
+    out = np.full((n, m), np.nan)
+    if len(values) == 0 or n == 0:
+        return out
+
+    # first bar that can see each observation; observations published after the last bar are dropped
+    bar = timeline.searchsorted(available, side="left")
+    # several observations on one cell: the latest published wins
+    avail_ns = available.as_unit("ns").asi8
+    order = np.lexsort((avail_ns, sid, bar))
+    bar, sid, values, avail_ns = bar[order], sid[order], values[order], avail_ns[order]
+    inside = bar < n
+    bar, sid, values, avail_ns = bar[inside], sid[inside], values[inside], avail_ns[inside]
+    last = np.r_[(bar[1:] != bar[:-1]) | (sid[1:] != sid[:-1]), True]
+    bar, sid, values, avail_ns = bar[last], sid[last], values[last], avail_ns[last]
+
+    # forward fill: for every cell, the row of the latest placed observation at or above it
+    src = np.full((n, m), -1, dtype=np.intp)
+    src[bar, sid] = bar
+    np.maximum.accumulate(src, axis=0, out=src)
+    placed = np.full((n, m), np.nan)
+    placed[bar, sid] = values
+    filled = src >= 0
+    cols = np.broadcast_to(np.arange(m), (n, m))
+    out[filled] = placed[src[filled], cols[filled]]
+
+    if max_age is not None:
+        pub = np.zeros((n, m), dtype=np.int64)
+        pub[bar, sid] = avail_ns
+        age = timeline.as_unit("ns").asi8[:, None] - pub[np.maximum(src, 0), cols]
+        out[filled & (age > pd.Timedelta(max_age).value)] = np.nan
+    return out
@@ -0,0 +1,115 @@
+from __future__ import annotations
+from typing import Iterator, Mapping
+import numpy as np
+
+"""
+One bar of prices as a read-only mapping over a price row, without building a dict.
+
+BarPrices behaves like the {symbol: price} dicts the engine used to pass around (get, [], in, items),
+so execution models and helpers written against dicts keep working, and also exposes the arrays behind
+it for positional code: row (prices aligned to symbols), valid (finite and > 0) and index
+(symbol -> column). order holds the columns in sorted-symbol order, the order orders are emitted in,
+and rank its inverse. active, when set, holds the columns of the bar's universe members: the only
+columns (besides held ones) the rebalancer looks at. fields holds the rows of the bar's other loaded
+fields (open/high/low/volume), read with field(name).
+"""
+
+
+def symbol_order(symbols: list[str]) -> np.ndarray:
+    """Column positions of symbols in sorted-symbol order"""
+    return np.array(sorted(range(len(symbols)), key=symbols.__getitem__), dtype=np.intp)
+
+
+def symbol_rank(order: np.ndarray) -> np.ndarray:
+    """Inverse of symbol_order: the sorted position of each column"""
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order), dtype=order.dtype)
+    return rank
+
+
+class BarPrices(Mapping):
+    """
+    :param symbols: Symbol of each column of row
+    :param index: symbol -> column
+    :param row: Prices of the bar (read-only view, not copied)
+    :param valid: Tradable mask of row (None -> computed as finite and > 0)
+    :param order: Columns in sorted-symbol order (None -> computed)
+    :param active: Columns of the universe members at this bar (None -> every column)
+    :param rank: Position of each column in order (None -> computed)
+    :param fields: Rows of other fields of the bar, e.g. {"high": ..., "low": ...} (None -> close only)
+    """
+    __slots__ = ("symbols", "index", "row", "valid", "active", "fields", "_order", "_rank")
+
+    def __init__(
+            self,
+            symbols: list[str],
+            index: dict[str, int],
+            row: np.ndarray,
+            valid: np.ndarray | None = None,
+            order: np.ndarray | None = None,
+            active: np.ndarray | None = None,
+            rank: np.ndarray | None = None,
+            fields: dict[str, np.ndarray] | None = None) -> None:
+        self.symbols = symbols
+        self.index = index
+        self.row = row
+        self.valid = valid_prices(row) if valid is None else valid
+        self.active = active
+        self.fields = fields
+        self._order = order
+        self._rank = rank
+
+    @classmethod
+    def from_row(cls, symbols: list[str], row: np.ndarray) -> BarPrices:
+        return cls(list(symbols), {s: j for j, s in enumerate(symbols)}, np.asarray(row))
+
+    @property
+    def order(self) -> np.ndarray:
+        if self._order is None:
+            self._order = symbol_order(self.symbols)
+        return self._order
+
+    @property
+    def rank(self) -> np.ndarray:
+        if self._rank is None:
+            self._rank = symbol_rank(self.order)
+        return self._rank
+
+    def __getitem__(self, symbol: str) -> float:
+        return float(self.row[self.index[symbol]])
+
+    def get(self, symbol: str, default=None):
+        j = self.index.get(symbol)
+        return default if j is None else float(self.row[j])
+
+    def __contains__(self, symbol) -> bool:
+        return symbol in self.index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.symbols)
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def is_valid(self, symbol: str) -> bool:
+        """True if symbol is in the bar with a finite, positive price"""
+        j = self.index.get(symbol)
+        return j is not None and bool(self.valid[j])
+
+    def field(self, name: str, default: np.ndarray | None = None) -> np.ndarray | None:
+        """Row of another field of the bar ("close" is row), or default if it is not loaded"""
+        if name == "close":
+            return self.row
+        if self.fields is None:
+            return default
+        return self.fields.get(name, default)
+
+    def to_dict(self) -> dict[str, float]:
+        return dict(zip(self.symbols, self.row.tolist()))
+
+
+def valid_prices(values: np.ndarray) -> np.ndarray:
+    """Finite and > 0 mask of a price array"""
+    with np.errstate(invalid="ignore"):
+        return np.isfinite(values) & (values > 0.0)
+
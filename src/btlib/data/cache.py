@@ -0,0 +1,241 @@
+from __future__ import annotations
+import json
+import os
+from pathlib import Path
+from typing import Callable, Iterable
+from urllib.parse import quote
+import numpy as np
+import pandas as pd
+from btlib.data.market_data import MarketData
+
+"""
+Local on-disk price cache. Each (symbol, field) series is stored as column partitions (.npz files
+holding a ts and a values array) that each cover a half-open [start, end) range. A request is served
+from the partitions that overlap it; only the uncovered gaps are passed to the fetcher, and new data is
+merged with overlapping or adjacent partitions so coverage stays in a few files. A JSON manifest tracks
+coverage, sizes and last use; least recently used partitions are evicted once the cache exceeds max_bytes.
+
+Fetchers are plain callables, so a local file can stand in for the network:
+    fetcher(symbols: list[str], start: pd.Timestamp, end: pd.Timestamp, field: str) -> pd.DataFrame
+returning a frame indexed by timestamp with one column per symbol for rows in [start, end).
+"""
+
+Fetcher = Callable[[list[str], pd.Timestamp, pd.Timestamp, str], pd.DataFrame]
+
+_MANIFEST = "manifest.json"
+
+
+def yfinance_fetcher(symbols: list[str], start: pd.Timestamp, end: pd.Timestamp, field: str) -> pd.DataFrame:
+    """Downloads from Yahoo Finance (needs the yfinance package); field is a yf.download column, e.g. "Close" """
+    try:
+        import yfinance as yf
+    except ImportError as e:
+        raise ImportError("yfinance_fetcher needs yfinance: pip install yfinance") from e
+    data = yf.download(list(symbols), start=start, end=end, progress=False, auto_adjust=True)
+    if data.empty:
+        return pd.DataFrame(index=pd.DatetimeIndex([]), columns=list(symbols), dtype=float)
+    return data[field]
+
+
+def frame_fetcher(frames: dict[str, pd.DataFrame]) -> Fetcher:
+    """Fetcher over in-memory frames ({field: frame}), e.g. loaded once from a local CSV/Parquet file"""
+    def fetch(symbols: list[str], start: pd.Timestamp, end: pd.Timestamp, field: str) -> pd.DataFrame:
+        frame = frames[field]
+        rows = frame[(frame.index >= start) & (frame.index < end)]
+        return rows[[s for s in symbols if s in rows.columns]]
+    return fetch
+
+
+class PriceCache:
+    """
+    :param root: Cache directory (created if missing, ~ is expanded)
+    :param fetcher: Called for ranges the cache does not cover (None -> cache-only, missing ranges raise)
+    :param max_bytes: Size cap of the partition files; least recently used partitions are evicted above it
+    """
+    def __init__(self, root: str | os.PathLike, fetcher: Fetcher | None = None, max_bytes: int = 1 << 30) -> None:
+        self.root = Path(root).expanduser()
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.fetcher = fetcher
+        self.max_bytes = int(max_bytes)
+        self._manifest = self._load_manifest()
+
+    # ----------------------------
+    # Manifest
+    # ----------------------------
+
+    def _load_manifest(self) -> dict:
+        path = self.root / _MANIFEST
+        if path.exists():
+            with path.open() as fh:
+                return json.load(fh)
+        return {"clock": 0, "partitions": {}}
+
+    def _save_manifest(self) -> None:
+        tmp = self.root / (_MANIFEST + ".tmp")
+        with tmp.open("w") as fh:
+            json.dump(self._manifest, fh)
+        os.replace(tmp, self.root / _MANIFEST)
+
+    def _tick(self) -> int:
+        self._manifest["clock"] += 1
+        return self._manifest["clock"]
+
+    def _partitions(self, symbol: str, field: str) -> list[tuple[str, dict]]:
+        """(key, entry) of a series, ordered by start"""
+        parts = [
+            (key, p) for key, p in self._manifest["partitions"].items()
+            if p["symbol"] == symbol and p["field"] == field
+        ]
+        return sorted(parts, key=lambda kp: kp[1]["start"])
+
+    @property
+    def nbytes(self) -> int:
+        return int(sum(p["nbytes"] for p in self._manifest["partitions"].values()))
+
+    # ----------------------------
+    # Partition files
+    # ----------------------------
+
+    def _read(self, entry: dict) -> pd.Series:
+        with np.load(self.root / entry["file"], allow_pickle=False) as data:
+            index = pd.DatetimeIndex(data["ts"])
+            tz = str(data["tz"])
+            values = data["values"]
+        if tz:
+            index = index.tz_localize("UTC").tz_convert(tz)
+        return pd.Series(values, index=index, name=entry["symbol"])
+
+    def _write(self, symbol: str, field: str, start: pd.Timestamp, end: pd.Timestamp, series: pd.Series) -> None:
+        index = pd.DatetimeIndex(series.index)
+        tz = "" if index.tz is None else str(index.tz)
+        ts = (index.tz_convert("UTC").tz_localize(None) if index.tz is not None else index).to_numpy()
+        rel = Path(quote(field, safe="")) / quote(symbol, safe="") / f"{start.value}_{end.value}.npz"
+        path = self.root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("wb") as fh:
+            np.savez(fh, ts=ts, values=series.to_numpy(dtype=float), tz=np.array(tz))
+        self._manifest["partitions"][str(rel)] = {
+            "symbol": symbol,
+            "field": field,
+            "start": start.value,
+            "end": end.value,
+            "file": str(rel),
+            "nbytes": path.stat().st_size,
+            "last_used": self._tick(),
+        }
+
+    def _drop(self, key: str) -> None:
+        entry = self._manifest["partitions"].pop(key)
+        (self.root / entry["file"]).unlink(missing_ok=True)
+
+    # ----------------------------
+    # Coverage
+    # ----------------------------
+
+    def missing(self, symbol: str, start, end, field: str = "close") -> list[tuple[pd.Timestamp, pd.Timestamp]]:
+        """Sub-ranges of [start, end) not covered by the cache"""
+        lo, hi = pd.Timestamp(start).value, pd.Timestamp(end).value
+        gaps = []
+        for _, p in self._partitions(symbol, field):
+            if p["end"] <= lo or p["start"] >= hi:
+                continue
+            if p["start"] > lo:
+                gaps.append((lo, p["start"]))
+            lo = max(lo, p["end"])
+        if lo < hi:
+            gaps.append((lo, hi))
+        tz = pd.Timestamp(start).tz
+        return [(pd.Timestamp(a, tz=tz), pd.Timestamp(b, tz=tz)) for a, b in gaps]
+
+    def put(self, symbol: str, start, end, series: pd.Series, field: str = "close") -> None:
+        """
+        Stores a series as covering [start, end) (rows outside are dropped), merging it with
+        overlapping or adjacent partitions; on overlap the new values win.
+        """
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        series = series[(series.index >= start) & (series.index < end)]
+        lo, hi = start, end
+        pieces = []
+        for key, p in self._partitions(symbol, field):
+            if p["end"] < lo.value or p["start"] > hi.value:
+                continue
+            pieces.append(self._read(p))
+            lo = min(lo, pd.Timestamp(p["start"], tz=start.tz))
+            hi = max(hi, pd.Timestamp(p["end"], tz=start.tz))
+            self._drop(key)
+        merged = pd.concat(pieces + [series.astype(float)]) if pieces else series.astype(float)
+        merged = merged[~merged.index.duplicated(keep="last")].sort_index()
+        self._write(symbol, field, lo, hi, merged)
+
+    # ----------------------------
+    # Requests
+    # ----------------------------
+
+    def get(self, symbols: Iterable[str], start, end, field: str = "close") -> pd.DataFrame:
+        """
+        Prices of symbols over [start, end), one column per symbol on the union of their timestamps.
+        Gaps are fetched in one fetcher call per distinct gap (symbols missing the same range are batched).
+        """
+        symbols = [str(s) for s in symbols]
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        if end <= start:
+            raise ValueError(f"end ({end}) must be after start ({start})")
+
+        batches: dict[tuple[pd.Timestamp, pd.Timestamp], list[str]] = {}
+        for sym in symbols:
+            for gap in self.missing(sym, start, end, field):
+                batches.setdefault(gap, []).append(sym)
+        if batches and self.fetcher is None:
+            raise KeyError(f"Cache misses {sorted(batches)} and no fetcher is configured")
+        now = pd.Timestamp.now(tz=start.tz)
+        for (g0, g1), syms in batches.items():
+            fetched = self.fetcher(syms, g0, g1, field)
+            # coverage is only recorded up to now: bars that do not exist yet are fetched again next time
+            covered_to = min(g1, now)
+            if covered_to <= g0:
+                continue
+            for sym in syms:
+                col = fetched[sym] if sym in fetched.columns else pd.Series(dtype=float, index=pd.DatetimeIndex([], tz=g0.tz))
+                self.put(sym, g0, covered_to, col, field)
+
+        columns = []
+        for sym in symbols:
+            parts = []
+            for key, p in self._partitions(sym, field):
+                if p["end"] <= start.value or p["start"] >= end.value:
+                    continue
+                p["last_used"] = self._tick()
+                s = self._read(p)
+                parts.append(s[(s.index >= start) & (s.index < end)])
+            columns.append(pd.concat(parts) if parts else pd.Series(dtype=float, index=pd.DatetimeIndex([], tz=start.tz)))
+        self._evict(keep={(s, field) for s in symbols})
+        self._save_manifest()
+        out = pd.concat(columns, axis=1) if columns else pd.DataFrame()
+        out.columns = symbols
+        return out.sort_index()
+
+    def market(self, symbols: Iterable[str], start, end, field: str = "close") -> MarketData:
+        """get() wrapped as MarketData"""
+        return MarketData(self.get(symbols, start, end, field))
+
+    def _evict(self, keep: set[tuple[str, str]] = frozenset()) -> None:
+        """Drops least recently used partitions until the cache fits max_bytes; the series just served go last"""
+        total = self.nbytes
+        if total <= self.max_bytes:
+            return
+        order = sorted(
+            self._manifest["partitions"].items(),
+            key=lambda kp: ((kp[1]["symbol"], kp[1]["field"]) in keep, kp[1]["last_used"]),
+        )
+        for key, p in order:
+            if total <= self.max_bytes:
+                break
+            if (p["symbol"], p["field"]) in keep:
+                break  # never evict what the current request returned
+            total -= p["nbytes"]
+            self._drop(key)
+
+    def clear(self) -> None:
+        for key in list(self._manifest["partitions"]):
+            self._drop(key)
+        self._save_manifest()
@@ -0,0 +1,249 @@
+from __future__ import annotations
+import json
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable, Iterator, Protocol
+import numpy as np
+import pandas as pd
+from btlib.data.market_data import FIELDS, MarketData
+
+"""
+Out-of-core market data: the timeline is walked in blocks of `block_bars` bars read from disk, and only
+the current block plus a `lookback` tail of the previous one is held in memory.
+
+Sources:
+- the symbol=/year= partitioned Parquet directories of btlib.data.arrow_io (write_partitioned,
+  ParquetBarWriter), through ChunkedMarketData.from_partitioned; each block is a time-range read of
+  those files scattered onto the (bars x symbols) grid
+- BlockStore: one raw row-major (bars x symbols) file per field plus an int64 timestamp file and a small
+  JSON header, served from a memory map. A block is then a plain slice, with no decoding or realignment
+  per block and no pyarrow needed; BlockStoreWriter appends frames to it piece by piece, so stores
+  larger than RAM can be built from a sequence of downloads or files.
+"""
+
+_META = "meta.json"
+_TS = "ts.bin"
+
+
+class BlockSource(Protocol):
+    """Anything that can hand out rows [start, stop) of (bars x symbols) field matrices"""
+    def timestamps(self) -> pd.DatetimeIndex: ...
+    def symbols(self) -> list[str]: ...
+    def fields(self) -> list[str]: ...
+    def read(self, start: int, stop: int, field: str = "close") -> np.ndarray: ...
+
+
+def _check_fields(fields: Iterable[str]) -> list[str]:
+    fields = [str(f).lower() for f in fields]
+    unknown = [f for f in fields if f not in FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields {unknown} (expected some of {list(FIELDS)})")
+    if "close" not in fields:
+        raise ValueError("fields must include close")
+    return [f for f in FIELDS if f in fields]
+
+
+class BlockStoreWriter:
+    """
+    Appends bars to a BlockStore directory; use as a context manager or call close().
+    fields are the OHLCV fields stored (close is required); every append() must give each of them.
+    """
+    def __init__(self, root: str | os.PathLike, symbols: list[str], dtype=np.float64,
+                 fields: Iterable[str] = ("close",)) -> None:
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.symbols = [str(s) for s in symbols]
+        self.dtype = np.dtype(dtype)
+        self.fields = _check_fields(fields)
+        self.n_bars = 0
+        self._tz = None
+        self._unit = "ns"
+        self._last = None
+        self._values = {name: (self.root / f"{name}.bin").open("wb") for name in self.fields}
+        self._ts = (self.root / _TS).open("wb")
+
+    def append(self, close: pd.DataFrame, **fields: pd.DataFrame) -> None:
+        """
+        Bars strictly after the ones already written; columns are aligned to symbols (missing -> NaN).
+        The other stored fields are passed by name (e.g. volume=...) on the same timestamps as close.
+        """
+        frames = {"close": close, **{str(k).lower(): v for k, v in fields.items()}}
+        if set(frames) != set(self.fields):
+            raise ValueError(f"append() needs exactly the stored fields {self.fields}, got {sorted(frames)}")
+        if close.empty:
+            return
+        index = pd.DatetimeIndex(close.index)
+        if not index.is_monotonic_increasing or index.has_duplicates:
+            raise ValueError("Appended bars must be sorted without duplicates")
+        if self._last is not None and index[0] <= self._last:
+            raise ValueError(f"Appended bars must start after {self._last}, got {index[0]}")
+        if self.n_bars == 0:
+            self._tz = None if index.tz is None else str(index.tz)
+            self._unit = index.unit
+        for name in self.fields:
+            frame = frames[name]
+            if not pd.DatetimeIndex(frame.index).equals(index):
+                raise ValueError(f"{name} timestamps do not match close")
+            values = frame.set_axis(frame.columns.astype(str), axis=1).reindex(columns=self.symbols)
+            np.ascontiguousarray(values.to_numpy(dtype=self.dtype)).tofile(self._values[name])
+        utc = index.tz_convert("UTC").tz_localize(None) if index.tz is not None else index
+        utc.as_unit(self._unit).asi8.astype(np.int64).tofile(self._ts)
+        self._last = index[-1]
+        self.n_bars += len(index)
+
+    def close(self) -> None:
+        if self._ts.closed:
+            return
+        for fh in self._values.values():
+            fh.close()
+        self._ts.close()
+        meta = {"symbols": self.symbols, "dtype": self.dtype.str, "n_bars": self.n_bars, "tz": self._tz,
+                "unit": self._unit, "fields": self.fields}
+        with (self.root / _META).open("w") as fh:
+            json.dump(meta, fh)
+
+    def __enter__(self) -> BlockStoreWriter:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def write_block_store(market: MarketData, root: str | os.PathLike, dtype=None,
+                      fields: Iterable[str] | None = None) -> None:
+    """
+    Writes a MarketData as a BlockStore (in the market's storage dtype unless given), with the given
+    fields (None -> all the market has)
+    """
+    fields = market.fields() if fields is None else _check_fields(fields)
+    dtype = market.values().dtype if dtype is None else dtype
+    with BlockStoreWriter(root, market.symbols(), dtype=dtype, fields=fields) as w:
+        w.append(market.close, **{name: market.field_frame(name) for name in fields if name != "close"})
+
+
+class BlockStore:
+    """Read side of a BlockStore directory: rows are served from a read-only memory map"""
+    def __init__(self, root: str | os.PathLike) -> None:
+        self.root = Path(root)
+        with (self.root / _META).open() as fh:
+            meta = json.load(fh)
+        self._symbols = list(meta["symbols"])
+        self._fields = list(meta.get("fields", ["close"]))
+        n, width = int(meta["n_bars"]), len(self._symbols)
+        self._values = {
+            name: np.memmap(self.root / f"{name}.bin", dtype=np.dtype(meta["dtype"]), mode="r", shape=(n, width))
+            for name in self._fields
+        }
+        index = pd.DatetimeIndex(np.fromfile(self.root / _TS, dtype=np.int64).view(f"M8[{meta['unit']}]"))
+        self._index = index.tz_localize("UTC").tz_convert(meta["tz"]) if meta["tz"] else index
+
+    def timestamps(self) -> pd.DatetimeIndex:
+        return self._index
+
+    def symbols(self) -> list[str]:
+        return list(self._symbols)
+
+    def fields(self) -> list[str]:
+        return list(self._fields)
+
+    def read(self, start: int, stop: int, field: str = "close") -> np.ndarray:
+        if field not in self._values:
+            raise KeyError(f"Field {field!r} not in the store (available: {self._fields})")
+        return np.array(self._values[field][start:stop])  # copy the block out of the map
+
+
+@dataclass(frozen=True)
+class MarketBlock:
+    """
+    One block of the timeline. Rows [0, offset) are the lookback tail carried over from the previous
+    block; rows [offset, len) are the new bars start, start + 1, ... of the full timeline. values are
+    the closes; fields holds the other loaded fields on the same rows.
+    """
+    start: int
+    offset: int
+    index: pd.DatetimeIndex
+    values: np.ndarray
+    fields: dict[str, np.ndarray] = field(default_factory=dict)
+
+    @property
+    def stop(self) -> int:
+        return self.start + len(self.index) - self.offset
+
+    def field(self, name: str) -> np.ndarray:
+        return self.values if name == "close" else self.fields[name]
+
+
+class ChunkedMarketData:
+    """
+    Timeline of a BlockSource walked block by block.
+
+    :param source: Where the bars come from (e.g. a BlockStore)
+    :param block_bars: New bars per block
+    :param lookback: Bars of the previous block kept in front of each block (the history strategies may see)
+    :param fields: Fields loaded into each block, close included (None -> all the source has)
+    """
+    def __init__(self, source: BlockSource, block_bars: int = 10_000, lookback: int = 0,
+                 fields: Iterable[str] | None = None) -> None:
+        if int(block_bars) <= 0:
+            raise ValueError(f"block_bars must be a positive integer, got {block_bars!r}")
+        if int(lookback) < 0:
+            raise ValueError(f"lookback must be non-negative, got {lookback!r}")
+        self.source = source
+        self.block_bars = int(block_bars)
+        self.lookback = int(lookback)
+        available = source.fields()
+        self._fields = available if fields is None else _check_fields(fields)
+        missing = [f for f in self._fields if f not in available]
+        if missing:
+            raise ValueError(f"Fields {missing} not in the source (available: {available})")
+
+    @classmethod
+    def open(cls, root: str | os.PathLike, block_bars: int = 10_000, lookback: int = 0,
+             fields: Iterable[str] | None = None) -> ChunkedMarketData:
+        """Walks a BlockStore directory"""
+        return cls(BlockStore(root), block_bars=block_bars, lookback=lookback, fields=fields)
+
+    @classmethod
+    def from_partitioned(cls, root: str | os.PathLike, symbols: Iterable[str] | None = None, start=None, end=None,
+                         fields: Iterable[str] = ("close",), block_bars: int = 10_000, lookback: int = 0,
+                         ts_column: str = "ts", dtype=np.float64) -> ChunkedMarketData:
+        """Walks a symbol=/year= partitioned Parquet directory (see btlib.data.arrow_io.PartitionedSource)"""
+        from btlib.data.arrow_io import PartitionedSource
+        source = PartitionedSource(root, symbols=symbols, start=start, end=end, fields=fields,
+                                   ts_column=ts_column, dtype=dtype)
+        return cls(source, block_bars=block_bars, lookback=lookback)
+
+    def __len__(self) -> int:
+        return len(self.source.timestamps())
+
+    def timestamps(self) -> pd.DatetimeIndex:
+        return self.source.timestamps()
+
+    def symbols(self) -> list[str]:
+        return self.source.symbols()
+
+    def fields(self) -> list[str]:
+        return list(self._fields)
+
+    def blocks(self) -> Iterator[MarketBlock]:
+        """Blocks in time order; each holds at most lookback + block_bars rows"""
+        index = self.timestamps()
+        n = len(index)
+        tail_index = index[:0]
+        tails: dict[str, np.ndarray] = {}
+        for start in range(0, n, self.block_bars):
+            stop = min(start + self.block_bars, n)
+            arrays = {}
+            for name in self._fields:
+                new = self.source.read(start, stop, name)
+                values = np.concatenate([tails[name], new]) if tails else new
+                values.flags.writeable = False
+                arrays[name] = values
+            block_index = tail_index.append(index[start:stop])
+            yield MarketBlock(start=start, offset=len(tail_index), index=block_index, values=arrays["close"],
+                              fields={name: arr for name, arr in arrays.items() if name != "close"})
+            keep = min(self.lookback, len(block_index))
+            # copies, so the block itself can be freed
+            tails = {name: arr[len(arr) - keep:].copy() for name, arr in arrays.items()} if keep else {}
+            tail_index = block_index[len(block_index) - keep:] if keep else index[:0]
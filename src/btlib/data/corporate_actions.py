@@ -0,0 +1,185 @@
+from __future__ import annotations
+import hashlib
+import os
+from dataclasses import dataclass
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from btlib.data.market_data import MarketData
+from btlib.data.validators import validate_price_frame, require_columns
+
+"""
+Corporate-action adjustment of raw closes.
+
+Event tables are long frames, one row per event:
+    splits:    symbol, ex_date, ratio   (new shares per old share, e.g. 2.0 for a 2-for-1 split)
+    dividends: symbol, ex_date, amount  (cash per share)
+An event applies from the first bar on or after its ex_date. Every bar before it is scaled by the
+event's factor: 1 / ratio for a split, 1 - amount / (last valid close before the ex bar) for a dividend.
+The cumulative factor of a bar is the product of the factors of all later events, built for the whole
+(timestamps x symbols) matrix with one reverse cumulative product, so prices are on the share basis of
+the last bar:
+    back_adjusted = raw * split factor                  (continuous across splits, dividends not added back)
+    total_return  = raw * split factor * dividend factor (dividends reinvested)
+Events of symbols outside the price frame, or before its second bar, have nothing to adjust and are ignored.
+"""
+
+SPLIT_COLUMNS = ["symbol", "ex_date", "ratio"]
+DIVIDEND_COLUMNS = ["symbol", "ex_date", "amount"]
+_CACHE_VERSION = b"1"
+
+
+@dataclass
+class AdjustedPrices:
+    """Adjusted price matrices plus the cumulative factors that produced them (raw * factor)"""
+    back_adjusted: pd.DataFrame
+    total_return: pd.DataFrame
+    split_factor: np.ndarray
+    total_factor: np.ndarray
+
+    def market(self, kind: str = "total_return", **kwargs) -> MarketData:
+        """MarketData over one of the adjusted matrices (kwargs go to MarketData, e.g. dtype)"""
+        if kind not in ("back_adjusted", "total_return"):
+            raise ValueError(f"kind must be 'back_adjusted' or 'total_return', got {kind!r}")
+        return MarketData(getattr(self, kind), assume_sorted=True, validate=False, **kwargs)
+
+
+def _event_bars(events: pd.DataFrame, index: pd.DatetimeIndex, sym_index: dict[str, int]
+                ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(bar, column, row of events) of the events that fall on a bar after the first one"""
+    ex = pd.DatetimeIndex(pd.to_datetime(events["ex_date"]))
+    if index.tz is not None and ex.tz is None:
+        ex = ex.tz_localize(index.tz)
+    elif index.tz is None and ex.tz is not None:
+        ex = ex.tz_convert("UTC").tz_localize(None)
+    bars = index.searchsorted(ex, side="left")
+    cols = np.array([sym_index.get(str(s), -1) for s in events["symbol"]], dtype=np.intp)
+    keep = (cols >= 0) & (bars > 0) & (bars < len(index))
+    return bars[keep], cols[keep], np.flatnonzero(keep)
+
+
+def _cumulative(factors: np.ndarray) -> np.ndarray:
+    """cum[t] = product of factors[u] for u > t (events strictly after bar t)"""
+    cum = np.ones_like(factors)
+    cum[:-1] = np.cumprod(factors[:0:-1], axis=0)[::-1]
+    return cum
+
+
+def _last_valid(values: np.ndarray) -> np.ndarray:
+    """values with NaN / non-positive entries replaced by the last valid value above them (NaN before the first)"""
+    with np.errstate(invalid="ignore"):
+        valid = np.isfinite(values) & (values > 0.0)
+    rows = np.where(valid, np.arange(len(values))[:, None], -1)
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    out = values[np.maximum(rows, 0), np.arange(values.shape[1])[None, :]]
+    out[rows < 0] = np.nan
+    return out
+
+
+def adjustment_factors(
+        close: pd.DataFrame,
+        splits: pd.DataFrame | None = None,
+        dividends: pd.DataFrame | None = None) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Cumulative split and dividend factors, each a (timestamps x symbols) array aligned to close.
+
+    :param close: Raw (unadjusted) closes, sorted by time
+    :param splits: symbol, ex_date, ratio rows (None -> no splits)
+    :param dividends: symbol, ex_date, amount rows (None -> no dividends)
+    """
+    raw = close.to_numpy(dtype=float)
+    index = pd.DatetimeIndex(close.index)
+    sym_index = {str(s): j for j, s in enumerate(close.columns)}
+    split_step = np.ones_like(raw)
+    div_step = np.ones_like(raw)
+
+    if splits is not None and len(splits):
+        require_columns(splits, SPLIT_COLUMNS)
+        ratio = splits["ratio"].to_numpy(dtype=float)
+        if not (np.isfinite(ratio) & (ratio > 0.0)).all():
+            raise ValueError("Split ratios must be finite and > 0")
+        bars, cols, rows = _event_bars(splits, index, sym_index)
+        np.multiply.at(split_step, (bars, cols), 1.0 / ratio[rows])
+
+    if dividends is not None and len(dividends):
+        require_columns(dividends, DIVIDEND_COLUMNS)
+        amount = dividends["amount"].to_numpy(dtype=float)
+        if not (np.isfinite(amount) & (amount >= 0.0)).all():
+            raise ValueError("Dividend amounts must be finite and >= 0")
+        bars, cols, rows = _event_bars(dividends, index, sym_index)
+        prev = _last_valid(raw)[bars - 1, cols]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            factor = 1.0 - amount[rows] / prev
+        bad = ~np.isfinite(factor) | (factor <= 0.0)
+        if bad.any():
+            k = int(np.flatnonzero(bad)[0])
+            raise ValueError(
+                f"Dividend of {amount[rows][k]} for {close.columns[cols[k]]} at {index[bars[k]]} "
+                f"needs a valid prior close below it (got {prev[k]})"
+            )
+        np.multiply.at(div_step, (bars, cols), factor)
+
+    split_factor = _cumulative(split_step)
+    return split_factor, split_factor * _cumulative(div_step)
+
+
+def _cache_key(close: pd.DataFrame, splits: pd.DataFrame | None, dividends: pd.DataFrame | None) -> str:
+    h = hashlib.sha1(_CACHE_VERSION)
+    h.update(np.ascontiguousarray(close.to_numpy(dtype=float)).tobytes())
+    h.update(pd.DatetimeIndex(close.index).as_unit("ns").asi8.tobytes())
+    h.update("\0".join(map(str, close.columns)).encode())
+    for events in (splits, dividends):
+        h.update(b"|")
+        if events is not None and len(events):
+            h.update(pd.util.hash_pandas_object(events, index=False).to_numpy().tobytes())
+    return h.hexdigest()[:20]
+
+
+def adjust_prices(
+        close: pd.DataFrame | MarketData,
+        splits: pd.DataFrame | None = None,
+        dividends: pd.DataFrame | None = None,
+        cache_dir: str | os.PathLike | None = None) -> AdjustedPrices:
+    """
+    Back-adjusted and total-return closes from raw closes and split/dividend tables.
+
+    :param close: Raw closes (a frame or the closes of a MarketData)
+    :param splits: symbol, ex_date, ratio rows
+    :param dividends: symbol, ex_date, amount rows
+    :param cache_dir: Directory to keep the result in (e.g. next to the raw data); a result for the same
+        raw prices and events is loaded from it instead of being recomputed. None disables caching.
+    """
+    if isinstance(close, MarketData):
+        close = close.close
+    else:
+        validate_price_frame(close)
+        close = close.sort_index()
+
+    path = None
+    if cache_dir is not None:
+        cache_dir = Path(cache_dir).expanduser()
+        path = cache_dir / f"adjusted-{_cache_key(close, splits, dividends)}.npz"
+        if path.exists():
+            with np.load(path, allow_pickle=False) as data:
+                split_factor, total_factor = data["split_factor"], data["total_factor"]
+            return _adjusted(close, split_factor, total_factor)
+
+    split_factor, total_factor = adjustment_factors(close, splits, dividends)
+    if path is not None:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        with tmp.open("wb") as fh:
+            np.savez(fh, split_factor=split_factor, total_factor=total_factor)
+        os.replace(tmp, path)
+    return _adjusted(close, split_factor, total_factor)
+
+
+def _adjusted(close: pd.DataFrame, split_factor: np.ndarray, total_factor: np.ndarray) -> AdjustedPrices:
+    raw = close.to_numpy(dtype=float)
+    frame = lambda values: pd.DataFrame(values, index=close.index, columns=close.columns, copy=False)
+    return AdjustedPrices(
+        back_adjusted=frame(raw * split_factor),
+        total_return=frame(raw * total_factor),
+        split_factor=split_factor,
+        total_factor=total_factor,
+    )
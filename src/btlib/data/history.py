@@ -0,0 +1,254 @@
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+
+"""
+Zero-copy history views: "prices up to bar i" as read-only slices of one preallocated buffer.
+A view can only ever reach rows [start, i], so strategies cannot see the future by construction.
+"""
+
+
+def _readonly(arr: np.ndarray) -> np.ndarray:
+    view = arr.view()
+    view.flags.writeable = False
+    return view
+
+
+class HistoryView:
+    """
+    Read-only window of rows [start, i] of a price buffer.
+
+    Array access (values, tail_values, column) never copies more than requested; the DataFrame
+    form is built lazily on first use. Anything not defined here (tail, rolling, arithmetic,
+    numpy ufuncs, ...) is delegated to that DataFrame, so strategies written against
+    slice_upto() frames keep working.
+    Other (timestamps x symbols) arrays of the same rows (OHLCV fields, as-of aligned datasets)
+    are reached with data(name), as views over the same window.
+    """
+    __slots__ = ("_values", "_index", "_columns", "_col_index", "_source", "_frame", "_data")
+
+    def __init__(
+            self,
+            values: np.ndarray,
+            index: pd.DatetimeIndex,
+            columns: pd.Index,
+            col_index: dict[str, int],
+            source: tuple[pd.DataFrame, int, int] | None = None,
+            data: tuple[dict[str, np.ndarray], int, int] | None = None) -> None:
+        self._values = values
+        self._index = index
+        self._columns = columns
+        self._col_index = col_index
+        self._source = source
+        self._frame = None
+        self._data = data
+
+    @property
+    def values(self) -> np.ndarray:
+        """Read-only (rows, symbols) array of the window"""
+        return self._values
+
+    @property
+    def index(self) -> pd.DatetimeIndex:
+        return self._index
+
+    @property
+    def columns(self) -> pd.Index:
+        return self._columns
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return self._values.shape
+
+    @property
+    def empty(self) -> bool:
+        return self._values.shape[0] == 0 or self._values.shape[1] == 0
+
+    @property
+    def last_ts(self) -> pd.Timestamp | None:
+        return self._index[-1] if len(self._index) else None
+
+    def __len__(self) -> int:
+        return self._values.shape[0]
+
+    def __iter__(self):
+        return iter(self._columns)
+
+    def __array__(self, dtype=None, copy=None):
+        if dtype is None:
+            return self._values
+        return self._values.astype(dtype)
+
+    def column(self, symbol: str) -> np.ndarray:
+        """Read-only 1-D history of one symbol"""
+        return self._values[:, self._col_index[symbol]]
+
+    def tail_values(self, n: int, columns: list[str] | None = None) -> np.ndarray:
+        """Last n rows (fewer if the window is shorter), optionally restricted to columns"""
+        n = int(n)
+        rows = self._values[max(len(self) - n, 0):] if n > 0 else self._values[:0]
+        if columns is None:
+            return rows
+        return rows[:, [self._col_index[c] for c in columns]]
+
+    @property
+    def datasets(self) -> list[str]:
+        """Names reachable with data()"""
+        return [] if self._data is None else list(self._data[0])
+
+    def data(self, name: str) -> HistoryView:
+        """The same rows of another (timestamps x symbols) array, e.g. data("volume") or data("pe")"""
+        arrays, start, stop = self._data if self._data is not None else ({}, 0, 0)
+        if name not in arrays:
+            raise KeyError(f"Dataset {name!r} not available (available: {self.datasets})")
+        return HistoryView(arrays[name][start:stop], self._index, self._columns, self._col_index)
+
+    def to_frame(self) -> pd.DataFrame:
+        """DataFrame of the window, built once and cached"""
+        if self._frame is None:
+            if self._source is not None:
+                frame, start, stop = self._source
+                self._frame = frame.iloc[start:stop]
+            else:
+                self._frame = pd.DataFrame(self._values, index=self._index, columns=self._columns, copy=False)
+        return self._frame
+
+    def __getitem__(self, key):
+        return self.to_frame()[key]
+
+    def __getattr__(self, name: str):
+        # Only reached for attributes not defined above; private names never delegate
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.to_frame(), name)
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        inputs = tuple(x.to_frame() if isinstance(x, HistoryView) else x for x in inputs)
+        return getattr(ufunc, method)(*inputs, **kwargs)
+
+    def __repr__(self) -> str:
+        return f"HistoryView(rows={len(self)}, symbols={len(self._columns)}, last_ts={self.last_ts})"
+
+
+def _forward(name: str):
+    def op(self, *args):
+        args = tuple(x.to_frame() if isinstance(x, HistoryView) else x for x in args)
+        return getattr(self.to_frame(), name)(*args)
+    op.__name__ = name
+    return op
+
+
+# Special methods are looked up on the type, so __getattr__ never sees them: forward them explicitly
+for _name in (
+        "__add__", "__radd__", "__sub__", "__rsub__", "__mul__", "__rmul__", "__truediv__", "__rtruediv__",
+        "__floordiv__", "__rfloordiv__", "__mod__", "__rmod__", "__pow__", "__rpow__", "__matmul__",
+        "__rmatmul__", "__lt__", "__le__", "__gt__", "__ge__", "__neg__", "__pos__", "__abs__", "__invert__",
+        "__and__", "__rand__", "__or__", "__ror__", "__xor__", "__rxor__", "__eq__", "__ne__"):
+    setattr(HistoryView, _name, _forward(_name))
+del _name
+# Element-wise __eq__ makes views unhashable, like the DataFrame they stand in for
+HistoryView.__hash__ = None
+
+
+class HistoryWindow:
+    """
+    Incremental history over a preallocated (timestamps x symbols) buffer.
+
+    view(i) returns rows [0, i] (or the last `lookback` of them) as a HistoryView in O(1).
+    datasets are further arrays of the same shape, reachable from each view with data(name).
+    """
+    def __init__(
+            self,
+            values: np.ndarray,
+            index: pd.DatetimeIndex,
+            columns: pd.Index | list[str],
+            lookback: int | None = None,
+            frame: pd.DataFrame | None = None,
+            datasets: dict[str, np.ndarray] | None = None) -> None:
+        values = np.asarray(values)
+        if values.ndim != 2 or values.shape[0] != len(index) or values.shape[1] != len(columns):
+            raise ValueError(f"values shape {values.shape} does not match index/columns ({len(index)}, {len(columns)})")
+        self._datasets = {}
+        for name, arr in (datasets or {}).items():
+            arr = np.asarray(arr)
+            if arr.shape != values.shape:
+                raise ValueError(f"dataset {name!r} shape {arr.shape} does not match values {values.shape}")
+            self._datasets[name] = _readonly(arr)
+        if lookback is not None and int(lookback) <= 0:
+            raise ValueError(f"lookback must be a positive integer, got {lookback!r}")
+        self._values = _readonly(values)
+        self.index = pd.DatetimeIndex(index)
+        self.columns = pd.Index(columns)
+        self.lookback = None if lookback is None else int(lookback)
+        self._col_index = {c: j for j, c in enumerate(self.columns)}
+        self._frame = frame
+
+    def __len__(self) -> int:
+        return self._values.shape[0]
+
+    def start(self, i: int) -> int:
+        """First row visible at bar i"""
+        return 0 if self.lookback is None else max(i + 1 - self.lookback, 0)
+
+    def view(self, i: int) -> HistoryView:
+        """History up to and including bar i; i < 0 gives an empty view"""
+        i = int(i)
+        if i >= len(self):
+            raise IndexError(f"bar {i} out of range for history of length {len(self)}")
+        start = self.start(i) if i >= 0 else 0
+        stop = i + 1 if i >= 0 else 0
+        return HistoryView(
+            self._values[start:stop],
+            self.index[start:stop],
+            self.columns,
+            self._col_index,
+            None if self._frame is None else (self._frame, start, stop),
+            (self._datasets, start, stop) if self._datasets else None,
+        )
+
+
+class RingHistory:
+    """
+    Bounded history for streaming: the last `capacity` bars in a ring buffer.
+
+    Every row is written twice (at k % capacity and k % capacity + capacity) so the last
+    m <= capacity rows are always one contiguous slice, and view() stays zero-copy.
+    Views alias the ring and are only valid until the bar they were taken on is overwritten;
+    copy what must be kept longer than `capacity` bars.
+    """
+    def __init__(self, columns: pd.Index | list[str], capacity: int, dtype=np.float64) -> None:
+        if int(capacity) <= 0:
+            raise ValueError(f"capacity must be a positive integer, got {capacity!r}")
+        self.columns = pd.Index(columns)
+        self.capacity = int(capacity)
+        self._col_index = {c: j for j, c in enumerate(self.columns)}
+        self._values = np.full((2 * self.capacity, len(self.columns)), np.nan, dtype=dtype)
+        self._ts = np.zeros(2 * self.capacity, dtype="M8[ns]")
+        self._tz = None
+        self.n = 0  # bars appended so far
+
+    def __len__(self) -> int:
+        return min(self.n, self.capacity)
+
+    def append(self, ts: pd.Timestamp, row: np.ndarray) -> None:
+        """Adds one bar; row must be aligned to columns"""
+        ts = pd.Timestamp(ts)
+        if self.n == 0:
+            self._tz = ts.tz
+            self._ts = np.zeros(2 * self.capacity, dtype=f"M8[{ts.unit}]")
+        p = self.n % self.capacity
+        value = ts.tz_convert("UTC").to_datetime64() if ts.tz is not None else ts.to_datetime64()
+        self._values[p] = row
+        self._values[p + self.capacity] = row
+        self._ts[p] = value
+        self._ts[p + self.capacity] = value
+        self.n += 1
+
+    def view(self) -> HistoryView:
+        """The last min(n, capacity) bars, oldest first"""
+        m = len(self)
+        stop = (self.n - 1) % self.capacity + self.capacity + 1 if self.n else 0
+        index = pd.DatetimeIndex(self._ts[stop - m:stop])
+        if self._tz is not None:
+            index = index.tz_localize("UTC").tz_convert(self._tz)
+        return HistoryView(_readonly(self._values[stop - m:stop]), index, self.columns, self._col_index)
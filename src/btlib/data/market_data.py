@@ -1,14 +1,111 @@
 from btlib.data.validators import validate_price_frame
+from btlib.data.history import HistoryWindow, HistoryView
+from btlib.data.bar import BarPrices, symbol_order, symbol_rank, valid_prices
+from btlib.data.quality import DataQualityIndex
+from btlib.data.universe import Universe
+from btlib.data.asof import align_asof
 import pandas as pd
 import numpy as np
 """
 Class containing market data, converting dataframes into usable dicts for orders, fills, and positions
 """
+FIELDS = ("open", "high", "low", "close", "volume")
 class MarketData:
-    def __init__(self, close: pd.DataFrame) -> None:
-        validate_price_frame(close)
-        self.close = close.sort_index()
-        self.close.columns = self.close.columns.astype(str)
+    def __init__(
+            self,
+            close: pd.DataFrame,
+            *,
+            open: pd.DataFrame | None = None,
+            high: pd.DataFrame | None = None,
+            low: pd.DataFrame | None = None,
+            volume: pd.DataFrame | None = None,
+            dtype: np.dtype | type | str | None = None,
+            assume_sorted: bool = False,
+            validate: bool = True,
+            min_coverage: float | None = None) -> None:
+        """
+        assume_sorted=True wraps the frame as-is instead of taking a sort_index() copy, so it can sit on
+        shared or memory-mapped buffers; validate=False skips validate_price_frame for frames that come
+        from an existing MarketData; min_coverage is passed to it to reject symbols with too few valid marks.
+        open/high/low/volume are optional extra fields on the same timestamps and symbols as close; with
+        any of them (or a dtype, e.g. np.float32 to halve memory) every field is stored as one contiguous
+        (timestamps x symbols) array of that dtype and close is a frame over its array.
+        """
+        if validate:
+            validate_price_frame(close, min_coverage=min_coverage)
+        self.close = close if assume_sorted else close.sort_index()
+        if not all(isinstance(c, str) for c in self.close.columns):
+            self.close = self.close.set_axis(self.close.columns.astype(str), axis=1)
+        self._values = None
+        self._fields: dict[str, np.ndarray] = {}
+        self._valid = None
+        self._symbols = None
+        self._symbol_index = None
+        self._order = None
+        self._rank = None
+        self._quality = None
+        self.universe: Universe | None = None
+        self._datasets: dict[str, np.ndarray] = {}
+        extra = {"open": open, "high": high, "low": low, "volume": volume}
+        if dtype is not None or any(f is not None for f in extra.values()):
+            self._store_fields(extra, np.float64 if dtype is None else dtype, assume_sorted)
+    def _store_fields(self, extra: dict[str, pd.DataFrame | None], dtype, assume_sorted: bool) -> None:
+        dtype = np.dtype(dtype)
+        if dtype.kind != "f":
+            raise TypeError(f"Field storage dtype must be a float type, got {dtype}")
+        index, columns = self.close.index, self.close.columns
+        arrays = {}
+        for name, frame in extra.items():
+            if frame is None:
+                continue
+            frame = frame if assume_sorted else frame.sort_index()
+            frame = frame.set_axis(frame.columns.astype(str), axis=1)
+            if not frame.index.equals(index):
+                raise ValueError(f"{name} timestamps do not match close")
+            if set(frame.columns) != set(columns):
+                raise ValueError(f"{name} symbols do not match close")
+            if not all(pd.api.types.is_numeric_dtype(dt) for dt in frame.dtypes):
+                raise TypeError(f"All {name} columns must be numeric dtype")
+            arrays[name] = frame.reindex(columns=columns)
+        arrays["close"] = self.close
+        for name in FIELDS:
+            if name in arrays:
+                # C-contiguous and owned: never a view of a frame the caller still holds
+                arr = np.require(arrays[name].to_numpy(dtype=dtype), requirements=["C", "O"])
+                arr.flags.writeable = False
+                self._fields[name] = arr
+        self.close = pd.DataFrame(self._fields["close"], index=index, columns=columns, copy=False)
+        self._values = self._fields["close"]
+    @classmethod
+    def from_ohlcv(cls, data: pd.DataFrame | dict[str, pd.DataFrame], dtype=None, **kwargs) -> "MarketData":
+        """
+        MarketData from {field: frame} or a frame with (field, symbol) MultiIndex columns, e.g. the
+        output of yf.download; field names are matched case-insensitively and "adj close" is ignored.
+        """
+        if isinstance(data, pd.DataFrame):
+            if not isinstance(data.columns, pd.MultiIndex):
+                raise ValueError("Expected (field, symbol) MultiIndex columns")
+            data = {f: data[f] for f in data.columns.get_level_values(0).unique()}
+        frames = {str(k).lower(): v for k, v in data.items()}
+        if "close" not in frames:
+            raise ValueError(f"No close field in {sorted(frames)}")
+        extra = {f: frames[f] for f in FIELDS if f != "close" and f in frames}
+        return cls(frames["close"], dtype=dtype, **extra, **kwargs)
+    @classmethod
+    def from_parquet(cls, path, symbols=None, start=None, end=None, ts_column: str = "ts") -> "MarketData":
+        """Wide Parquet file, only the requested symbols/date range (see btlib.data.arrow_io)"""
+        from btlib.data.arrow_io import read_parquet
+        return read_parquet(path, symbols=symbols, start=start, end=end, ts_column=ts_column)
+    @classmethod
+    def from_arrow(cls, path, symbols=None, start=None, end=None, ts_column: str = "ts") -> "MarketData":
+        """Memory-mapped wide Arrow IPC file, only the requested symbols/date range"""
+        from btlib.data.arrow_io import read_arrow
+        return read_arrow(path, symbols=symbols, start=start, end=end, ts_column=ts_column)
+    @classmethod
+    def from_partitioned(cls, root, symbols=None, start=None, end=None, field: str = "close") -> "MarketData":
+        """symbol=/year= partitioned Parquet directory, only the requested partitions"""
+        from btlib.data.arrow_io import read_partitioned
+        return read_partitioned(root, symbols=symbols, start=start, end=end, field=field)
     def timestamps(self) -> pd.Timestamp:
         return self.close.index
     def symbols(self) -> list[str]:
@@ -19,8 +116,7 @@ class MarketData:
             raise KeyError(f"Timestamp {ts} not found in market data")
         return self.close.loc[ts]
     def get_price_dict(self, ts: pd.Timestamp) -> dict[str,float]:
-        get_close=self.get_close(ts)
-        return get_close.to_dict()
+        return self.bar(self.position(ts)).to_dict()
     def slice_upto(self, ts: pd.Timestamp) -> pd.DataFrame:
         ts = pd.Timestamp(ts)
 
@@ -29,6 +125,155 @@ class MarketData:
 
         return self.close.loc[:ts]
     def tradable_symbols(self, ts: pd.Timestamp) -> list[str]:
-        row = self.get_close(ts)
-        mask = np.isfinite(row.astype(float))
-        return row.index[mask].tolist()
+        row = self.row(self.position(ts))
+        symbols = self._symbol_list()
+        return [symbols[j] for j in np.flatnonzero(np.isfinite(row))]
+    # ----------------------------
+    # Positional access (bar i = row i of values())
+    # ----------------------------
+    def position(self, ts: pd.Timestamp) -> int:
+        """Bar number of a timestamp"""
+        ts = pd.Timestamp(ts)
+        try:
+            i = self.close.index.get_loc(ts)
+        except KeyError:
+            raise KeyError(f"Timestamp {ts} not found in market data") from None
+        if not isinstance(i, (int, np.integer)):
+            raise KeyError(f"Timestamp {ts} is not unique in market data")
+        return int(i)
+    def _symbol_list(self) -> list[str]:
+        if self._symbols is None:
+            self._symbols = self.close.columns.tolist()
+        return self._symbols
+    def symbol_index(self) -> dict[str, int]:
+        """symbol -> column of values(), built once"""
+        if self._symbol_index is None:
+            self._symbol_index = {s: j for j, s in enumerate(self._symbol_list())}
+        return self._symbol_index
+    def row(self, i: int) -> np.ndarray:
+        """Closes of bar i as a read-only view aligned to symbols()"""
+        return self.values()[i]
+    def valid_mask(self) -> np.ndarray:
+        """Read-only (timestamps x symbols) mask of tradable closes (finite and > 0), built once"""
+        if self._valid is None:
+            valid = valid_prices(self.values())
+            valid.flags.writeable = False
+            self._valid = valid
+        return self._valid
+    def quality(self, stale_bars: int = 5) -> DataQualityIndex:
+        """Data-quality index of the closes (tradable ids per bar, first/last valid bar, gaps, stale runs), built once"""
+        if self._quality is None or self._quality.stale_bars != int(stale_bars):
+            self._quality = DataQualityIndex(self.values(), self.close.index, self._symbol_list(),
+                                             stale_bars=stale_bars, valid=self.valid_mask())
+        return self._quality
+    def bar(self, i: int) -> BarPrices:
+        """Closes of bar i as a BarPrices mapping over row(i) (no dict is built), with the other fields' rows"""
+        if self._order is None:
+            self._order = symbol_order(self._symbol_list())
+            self._rank = symbol_rank(self._order)
+        active = None if self.universe is None else self.universe.active_ids(i)
+        fields = {name: arr[i] for name, arr in self._fields.items() if name != "close"} if len(self._fields) > 1 else None
+        return BarPrices(self._symbol_list(), self.symbol_index(), self.values()[i], self.valid_mask()[i], self._order,
+                         active=active, rank=self._rank, fields=fields)
+    def with_universe(self, universe: "Universe | pd.DataFrame | None") -> "MarketData":
+        """
+        This MarketData (same buffers) with point-in-time universe membership attached: a Universe or a
+        symbol/start/end intervals frame (see btlib.data.universe). The engine then only builds targets
+        and orders for the members of each bar (plus held symbols) and records targets sparsely.
+        """
+        if isinstance(universe, pd.DataFrame):
+            universe = Universe.from_intervals(universe, self.close.index, self._symbol_list())
+        if universe is not None:
+            if len(universe) != len(self.close.index) or universe.symbols != self._symbol_list():
+                raise ValueError("Universe timestamps/symbols do not match the market")
+        sub = self.window(0, len(self.close.index))
+        sub.universe = universe
+        return sub
+    def with_dataset(self, name: str, data: "pd.DataFrame | np.ndarray", **kwargs) -> "MarketData":
+        """
+        This MarketData (same buffers) with one more dataset aligned to its bars: a long
+        symbol/ts/value frame or a wide frame indexed by observation time, joined as-of with a
+        publication lag (kwargs go to btlib.data.asof.align_asof, e.g. lag="45D"), or an array
+        already aligned to (timestamps x symbols). Strategies read it from history views with
+        hist.data(name), never past the current bar.
+        """
+        name = str(name)
+        if name in FIELDS:
+            raise ValueError(f"Dataset name {name!r} clashes with a price field")
+        if isinstance(data, pd.DataFrame):
+            arr = align_asof(data, self.close.index, self._symbol_list(), **kwargs)
+        else:
+            if kwargs:
+                raise TypeError("Alignment options only apply to DataFrame datasets")
+            arr = np.array(data, dtype=float)
+            if arr.shape != self.values().shape:
+                raise ValueError(f"dataset {name!r} shape {arr.shape} does not match the market {self.values().shape}")
+        arr.flags.writeable = False
+        sub = self.window(0, len(self.close.index))
+        sub._datasets = {**self._datasets, name: arr}
+        return sub
+    def datasets(self) -> list[str]:
+        """Names of the attached as-of datasets"""
+        return list(self._datasets)
+    def dataset(self, name: str) -> np.ndarray:
+        """Read-only (timestamps x symbols) array of one attached dataset"""
+        if name not in self._datasets:
+            raise KeyError(f"Dataset {name!r} not attached (available: {self.datasets()})")
+        return self._datasets[name]
+    def dataset_frame(self, name: str) -> pd.DataFrame:
+        return pd.DataFrame(self.dataset(name), index=self.close.index, columns=self.close.columns, copy=False)
+    def fields(self) -> list[str]:
+        """Available fields, in OHLCV order"""
+        return [f for f in FIELDS if f in self._fields] if self._fields else ["close"]
+    def field(self, name: str) -> np.ndarray:
+        """Read-only (timestamps x symbols) array of one field"""
+        if name == "close":
+            return self.values()
+        if name not in self._fields:
+            raise KeyError(f"Field {name!r} not loaded (available: {self.fields()})")
+        return self._fields[name]
+    def field_row(self, name: str, i: int) -> np.ndarray:
+        """Bar i of one field as a row view aligned to symbols()"""
+        return self.field(name)[i]
+    def field_frame(self, name: str) -> pd.DataFrame:
+        """One field as a DataFrame over its array (no copy)"""
+        if name == "close":
+            return self.close
+        return pd.DataFrame(self.field(name), index=self.close.index, columns=self.close.columns, copy=False)
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the price arrays"""
+        if self._fields:
+            return int(sum(a.nbytes for a in self._fields.values()))
+        return int(self.values().nbytes)
+    def values(self) -> np.ndarray:
+        """Read-only float array of closes (timestamps x symbols), built once"""
+        if self._values is None:
+            values = np.asarray(self.close.to_numpy(dtype=float)).view()
+            values.flags.writeable = False
+            self._values = values
+        return self._values
+    def window(self, start: int, stop: int) -> "MarketData":
+        """Bars [start, stop) as a MarketData sharing this one's buffers (no copy, no re-validation)"""
+        n = len(self.close.index)
+        start, stop, _ = slice(start, stop).indices(n)
+        if stop <= start:
+            raise ValueError(f"Empty market window [{start}, {stop})")
+        sub = MarketData(self.close.iloc[start:stop], assume_sorted=True, validate=False)
+        sub._values = self.values()[start:stop]
+        sub._fields = {name: arr[start:stop] for name, arr in self._fields.items()}
+        if self._valid is not None:
+            sub._valid = self._valid[start:stop]
+        if self.universe is not None:
+            sub.universe = self.universe.window(start, stop)
+        sub._datasets = {name: arr[start:stop] for name, arr in self._datasets.items()}
+        return sub
+    def history_window(self, lookback: int | None = None) -> HistoryWindow:
+        """History over the closes; the other fields and attached datasets are reachable with view.data(name)"""
+        datasets = {name: arr for name, arr in self._fields.items() if name != "close"}
+        datasets.update(self._datasets)
+        return HistoryWindow(self.values(), self.close.index, self.close.columns, lookback=lookback, frame=self.close,
+                             datasets=datasets)
+    def history(self, i: int, lookback: int | None = None) -> HistoryView:
+        """Prices up to and including bar i (optionally only the last `lookback` bars)"""
+        return self.history_window(lookback).view(i)
@@ -0,0 +1,141 @@
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+from btlib.data.bar import valid_prices
+
+"""
+Data-quality index of a price matrix, built once: which marks are usable (finite and > 0, the rule the
+engine trades on), where each symbol's data starts and ends, the gaps in between and stale-price runs.
+
+Tradable symbols per bar are stored CSR-style (ids of the valid columns of every bar laid end to end,
+plus one offset per bar), so tradable_ids(i) is a slice and first/last valid bars are array lookups.
+"""
+
+
+def _runs(mask: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(column, start, length) of the True runs down each column of a 2-D mask, ordered by column then start"""
+    n, m = mask.shape
+    padded = np.zeros((n + 2, m), dtype=np.int8)
+    padded[1:-1] = mask
+    d = np.diff(padded, axis=0)
+    cols, starts = np.nonzero((d == 1).T)
+    _, ends = np.nonzero((d == -1).T)
+    return cols, starts, ends - starts
+
+
+class DataQualityIndex:
+    """
+    :param values: (timestamps x symbols) prices
+    :param index: Timestamps of the rows
+    :param columns: Symbols of the columns
+    :param stale_bars: A price repeated unchanged on at least this many consecutive bars is a stale run
+    :param valid: Precomputed validity mask of values (None -> computed)
+    """
+    def __init__(self, values: np.ndarray, index: pd.DatetimeIndex, columns, stale_bars: int = 5,
+                 valid: np.ndarray | None = None) -> None:
+        if int(stale_bars) < 2:
+            raise ValueError(f"stale_bars must be at least 2, got {stale_bars!r}")
+        self.index = index
+        self.symbols = [str(c) for c in columns]
+        self._sym_index = {s: j for j, s in enumerate(self.symbols)}
+        self.stale_bars = int(stale_bars)
+        if valid is None:
+            valid = valid_prices(values)
+            valid.flags.writeable = False
+        self.valid = valid
+        n, m = valid.shape
+
+        rows, cols = np.nonzero(valid)  # row-major: grouped by bar, columns ascending within a bar
+        self._ids = cols.astype(np.intp)
+        self._ids.flags.writeable = False
+        self._offsets = np.zeros(n + 1, dtype=np.intp)
+        np.cumsum(np.bincount(rows, minlength=n), out=self._offsets[1:])
+
+        any_valid = valid.any(axis=0)
+        self.first_valid = np.where(any_valid, valid.argmax(axis=0), -1)
+        self.last_valid = np.where(any_valid, n - 1 - valid[::-1].argmax(axis=0), -1)
+        self.n_valid = valid.sum(axis=0)
+
+        # gaps: invalid runs strictly between a symbol's first and last valid bar
+        g_col, g_start, g_len = _runs(~valid)
+        inside = (g_start > self.first_valid[g_col]) & (g_start < self.last_valid[g_col])
+        self.gap_sid, self.gap_start, self.gap_length = g_col[inside], g_start[inside], g_len[inside]
+
+        # stale runs: k equal consecutive valid prices are k - 1 unchanged steps
+        same = valid[1:] & valid[:-1] & (values[1:] == values[:-1])
+        s_col, s_start, s_len = _runs(same)
+        keep = s_len + 1 >= self.stale_bars
+        self.stale_sid, self.stale_start, self.stale_length = s_col[keep], s_start[keep], s_len[keep] + 1
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def tradable_ids(self, i: int) -> np.ndarray:
+        """Column ids with a valid mark at bar i (a read-only slice, ascending)"""
+        return self._ids[self._offsets[i]:self._offsets[i + 1]]
+
+    def tradable_symbols(self, i: int) -> list[str]:
+        return [self.symbols[j] for j in self.tradable_ids(i)]
+
+    def n_tradable(self, i: int) -> int:
+        return int(self._offsets[i + 1] - self._offsets[i])
+
+    def _sid(self, symbol: str) -> int:
+        try:
+            return self._sym_index[symbol]
+        except KeyError:
+            raise KeyError(f"{symbol} not in symbol universe") from None
+
+    def first_valid_bar(self, symbol: str) -> int | None:
+        """Bar of the first valid mark (None if the symbol never has one)"""
+        i = int(self.first_valid[self._sid(symbol)])
+        return None if i < 0 else i
+
+    def last_valid_bar(self, symbol: str) -> int | None:
+        i = int(self.last_valid[self._sid(symbol)])
+        return None if i < 0 else i
+
+    def gaps(self) -> pd.DataFrame:
+        """One row per gap: symbol, first and last missing timestamp, length in bars"""
+        return pd.DataFrame({
+            "symbol": [self.symbols[j] for j in self.gap_sid],
+            "start": self.index[self.gap_start],
+            "end": self.index[self.gap_start + self.gap_length - 1],
+            "bars": self.gap_length,
+        })
+
+    def stale_runs(self) -> pd.DataFrame:
+        """One row per stale run: symbol, first and last bar of the unchanged price, length in bars"""
+        return pd.DataFrame({
+            "symbol": [self.symbols[j] for j in self.stale_sid],
+            "start": self.index[self.stale_start],
+            "end": self.index[self.stale_start + self.stale_length - 1],
+            "bars": self.stale_length,
+        })
+
+    def report(self) -> pd.DataFrame:
+        """
+        Per-symbol summary: coverage (valid bars / all bars), coverage between the first and last valid
+        bar, first/last valid timestamp, number and longest length of gaps and stale runs.
+        """
+        n, m = self.valid.shape
+        first, last = self.first_valid, self.last_valid
+        listed = np.where(first >= 0, last - first + 1, 0)
+        n_gaps = np.bincount(self.gap_sid, minlength=m)
+        max_gap = np.zeros(m, dtype=np.int64)
+        np.maximum.at(max_gap, self.gap_sid, self.gap_length)
+        n_stale = np.bincount(self.stale_sid, minlength=m)
+        max_stale = np.zeros(m, dtype=np.int64)
+        np.maximum.at(max_stale, self.stale_sid, self.stale_length)
+        nat = pd.NaT
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return pd.DataFrame({
+                "coverage": self.n_valid / max(n, 1),
+                "listed_coverage": np.where(listed > 0, self.n_valid / np.maximum(listed, 1), np.nan),
+                "first_valid": [self.index[i] if i >= 0 else nat for i in first],
+                "last_valid": [self.index[i] if i >= 0 else nat for i in last],
+                "n_gaps": n_gaps,
+                "max_gap": max_gap,
+                "n_stale_runs": n_stale,
+                "max_stale_run": max_stale,
+            }, index=pd.Index(self.symbols, name="symbol"))
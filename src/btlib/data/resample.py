@@ -0,0 +1,273 @@
+from __future__ import annotations
+import os
+from pathlib import Path
+from typing import Callable, Iterable, Iterator
+import numpy as np
+import pandas as pd
+from btlib.data.market_data import MarketData, FIELDS
+from btlib.data.validators import require_columns
+
+"""
+Streaming resampling of tick or minute data into OHLCV bars.
+
+Input comes as an iterator of long frames in time order (e.g. iter_csv / iter_parquet over files too
+large to load), either ticks (ts, symbol, price[, size]) or bars (ts, symbol, open, high, low, close[, volume]).
+Each chunk is reduced with NumPy into one partial bar per (bucket, symbol); partial bars merge with the
+same rules (first open, max high, min low, last close, summed volume), so only the newest bucket is
+carried to the next chunk and memory stays bounded by chunk size plus one bar per symbol. Buckets older
+than the newest one are complete and are emitted as soon as a chunk moves past them.
+
+Buckets are labelled by their start. Fixed frequencies ("5min", "1h", "1D") are floored on the
+wall clock of `tz` (tz-aware input is converted first), so "1D" with an exchange tz gives session-daily
+bars; `offset` shifts bucket boundaries (e.g. "9h30min" for sessions opening at 9:30).
+
+ParquetBarWriter writes emitted bars in the symbol=/year= partitioned layout of btlib.data.arrow_io,
+so MarketData.from_partitioned / read_bars load them back.
+"""
+
+BAR_COLUMNS = ["ts", "symbol", "open", "high", "low", "close", "volume"]
+BarSink = Callable[[str, pd.DataFrame], None]
+
+
+def _empty_bars() -> pd.DataFrame:
+    return pd.DataFrame({c: pd.Series(dtype=float) for c in BAR_COLUMNS}).astype({"symbol": object})
+
+
+class BarResampler:
+    """
+    :param freq: Bar length, anything pd.Timedelta accepts ("5min", "1h", "1D")
+    :param tz: Wall clock the buckets are floored on (None -> the input's own clock)
+    :param offset: Shift of the bucket boundaries from midnight
+    :param ts_column: Timestamp column of the input frames
+    """
+    def __init__(self, freq: str | pd.Timedelta, tz: str | None = None, offset: str | pd.Timedelta | None = None,
+                 ts_column: str = "ts") -> None:
+        self.freq = pd.Timedelta(freq)
+        if self.freq <= pd.Timedelta(0):
+            raise ValueError(f"freq must be positive, got {freq!r}")
+        self.tz = tz
+        self.offset = pd.Timedelta(0) if offset is None else pd.Timedelta(offset)
+        self.ts_column = ts_column
+        self._symbols: list[str] = []
+        self._sid: dict[str, int] = {}
+        self._carry: dict[str, np.ndarray] | None = None
+        self._last_ts: pd.Timestamp | None = None
+        self._out_tz = None
+        self._unit = None
+
+    # ----------------------------
+    # Chunk reduction
+    # ----------------------------
+
+    def _buckets(self, ts: pd.DatetimeIndex) -> np.ndarray:
+        """Bucket start of each timestamp, as int64 ns of the wall clock"""
+        wall = ts
+        if ts.tz is not None:
+            wall = ts.tz_convert(self.tz) if self.tz is not None else ts
+            wall = wall.tz_localize(None)
+        ns = wall.as_unit("ns").asi8
+        step, off = self.freq.value, self.offset.value
+        return (ns - off) // step * step + off
+
+    def _label(self, buckets: np.ndarray) -> pd.DatetimeIndex:
+        index = pd.DatetimeIndex(buckets.view("M8[ns]"))
+        if self._out_tz is not None:
+            index = index.tz_localize(self.tz or self._out_tz, ambiguous=True, nonexistent="shift_forward")
+        return index.as_unit(self._unit or "ns")
+
+    def _sids(self, symbols: np.ndarray) -> np.ndarray:
+        codes, uniques = pd.factorize(symbols)
+        ids = np.empty(len(uniques), dtype=np.int64)
+        for k, s in enumerate(uniques):
+            s = str(s)
+            if s not in self._sid:
+                self._sid[s] = len(self._symbols)
+                self._symbols.append(s)
+            ids[k] = self._sid[s]
+        return ids[codes]
+
+    @staticmethod
+    def _reduce(parts: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+        """Merges partial bars of the same (bucket, sid); rows must be in time order"""
+        n = len(parts["bucket"])
+        if n == 0:
+            return parts
+        order = np.lexsort((np.arange(n), parts["bucket"], parts["sid"]))
+        b, s = parts["bucket"][order], parts["sid"][order]
+        starts = np.flatnonzero(np.r_[True, (b[1:] != b[:-1]) | (s[1:] != s[:-1])])
+        ends = np.r_[starts[1:], n] - 1
+        return {
+            "bucket": b[starts],
+            "sid": s[starts],
+            "open": parts["open"][order][starts],
+            "high": np.maximum.reduceat(parts["high"][order], starts),
+            "low": np.minimum.reduceat(parts["low"][order], starts),
+            "close": parts["close"][order][ends],
+            "volume": np.add.reduceat(parts["volume"][order], starts),
+        }
+
+    def _parts(self, chunk: pd.DataFrame) -> dict[str, np.ndarray]:
+        require_columns(chunk, [self.ts_column, "symbol"])
+        ts = pd.DatetimeIndex(pd.to_datetime(chunk[self.ts_column]))
+        if not ts.is_monotonic_increasing:
+            raise ValueError("Rows must be sorted by time within a chunk")
+        if self._last_ts is not None and len(ts) and ts[0] < self._last_ts:
+            raise ValueError(f"Chunk starts at {ts[0]}, before the previous chunk ended ({self._last_ts})")
+        if self._unit is None and len(ts):
+            self._unit = ts.unit
+            self._out_tz = ts.tz
+        if len(ts):
+            self._last_ts = ts[-1]
+
+        if "price" in chunk.columns:
+            price = chunk["price"].to_numpy(dtype=float)
+            o = h = l = c = price
+            size_col = "size" if "size" in chunk.columns else "volume"
+            v = chunk[size_col].to_numpy(dtype=float) if size_col in chunk.columns else np.zeros(len(chunk))
+        else:
+            require_columns(chunk, ["open", "high", "low", "close"])
+            o, h, l, c = (chunk[f].to_numpy(dtype=float) for f in ("open", "high", "low", "close"))
+            v = chunk["volume"].to_numpy(dtype=float) if "volume" in chunk.columns else np.zeros(len(chunk))
+        keep = np.isfinite(c) & np.isfinite(o)
+        return {
+            "bucket": self._buckets(ts)[keep],
+            "sid": self._sids(chunk["symbol"].to_numpy())[keep],
+            "open": o[keep], "high": h[keep], "low": l[keep], "close": c[keep],
+            "volume": np.nan_to_num(v[keep]),
+        }
+
+    def _frame(self, bars: dict[str, np.ndarray]) -> pd.DataFrame:
+        if len(bars["bucket"]) == 0:
+            return _empty_bars()
+        names = np.asarray(self._symbols, dtype=object)
+        rank = np.empty(len(names), dtype=np.int64)
+        rank[np.argsort(names)] = np.arange(len(names))
+        order = np.lexsort((rank[bars["sid"]], bars["bucket"]))  # by time, then symbol name
+        return pd.DataFrame({
+            "ts": self._label(bars["bucket"][order]),
+            "symbol": names[bars["sid"][order]],
+            **{f: bars[f][order] for f in ("open", "high", "low", "close", "volume")},
+        })
+
+    # ----------------------------
+    # Streaming
+    # ----------------------------
+
+    def push(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        """Adds a chunk; returns the bars completed by it (ts, symbol, open, high, low, close, volume)"""
+        parts = self._parts(chunk)
+        if self._carry is not None:
+            parts = {k: np.concatenate([self._carry[k], parts[k]]) for k in parts}
+        bars = self._reduce(parts)
+        if len(bars["bucket"]) == 0:
+            self._carry = None
+            return _empty_bars()
+        newest = bars["bucket"].max()
+        done = bars["bucket"] < newest
+        self._carry = {k: a[~done] for k, a in bars.items()}
+        return self._frame({k: a[done] for k, a in bars.items()})
+
+    def flush(self) -> pd.DataFrame:
+        """Emits the bars of the newest (possibly incomplete) bucket; call once the input is exhausted"""
+        if self._carry is None:
+            return _empty_bars()
+        out = self._frame(self._carry)
+        self._carry = None
+        return out
+
+    def resample(self, chunks: Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        """Bars of every chunk as they complete, then the flushed remainder"""
+        for chunk in chunks:
+            bars = self.push(chunk)
+            if len(bars):
+                yield bars
+        bars = self.flush()
+        if len(bars):
+            yield bars
+
+
+def resample_stream(chunks: Iterable[pd.DataFrame], resamplers: dict[str, BarResampler], sink: BarSink) -> None:
+    """
+    Feeds every chunk to several resamplers in one pass over the input (e.g. {"5min": ..., "1h": ..., "1d": ...})
+    and hands completed bars to sink(name, bars).
+    """
+    for chunk in chunks:
+        for name, r in resamplers.items():
+            bars = r.push(chunk)
+            if len(bars):
+                sink(name, bars)
+    for name, r in resamplers.items():
+        bars = r.flush()
+        if len(bars):
+            sink(name, bars)
+
+
+# ----------------------------
+# Input / output
+# ----------------------------
+
+def iter_csv(path: str | os.PathLike, chunksize: int = 1_000_000, ts_column: str = "ts", **kwargs) -> Iterator[pd.DataFrame]:
+    """Long CSV file in chunks of chunksize rows, with the timestamp column parsed"""
+    for chunk in pd.read_csv(path, chunksize=chunksize, **kwargs):
+        chunk[ts_column] = pd.to_datetime(chunk[ts_column])
+        yield chunk
+
+
+def iter_parquet(path: str | os.PathLike, batch_size: int = 1_000_000, columns: list[str] | None = None) -> Iterator[pd.DataFrame]:
+    """Long Parquet file in record batches (needs pyarrow)"""
+    from btlib.data.arrow_io import _pyarrow
+    _pyarrow()
+    import pyarrow.parquet as pq
+    pf = pq.ParquetFile(path, memory_map=True)
+    for batch in pf.iter_batches(batch_size=batch_size, columns=columns):
+        yield batch.to_pandas()
+
+
+def bars_to_wide(bars: pd.DataFrame, field: str = "close", symbols: list[str] | None = None) -> pd.DataFrame:
+    """
+    (timestamps x symbols) frame of one field of in-memory bars. Bars already written by ParquetBarWriter
+    need no conversion: ChunkedMarketData.from_partitioned walks that directory directly.
+    """
+    wide = bars.pivot(index="ts", columns="symbol", values=field)
+    wide = wide.set_axis(pd.DatetimeIndex(wide.index).rename(None), axis=0)
+    if symbols is not None:
+        wide = wide.reindex(columns=symbols)
+    return wide.set_axis(pd.Index([str(c) for c in wide.columns]), axis=1)
+
+
+class ParquetBarWriter:
+    """
+    BarSink writing root/<name>/symbol=<SYM>/year=<YYYY>/part-<k>.parquet files with ts + OHLCV columns,
+    one new part per call, so each frequency's directory reads back with read_bars / MarketData.from_partitioned.
+    """
+    def __init__(self, root: str | os.PathLike, ts_column: str = "ts") -> None:
+        self.root = Path(root)
+        self.ts_column = ts_column
+        self._part = 0
+
+    def __call__(self, name: str, bars: pd.DataFrame) -> None:
+        from btlib.data.arrow_io import _pyarrow
+        pa = _pyarrow()
+        import pyarrow.parquet as pq
+        if bars.empty:
+            return
+        years = pd.DatetimeIndex(bars["ts"]).year.to_numpy()
+        symbols = bars["symbol"].to_numpy()
+        part = self._part
+        self._part += 1
+        for (sym, year), sub in bars.groupby([symbols, years], sort=False):
+            out = self.root / name / f"symbol={sym}" / f"year={int(year)}"
+            out.mkdir(parents=True, exist_ok=True)
+            table = pa.Table.from_arrays(
+                [pa.array(pd.DatetimeIndex(sub["ts"]))] + [pa.array(sub[f].to_numpy(dtype=float)) for f in FIELDS],
+                names=[self.ts_column] + list(FIELDS),
+            )
+            pq.write_table(table, out / f"part-{part:06d}.parquet", sorting_columns=[pq.SortingColumn(0)])
+
+
+def read_bars(root: str | os.PathLike, symbols: Iterable[str] | None = None, start=None, end=None,
+              fields: Iterable[str] = FIELDS, dtype=None) -> MarketData:
+    """OHLCV MarketData from a ParquetBarWriter directory (one frequency)"""
+    from btlib.data.arrow_io import read_partitioned
+    frames = {f: read_partitioned(root, symbols=symbols, start=start, end=end, field=f).close for f in fields}
+    return MarketData.from_ohlcv(frames, dtype=dtype)
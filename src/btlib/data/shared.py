@@ -0,0 +1,118 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+from btlib.data.market_data import MarketData
+from btlib.data.universe import Universe
+
+"""
+Publish a MarketData once in shared memory so worker processes can attach to it instead of each
+receiving a pickled copy of the frame. The close matrix, the other OHLCV fields (in their storage
+dtype), the as-of datasets and the point-in-time universe all travel in the same segment.
+"""
+
+_ALIGN = 64
+
+
+@dataclass(frozen=True)
+class SharedArray:
+    """Where one array sits in the segment"""
+    offset: int
+    shape: tuple[int, ...]
+    dtype: str
+
+
+@dataclass(frozen=True)
+class SharedMarketSpec:
+    """
+    Everything a worker needs to attach: the segment name plus (small) index/column metadata.
+    The close matrix starts at offset 0; fields and datasets mirror MarketData's field arrays
+    (empty for a close-only market) and attached datasets; universe holds the (offsets, ids)
+    arrays of market.universe.
+    """
+    name: str
+    shape: tuple[int, int]
+    dtype: str
+    index: pd.DatetimeIndex
+    columns: list[str]
+    universe: tuple[SharedArray, SharedArray] | None = None
+    fields: dict[str, SharedArray] = field(default_factory=dict)
+    datasets: dict[str, SharedArray] = field(default_factory=dict)
+
+
+def _layout(arrays: list[np.ndarray]) -> tuple[list[SharedArray], int]:
+    """Offsets of the arrays packed one after the other, each aligned to _ALIGN bytes"""
+    slots, size = [], 0
+    for arr in arrays:
+        slots.append(SharedArray(size, tuple(arr.shape), arr.dtype.str))
+        size += -(-arr.nbytes // _ALIGN) * _ALIGN
+    return slots, size
+
+
+def _view(shm: shared_memory.SharedMemory, slot: SharedArray) -> np.ndarray:
+    arr = np.ndarray(slot.shape, dtype=np.dtype(slot.dtype), buffer=shm.buf, offset=slot.offset)
+    arr.flags.writeable = False
+    return arr
+
+
+class SharedMarketData:
+    """
+    Owner side of a shared close matrix. Use as a context manager (or call close()) so the
+    segment is unlinked when the sweep is done.
+    """
+    def __init__(self, market: MarketData) -> None:
+        values = market.values()
+        fields = [name for name in market._fields if name != "close"]
+        datasets = list(market._datasets)
+        arrays = [values] + [market._fields[name] for name in fields] + [market._datasets[name] for name in datasets]
+        if market.universe is not None:
+            arrays += [market.universe._offsets, market.universe._ids]
+        slots, size = _layout(arrays)
+        self._shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        for arr, slot in zip(arrays, slots):
+            np.ndarray(slot.shape, dtype=arr.dtype, buffer=self._shm.buf, offset=slot.offset)[...] = arr
+        k = 1 + len(fields)
+        self.spec = SharedMarketSpec(
+            name=self._shm.name,
+            shape=values.shape,
+            dtype=values.dtype.str,
+            index=market.timestamps(),
+            columns=market.symbols(),
+            universe=(slots[-2], slots[-1]) if market.universe is not None else None,
+            fields={"close": slots[0], **dict(zip(fields, slots[1:k]))} if market._fields else {},
+            datasets=dict(zip(datasets, slots[k:k + len(datasets)])),
+        )
+
+    def close(self) -> None:
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def __enter__(self) -> SharedMarketData:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def attach_market(spec: SharedMarketSpec) -> tuple[MarketData, shared_memory.SharedMemory]:
+    """
+    Worker side: MarketData backed directly by the shared segment (no copy, no re-validation).
+    Keep the returned SharedMemory referenced for as long as the MarketData is used.
+    """
+    # pool workers share the owner's resource tracker, so the owner's unlink() is the only cleanup
+    shm = shared_memory.SharedMemory(name=spec.name)
+    values = _view(shm, SharedArray(0, spec.shape, spec.dtype))
+    close = pd.DataFrame(values, index=spec.index, columns=spec.columns, copy=False)
+    market = MarketData(close, assume_sorted=True, validate=False)
+    market._values = values  # as stored, e.g. float32, not re-converted to float64
+    market._fields = {name: _view(shm, slot) for name, slot in spec.fields.items()}
+    if spec.fields:
+        market._fields["close"] = values
+    market._datasets = {name: _view(shm, slot) for name, slot in spec.datasets.items()}
+    if spec.universe is not None:
+        offsets, ids = (_view(shm, slot) for slot in spec.universe)
+        market.universe = Universe(spec.index, spec.columns, offsets, ids)
+    return market, shm
@@ -0,0 +1,113 @@
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+from btlib.data.validators import require_columns
+
+"""
+Point-in-time universe membership. Each symbol is a member over one or more [start, end) intervals;
+the members of every bar are stored CSR-style (column ids of the members of each bar laid end to end,
+plus one offset per bar), so a survivorship-free universe of thousands of historical tickers costs
+O(members) per bar, not O(all tickers).
+"""
+
+
+class Universe:
+    """
+    Members of each bar of a timeline, as column ids into symbols.
+    Build with from_intervals, from_mask or from_listing rather than directly.
+    """
+    def __init__(self, index: pd.DatetimeIndex, symbols: list[str], offsets: np.ndarray, ids: np.ndarray) -> None:
+        if len(offsets) != len(index) + 1:
+            raise ValueError(f"offsets must have {len(index) + 1} entries, got {len(offsets)}")
+        self.index = index
+        self.symbols = [str(s) for s in symbols]
+        self._offsets = np.asarray(offsets, dtype=np.intp)
+        self._ids = np.asarray(ids, dtype=np.intp)
+        self._ids.flags.writeable = False
+
+    @classmethod
+    def _from_bar_ranges(cls, index: pd.DatetimeIndex, symbols: list[str], cols: np.ndarray,
+                         start: np.ndarray, stop: np.ndarray) -> Universe:
+        """Column cols[k] is a member on bars [start[k], stop[k])"""
+        n, m = len(index), len(symbols)
+        lengths = np.maximum(np.asarray(stop) - np.asarray(start), 0)
+        total = int(lengths.sum())
+        first = np.cumsum(lengths) - lengths
+        bars = np.repeat(np.asarray(start), lengths) + (np.arange(total) - np.repeat(first, lengths))
+        codes = np.unique(bars.astype(np.int64) * m + np.repeat(np.asarray(cols), lengths))  # by bar, then column
+        offsets = np.zeros(n + 1, dtype=np.intp)
+        np.cumsum(np.bincount(codes // m, minlength=n), out=offsets[1:])
+        return cls(index, symbols, offsets, codes % m)
+
+    @classmethod
+    def from_intervals(cls, intervals: pd.DataFrame, index: pd.DatetimeIndex, symbols: list[str]) -> Universe:
+        """
+        :param intervals: symbol, start, end rows; a symbol is a member from start (inclusive) to end
+            (exclusive, NaT/None -> to the end of the timeline). Symbols outside symbols raise.
+        :param index: Timestamps of the timeline
+        :param symbols: Column order (usually MarketData.symbols())
+        """
+        require_columns(intervals, ["symbol", "start", "end"])
+        index = pd.DatetimeIndex(index)
+        sym_index = {str(s): j for j, s in enumerate(symbols)}
+        unknown = sorted({str(s) for s in intervals["symbol"]} - set(sym_index))
+        if unknown:
+            raise ValueError(f"{unknown[:10]} not in symbol universe")
+        cols = np.array([sym_index[str(s)] for s in intervals["symbol"]], dtype=np.intp)
+
+        def bars(column: str, default: int) -> np.ndarray:
+            ts = pd.DatetimeIndex(pd.to_datetime(intervals[column]))
+            if index.tz is not None and ts.tz is None:
+                ts = ts.tz_localize(index.tz)
+            out = index.searchsorted(ts, side="left")
+            return np.where(ts.isna(), default, out)
+
+        return cls._from_bar_ranges(index, symbols, cols, bars("start", 0), bars("end", len(index)))
+
+    @classmethod
+    def from_mask(cls, mask: np.ndarray, index: pd.DatetimeIndex, symbols: list[str]) -> Universe:
+        """Members from a (timestamps x symbols) boolean mask"""
+        mask = np.asarray(mask, dtype=bool)
+        if mask.shape != (len(index), len(symbols)):
+            raise ValueError(f"mask shape {mask.shape} does not match ({len(index)}, {len(symbols)})")
+        rows, cols = np.nonzero(mask)
+        offsets = np.zeros(len(index) + 1, dtype=np.intp)
+        np.cumsum(np.bincount(rows, minlength=len(index)), out=offsets[1:])
+        return cls(pd.DatetimeIndex(index), symbols, offsets, cols)
+
+    @classmethod
+    def from_listing(cls, market) -> Universe:
+        """Each symbol is a member from its first to its last valid close (NaN-padded survivorship-free data)"""
+        q = market.quality()
+        cols = np.flatnonzero(q.first_valid >= 0)
+        return cls._from_bar_ranges(market.timestamps(), market.symbols(), cols,
+                                    q.first_valid[cols], q.last_valid[cols] + 1)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def active_ids(self, i: int) -> np.ndarray:
+        """Column ids of the members at bar i (read-only, ascending)"""
+        return self._ids[self._offsets[i]:self._offsets[i + 1]]
+
+    def active_symbols(self, i: int) -> list[str]:
+        return [self.symbols[j] for j in self.active_ids(i)]
+
+    def n_active(self, i: int) -> int:
+        return int(self._offsets[i + 1] - self._offsets[i])
+
+    def max_active(self) -> int:
+        return int(np.diff(self._offsets).max(initial=0))
+
+    def to_mask(self) -> np.ndarray:
+        """Dense (timestamps x symbols) membership mask"""
+        mask = np.zeros((len(self.index), len(self.symbols)), dtype=bool)
+        rows = np.repeat(np.arange(len(self.index)), np.diff(self._offsets))
+        mask[rows, self._ids] = True
+        return mask
+
+    def window(self, start: int, stop: int) -> Universe:
+        """Bars [start, stop), sharing the id array"""
+        offsets = self._offsets[start:stop + 1]
+        ids = self._ids[offsets[0]:offsets[-1]]
+        return Universe(self.index[start:stop], self.symbols, offsets - offsets[0], ids)
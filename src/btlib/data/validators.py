@@ -1,10 +1,11 @@
+import numpy as np
 import pandas as pd
 
 """
 Ensure prices and data are finite, are not duplicates, monotonic, numeric, etc
 Strict: Raise on failure
 """
-def validate_price_frame(df: pd.DataFrame) -> None:
+def validate_price_frame(df: pd.DataFrame, min_coverage: float | None = None) -> None:
     if not isinstance(df,pd.DataFrame):
         raise TypeError("Price data must be a pandas DataFrame")
     if not isinstance(df.index,pd.DatetimeIndex):
@@ -23,5 +24,18 @@ def validate_price_frame(df: pd.DataFrame) -> None:
     if df.empty:
         raise ValueError("Price data DataFrame is empty")
 
+    # NaN coverage: share of finite, positive prices per column
+    if min_coverage is not None:
+        values = df.to_numpy(dtype=float)
+        with np.errstate(invalid="ignore"):
+            coverage = (np.isfinite(values) & (values > 0.0)).mean(axis=0)
+        low = [f"{c} ({cov:.1%})" for c, cov in zip(df.columns, coverage) if cov < min_coverage]
+        if low:
+            raise ValueError(f"Price data coverage below {min_coverage:.1%}: {', '.join(low)}")
+
 def require_columns(df: pd.DataFrame, required: list[str])-> None:
-    pass
+    if not isinstance(df,pd.DataFrame):
+        raise TypeError("Expected a pandas DataFrame")
+    missing = [c for c in required if c not in df.columns]
+    if missing:
+        raise ValueError(f"Missing required columns {missing} (got {list(df.columns)})")
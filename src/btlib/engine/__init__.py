@@ -2,14 +2,27 @@
 
 from .config import BacktestConfig
 from .strategy_base import Strategy
-from .engine import run_positions_only, BacktestResults
+from .engine import run_positions_only, run_many, BacktestResults
+from .vectorized import run_weights_matrix, align_weights
 from .accounting import close_enough_zero, apply_fill
+from .checks import check_precompute
+from .streaming import StreamingEngine, run_chunked
+from .instrumentation import STAGES, StageTimings, ProgressEvent
 
 __all__ = [
     "BacktestConfig",
     "Strategy",
     "run_positions_only",
+    "run_many",
     "BacktestResults",
+    "run_weights_matrix",
+    "align_weights",
     "close_enough_zero",
     "apply_fill",
+    "check_precompute",
+    "StreamingEngine",
+    "run_chunked",
+    "STAGES",
+    "StageTimings",
+    "ProgressEvent",
 ]
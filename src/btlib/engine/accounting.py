@@ -1,5 +1,6 @@
 """Accounting Transforms: Apply fills to PortfolioState and compute mark to market aggregates"""
 from btlib.core.order_types import PortfolioState, Position, Fill
+from btlib.core.array_state import ArrayPortfolioState
 epsilon=1e-12
 
 
@@ -14,7 +15,11 @@ def sign(x:float) -> int:
         return 1
     if x<0:
         return -1
-def apply_fill(state: PortfolioState,fill: Fill) -> PortfolioState:
+def apply_fill(state: PortfolioState | ArrayPortfolioState,fill: Fill) -> PortfolioState | ArrayPortfolioState:
+    if isinstance(state, ArrayPortfolioState):
+        state.apply_fill(fill.symbol, fill.qty, fill.price, fill.fees, fill.slippage)
+        state.ts=fill.ts
+        return state
     if fill.symbol not in state.positions:
         state.positions[fill.symbol] = Position(fill.symbol,0,0) # Creates new position if not previously traded
     qty_0=state.positions[fill.symbol].qty
@@ -50,16 +55,9 @@ def apply_fill(state: PortfolioState,fill: Fill) -> PortfolioState:
     return state
 
 #Mark current state   
-def mark_to_market(state: PortfolioState, marks: dict[str,float]) -> dict:
-    pf_summary={
-                "equity": state.equity(marks),
-                "gross_exposure" : state.gross_exposure(marks),
-                "net_exposure" : state.net_exposure(marks),
-                "unrealized_pnl": state.unrealized_pnl(marks),
-                "realized_pnl": state.realized_pnl(marks),
-                "leverage": state.leverage(marks)
-                }
-    return pf_summary
+# equity, gross/net exposure, unrealized/realized pnl, leverage and n_positions in one pass
+def mark_to_market(state: PortfolioState | ArrayPortfolioState, marks) -> dict:
+    return state.mark(marks)
 
 
 
@@ -0,0 +1,56 @@
+from __future__ import annotations
+from dataclasses import replace
+from typing import Callable
+import numpy as np
+import pandas as pd
+from btlib.data.market_data import MarketData
+from btlib.engine.config import BacktestConfig
+from btlib.engine.engine import run_positions_only
+from btlib.engine.strategy_base import Strategy
+
+"""
+Equivalence check between a strategy's on_bar path and its Strategy.precompute matrix.
+"""
+
+
+def check_precompute(
+        strategy_factory: Callable[[], Strategy],
+        market: MarketData,
+        cfg: BacktestConfig | None = None,
+        atol: float = 1e-9) -> pd.DataFrame:
+    """
+    Runs a strategy through the engine twice, once bar by bar via on_bar and once from its
+    precompute matrix, and confirms the recorded targets match.
+
+    :param strategy_factory: Builds a fresh strategy (each path needs its own instance, on_bar may keep state)
+    :type strategy_factory: Callable[[], Strategy]
+    :param market: Sample market data
+    :type market: MarketData
+    :param cfg: Config of both runs (None -> BacktestConfig())
+    :type cfg: BacktestConfig | None
+    :param atol: Largest allowed absolute difference between target weights
+    :type atol: float
+    :return: Absolute target differences per bar and symbol
+    :rtype: pd.DataFrame
+    """
+    if cfg is None:
+        cfg = BacktestConfig()
+    strategy = strategy_factory()
+    hook = getattr(strategy, "precompute", None)
+    if hook is None or hook(market.close, start=int(cfg.warmup_bars)) is None:
+        raise ValueError(f"{type(strategy).__name__}.precompute does not return a target matrix")
+
+    on_bar = run_positions_only(market, strategy_factory(), replace(cfg, use_precompute=False)).targets
+    matrix = run_positions_only(market, strategy_factory(), replace(cfg, use_precompute=True)).targets
+
+    diff = (matrix - on_bar).abs()
+    bad = diff.max(axis=1) > atol
+    if bad.any():
+        first = diff.index[np.flatnonzero(bad.to_numpy())[:5]]
+        raise AssertionError(
+            f"precompute targets differ from on_bar on {int(bad.sum())} bars (atol={atol}); first: "
+            + "; ".join(
+                f"{ts}: on_bar={on_bar.loc[ts].to_dict()} precompute={matrix.loc[ts].to_dict()}" for ts in first
+            )
+        )
+    return diff
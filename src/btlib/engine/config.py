@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from btlib.core.enums import TimeInForce
 """
 Initial configuration settings of backtest
 """
@@ -10,4 +11,10 @@ class BacktestConfig:
     fail_on_missing_marks: bool = False
     max_abs_weight: float = 1.0
     min_order_notional: float = 10.0 
+    history_lookback: int | None = None  # bars of history passed to on_bar (None = full history)
+    compact_state: bool = False  # array-backed ArrayPortfolioState instead of a dict of Positions
+    use_precompute: bool = True  # read targets from Strategy.precompute when it returns a matrix
+    collect_timings: bool = False  # per-stage timings in BacktestResults.timings
+    timings_per_bar: bool = False  # also keep one timing row per bar (needs collect_timings)
+    rebalance_tif: TimeInForce = TimeInForce.IOC  # how long unfilled rebalance orders stay in the book
  
\ No newline at end of file
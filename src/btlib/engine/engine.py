@@ -1,14 +1,24 @@
+from copy import deepcopy
 from dataclasses import dataclass
+from time import perf_counter
 import pandas as pd
 from btlib.data.market_data import MarketData
+from btlib.data.bar import BarPrices
 from btlib.engine.strategy_base import Strategy
 from btlib.engine.config import BacktestConfig
-from btlib.core import PortfolioState, Fill
-from btlib.engine.rebalance import targets_to_orders
-from btlib.execution import ExecutionModel, NextCloseExecution
-from btlib.engine.accounting import apply_fill
+from btlib.core import PortfolioState, ArrayPortfolioState, Fill, TimeInForce
+from btlib.engine.rebalance import targets_to_order_batch
+from btlib.execution import ExecutionModel, NextCloseExecution, OrderBatch, OrderBook
+from btlib.execution.base import TIME_IN_FORCE
+from btlib.execution.order_book import FILLED, PARTIALLY_FILLED
+from btlib.engine.accounting import apply_fill, mark_to_market
 from btlib.costs import SimpleBpsCost, CostModel
-from btlib.reporting.reporting import build_fills, build_ledger, build_orders, build_targets, trades_from_fills
+from btlib.reporting.reporting import trades_from_fills
+from btlib.reporting.recorders import ResultRecorders
+from btlib.engine.instrumentation import (
+    StageTimer, NullTimer, StageTimings, ProgressEvent, ProgressCallback,
+    PRICES, HISTORY, STRATEGY, ORDERS, EXECUTION, COSTS, ACCOUNTING, MARKING, RESULTS,
+)
 import numpy as np
 
 @dataclass
@@ -21,6 +31,330 @@ class BacktestResults:
     orders: pd.DataFrame
     fills: pd.DataFrame
     trades: pd.DataFrame
+    timings: StageTimings | None = None  # set when cfg.collect_timings is on
+
+class _StrategyRun:
+    """
+    Per-strategy state of one backtest (portfolio, pending orders, recorders) advanced one bar at a time.
+    The market lookups for a bar (BarPrices marks, price row, history view) are computed by the caller,
+    so several runs can share them.
+    """
+    def __init__(
+            self,
+            strategy: Strategy,
+            cfg: BacktestConfig,
+            execution_model: ExecutionModel,
+            cost_model: CostModel | None,
+            symbols: list[str],
+            ts0: pd.Timestamp,
+            capacity: int,
+            recorders: ResultRecorders | None = None,
+            sparse_targets: bool = False) -> None:
+        self.strategy = strategy
+        self.cfg = cfg
+        self.execution_model = execution_model
+        self.cost_model = cost_model
+        self.symbols = symbols
+        # with universe membership only the members' targets are built and recorded
+        self.sparse_targets = sparse_targets
+        # universe runs always use the array portfolio: dict positions keep flat entries that would still
+        # need (possibly NaN) marks after the symbol leaves the universe
+        self.compact = getattr(cfg, "compact_state", False) or sparse_targets
+        if self.compact:
+            self.state = ArrayPortfolioState(ts = ts0,
+                                             cash = cfg.initial_cash,
+                                             symbols = symbols
+                                             )
+        else:
+            self.state = PortfolioState(ts = ts0,
+                                        cash = cfg.initial_cash,
+                                        positions={}
+                                        )
+        self.book = OrderBook(symbols)  # live orders: last bar's, carried-over and resting limit/stop orders
+        self.rebalance_tif = TIME_IN_FORCE.index(TimeInForce(getattr(cfg, "rebalance_tif", TimeInForce.IOC)))
+        self.rec = recorders if recorders is not None else ResultRecorders.for_run(capacity, symbols, sparse_targets)
+        self.sym_index = {s: j for j, s in enumerate(symbols)}
+        self.max_abs = getattr(cfg, "max_abs_weight", 1.0)
+        self.fail_on_missing = getattr(cfg, "fail_on_missing_marks", True)
+        self.weights = None  # (n_bars, n_symbols) targets from Strategy.precompute
+        if getattr(cfg, "collect_timings", False):
+            self.timer = StageTimer(per_bar=getattr(cfg, "timings_per_bar", False))
+        else:
+            self.timer = NullTimer()
+        self.equity = float(cfg.initial_cash)  # last marked equity, for progress reporting
+
+    def precompute(self, market: MarketData) -> None:
+        """Asks the strategy for its whole target matrix once; on_bar is skipped if it provides one"""
+        hook = getattr(self.strategy, "precompute", None)
+        if hook is None or not getattr(self.cfg, "use_precompute", True):
+            return
+        weights = hook(market.close, start=int(self.cfg.warmup_bars))
+        if weights is not None:
+            # imported here: vectorized imports BacktestResults from this module
+            from btlib.engine.vectorized import align_weights
+            self.weights = align_weights(weights, market)
+
+    def step(self, i: int, ts: pd.Timestamp, marks: BarPrices, row: np.ndarray, hist) -> None:
+        """Fills last bar's orders at ts, asks the strategy for targets, queues orders and marks the book"""
+        tm = self.timer
+        tm.start()
+        if i > 0 and len(self.book):
+            self._fill_pending(i, ts, marks)
+
+        explicit = None  # orders returned by on_bar instead of targets
+        if self.sparse_targets:
+            targets = self._member_targets(i, ts, marks.active, hist)
+            if isinstance(targets, list):
+                explicit = targets
+        else:
+            # clip targets for logging + to match order sizing (written straight into the targets recorder)
+            target_row = self.rec.targets.next_row(ts)
+            # --- WARMUP BARS --- (row stays 0)
+            if i >= self.cfg.warmup_bars:
+                if self.weights is not None:
+                    target_row[:] = self.weights[i]
+                else:
+                    targets = self.strategy.on_bar(ts, data_upto_ts=hist, state=self.state)
+                    if targets is None:
+                        targets = {}
+                    if isinstance(targets, list):
+                        explicit = targets
+                        targets = {}
+                    for s, w in targets.items():
+                        j = self.sym_index.get(s)
+                        if j is not None:
+                            target_row[j] = float(w)
+            tm.lap(STRATEGY)
+            np.clip(target_row, -self.max_abs, self.max_abs, out=target_row)
+            # the target row is aligned to marks.symbols, so it is passed as is
+            targets = target_row
+
+        state = self.state
+        held = state.held_symbols()
+        bad_held = [sym for sym in held if not marks.is_valid(sym)]
+
+        # treat as "no trading possible" this bar if a held symbol has no mark
+        if not bad_held:
+            if explicit is not None:
+                batch = OrderBatch.from_orders(explicit, self.sym_index, ts)
+            else:
+                # what is still on order (remainders of partly filled orders) counts towards the targets
+                pending = self.book.open_qty() if len(self.book) else None
+                batch = targets_to_order_batch(ts, targets, state, marks, self.cfg, pending)
+                batch.tif = np.full(len(batch), self.rebalance_tif, dtype=np.int8)
+            if len(batch):
+                rows = self.rec.orders.record_many(ts, batch.sids, batch.qty, batch.types(), tag=batch.tags,
+                                                   limit_price=batch.limit_price, stop_price=batch.stop_price,
+                                                   tif=batch.tifs())
+                self.book.submit(batch, refs=rows)
+        tm.lap(ORDERS)
+
+        if bad_held:
+            if self.fail_on_missing:
+                raise ValueError(f"Missing/invalid marks for held symbols at {ts}: {bad_held}")
+            # Can't mark-to-market; avoid crashing and avoid inventing equity.
+            equity = np.nan
+            gross = np.nan
+            net = np.nan
+            lev = np.nan
+            n_positions = sum(1 for sym in held if abs(state.get_position(sym).qty) > 1e-12)
+        else:
+            pf = mark_to_market(state, row if self.compact else marks)
+            equity = pf["equity"]
+            gross = pf["gross_exposure"]
+            net = pf["net_exposure"]
+            lev = pf["leverage"]
+            n_positions = pf["n_positions"]
+
+        self.rec.ledger.record(ts, state.cash, equity, gross, net, lev, n_positions)
+        self.equity = equity
+        tm.lap(MARKING)
+        tm.end_bar(ts)
+
+    def _member_targets(self, i: int, ts: pd.Timestamp, active: np.ndarray, hist) -> dict[str, float] | list:
+        """
+        Clipped targets of the universe members at bar i (other symbols are weight 0), recorded sparsely;
+        orders returned by on_bar are passed through
+        """
+        w = np.zeros(len(active))
+        targets = {}
+        if i >= self.cfg.warmup_bars:
+            if self.weights is not None:
+                w[:] = self.weights[i, active]
+            else:
+                targets = self.strategy.on_bar(ts, data_upto_ts=hist, state=self.state)
+                if targets is None:
+                    targets = {}
+                for s, x in ({} if isinstance(targets, list) else targets).items():
+                    j = self.sym_index.get(s)
+                    if j is None:
+                        continue
+                    k = int(np.searchsorted(active, j))
+                    if k < len(active) and active[k] == j:
+                        w[k] = float(x)
+        self.timer.lap(STRATEGY)
+        np.clip(w, -self.max_abs, self.max_abs, out=w)
+        self.rec.targets.record_sparse(ts, active, w)
+        if isinstance(targets, list):
+            return targets
+        nz = np.flatnonzero(w)
+        return {self.symbols[active[k]]: float(w[k]) for k in nz}
+
+    def _report_orders(self, ids: np.ndarray) -> None:
+        """Copies the filled quantity and status of book orders into the orders recorder"""
+        if len(ids):
+            refs, filled, status = self.book.order_state(ids)
+            self.rec.orders.update(refs, filled, status)
+
+    def _fill_pending(self, i: int, ts: pd.Timestamp, marks: BarPrices) -> None:
+        tm = self.timer
+        book = self.book
+        self._report_orders(book.begin_bar(ts))
+        ids, orders = book.candidates(marks)
+        if not len(orders):
+            self._report_orders(book.end_bar())
+            tm.lap(EXECUTION)
+            return
+        fb = self.execution_model.simulate_fills_batch(ts, orders, marks)
+        done = book.settle(ids, fb)
+        filled = np.flatnonzero(fb.filled)
+        self._report_orders(ids[filled])
+        self._report_orders(book.end_bar())
+        tm.lap(EXECUTION)
+        sids, qty, price = orders.sids[filled], fb.qty[filled], fb.price[filled]
+        tags = None if orders.tags is None else orders.tags[filled]
+        if not (np.isfinite(qty).all() and np.isfinite(price).all() and (price > 0.0).all()):
+            raise ValueError(f"Execution model returned non-finite quantities or non-positive prices at {ts}")
+        if self.cost_model is None:
+            fees = slippage = np.zeros_like(qty)
+        else:
+            fees, slippage = self.cost_model.compute_many(ts, np.asarray(self.symbols, dtype=object)[sids], qty, price,
+                                                          sids=sids, bar=i)
+        tm.lap(COSTS)
+        if filled.size:
+            if self.compact:
+                # one batched update of the position arrays
+                self.state.apply_fills(sids, qty, price, fees, slippage)
+                self.state.ts = ts
+            else:
+                for k, j in enumerate(sids):
+                    self.state = apply_fill(self.state, Fill(ts, self.symbols[j], float(qty[k]), float(price[k]),
+                                                             float(fees[k]), float(slippage[k]),
+                                                             None if tags is None else tags[k]))
+            self.rec.fills.record_many(ts, sids, qty, price, fees, slippage, tag=tags,
+                                       status=np.where(done[filled], FILLED, PARTIALLY_FILLED).astype(np.int8))
+        tm.lap(ACCOUNTING)
+
+    def results(self) -> BacktestResults:
+        self.timer.start()
+        ledger, targets, orders, fills = self.rec.build()
+        trades = trades_from_fills(fills)
+        self.timer.lap(RESULTS)
+        return BacktestResults(ledger=ledger, targets=targets, orders=orders, fills=fills, trades=trades,
+                               timings=self.timer.timings())
+
+
+def run_many(
+        market: MarketData,
+        runs: list[tuple],
+        execution_model: ExecutionModel | None = None,
+        verbose: bool = False,
+        log_every: int = 100,
+        callback: ProgressCallback | None = None) -> list[BacktestResults]:
+    """
+    Runs several strategies over the same market in a single pass over the timeline.
+
+    Each entry of runs is a (strategy, cfg, cost_model) triple, optionally followed by its own
+    execution model. The per-bar market lookups (BarPrices marks, price row and the history view for
+    each distinct cfg.history_lookback) are computed once per bar and shared by every run; each run
+    keeps its own portfolio, pending orders and recorders. Strategies that return a matrix from
+    Strategy.precompute are read by row instead of calling on_bar (cfg.use_precompute=False disables it). Results are identical to calling
+    run_positions_only separately for each entry. Orders wait in an OrderBook: rebalance orders are
+    MARKET orders with time in force cfg.rebalance_tif (IOC: the next bar only), sized net of what is
+    still on order; an on_bar that returns a list of Orders submits those instead, and limit/stop orders
+    rest in the book until their price is reached or their time in force runs out. An execution model may
+    fill orders in part (VolumeParticipationExecution); the remainder stays in the book on the same terms,
+    and the orders/fills frames record the filled quantity and status. With a universe attached (MarketData.with_universe),
+    each bar only builds targets and orders for its members plus held symbols (targets for other
+    symbols are dropped, so positions leaving the universe are closed), targets are recorded as sparse
+    columns and the portfolio is kept as an ArrayPortfolioState. A cost model instance given to several entries
+    is copied for every entry after the first, so stateful models do not mix the runs. An error in any run
+    (e.g. fail_on_missing_marks) stops the whole pass.
+
+    :param market: Market prices for each symbol at each timestamp
+    :type market: MarketData
+    :param runs: (strategy, cfg, cost_model) or (strategy, cfg, cost_model, execution_model) entries
+    :type runs: list[tuple]
+    :param execution_model: Execution model for entries that do not bring their own (None -> NextCloseExecution)
+    :type execution_model: ExecutionModel | None
+    :param verbose: Toggles progress bar during program runtime
+    :type verbose: bool
+    :param log_every: How often progress is reported
+    :type log_every: int
+    :param callback: Called with a ProgressEvent per run every log_every bars and on the last bar
+    :type callback: ProgressCallback | None
+    :return: One BacktestResults per entry, in the order of runs
+    :rtype: list[BacktestResults]
+    """
+    if execution_model is None:
+        execution_model = NextCloseExecution()
+    timestamps = market.timestamps()
+    n = len(timestamps)
+    symbols = market.symbols()
+
+    steppers = []
+    seen_costs = set()
+    for entry in runs:
+        if len(entry) not in (3, 4):
+            raise ValueError("runs entries must be (strategy, cfg, cost_model[, execution_model])")
+        strategy, cfg, cost_model = entry[:3]
+        if cost_model is not None:
+            # cost models may carry per-run state (TieredFeeCost's monthly volumes): one instance per run
+            if id(cost_model) in seen_costs:
+                cost_model = deepcopy(cost_model)
+            seen_costs.add(id(cost_model))
+        em = entry[3] if len(entry) == 4 and entry[3] is not None else execution_model
+        steppers.append(_StrategyRun(strategy, cfg, em, cost_model, symbols, timestamps[0], n,
+                                     sparse_targets=market.universe is not None))
+
+    for run in steppers:
+        run.precompute(market)
+        if run.cost_model is not None:
+            run.cost_model.prepare(market)
+
+    # one HistoryWindow per distinct lookback; all runs with the same lookback see the same view
+    histories = {}
+    for run in steppers:
+        lookback = getattr(run.cfg, "history_lookback", None)
+        if lookback not in histories:
+            histories[lookback] = market.history_window(lookback=lookback)
+
+    t_start = perf_counter()
+    for i, ts in enumerate(timestamps):
+        report = i == 0 or (i + 1) % log_every == 0 or (i + 1) == n
+        if verbose and report:
+            print(f"Backtest progress: {i+1}/{n} ({(i+1)/n:.1%})")
+        t0 = perf_counter()
+        marks = market.bar(i)
+        row = marks.row
+        t1 = perf_counter()
+        # no-future guarantee: the views only span rows up to bar i
+        views = {lookback: h.view(i) for lookback, h in histories.items()}
+        t2 = perf_counter()
+        for k, run in enumerate(steppers):
+            # shared lookups are charged in full to every run that uses them
+            run.timer.add(PRICES, t1 - t0)
+            run.timer.add(HISTORY, t2 - t1)
+            run.step(i, ts, marks, row, views[getattr(run.cfg, "history_lookback", None)])
+            if callback is not None and report:
+                callback(ProgressEvent(
+                    run=k, bar=i + 1, n_bars=n, ts=ts, equity=run.equity,
+                    elapsed=perf_counter() - t_start, timings=run.timer.cumulative(),
+                ))
+
+    return [run.results() for run in steppers]
+
+
 def run_positions_only(
         market: MarketData, 
         strategy: Strategy, 
@@ -28,14 +362,19 @@ def run_positions_only(
         execution_model: ExecutionModel | None = None, 
         cost_model: CostModel | None = None,
         verbose: bool = False,
-        log_every:int = 100) -> BacktestResults:
+        log_every:int = 100,
+        callback: ProgressCallback | None = None) -> BacktestResults:
     """
      Runs a simulation of a backtest using the provided market data and trading strategy.
 
     The function simulates the progression of a portfolio's state over time, handling
     order generation from the strategy, order execution via an execution model,
-    cost calculations, and logging of various metrics. It ensures no future
-    data leakage to the strategy's decision-making process.
+    cost calculations, and logging of various metrics. With cfg.collect_timings the time spent in
+    each stage is returned in BacktestResults.timings. It ensures no future
+    data leakage to the strategy's decision-making process: on_bar receives a read-only
+    HistoryView of prices up to ts (the last cfg.history_lookback bars if set).
+    If the strategy returns a target matrix from Strategy.precompute, targets are read from it by
+    row instead of calling on_bar.
     
     :param market: Market prices for each symbol at each timestamp
     :type market: MarketData
@@ -51,129 +390,17 @@ def run_positions_only(
     :type verbose: bool
     :param log_every: How often progress is reported
     :type log_every: int
+    :param callback: Called with a ProgressEvent (bar, ts, equity, elapsed, stage timings) every log_every bars and on the last bar
+    :type callback: ProgressCallback | None
     :return: Computes a summary of all calculated stats from the backtest and combines them into a BacktestResults dataclass
     :rtype: BacktestResults
     """
 
-    if execution_model is None:
-        execution_model = NextCloseExecution()
-    ts0=market.timestamps()[0]
-    n = len(market.timestamps())
-    state=PortfolioState(ts = ts0,
-                         cash = cfg.initial_cash,
-                         positions={}
-                         )
-    pending_orders= []
-    ledger_rows=[]
-    targets_rows=[]
-    orders_rows=[]
-    fills_rows= []
-    symbols=market.symbols()
-    for i, ts in enumerate(market.timestamps()):
-        if verbose and (i == 0 or (i + 1) % log_every == 0 or (i + 1) == n):
-            print(f"Backtest progress: {i+1}/{n} ({(i+1)/n:.1%})")
-        marks = market.get_price_dict(ts)
-        
-        
-        if i>0 and pending_orders:
-            fills=execution_model.simulate_fills(ts,pending_orders,marks)
-            for f in fills:
-                if not cost_model:
-                    fees, slippage = 0.0, 0.0
-                else:
-                    fees, slippage= cost_model.compute(f)
-                f2= Fill(f.ts,f.symbol,f.qty,f.price,fees,slippage, getattr(f, "tag", None))
-                state = apply_fill(state,f2)
-
-                fills_rows.append({
-                    "ts_fill": f2.ts,
-                    "symbol": f2.symbol,
-                    "notional": abs(f2.qty * f2.price),
-                    "qty": f2.qty,
-                    "price": f2.price,
-                    "fees": f2.fees,
-                    "slippage": f2.slippage,
-                    "tag": getattr(f2, "tag", None)
-                })
-            pending_orders=[]
-        hist = market.slice_upto(ts)
-
-        # no-future guarantee (guard empty first)
-        if not hist.empty and hist.index.max() > ts:
-            raise ValueError(f"Future leakage at {hist.index.max()} (ts={ts})")
-        
-
-        # --- WARMUP BARS ---
-        if i < cfg.warmup_bars:
-            targets = {}   
-        else:
-            targets = strategy.on_bar(ts, data_upto_ts=hist, state=state) or {}
-
-
-        # clip targets for logging + to match order sizing
-        max_abs = getattr(cfg, "max_abs_weight", 1.0)
-        clipped_targets = {s: float(targets.get(s, 0.0)) for s in symbols}
-        for s in symbols:
-            w = clipped_targets[s]
-            if abs(w) > max_abs:
-                clipped_targets[s] = max(-max_abs, min(max_abs, w))
-        targets = clipped_targets
-
-        held = list(state.positions.keys())
-        bad_held = [
-            sym for sym in held
-            if sym not in marks or (not np.isfinite(marks[sym])) or float(marks[sym]) <= 0.0
-        ]
-
-
-        if bad_held:
-            # treat as "no trading possible" this bar
-            current_orders = []
-        else:
-            current_orders = targets_to_orders(ts, targets, state, marks, cfg)
-        targets_rows.append({"ts": ts, **{s: float(targets.get(s, 0.0)) for s in symbols}})
-        pending_orders.extend(current_orders)
-        for o in current_orders:
-            orders_rows.append({
-                "ts_submit": o.ts,
-                "symbol": o.symbol,
-                "qty": o.qty,
-                "order_type": o.order_type,
-                "tag": o.tag
-            })
-
-        fail_on_missing = getattr(cfg, "fail_on_missing_marks", True)
-        if bad_held:
-            if fail_on_missing:
-                raise ValueError(f"Missing/invalid marks for held symbols at {ts}: {bad_held}")
-            # Can't mark-to-market; avoid crashing and avoid inventing equity.
-            equity = np.nan
-            gross = np.nan
-            net = np.nan
-            lev = np.nan
-        else:
-            equity = state.equity(marks)
-            gross = state.gross_exposure(marks)
-            net = state.net_exposure(marks)
-            lev = state.leverage(marks)
-
-        ledger_rows.append({
-            "ts": ts,
-            "cash": state.cash,
-            "equity": equity,
-            "gross_exposure": gross,
-            "net_exposure": net,
-            "leverage": lev,
-            "n_positions": sum(1 for p in state.positions.values() if abs(p.qty) > 1e-12)
-        })
-
-        
-
-    ledger=build_ledger(ledger_rows)
-    targets= build_targets(targets_rows,symbols)
-    orders=build_orders(orders_rows)
-    fills=build_fills(fills_rows)
-    trades= trades_from_fills(fills)
-
-    return BacktestResults(ledger=ledger,targets=targets, orders=orders,fills=fills, trades=trades)
-        
+    return run_many(
+        market,
+        [(strategy, cfg, cost_model)],
+        execution_model=execution_model,
+        verbose=verbose,
+        log_every=log_every,
+        callback=callback,
+    )[0]
@@ -0,0 +1,132 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from time import perf_counter
+from typing import Callable
+import numpy as np
+import pandas as pd
+
+"""
+Opt-in engine instrumentation: per-stage wall-clock timings (enabled with cfg.collect_timings)
+and a progress callback. A disabled timer is a NullTimer whose methods do nothing, so the
+engine loop pays one no-op call per stage when timings are off.
+"""
+
+STAGES = (
+    "prices",      # per-bar market lookups (price dict / row)
+    "history",     # history view for on_bar
+    "strategy",    # on_bar / precomputed row
+    "orders",      # target clipping, targets_to_orders, order recording
+    "execution",   # ExecutionModel.simulate_fills_batch
+    "costs",       # CostModel.compute
+    "accounting",  # applying fills to the portfolio, fill recording
+    "marking",     # mark-to-market and the ledger row
+    "results",     # building the result frames and trades (once per run)
+)
+PRICES, HISTORY, STRATEGY, ORDERS, EXECUTION, COSTS, ACCOUNTING, MARKING, RESULTS = range(len(STAGES))
+
+
+@dataclass
+class StageTimings:
+    """Seconds spent in each engine stage; per_bar has one row per bar when cfg.timings_per_bar is set"""
+    total: pd.Series
+    per_bar: pd.DataFrame | None
+    n_bars: int
+
+    def summary(self) -> pd.DataFrame:
+        """total_s, us_per_bar and share of the run for every stage, slowest first"""
+        total = self.total
+        grand = float(total.sum())
+        out = pd.DataFrame({
+            "total_s": total,
+            "us_per_bar": total / max(self.n_bars, 1) * 1e6,
+            "share": total / grand if grand > 0 else 0.0,
+        })
+        return out.sort_values("total_s", ascending=False)
+
+
+@dataclass(frozen=True)
+class ProgressEvent:
+    """Passed to the engine callback every log_every bars and on the last bar"""
+    run: int                   # position of the run in run_many (0 for run_positions_only)
+    bar: int                   # bars processed so far
+    n_bars: int | None         # None when the length is unknown (streaming)
+    ts: pd.Timestamp
+    equity: float
+    elapsed: float             # seconds since the run started
+    timings: dict[str, float] | None  # cumulative seconds per stage if timings are collected
+
+
+ProgressCallback = Callable[[ProgressEvent], None]
+
+
+class StageTimer:
+    """
+    Accumulates time per stage. start() marks the beginning of a bar's work, lap(stage) charges the
+    time since the previous mark to stage, end_bar(ts) closes the bar.
+    """
+    def __init__(self, per_bar: bool = False) -> None:
+        self.per_bar = per_bar
+        self._total = [0.0] * len(STAGES)
+        self._bar = [0.0] * len(STAGES)
+        self._rows: list[list[float]] = []
+        self._index: list[pd.Timestamp] = []
+        self._last = perf_counter()
+        self.n_bars = 0
+
+    def start(self) -> None:
+        self._last = perf_counter()
+
+    def lap(self, stage: int) -> None:
+        now = perf_counter()
+        self._bar[stage] += now - self._last
+        self._last = now
+
+    def add(self, stage: int, seconds: float) -> None:
+        """Charges time measured elsewhere (e.g. a lookup shared by several runs)"""
+        self._bar[stage] += seconds
+
+    def end_bar(self, ts: pd.Timestamp) -> None:
+        bar = self._bar
+        total = self._total
+        for k in range(len(bar)):
+            total[k] += bar[k]
+        if self.per_bar:
+            self._rows.append(bar)
+            self._index.append(ts)
+        self._bar = [0.0] * len(STAGES)
+        self.n_bars += 1
+
+    def cumulative(self) -> dict[str, float]:
+        return dict(zip(STAGES, self._total))
+
+    def timings(self) -> StageTimings:
+        # anything charged after the last bar (result building) goes into the totals only
+        total = np.asarray(self._total) + np.asarray(self._bar)
+        per_bar = None
+        if self.per_bar:
+            rows = np.asarray(self._rows, dtype=float).reshape(len(self._rows), len(STAGES))
+            per_bar = pd.DataFrame(rows, index=pd.DatetimeIndex(self._index, name="ts"), columns=list(STAGES))
+        return StageTimings(total=pd.Series(total, index=list(STAGES), name="seconds"), per_bar=per_bar, n_bars=self.n_bars)
+
+
+class NullTimer:
+    """Stand-in used when timings are off"""
+    per_bar = False
+
+    def start(self) -> None:
+        pass
+
+    def lap(self, stage: int) -> None:
+        pass
+
+    def add(self, stage: int, seconds: float) -> None:
+        pass
+
+    def end_bar(self, ts: pd.Timestamp) -> None:
+        pass
+
+    def cumulative(self) -> None:
+        return None
+
+    def timings(self) -> None:
+        return None
@@ -3,8 +3,10 @@ import pandas as pd
 
 from btlib.core.order_types import require_finite, Order, PortfolioState
 from btlib.core.enums import OrderType
-from btlib.engine.accounting import close_enough_zero
+from btlib.engine.accounting import close_enough_zero, epsilon
 from btlib.engine import BacktestConfig
+from btlib.data.bar import BarPrices
+from btlib.execution.base import OrderBatch
 
 
 def sanitize_targets(
@@ -74,17 +76,134 @@ def weights_to_target_shares(
     return target
 
 
+def _bar_targets_to_orders(
+    targets: dict[str, float] | np.ndarray,
+    state: PortfolioState,
+    bar: BarPrices,
+    cfg: BacktestConfig,
+    pending: np.ndarray | None = None,
+) -> tuple[np.ndarray, np.ndarray] | None:
+    """
+    targets_to_orders over the arrays of a BarPrices: same sizing, filters and order as the dict path,
+    computed for every symbol at once, as (column, qty) arrays. When the bar carries universe members
+    (bar.active), only the members, held symbols and symbols with a target are looked at. pending
+    (per symbol id) is quantity already on order, which counts towards the targets.
+    Returns None (use the dict path) if a held symbol is not in the bar.
+    """
+    index = bar.index
+    held = state.held_symbols()
+    if any(sym not in index for sym in held):
+        return None
+
+    max_abs_weight = getattr(cfg, "max_abs_weight", 1.0)
+    min_order_notional = getattr(cfg, "min_order_notional", 10.0)
+    allow_fractional = getattr(cfg, "allow_fractional_shares", True)
+
+    m = len(bar.symbols)
+    held_ids = np.array([index[sym] for sym in held], dtype=np.intp)
+    if isinstance(targets, np.ndarray):
+        if targets.shape != (m,):
+            raise ValueError(f"targets shape {targets.shape} does not match {m} symbols")
+        target_ids = np.flatnonzero(targets)
+    else:
+        target_ids = np.empty(len(targets), dtype=np.intp)
+        target_w = np.empty(len(targets))
+        for k, (sym, w) in enumerate(targets.items()):
+            j = index.get(sym)
+            if j is None:
+                raise ValueError(f"{sym} not in symbol universe")
+            target_ids[k] = j
+            target_w[k] = float(w)
+
+    # columns looked at, ascending: all of them, or members + held + targeted
+    cols = None if bar.active is None else np.unique(np.concatenate([bar.active, held_ids, target_ids]))
+    width = m if cols is None else len(cols)
+    pos = (lambda ids: ids) if cols is None else (lambda ids: np.searchsorted(cols, ids))
+
+    if isinstance(targets, np.ndarray):
+        weights = (targets if cols is None else targets[cols]).astype(float)
+    else:
+        weights = np.zeros(width)
+        weights[pos(target_ids)] = target_w
+    finite = np.isfinite(weights)
+    if not finite.all():
+        k = int(np.flatnonzero(~finite)[0])
+        require_finite(bar.symbols[k if cols is None else cols[k]], float(weights[k]))
+    np.clip(weights, -max_abs_weight, max_abs_weight, out=weights)
+
+    valid = bar.valid if cols is None else bar.valid[cols]
+    row = bar.row if cols is None else bar.row[cols]
+    if cols is None and isinstance(state, PortfolioState) and len(state.positions) < m:
+        # the dict path registers a flat position for every tradable symbol it looks at; keep that,
+        # since a flat position with a missing mark later fails the equity check, as on the dict path
+        for j in np.flatnonzero(valid):
+            state.get_position(bar.symbols[j])
+    equity = state.equity(bar)
+    require_finite("equity", float(equity))
+
+    current = np.zeros(width)
+    current[pos(held_ids)] = [state.get_position(sym).qty for sym in held]
+
+    px = np.where(valid, row, 1.0).astype(float, copy=False)
+    shares = (weights * float(equity)) / px
+    if not allow_fractional:
+        shares = np.trunc(shares)
+    delta = shares - current
+    if pending is not None:
+        delta -= pending if cols is None else pending[cols]
+    trade = valid & (np.abs(delta) > epsilon) & (np.abs(delta * px) >= float(min_order_notional))
+
+    # orders in sorted-symbol order, as (column, qty)
+    if cols is None:
+        picked = bar.order[trade[bar.order]]
+        return picked, delta[picked]
+    picked = np.flatnonzero(trade)
+    picked = picked[np.argsort(bar.rank[cols[picked]], kind="stable")]
+    return cols[picked], delta[picked]
+
+
+def targets_to_order_batch(
+    ts: pd.Timestamp,
+    targets: dict[str, float] | np.ndarray,
+    state: PortfolioState,
+    bar: BarPrices,
+    cfg: BacktestConfig,
+    pending: np.ndarray | None = None,
+) -> OrderBatch:
+    """
+    targets_to_orders as an OrderBatch of symbol ids and quantities, without building Order objects.
+    pending: quantity already on order per symbol id, netted against the targets (array path only)
+    """
+    ts = pd.Timestamp(ts)
+    arrays = _bar_targets_to_orders(targets, state, bar, cfg, pending)
+    if arrays is not None:
+        return OrderBatch(ts, arrays[0], arrays[1])
+    return OrderBatch.from_orders(targets_to_orders(ts, targets, state, bar, cfg), bar.index, ts)
+
+
 def targets_to_orders(
     ts: pd.Timestamp,
-    targets: dict[str, float],
+    targets: dict[str, float] | np.ndarray,
     state: PortfolioState,
-    prices: dict[str, float],
+    prices: dict[str, float] | BarPrices,
     cfg: BacktestConfig,
 ) -> list[Order]:
     """
     Day 6: create *intended* MARKET orders to move from current holdings to target weights.
     No fills are simulated here.
+    With BarPrices marks the orders are sized on the bar's arrays instead of per-symbol dict lookups, and
+    targets may also be a weight array aligned to the bar's symbols.
     """
+    if isinstance(prices, BarPrices):
+        arrays = _bar_targets_to_orders(targets, state, prices, cfg)
+        if arrays is not None:
+            ts = pd.Timestamp(ts)
+            return [
+                Order(ts=ts, order_type=OrderType.MARKET, symbol=prices.symbols[j], qty=float(q))
+                for j, q in zip(*arrays)
+            ]
+        if isinstance(targets, np.ndarray):
+            targets = {prices.symbols[j]: float(targets[j]) for j in np.flatnonzero(targets)}
     # Universe: include all marked symbols + all held symbols (so omitted holdings can be flattened)
     symbols = sorted(set(prices.keys()) | set(state.positions.keys()))
 
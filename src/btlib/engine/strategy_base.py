@@ -1,8 +1,24 @@
 import pandas as pd
-from btlib.core.order_types import PortfolioState
+from btlib.core.order_types import PortfolioState, Order
+from btlib.data.history import HistoryView
 class Strategy:
     def on_bar(self, 
                 ts: pd.Timestamp, 
-                data_upto_ts: pd.DataFrame,
-                state: PortfolioState)->dict[str, float]:
+                data_upto_ts: HistoryView | pd.DataFrame,
+                state: PortfolioState)->dict[str, float] | list[Order]:
+        """
+        Target weights for bar ts (rebalanced with MARKET orders filled on the next bar), or a list of
+        Orders (any OrderType / TimeInForce) to submit as they are instead of rebalancing.
+        """
         return {}
+
+    def precompute(self, close: pd.DataFrame, start: int = 0) -> pd.DataFrame | None:
+        """
+        Optional vectorized path. Strategies whose targets are a pure function of prices can return
+        the whole target-weight matrix (index/columns of close; omitted symbols are weight 0) and the
+        engine reads row i instead of calling on_bar. Row t must equal what on_bar would return at
+        bar t when on_bar is first called at bar `start` (the engine passes cfg.warmup_bars); rows
+        before start are ignored. Return None (the default) to go through on_bar.
+        Use check_precompute to confirm both paths agree.
+        """
+        return None
@@ -0,0 +1,248 @@
+from __future__ import annotations
+from time import perf_counter
+from typing import Callable, Mapping
+import numpy as np
+import pandas as pd
+from btlib.costs import CostModel
+from btlib.data.bar import BarPrices, symbol_order
+from btlib.data.chunked import ChunkedMarketData
+from btlib.data.history import HistoryWindow, RingHistory
+from btlib.engine.config import BacktestConfig
+from btlib.engine.engine import BacktestResults, _StrategyRun
+from btlib.engine.instrumentation import ProgressCallback, ProgressEvent
+from btlib.engine.strategy_base import Strategy
+from btlib.engine.instrumentation import PRICES, HISTORY
+from btlib.execution import ExecutionModel, NextCloseExecution
+from btlib.reporting.recorders import ResultRecorders
+
+"""
+Incremental engines: the run_positions_only loop body driven one bar at a time by the caller
+(StreamingEngine, for live paper trading) or block by block over out-of-core data (run_chunked),
+for replays too long to hold as one MarketData.
+State is bounded: the portfolio, pending orders, a RingHistory of the last `lookback` bars and
+the result recorders, which can be drained to a writer every `flush_every` rows.
+"""
+
+ResultWriter = Callable[[str, pd.DataFrame], None]
+
+
+def _flush_recorders(recorders: ResultRecorders, writer: ResultWriter, flush_every: int, force: bool) -> None:
+    """Hands every recorder holding flush_every rows (or any rows, if force) to the writer"""
+    for kind in ("ledger", "targets", "orders", "fills"):
+        rec = getattr(recorders, kind)
+        if len(rec) and (force or len(rec) >= flush_every):
+            writer(kind, rec.drain())
+
+
+class StreamingEngine:
+    """
+    Bar-by-bar backtest of one strategy over a fixed symbol universe.
+
+        engine = StreamingEngine(symbols, strategy, cfg, lookback=60)
+        for ts, prices in feed:
+            engine.push_bar(ts, prices)
+        res = engine.finalize()
+
+    Pushing every bar of a MarketData gives the same results as run_positions_only with
+    cfg.history_lookback == lookback (precompute is not used: the engine never sees the whole
+    close matrix, so targets always come from on_bar).
+    """
+    def __init__(
+            self,
+            symbols: list[str],
+            strategy: Strategy,
+            cfg: BacktestConfig,
+            execution_model: ExecutionModel | None = None,
+            cost_model: CostModel | None = None,
+            lookback: int | None = None,
+            writer: ResultWriter | None = None,
+            flush_every: int = 10_000) -> None:
+        """
+        :param symbols: Symbol universe; prices pushed as arrays must follow this order
+        :type symbols: list[str]
+        :param lookback: Bars of history kept for on_bar (None -> cfg.history_lookback, which must then be set)
+        :type lookback: int | None
+        :param writer: Called as writer(kind, frame) with kind in ledger/targets/orders/fills whenever a
+            recorder reaches flush_every rows, and for the remainder in finalize(); None keeps every row in memory
+        :type writer: ResultWriter | None
+        :param flush_every: Rows a recorder holds before it is drained to the writer
+        :type flush_every: int
+        """
+        if lookback is None:
+            lookback = getattr(cfg, "history_lookback", None)
+        if lookback is None:
+            raise ValueError("StreamingEngine needs a bounded history: pass lookback or set cfg.history_lookback")
+        if int(flush_every) <= 0:
+            raise ValueError(f"flush_every must be a positive integer, got {flush_every!r}")
+        self.symbols = [str(s) for s in symbols]
+        self.strategy = strategy
+        self.cfg = cfg
+        self.execution_model = execution_model if execution_model is not None else NextCloseExecution()
+        self.cost_model = cost_model
+        self.history = RingHistory(self.symbols, int(lookback))
+        self.writer = writer
+        self.flush_every = int(flush_every)
+        self.recorders = ResultRecorders.for_run(min(self.flush_every, 1024), self.symbols)
+        self._sym_index = {s: j for j, s in enumerate(self.symbols)}
+        self._order = symbol_order(self.symbols)
+        self._run: _StrategyRun | None = None
+        self._last_ts: pd.Timestamp | None = None
+        self._finalized = False
+
+    @property
+    def n_bars(self) -> int:
+        return self.history.n
+
+    @property
+    def state(self):
+        """Current portfolio (None before the first bar)"""
+        return None if self._run is None else self._run.state
+
+    def _price_row(self, prices: Mapping[str, float] | np.ndarray | pd.Series) -> np.ndarray:
+        if isinstance(prices, Mapping) or isinstance(prices, pd.Series):
+            row = np.full(len(self.symbols), np.nan)
+            for s, p in prices.items():
+                j = self._sym_index.get(str(s))
+                if j is None:
+                    raise ValueError(f"{s!r} not in symbol universe")
+                row[j] = p
+            return row
+        row = np.asarray(prices, dtype=float)
+        if row.shape != (len(self.symbols),):
+            raise ValueError(f"prices shape {row.shape} does not match {len(self.symbols)} symbols")
+        return row
+
+    def push_bar(
+            self,
+            ts: pd.Timestamp,
+            prices: Mapping[str, float] | np.ndarray | pd.Series,
+            fields: Mapping[str, Mapping[str, float] | np.ndarray | pd.Series] | None = None) -> None:
+        """
+        Processes one bar: fills the orders queued on the previous bar at these prices, calls on_bar
+        with the last `lookback` bars, queues the new orders and records the ledger row.
+        Missing symbols in a mapping are treated as NaN prices. fields holds the bar's other fields
+        (e.g. {"high": ..., "low": ..., "volume": ...}) in the same forms, for stop triggers, execution
+        and cost models that read them.
+        """
+        if self._finalized:
+            raise RuntimeError("push_bar() after finalize()")
+        ts = pd.Timestamp(ts)
+        if self._last_ts is not None and ts <= self._last_ts:
+            raise ValueError(f"Bars must be pushed in increasing time order: {ts} after {self._last_ts}")
+        row = self._price_row(prices)
+        if self._run is None:
+            self._run = _StrategyRun(
+                self.strategy, self.cfg, self.execution_model, self.cost_model,
+                self.symbols, ts, self.flush_every, recorders=self.recorders,
+            )
+            if self.cost_model is not None:
+                self.cost_model.prepare_stream(self.symbols)
+
+        tm = self._run.timer
+        tm.start()
+        i = self.history.n
+        extra = None if not fields else {str(name): self._price_row(v) for name, v in fields.items()}
+        marks = BarPrices(self.symbols, self._sym_index, row, order=self._order, fields=extra)
+        tm.lap(PRICES)
+        self.history.append(ts, row)
+        # the ring holds the just-appended bar, so the view spans rows up to ts and nothing later
+        hist = self.history.view()
+        tm.lap(HISTORY)
+        self._run.step(i, ts, marks, row, hist)
+        if self.cost_model is not None:
+            self.cost_model.observe_bar(i, ts, marks)
+        self._last_ts = ts
+        if self.writer is not None:
+            self._flush(force=False)
+
+    def _flush(self, force: bool) -> None:
+        _flush_recorders(self.recorders, self.writer, self.flush_every, force)
+
+    def finalize(self) -> BacktestResults | None:
+        """
+        Ends the run. Orders still pending (submitted on the last bar) are dropped, as in run_positions_only.
+        Without a writer, returns the full BacktestResults; with one, drains the remaining rows to it and
+        returns None (build trades with trades_from_fills on the written fills if needed).
+        """
+        self._finalized = True
+        if self.writer is not None:
+            self._flush(force=True)
+            return None
+        if self._run is None:
+            raise ValueError("No bars were pushed")
+        return self._run.results()
+
+
+def run_chunked(
+        market: ChunkedMarketData,
+        strategy: Strategy,
+        cfg: BacktestConfig,
+        execution_model: ExecutionModel | None = None,
+        cost_model: CostModel | None = None,
+        writer: ResultWriter | None = None,
+        flush_every: int = 10_000,
+        verbose: bool = False,
+        log_every: int = 100,
+        callback: ProgressCallback | None = None) -> BacktestResults | None:
+    """
+    Backtests a strategy over a ChunkedMarketData: blocks are read one at a time and on_bar gets a
+    zero-copy view of the last cfg.history_lookback bars (which may reach into the block's carried tail).
+    Gives the same results as run_positions_only on the full data with the same history_lookback.
+    The block's other fields (e.g. volume for the impact cost models) reach the bars as BarPrices fields.
+
+    :param market: Out-of-core timeline; its lookback tail must cover cfg.history_lookback - 1 bars
+    :type market: ChunkedMarketData
+    :param writer: writer(kind, frame) receiving result rows every flush_every rows (see StreamingEngine);
+        None keeps every row in memory and returns BacktestResults
+    :type writer: ResultWriter | None
+    :return: BacktestResults, or None when the rows went to a writer
+    :rtype: BacktestResults | None
+    """
+    lookback = getattr(cfg, "history_lookback", None)
+    if lookback is None:
+        raise ValueError("run_chunked needs a bounded history: set cfg.history_lookback")
+    if market.lookback < int(lookback) - 1:
+        raise ValueError(f"market.lookback ({market.lookback}) must be at least history_lookback - 1 ({int(lookback) - 1})")
+    timestamps = market.timestamps()
+    n = len(timestamps)
+    symbols = market.symbols()
+    sym_index = {s: j for j, s in enumerate(symbols)}
+    order = symbol_order(symbols)
+    recorders = ResultRecorders.for_run(min(flush_every, n) if writer is not None else n, symbols)
+    run = _StrategyRun(
+        strategy, cfg, execution_model if execution_model is not None else NextCloseExecution(), cost_model,
+        symbols, timestamps[0], n, recorders=recorders,
+    )
+    if cost_model is not None:
+        cost_model.prepare_stream(symbols)
+    tm = run.timer
+    t_start = perf_counter()
+    for block in market.blocks():
+        history = HistoryWindow(block.values, block.index, symbols, lookback=lookback)
+        for k in range(block.offset, len(block.index)):
+            i = block.start + k - block.offset
+            report = i == 0 or (i + 1) % log_every == 0 or (i + 1) == n
+            if verbose and report:
+                print(f"Backtest progress: {i+1}/{n} ({(i+1)/n:.1%})")
+            tm.start()
+            ts = block.index[k]
+            row = block.values[k]
+            extra = {name: arr[k] for name, arr in block.fields.items()} if block.fields else None
+            marks = BarPrices(symbols, sym_index, row, order=order, fields=extra)
+            tm.lap(PRICES)
+            hist = history.view(k)
+            tm.lap(HISTORY)
+            run.step(i, ts, marks, row, hist)
+            if cost_model is not None:
+                cost_model.observe_bar(i, ts, marks)
+            if writer is not None:
+                _flush_recorders(recorders, writer, flush_every, force=False)
+            if callback is not None and report:
+                callback(ProgressEvent(
+                    run=0, bar=i + 1, n_bars=n, ts=ts, equity=run.equity,
+                    elapsed=perf_counter() - t_start, timings=tm.cumulative(),
+                ))
+    if writer is not None:
+        _flush_recorders(recorders, writer, flush_every, force=True)
+        return None
+    return run.results()
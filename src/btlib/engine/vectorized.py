@@ -0,0 +1,200 @@
+"""Vectorized engine: simulate a full (timestamps x symbols) target-weight matrix with NumPy array operations"""
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+from btlib.core import TimeInForce
+from btlib.costs import CostModel
+from btlib.data.market_data import MarketData
+from btlib.engine.accounting import epsilon
+from btlib.engine.config import BacktestConfig
+from btlib.engine.engine import BacktestResults
+from btlib.execution.order_book import FILLED, CANCELED
+from btlib.reporting.reporting import trades_from_fills
+from btlib.reporting.recorders import FillsRecorder, OrdersRecorder
+
+
+def align_weights(weights: pd.DataFrame | np.ndarray, market: MarketData) -> np.ndarray:
+    """
+    Aligns a target-weight matrix to the market's timestamps and symbols.
+
+    - DataFrame: rows/columns are matched by label; missing timestamps or symbols -> weight 0
+      (the same as a strategy omitting them from its dict), unknown labels -> raise
+    - ndarray: must already have shape (len(timestamps), len(symbols))
+    - Non-finite weights -> raise
+    """
+    index = market.timestamps()
+    symbols = market.symbols()
+    if isinstance(weights, pd.DataFrame):
+        cols = weights.columns.astype(str)
+        unknown_syms = cols.difference(pd.Index(symbols))
+        if len(unknown_syms) > 0:
+            raise ValueError(f"{list(unknown_syms)} not in symbol universe")
+        w_index = pd.DatetimeIndex(weights.index)
+        unknown_ts = w_index.difference(index)
+        if len(unknown_ts) > 0:
+            raise ValueError(f"Weights contain timestamps not in market data: {list(unknown_ts[:5])}")
+        frame = weights.set_axis(cols, axis=1).set_axis(w_index, axis=0)
+        w = np.array(frame.reindex(index=index, columns=symbols, fill_value=0.0), dtype=float)
+    else:
+        w = np.asarray(weights, dtype=float)
+        if w.shape != (len(index), len(symbols)):
+            raise ValueError(f"Weights shape {w.shape} does not match market shape {(len(index), len(symbols))}")
+        w = w.copy()
+    if not np.isfinite(w).all():
+        raise ValueError("Weights must be finite numbers")
+    return w
+
+
+def run_weights_matrix(
+        market: MarketData,
+        weights: pd.DataFrame | np.ndarray,
+        cfg: BacktestConfig,
+        cost_model: CostModel | None = None,
+        verbose: bool = False,
+        log_every: int = 100) -> BacktestResults:
+    """
+    Runs a backtest from a precomputed target-weight matrix, with every bar simulated as array operations.
+
+    Mirrors run_positions_only with NextCloseExecution: weights at bar i are clipped to
+    cfg.max_abs_weight, turned into orders against the marks at bar i (dropping orders below
+    cfg.min_order_notional), and filled at the close of bar i+1. Warmup bars, missing-mark handling
+    and the ledger/targets/orders/fills/trades schemas are identical, so results are interchangeable.
+
+    :param market: Market prices for each symbol at each timestamp
+    :type market: MarketData
+    :param weights: Target weights, timestamps x symbols (see align_weights)
+    :type weights: pd.DataFrame | np.ndarray
+    :param cfg: Config settings of the backtest
+    :type cfg: BacktestConfig
+    :param cost_model: Determine what cost model will be used during the backtest
+    :type cost_model: CostModel | None
+    :param verbose: Toggles progress bar during program runtime
+    :type verbose: bool
+    :param log_every: How often progress is reported
+    :type log_every: int
+    :return: Same BacktestResults as run_positions_only
+    :rtype: BacktestResults
+    """
+    index = market.timestamps()
+    symbols = market.symbols()
+    sym_arr = np.asarray(symbols, dtype=object)
+    n, m = len(index), len(symbols)
+
+    px = market.close.to_numpy(dtype=float)
+    valid = np.isfinite(px) & (px > 0.0)
+
+    w = align_weights(weights, market)
+    max_abs = getattr(cfg, "max_abs_weight", 1.0)
+    np.clip(w, -max_abs, max_abs, out=w)
+    w[:max(int(cfg.warmup_bars), 0)] = 0.0
+
+    min_order_notional = float(getattr(cfg, "min_order_notional", 10.0))
+    allow_fractional = getattr(cfg, "allow_fractional_shares", True)
+    fail_on_missing = getattr(cfg, "fail_on_missing_marks", True)
+
+    # targets_to_orders emits orders in sorted symbol order; keep that order for orders and fills
+    emit_order = np.argsort(sym_arr.astype(str), kind="stable")
+
+    qty = np.zeros(m)
+    cash = float(cfg.initial_cash)
+    pending_cols = np.empty(0, dtype=np.intp)
+    pending_qty = np.empty(0)
+    pending_rows = np.empty(0, dtype=np.int64)
+
+    cash_col = np.empty(n)
+    equity_col = np.empty(n)
+    gross_col = np.empty(n)
+    net_col = np.empty(n)
+    lev_col = np.empty(n)
+    npos_col = np.empty(n, dtype=np.int64)
+
+    if cost_model is not None:
+        cost_model.prepare(market)
+
+    orders_rec = OrdersRecorder(symbols)
+    fills_rec = FillsRecorder(symbols)
+
+    for i in range(n):
+        if verbose and (i == 0 or (i + 1) % log_every == 0 or (i + 1) == n):
+            print(f"Backtest progress: {i+1}/{n} ({(i+1)/n:.1%})")
+        row = px[i]
+        ok = valid[i]
+
+        # --- FILL ORDERS SUBMITTED ON THE PREVIOUS BAR AT THIS CLOSE ---
+        if i > 0 and pending_cols.size:
+            fillable = ok[pending_cols]
+            cols = pending_cols[fillable]
+            # IOC: whatever cannot fill at this close is cancelled
+            orders_rec.update(pending_rows, np.where(fillable, pending_qty, 0.0),
+                              np.where(fillable, FILLED, CANCELED).astype(np.int8))
+            if cols.size:
+                fq = pending_qty[fillable]
+                fp = row[cols]
+                if cost_model is None:
+                    fees = slippage = np.zeros_like(fq)
+                else:
+                    fees, slippage = cost_model.compute_many(index[i], sym_arr[cols], fq, fp, sids=cols, bar=i)
+                cash -= float(np.sum(fq * fp + fees + slippage))
+                new_qty = qty[cols] + fq
+                new_qty[np.abs(new_qty) <= epsilon] = 0.0
+                qty[cols] = new_qty
+
+                fills_rec.record_many(index[i], cols, fq, fp, fees, slippage)
+            pending_cols = np.empty(0, dtype=np.intp)
+            pending_qty = np.empty(0)
+            pending_rows = np.empty(0, dtype=np.int64)
+
+        held = qty != 0.0
+        bad_held = held & ~ok
+        cash_col[i] = cash
+        npos_col[i] = int(held.sum())
+
+        if bad_held.any():
+            if fail_on_missing:
+                raise ValueError(f"Missing/invalid marks for held symbols at {index[i]}: {sym_arr[bad_held].tolist()}")
+            # Can't mark-to-market; no trading possible and no invented equity
+            equity_col[i] = gross_col[i] = net_col[i] = lev_col[i] = np.nan
+            continue
+
+        mv = qty[held] * row[held]
+        net = float(mv.sum())
+        gross = float(np.abs(mv).sum())
+        equity = cash + net
+
+        # --- TARGET WEIGHTS -> ORDERS ---
+        target = np.divide(w[i] * equity, row, out=np.zeros(m), where=ok)
+        if not allow_fractional:
+            target = np.trunc(target)
+        delta = target - qty
+        trade = ok & (np.abs(delta) > epsilon) & (np.abs(delta * np.where(ok, row, 0.0)) >= min_order_notional)
+        cols = emit_order[trade[emit_order]]
+        if cols.size:
+            pending_cols = cols
+            pending_qty = delta[cols]
+            pending_rows = orders_rec.record_many(index[i], cols, pending_qty, tif=TimeInForce.IOC)
+
+        if equity <= 0:
+            raise ValueError("Equity must be positive to calculate leverage")
+        equity_col[i] = equity
+        gross_col[i] = gross
+        net_col[i] = net
+        lev_col[i] = gross / equity
+
+    ts_index = pd.DatetimeIndex(index, freq=None, name="ts")
+    ledger = pd.DataFrame(
+        {
+            "cash": cash_col,
+            "equity": equity_col,
+            "gross_exposure": gross_col,
+            "net_exposure": net_col,
+            "leverage": lev_col,
+            "n_positions": npos_col,
+        },
+        index=ts_index,
+    )
+    targets = pd.DataFrame(w, index=ts_index, columns=symbols)
+    orders = orders_rec.to_frame()
+    fills = fills_rec.to_frame()
+    trades = trades_from_fills(fills)
+
+    return BacktestResults(ledger=ledger, targets=targets, orders=orders, fills=fills, trades=trades)
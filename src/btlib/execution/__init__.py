@@ -1,4 +1,7 @@
-from .base import ExecutionModel
+from .base import ExecutionModel, BatchExecutionModel, OrderBatch, FillBatch
 from .next_close import NextCloseExecution
+from .order_book import OrderBook
+from .volume_participation import VolumeParticipationExecution
 
-__all__ = ["ExecutionModel", "NextCloseExecution"]
+__all__ = ["ExecutionModel", "BatchExecutionModel", "OrderBatch", "FillBatch", "NextCloseExecution", "OrderBook",
+           "VolumeParticipationExecution"]
@@ -1,7 +1,160 @@
 # base.py
+from __future__ import annotations
 from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Mapping
+import numpy as np
 import pandas as pd
 from btlib.core.order_types import Order, Fill
+from btlib.core.enums import OrderType, TimeInForce
+from btlib.data.bar import BarPrices
+
+"""
+Execution models turn the orders pending at a bar into fills.
+
+The per-order interface (simulate_fills: list of Order -> list of Fill) is what models implement by
+default. The batch interface (simulate_fills_batch) works on struct-of-arrays orders: symbol ids,
+quantities and (optionally) order types, limit/stop prices and time in force in, filled quantities
+and prices out, aligned to the orders. The engine always calls the
+batch one; ExecutionModel answers it through simulate_fills, and BatchExecutionModel subclasses
+implement it directly on the bar's arrays (and get simulate_fills from it).
+"""
+
+
+ORDER_TYPES = list(OrderType)
+TIME_IN_FORCE = list(TimeInForce)
+MARKET, LIMIT, STOP, STOP_LIMIT = (ORDER_TYPES.index(t) for t in
+                                   (OrderType.MARKET, OrderType.LIMIT, OrderType.STOP, OrderType.STOP_LIMIT))
+DAY, GTC, IOC = (TIME_IN_FORCE.index(t) for t in (TimeInForce.DAY, TimeInForce.GTC, TimeInForce.IOC))
+
+
+@dataclass
+class OrderBatch:
+    """
+    Orders as parallel arrays. Only sids and qty are required; the optional columns default to MARKET
+    DAY orders without tags.
+
+    :param ts: Submission timestamp (one for the batch, or a datetime64 array with one per order)
+    :param sids: Column of each order's symbol (MarketData.symbols() / BarPrices.symbols)
+    :param qty: Signed quantity of each order
+    :param tags: Optional tag of each order (None -> no tags)
+    :param order_type: Codes into ORDER_TYPES (None -> all MARKET)
+    :param limit_price: Limit of LIMIT / STOP_LIMIT orders, NaN for the others
+    :param stop_price: Stop of STOP / STOP_LIMIT orders, NaN for the others
+    :param tif: Codes into TIME_IN_FORCE (None -> all DAY)
+    """
+    ts: pd.Timestamp | np.ndarray
+    sids: np.ndarray
+    qty: np.ndarray
+    tags: np.ndarray | None = None
+    order_type: np.ndarray | None = None
+    limit_price: np.ndarray | None = None
+    stop_price: np.ndarray | None = None
+    tif: np.ndarray | None = None
+
+    def __len__(self) -> int:
+        return len(self.sids)
+
+    @classmethod
+    def empty(cls, ts: pd.Timestamp) -> OrderBatch:
+        return cls(ts, np.empty(0, dtype=np.intp), np.empty(0))
+
+    def types(self) -> np.ndarray:
+        """Order type code of every order"""
+        return np.full(len(self), MARKET, dtype=np.int8) if self.order_type is None else self.order_type
+
+    def tifs(self) -> np.ndarray:
+        """Time-in-force code of every order"""
+        return np.full(len(self), DAY, dtype=np.int8) if self.tif is None else self.tif
+
+    def prices(self, name: str) -> np.ndarray:
+        """limit_price or stop_price of every order (NaN where unused)"""
+        values = getattr(self, name)
+        return np.full(len(self), np.nan) if values is None else values
+
+    def marketable(self, px: np.ndarray) -> np.ndarray:
+        """
+        Mask of the orders that can trade at px (aligned to the orders): MARKET orders always, LIMIT orders
+        at or through the limit, STOP orders at or through the stop, STOP_LIMIT orders if both hold
+        """
+        ok = np.ones(len(self), dtype=bool)
+        if self.order_type is None:
+            return ok
+        types = self.order_type
+        buy = self.qty > 0.0
+        limit, stop = self.prices("limit_price"), self.prices("stop_price")
+        has_limit = (types == LIMIT) | (types == STOP_LIMIT)
+        has_stop = (types == STOP) | (types == STOP_LIMIT)
+        ok &= ~has_limit | np.where(buy, px <= limit, px >= limit)
+        ok &= ~has_stop | np.where(buy, px >= stop, px <= stop)
+        return ok
+
+    def ts_at(self, k: int) -> pd.Timestamp:
+        return pd.Timestamp(self.ts if np.ndim(self.ts) == 0 else self.ts[k])
+
+    def take(self, keep: np.ndarray) -> OrderBatch:
+        """The orders at positions (or mask) keep"""
+        opt = lambda a: None if a is None else a[keep]
+        return OrderBatch(self.ts if np.ndim(self.ts) == 0 else self.ts[keep], self.sids[keep], self.qty[keep],
+                          opt(self.tags), opt(self.order_type), opt(self.limit_price), opt(self.stop_price),
+                          opt(self.tif))
+
+    @classmethod
+    def from_orders(cls, orders: list[Order], index: Mapping[str, int], ts: pd.Timestamp | None = None) -> OrderBatch:
+        """Batch of Order objects; index maps symbols to columns"""
+        if ts is None:
+            ts = orders[0].ts if orders else pd.NaT
+        unknown = [o.symbol for o in orders if o.symbol not in index]
+        if unknown:
+            raise ValueError(f"{unknown[:10]} not in symbol universe")
+        tags = None
+        if any(o.tag is not None for o in orders):
+            tags = np.array([o.tag for o in orders], dtype=object)
+        batch = cls(
+            ts,
+            np.array([index[o.symbol] for o in orders], dtype=np.intp),
+            np.array([o.qty for o in orders], dtype=float),
+            tags,
+        )
+        if any(o.order_type is not OrderType.MARKET for o in orders):
+            batch.order_type = np.array([ORDER_TYPES.index(o.order_type) for o in orders], dtype=np.int8)
+            batch.limit_price = np.array([np.nan if o.limit_price is None else o.limit_price for o in orders], dtype=float)
+            batch.stop_price = np.array([np.nan if o.stop_price is None else o.stop_price for o in orders], dtype=float)
+        if any(o.tif is not TimeInForce.DAY for o in orders):
+            batch.tif = np.array([TIME_IN_FORCE.index(o.tif) for o in orders], dtype=np.int8)
+        return batch
+
+    def to_orders(self, symbols: list[str]) -> list[Order]:
+        """The batch as Order objects"""
+        tags = self.tags if self.tags is not None else [None] * len(self)
+        types, tifs = self.types(), self.tifs()
+        limit, stop = self.prices("limit_price"), self.prices("stop_price")
+        return [
+            Order(ts=self.ts_at(k), order_type=ORDER_TYPES[types[k]], symbol=symbols[j], qty=float(self.qty[k]),
+                  tag=tags[k], limit_price=None if np.isnan(limit[k]) else float(limit[k]),
+                  stop_price=None if np.isnan(stop[k]) else float(stop[k]), tif=TIME_IN_FORCE[tifs[k]])
+            for k, j in enumerate(self.sids)
+        ]
+
+
+@dataclass
+class FillBatch:
+    """
+    Fills of an OrderBatch, aligned to its orders: qty[k] is what order k filled (0 -> no fill) at price[k]
+    (NaN when not filled).
+    """
+    qty: np.ndarray
+    price: np.ndarray
+
+    @property
+    def filled(self) -> np.ndarray:
+        """Mask of the orders with a fill"""
+        return self.qty != 0.0
+
+    @classmethod
+    def none(cls, n: int) -> FillBatch:
+        return cls(np.zeros(n), np.full(n, np.nan))
+
 
 class ExecutionModel(ABC):
     @abstractmethod
@@ -12,3 +165,49 @@ class ExecutionModel(ABC):
         bar_prices: dict[str, float],
     ) -> list[Fill]:
         raise NotImplementedError
+
+    def simulate_fills_batch(self, ts_fill: pd.Timestamp, orders: OrderBatch, bar: BarPrices) -> FillBatch:
+        """
+        Compatibility adapter: runs simulate_fills on Order objects built from the batch and maps each fill
+        back to the first not yet filled order of its symbol. Override for an array-native model.
+        """
+        out = FillBatch.none(len(orders))
+        if len(orders) == 0:
+            return out
+        fills = self.simulate_fills(ts_fill, orders.to_orders(bar.symbols), bar)
+        open_orders: dict[int, list[int]] = {}
+        for k in range(len(orders) - 1, -1, -1):
+            open_orders.setdefault(int(orders.sids[k]), []).append(k)
+        for f in fills:
+            queue = open_orders.get(bar.index.get(f.symbol, -1))
+            if not queue:
+                raise ValueError(f"Fill for {f.symbol} does not match a pending order")
+            k = queue.pop()
+            out.qty[k] = f.qty
+            out.price[k] = f.price
+        return out
+
+
+class BatchExecutionModel(ExecutionModel):
+    """Execution model implemented on arrays; simulate_fills is answered through simulate_fills_batch"""
+    @abstractmethod
+    def simulate_fills_batch(self, ts_fill: pd.Timestamp, orders: OrderBatch, bar: BarPrices) -> FillBatch:
+        raise NotImplementedError
+
+    def simulate_fills(
+        self,
+        ts_fill: pd.Timestamp,
+        orders: list[Order],
+        bar_prices: dict[str, float],
+    ) -> list[Fill]:
+        if not isinstance(bar_prices, BarPrices):
+            symbols = sorted(set(bar_prices) | {o.symbol for o in orders})
+            bar_prices = BarPrices.from_row(symbols, [bar_prices.get(s, np.nan) for s in symbols])
+        # orders for symbols outside the bar have no price and never fill
+        known = [o for o in orders if o.symbol in bar_prices.index]
+        fb = self.simulate_fills_batch(ts_fill, OrderBatch.from_orders(known, bar_prices.index), bar_prices)
+        return [
+            Fill(ts=ts_fill, symbol=o.symbol, qty=float(fb.qty[k]), price=float(fb.price[k]),
+                 fees=0.0, slippage=0.0, tag=o.tag)
+            for k, o in enumerate(known) if fb.qty[k] != 0.0
+        ]
@@ -3,15 +3,28 @@ from __future__ import annotations
 import numpy as np
 import pandas as pd
 from btlib.core.order_types import Order, Fill
-from btlib.execution.base import ExecutionModel
+from btlib.execution.base import BatchExecutionModel, OrderBatch, FillBatch
+from btlib.data.bar import BarPrices
+
+class NextCloseExecution(BatchExecutionModel):
+    def simulate_fills_batch(self, ts_fill: pd.Timestamp, orders: OrderBatch, bar: BarPrices) -> FillBatch:
+        """
+        Every order whose symbol has a valid mark fills in full at it: MARKET orders always, LIMIT orders
+        if the close is at or through the limit, STOP orders if it is at or through the stop, STOP_LIMIT
+        orders if both hold. (Orders from an OrderBook arrive with triggered stops already converted.)
+        """
+        px = bar.row[orders.sids]
+        ok = bar.valid[orders.sids] & orders.marketable(px)
+        return FillBatch(np.where(ok, orders.qty, 0.0), np.where(ok, px, np.nan))
 
-class NextCloseExecution(ExecutionModel):
     def simulate_fills(
         self,
         ts_fill: pd.Timestamp,
         orders: list[Order],
         bar_prices: dict[str, float],
     ) -> list[Fill]:
+        if isinstance(bar_prices, BarPrices):
+            return super().simulate_fills(ts_fill, orders, bar_prices)
         fills: list[Fill] = []
         for o in orders:
             px = bar_prices.get(o.symbol, None)
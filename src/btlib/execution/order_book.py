@@ -0,0 +1,422 @@
+from __future__ import annotations
+import heapq
+from bisect import bisect_left, bisect_right
+import numpy as np
+import pandas as pd
+from btlib.core.enums import OrderStatus
+from btlib.data.bar import BarPrices
+from btlib.execution.base import (
+    OrderBatch, FillBatch, ORDER_TYPES, TIME_IN_FORCE, MARKET, LIMIT, STOP, STOP_LIMIT, DAY, IOC,
+)
+
+"""
+Pending-order book: every order that can still trade, indexed so a bar only looks at the orders it
+can trigger.
+
+Resting limit and stop orders sit in four price-level indexes (buy/sell x limit/stop), each a sorted
+key list per symbol plus a dense array of the best key of every symbol. Keys are signed so that the
+orders a bar reaches are always a prefix: a buy limit is reached when low <= limit, a sell limit when
+high >= limit, a buy stop when high >= stop and a sell stop when low <= stop (high/low fall back to the
+close when the market has no such field). One vectorized comparison of the best keys against the bar
+finds the symbols with anything to do, and a bisection per such symbol finds the orders.
+
+A triggered STOP becomes a MARKET order and a triggered STOP_LIMIT a LIMIT order; both stay in the book
+until they fill or expire. Orders submitted at a bar can first trade on the next one. Time in force:
+IOC orders get only that first bar, DAY orders the rest of its calendar date, GTC orders never expire.
+An execution model may fill part of an order; the rest stays live (PARTIALLY_FILLED) on the same terms.
+
+IOC MARKET orders (the engine's rebalance orders) live for exactly one bar, so they skip the indexes and
+the expiry heap: they are kept as an id array per bar, handed to the execution model whole and cancelled
+as an array at the end of their bar. Only orders that can rest pay for per-order bookkeeping.
+"""
+
+STATUSES = list(OrderStatus)
+CREATED, FILLED, CANCELED, EXPIRED, PARTIALLY_FILLED = (
+    STATUSES.index(s) for s in (OrderStatus.CREATED, OrderStatus.FILLED, OrderStatus.CANCELED, OrderStatus.EXPIRED,
+                                OrderStatus.PARTIALLY_FILLED))
+_LIVE = (CREATED, PARTIALLY_FILLED)
+_BUY_LIMIT, _SELL_LIMIT, _BUY_STOP, _SELL_STOP = range(4)
+_NEVER = np.iinfo(np.int64).max
+_EPS = 1e-12
+
+
+class _PriceLevels:
+    """Resting orders of one kind: sorted (key, id) lists per symbol and the smallest key of every symbol"""
+    def __init__(self, m: int) -> None:
+        self.keys: dict[int, list[float]] = {}
+        self.ids: dict[int, list[int]] = {}
+        self.best = np.full(m, np.inf)
+
+    def add(self, sid: int, key: float, oid: int) -> None:
+        keys = self.keys.setdefault(sid, [])
+        ids = self.ids.setdefault(sid, [])
+        k = bisect_right(keys, key)  # after equal keys: first come, first served within a level
+        keys.insert(k, key)
+        ids.insert(k, oid)
+        self.best[sid] = keys[0]
+
+    def remove(self, sid: int, key: float, oid: int) -> None:
+        keys, ids = self.keys[sid], self.ids[sid]
+        k = bisect_left(keys, key)
+        while ids[k] != oid:
+            k += 1
+        del keys[k]
+        del ids[k]
+        if keys:
+            self.best[sid] = keys[0]
+        else:
+            del self.keys[sid], self.ids[sid]
+            self.best[sid] = np.inf
+
+    def reached(self, threshold: np.ndarray) -> list[int]:
+        """Ids of the orders with key <= threshold[sid] (NaN thresholds reach nothing)"""
+        out: list[int] = []
+        for sid in np.flatnonzero(self.best <= threshold):
+            sid = int(sid)
+            out.extend(self.ids[sid][:bisect_right(self.keys[sid], threshold[sid])])
+        return out
+
+    def __len__(self) -> int:
+        return sum(len(ids) for ids in self.ids.values())
+
+
+class OrderBook:
+    """
+    Live orders of one portfolio. Order ids are row numbers, valid until the next begin_bar (which may
+    compact away finished orders).
+
+    Per bar: begin_bar(ts) expires orders, candidates(bar) returns the orders the bar can trade (as an
+    OrderBatch for the execution model), settle(ids, fills) books the result and end_bar() cancels the IOC
+    orders that had their bar; submit(batch) adds new ones.
+
+    :param symbols: Symbol of each column id
+    :param capacity: Initial number of order rows
+    """
+    _COLUMNS = {"sid": np.intp, "qty": np.float64, "filled": np.float64, "order_type": np.int8,
+                "limit_price": np.float64, "stop_price": np.float64, "tif": np.int8, "status": np.int8,
+                "ts": np.int64, "expire": np.int64, "ref": np.int64, "tag": object, "quick": np.bool_}
+
+    def __init__(self, symbols: list[str], capacity: int = 1024) -> None:
+        self.symbols = list(symbols)
+        m = len(self.symbols)
+        self._cols = {name: np.zeros(max(int(capacity), 1), dtype=dt) for name, dt in self._COLUMNS.items()}
+        self.n = 0  # order rows, finished ones included
+        self._live = 0
+        self._tz = None
+        self._market: dict[int, None] = {}  # insertion-ordered set of live MARKET order ids
+        self._levels = [_PriceLevels(m) for _ in range(4)]
+        self._expiry: list[tuple[int, int]] = []  # heap of (expire ns, id)
+        self._new: list[int] = []  # submitted since the last begin_bar
+        self._quick_new: list[np.ndarray] = []  # IOC MARKET ids submitted since the last begin_bar
+        self._quick = np.empty(0, dtype=np.intp)  # IOC MARKET ids trading on the current bar
+        self._now = np.iinfo(np.int64).min  # ns of the current bar
+        self._tagged = False  # any order submitted with a tag
+
+    def __len__(self) -> int:
+        """Number of live orders"""
+        return self._live
+
+    # ----------------------------
+    # Indexing
+    # ----------------------------
+
+    def _level(self, oid: int) -> tuple[int, float] | None:
+        """(index, key) of a resting order, None for MARKET orders"""
+        c = self._cols
+        t, buy = c["order_type"][oid], c["qty"][oid] > 0.0
+        if t == LIMIT:
+            limit = float(c["limit_price"][oid])
+            return (_BUY_LIMIT, -limit) if buy else (_SELL_LIMIT, limit)
+        if t == STOP or t == STOP_LIMIT:
+            stop = float(c["stop_price"][oid])
+            return (_BUY_STOP, stop) if buy else (_SELL_STOP, -stop)
+        return None
+
+    def _index(self, oid: int) -> None:
+        level = self._level(oid)
+        if level is None:
+            self._market[oid] = None
+        else:
+            self._levels[level[0]].add(int(self._cols["sid"][oid]), level[1], oid)
+
+    def _unindex(self, oid: int) -> None:
+        level = self._level(oid)
+        if level is None:
+            del self._market[oid]
+        else:
+            self._levels[level[0]].remove(int(self._cols["sid"][oid]), level[1], oid)
+
+    def _finish(self, oid: int, status: int) -> None:
+        if not self._cols["quick"][oid]:
+            self._unindex(oid)
+        self._cols["status"][oid] = status
+        self._live -= 1
+
+    def _finish_quick(self, ids: np.ndarray, status: int) -> np.ndarray:
+        """_finish for IOC MARKET ids, as one array update; returns the ids that were still live"""
+        c = self._cols
+        ids = ids[(c["status"][ids] == CREATED) | (c["status"][ids] == PARTIALLY_FILLED)]
+        c["status"][ids] = status
+        self._live -= len(ids)
+        return ids
+
+    # ----------------------------
+    # Orders in
+    # ----------------------------
+
+    def _ts_ns(self, ts) -> np.ndarray:
+        if not np.ndim(ts):
+            # one timestamp per batch/bar: skip the DatetimeIndex round trip
+            ts = pd.Timestamp(ts)
+            if self._tz is None and self.n == 0:
+                self._tz = ts.tz
+            return np.array([ts.as_unit("ns").value], dtype=np.int64)
+        ts = pd.DatetimeIndex(np.atleast_1d(ts))
+        if self._tz is None and self.n == 0:
+            self._tz = ts.tz
+        if ts.tz is not None:
+            ts = ts.tz_convert("UTC").tz_localize(None)
+        return ts.as_unit("ns").asi8
+
+    def submit(self, batch: OrderBatch, refs: np.ndarray | None = None) -> np.ndarray:
+        """
+        Adds the orders of a batch (first tradable on the next bar) and returns their ids. refs are kept
+        with the orders for the caller (e.g. report row numbers; -1 if not given), see order_state.
+        """
+        k = len(batch)
+        if k == 0:
+            return np.empty(0, dtype=np.intp)
+        types, tifs = batch.types(), batch.tifs()
+        limit, stop = batch.prices("limit_price"), batch.prices("stop_price")
+        for name, prices, needed in (("limit_price", limit, (types == LIMIT) | (types == STOP_LIMIT)),
+                                     ("stop_price", stop, (types == STOP) | (types == STOP_LIMIT))):
+            bad = needed & ~(np.isfinite(prices) & (prices > 0.0))
+            if bad.any():
+                raise ValueError(f"{name} must be a finite number > 0 for {ORDER_TYPES[types[bad][0]].value} orders")
+        if not (np.isfinite(batch.qty).all() and (batch.qty != 0.0).all()):
+            raise ValueError("Order quantities must be finite and non-zero")
+
+        start = self.n
+        if start + k > len(self._cols["sid"]):
+            size = max(start + k, 2 * len(self._cols["sid"]))
+            for name, col in self._cols.items():
+                new = np.zeros(size, dtype=col.dtype) if col.dtype.kind != "O" else np.full(size, None, dtype=object)
+                new[:start] = col[:start]
+                self._cols[name] = new
+        rows = slice(start, start + k)
+        c = self._cols
+        c["sid"][rows] = batch.sids
+        c["qty"][rows] = batch.qty
+        c["filled"][rows] = 0.0
+        c["order_type"][rows] = types
+        c["limit_price"][rows] = limit
+        c["stop_price"][rows] = stop
+        c["tif"][rows] = tifs
+        c["status"][rows] = CREATED
+        c["ts"][rows] = self._ts_ns(batch.ts)
+        c["expire"][rows] = _NEVER
+        c["ref"][rows] = -1 if refs is None else refs
+        c["tag"][rows] = None if batch.tags is None else batch.tags
+        self._tagged = self._tagged or batch.tags is not None
+        quick = (types == MARKET) & (tifs == IOC)
+        c["quick"][rows] = quick
+        self.n += k
+        self._live += k
+        ids = np.arange(start, start + k)
+        if quick.all():
+            self._quick_new.append(ids)
+            return ids
+        self._quick_new.append(ids[quick])
+        rest = ids[~quick].tolist()
+        for oid in rest:
+            self._index(oid)
+        self._new.extend(rest)
+        return ids
+
+    def cancel(self, ids) -> int:
+        """Cancels the live orders among ids; returns how many were cancelled"""
+        done = 0
+        for oid in np.atleast_1d(ids).tolist():
+            if 0 <= oid < self.n and self._cols["status"][oid] in _LIVE:
+                self._finish(oid, CANCELED)
+                done += 1
+        return done
+
+    # ----------------------------
+    # Per bar
+    # ----------------------------
+
+    def begin_bar(self, ts: pd.Timestamp) -> np.ndarray:
+        """
+        Starts the clock of newly submitted orders and expires the ones whose time is up; returns their ids.
+        Finished orders may be compacted away first, so ids from before this call are stale.
+        """
+        if self.n - self._live >= max(4096, self._live):
+            self.compact()
+        ts = pd.Timestamp(ts)
+        now = self._now = int(self._ts_ns(ts)[0])
+        c = self._cols
+        # IOC MARKET orders left from a bar that was not closed with end_bar
+        stale = self._finish_quick(self._quick, CANCELED)
+        self._quick = np.concatenate(self._quick_new) if self._quick_new else np.empty(0, dtype=np.intp)
+        self._quick_new = []
+        if self._new:
+            session_end = int(self._ts_ns(ts.normalize() + pd.Timedelta(days=1))[0])
+            for oid in self._new:
+                tif = c["tif"][oid]
+                # expire = the last ns the order may trade at
+                if tif == IOC:
+                    c["expire"][oid] = now
+                elif tif == DAY:
+                    c["expire"][oid] = session_end - 1
+                else:
+                    continue
+                if c["status"][oid] in _LIVE:
+                    heapq.heappush(self._expiry, (int(c["expire"][oid]), oid))
+            self._new = []
+        expired = self._expire(now - 1)
+        return np.concatenate([stale, expired]) if len(stale) else expired
+
+    def end_bar(self) -> np.ndarray:
+        """Expires the orders that may not trade after the current bar (IOC ones); returns their ids"""
+        quick = self._finish_quick(self._quick, CANCELED)
+        self._quick = np.empty(0, dtype=np.intp)
+        expired = self._expire(self._now)
+        return np.concatenate([quick, expired]) if len(quick) else expired
+
+    def _expire(self, until: int) -> np.ndarray:
+        c = self._cols
+        expired = []
+        while self._expiry and self._expiry[0][0] <= until:
+            _, oid = heapq.heappop(self._expiry)
+            if c["status"][oid] in _LIVE:
+                self._finish(oid, CANCELED if c["tif"][oid] == IOC else EXPIRED)
+                expired.append(oid)
+        return np.array(expired, dtype=np.intp)
+
+    def candidates(self, bar: BarPrices) -> tuple[np.ndarray, OrderBatch]:
+        """
+        (ids, batch) of the orders bar can trade, in submission order: live MARKET orders (triggered stops
+        included) and the LIMIT orders whose price the bar's range reached. Stops reached by the range are
+        converted first.
+        """
+        valid = bar.valid
+        high = np.where(valid, bar.field("high", bar.row), np.nan)
+        neg_low = np.where(valid, -bar.field("low", bar.row), np.nan)
+        c = self._cols
+        for level, threshold in ((_BUY_STOP, high), (_SELL_STOP, neg_low)):
+            for oid in self._levels[level].reached(threshold):
+                self._unindex(oid)
+                c["order_type"][oid] = MARKET if c["order_type"][oid] == STOP else LIMIT
+                self._index(oid)
+        ids = list(self._market)
+        ids += self._levels[_BUY_LIMIT].reached(neg_low)
+        ids += self._levels[_SELL_LIMIT].reached(high)
+        quick = self._quick[np.isin(c["status"][self._quick], _LIVE)]
+        ids = np.sort(np.concatenate([quick, np.array(ids, dtype=np.intp)])) if ids else quick
+        tags = c["tag"][ids] if self._tagged else None
+        batch = OrderBatch(
+            ts=self._datetimes(c["ts"][ids]),
+            sids=c["sid"][ids],
+            qty=c["qty"][ids] - c["filled"][ids],
+            tags=tags if tags is not None and any(t is not None for t in tags) else None,
+            order_type=c["order_type"][ids],
+            limit_price=c["limit_price"][ids],
+            stop_price=c["stop_price"][ids],
+            tif=c["tif"][ids],
+        )
+        return ids, batch
+
+    def settle(self, ids: np.ndarray, fills: FillBatch) -> np.ndarray:
+        """
+        Books the fills of candidates(...) orders; returns the mask of ids that are now completely filled.
+        Partly filled orders stay live for their remainder.
+        """
+        c = self._cols
+        remaining = c["qty"][ids] - c["filled"][ids]
+        q = fills.qty
+        over = (q != 0.0) & ((np.sign(q) != np.sign(remaining)) | (np.abs(q) > np.abs(remaining) + _EPS))
+        if over.any():
+            oid = int(ids[np.flatnonzero(over)[0]])
+            raise ValueError(f"Fill of {q[over][0]} does not fit order {oid} with {remaining[over][0]} left")
+        c["filled"][ids] += q
+        done = np.abs(remaining - q) <= _EPS
+        c["status"][ids[(q != 0.0) & ~done]] = PARTIALLY_FILLED
+        finished = ids[done]
+        quick = c["quick"][finished]
+        self._finish_quick(finished[quick], FILLED)
+        for oid in finished[~quick].tolist():
+            self._finish(oid, FILLED)
+        return done
+
+    # ----------------------------
+    # Inspection
+    # ----------------------------
+
+    def _datetimes(self, ns: np.ndarray) -> np.ndarray:
+        out = ns.astype("M8[ns]")
+        if self._tz is not None:
+            return pd.DatetimeIndex(out).tz_localize("UTC").tz_convert(self._tz).to_numpy()
+        return out
+
+    def open_ids(self) -> np.ndarray:
+        return np.flatnonzero(np.isin(self._cols["status"][:self.n], _LIVE))
+
+    def status(self, oid: int) -> OrderStatus:
+        return STATUSES[self._cols["status"][oid]]
+
+    def order_state(self, ids: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(refs, filled quantity, status codes into STATUSES) of the orders ids"""
+        c = self._cols
+        return c["ref"][ids], c["filled"][ids], c["status"][ids]
+
+    def open_qty(self) -> np.ndarray:
+        """Unfilled quantity of the live orders, summed per symbol id"""
+        live = self.open_ids()
+        c = self._cols
+        return np.bincount(c["sid"][live], weights=c["qty"][live] - c["filled"][live], minlength=len(self.symbols))
+
+    def resting(self) -> int:
+        """Number of orders waiting in the limit/stop indexes"""
+        return sum(len(level) for level in self._levels)
+
+    def to_frame(self, live_only: bool = False) -> pd.DataFrame:
+        """One row per order in the book (finished ones until compacted), by id"""
+        c = self._cols
+        rows = self.open_ids() if live_only else np.arange(self.n)
+        ts = pd.DatetimeIndex(c["ts"][rows].astype("M8[ns]"))
+        if self._tz is not None:
+            ts = ts.tz_localize("UTC").tz_convert(self._tz)
+        types, tifs, statuses = (np.asarray(values, dtype=object) for values in (ORDER_TYPES, TIME_IN_FORCE, STATUSES))
+        return pd.DataFrame({
+            "ts_submit": ts,
+            "symbol": np.asarray(self.symbols, dtype=object)[c["sid"][rows]],
+            "qty": c["qty"][rows],
+            "filled": c["filled"][rows],
+            "order_type": types[c["order_type"][rows]],
+            "limit_price": c["limit_price"][rows],
+            "stop_price": c["stop_price"][rows],
+            "tif": tifs[c["tif"][rows]],
+            "status": statuses[c["status"][rows]],
+            "tag": c["tag"][rows],
+        }, index=pd.Index(rows, name="id"))
+
+    def compact(self) -> None:
+        """Drops finished orders and renumbers the live ones (ids change)"""
+        c = self._cols
+        live = self.open_ids()
+        remap = np.full(self.n, -1, dtype=np.intp)
+        remap[live] = np.arange(len(live))
+        for name, col in c.items():
+            col[:len(live)] = col[live]
+            if col.dtype.kind == "O":
+                col[len(live):self.n] = None
+        self.n = len(live)
+        self._market = {int(remap[oid]): None for oid in self._market}
+        for level in self._levels:
+            level.ids = {sid: [int(remap[oid]) for oid in ids] for sid, ids in level.ids.items()}
+        self._expiry = [(ns, int(remap[oid])) for ns, oid in self._expiry if remap[oid] >= 0]
+        heapq.heapify(self._expiry)
+        self._new = [int(remap[oid]) for oid in self._new if remap[oid] >= 0]
+        self._quick_new = [remap[ids][remap[ids] >= 0] for ids in self._quick_new]
+        self._quick = remap[self._quick][remap[self._quick] >= 0]
@@ -0,0 +1,60 @@
+# src/btlib/execution/volume_participation.py
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+from btlib.execution.base import BatchExecutionModel, OrderBatch, FillBatch
+from btlib.data.bar import BarPrices
+
+"""
+Volume-capped execution: orders trade at the close like NextCloseExecution, but a bar only absorbs
+max_participation of its volume per symbol. What does not fit stays in the OrderBook and is offered
+again on later bars until it fills or its time in force runs out.
+"""
+
+
+class VolumeParticipationExecution(BatchExecutionModel):
+    """
+    Fills at the close, capped at max_participation x the bar's volume per symbol. The orders of a symbol
+    share that cap first come, first served (the batch order, which is submission order for an
+    OrderBook), buys and sells alike. Symbols without a finite volume > 0 do not trade.
+
+    :param max_participation: Fraction of a bar's volume one portfolio may trade, in (0, 1]
+    :param volume_field: MarketData field holding the volume
+    :param whole_shares: Round the cap of each symbol down to whole shares
+    """
+    def __init__(self, max_participation: float = 0.1, volume_field: str = "volume", whole_shares: bool = False) -> None:
+        if not (np.isfinite(max_participation) and 0.0 < max_participation <= 1.0):
+            raise ValueError(f"max_participation must be in (0, 1], got {max_participation}")
+        self.max_participation = float(max_participation)
+        self.volume_field = volume_field
+        self.whole_shares = whole_shares
+
+    def capacity(self, bar: BarPrices) -> np.ndarray:
+        """Shares each symbol can trade on this bar"""
+        volume = bar.field(self.volume_field)
+        if volume is None:
+            raise ValueError(f"{type(self).__name__} needs a '{self.volume_field}' field in the market data")
+        volume = np.asarray(volume, dtype=float)
+        cap = np.where(np.isfinite(volume) & (volume > 0.0), volume * self.max_participation, 0.0)
+        return np.floor(cap) if self.whole_shares else cap
+
+    def simulate_fills_batch(self, ts_fill: pd.Timestamp, orders: OrderBatch, bar: BarPrices) -> FillBatch:
+        n = len(orders)
+        if n == 0:
+            return FillBatch.none(0)
+        sids = orders.sids
+        px = bar.row[sids]
+        want = np.where(bar.valid[sids] & orders.marketable(px), np.abs(orders.qty), 0.0)
+
+        # group the orders by symbol (stable, so each group keeps the batch order) and hand out the cap
+        by_sid = np.argsort(sids, kind="stable")
+        s, w = sids[by_sid], want[by_sid]
+        end = np.cumsum(w)
+        first = np.flatnonzero(np.r_[True, s[1:] != s[:-1]])
+        start_of_group = np.repeat((end - w)[first], np.diff(np.r_[first, n]))
+        before = end - w - start_of_group  # wanted by earlier orders of the same symbol
+        got = np.clip(self.capacity(bar)[s] - before, 0.0, w)
+
+        qty = np.zeros(n)
+        qty[by_sid] = np.sign(orders.qty[by_sid]) * got
+        return FillBatch(qty, np.where(qty != 0.0, px, np.nan))
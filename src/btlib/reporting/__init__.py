@@ -1,4 +1,6 @@
 from .reporting import build_fills, build_ledger, build_orders, build_targets, trades_from_fills
+from .recorders import LedgerRecorder, TargetsRecorder, SparseTargetsRecorder, OrdersRecorder, FillsRecorder, ResultRecorders
 
 
-__all__ = ["build_fills", "build_ledger", "build_orders", "build_targets", "trades_from_fills"]
\ No newline at end of file
+__all__ = ["build_fills", "build_ledger", "build_orders", "build_targets", "trades_from_fills",
+           "LedgerRecorder", "TargetsRecorder", "SparseTargetsRecorder", "OrdersRecorder", "FillsRecorder", "ResultRecorders"]
\ No newline at end of file
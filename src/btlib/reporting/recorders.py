@@ -0,0 +1,430 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Any
+import numpy as np
+import pandas as pd
+from btlib.core.enums import OrderStatus, OrderType, TimeInForce
+from btlib.reporting.reporting import build_fills, build_orders, build_targets
+
+"""
+Columnar result recorders: engine output is written straight into typed NumPy columns
+(preallocated when the number of rows is known, chunk-grown otherwise) and turned into the
+ledger/targets/orders/fills DataFrames at the end, without per-row dicts.
+"""
+
+_ORDER_TYPES = list(OrderType)
+_ORDER_TYPE_CODE = {t: k for k, t in enumerate(_ORDER_TYPES)}
+_TIFS = list(TimeInForce)
+_TIF_CODE = {t: k for k, t in enumerate(_TIFS)}
+_STATUSES = list(OrderStatus)
+_STATUS_CODE = {t: k for k, t in enumerate(_STATUSES)}
+
+
+def _codes(value, codes: dict) -> np.ndarray | int:
+    """An enum member as its code; arrays are taken to be codes already"""
+    return codes[value] if not isinstance(value, np.ndarray) else value
+
+
+class _ColumnStore:
+    """Typed columns that share a row count and grow in chunks"""
+    def __init__(self, columns: dict[str, Any], capacity: int = 1024, width: dict[str, int] | None = None) -> None:
+        self._dtypes = {name: np.dtype(dt) for name, dt in columns.items()}
+        self._width = width or {}
+        self._cols: dict[str, np.ndarray] = {}
+        self.n = 0
+        self._ts_unit: str | None = None
+        self.tz = None
+        self._allocate(max(int(capacity), 1))
+
+    def _allocate(self, capacity: int) -> None:
+        for name, dt in self._dtypes.items():
+            shape = (capacity, self._width[name]) if name in self._width else (capacity,)
+            new = np.zeros(shape, dtype=dt) if dt.kind != "O" else np.full(shape, None, dtype=object)
+            old = self._cols.get(name)
+            if old is not None:
+                new[:self.n] = old[:self.n]
+            self._cols[name] = new
+
+    @property
+    def capacity(self) -> int:
+        return len(next(iter(self._cols.values())))
+
+    def reserve(self, k: int) -> int:
+        """Makes room for k more rows and returns the first free row"""
+        need = self.n + int(k)
+        if need > self.capacity:
+            self._allocate(max(need, 2 * self.capacity))
+        return self.n
+
+    def ts_value(self, ts: pd.Timestamp) -> np.datetime64:
+        """Timestamps are stored as datetime64 in the unit (and tz) of the first one recorded"""
+        ts = pd.Timestamp(ts)
+        if self._ts_unit is None:
+            self._ts_unit = ts.unit
+            self.tz = ts.tz
+            self._dtypes["ts"] = np.dtype(f"M8[{ts.unit}]")
+            self._cols["ts"] = np.zeros(self.capacity, dtype=self._dtypes["ts"])
+        return ts.tz_convert("UTC").to_datetime64() if ts.tz is not None else ts.to_datetime64()
+
+    def column(self, name: str) -> np.ndarray:
+        return self._cols[name][:self.n]
+
+    def ts_index(self, name: str) -> pd.DatetimeIndex:
+        values = self.column("ts")
+        if self.tz is not None:
+            return pd.DatetimeIndex(values, name=name).tz_localize("UTC").tz_convert(self.tz)
+        return pd.DatetimeIndex(values, name=name)
+
+    def clear(self) -> None:
+        """Forgets the recorded rows but keeps the allocation (and ts unit/tz)"""
+        for col in self._cols.values():
+            if col.dtype.kind == "O":
+                col[:self.n] = None
+        self.n = 0
+
+    @property
+    def nbytes(self) -> int:
+        return int(sum(c.nbytes for c in self._cols.values()))
+
+
+class _Recorder:
+    """Shared plumbing of the recorders: one _ColumnStore in _store, and a to_frame() of its rows"""
+    _store: _ColumnStore
+
+    def __len__(self) -> int:
+        return self._store.n
+
+    def to_frame(self) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        self._store.clear()
+
+    def drain(self) -> pd.DataFrame:
+        """Frame of the rows recorded so far; the recorder is emptied and keeps appending"""
+        frame = self.to_frame().copy()
+        self.clear()
+        return frame
+
+    @property
+    def nbytes(self) -> int:
+        return self._store.nbytes
+
+
+class LedgerRecorder(_Recorder):
+    """One row per bar: cash, equity, gross/net exposure, leverage, n_positions"""
+    FLOAT_COLS = ["cash", "equity", "gross_exposure", "net_exposure", "leverage"]
+
+    def __init__(self, capacity: int) -> None:
+        self._store = _ColumnStore(
+            {"ts": "M8[ns]", **{c: np.float64 for c in self.FLOAT_COLS}, "n_positions": np.int64},
+            capacity,
+        )
+
+    def record(self, ts, cash: float, equity: float, gross_exposure: float, net_exposure: float,
+               leverage: float, n_positions: int) -> None:
+        st = self._store
+        k = st.reserve(1)
+        st._cols["ts"][k] = st.ts_value(ts)
+        st._cols["cash"][k] = cash
+        st._cols["equity"][k] = equity
+        st._cols["gross_exposure"][k] = gross_exposure
+        st._cols["net_exposure"][k] = net_exposure
+        st._cols["leverage"][k] = leverage
+        st._cols["n_positions"][k] = n_positions
+        st.n += 1
+
+    def to_frame(self) -> pd.DataFrame:
+        st = self._store
+        data = {c: st.column(c) for c in self.FLOAT_COLS + ["n_positions"]}
+        return pd.DataFrame(data, index=st.ts_index("ts"))
+
+
+class TargetsRecorder(_Recorder):
+    """Dense (bars x symbols) float array of clipped target weights"""
+    def __init__(self, capacity: int, symbols: list[str]) -> None:
+        self.symbols = list(symbols)
+        self._store = _ColumnStore({"ts": "M8[ns]", "w": np.float64}, capacity, width={"w": len(self.symbols)})
+
+    def next_row(self, ts) -> np.ndarray:
+        """Appends a zero row for ts and returns it for the caller to fill in place"""
+        st = self._store
+        k = st.reserve(1)
+        st._cols["ts"][k] = st.ts_value(ts)
+        row = st._cols["w"][k]
+        row[:] = 0.0
+        st.n += 1
+        return row
+
+    def record(self, ts, weights: np.ndarray) -> None:
+        self.next_row(ts)[:] = weights
+
+    def to_frame(self) -> pd.DataFrame:
+        st = self._store
+        if st.n == 0:
+            return build_targets([], self.symbols)
+        return pd.DataFrame(st.column("w"), index=st.ts_index("ts"), columns=self.symbols)
+
+
+class SparseTargetsRecorder(_Recorder):
+    """
+    Clipped target weights kept as (bar, symbol id, weight) entries for the non-zero weights only, for
+    universes where few of the symbols are live at a time. to_frame() has the same shape as
+    TargetsRecorder's, with pandas sparse columns (fill value 0).
+    """
+    def __init__(self, capacity: int, symbols: list[str]) -> None:
+        self.symbols = list(symbols)
+        self._bars = _ColumnStore({"ts": "M8[ns]"}, capacity)
+        self._store = _ColumnStore({"bar": np.int64, "sid": np.int32, "w": np.float64}, capacity)
+
+    def __len__(self) -> int:
+        return self._bars.n
+
+    def record_sparse(self, ts, ids: np.ndarray, weights: np.ndarray) -> None:
+        """Records a bar whose weights are `weights` on columns `ids` and zero elsewhere"""
+        bars = self._bars
+        b = bars.reserve(1)
+        bars._cols["ts"][b] = bars.ts_value(ts)
+        bars.n += 1
+        nz = np.flatnonzero(weights)
+        if nz.size == 0:
+            return
+        st = self._store
+        k = st.reserve(nz.size)
+        st._cols["bar"][k:k + nz.size] = b
+        st._cols["sid"][k:k + nz.size] = np.asarray(ids)[nz]
+        st._cols["w"][k:k + nz.size] = np.asarray(weights)[nz]
+        st.n += nz.size
+
+    def record(self, ts, weights: np.ndarray) -> None:
+        self.record_sparse(ts, np.arange(len(self.symbols)), weights)
+
+    def to_frame(self) -> pd.DataFrame:
+        n = self._bars.n
+        if n == 0:
+            return build_targets([], self.symbols)
+        st = self._store
+        sid = st.column("sid")
+        by_sid = np.argsort(sid, kind="stable")
+        bounds = np.searchsorted(sid[by_sid], np.arange(len(self.symbols) + 1))
+        bar, w = st.column("bar")[by_sid], st.column("w")[by_sid]
+        columns = {}
+        # one dense column at a time, reused: peak memory is O(bars), not O(bars x symbols)
+        dense = np.zeros(n)
+        for j, sym in enumerate(self.symbols):
+            rows = slice(bounds[j], bounds[j + 1])
+            dense[bar[rows]] = w[rows]
+            columns[sym] = pd.arrays.SparseArray(dense, fill_value=0.0)
+            dense[bar[rows]] = 0.0
+        return pd.DataFrame(columns, index=self._bars.ts_index("ts"), columns=self.symbols)
+
+    def clear(self) -> None:
+        self._bars.clear()
+        self._store.clear()
+
+    @property
+    def nbytes(self) -> int:
+        return self._bars.nbytes + self._store.nbytes
+
+
+class OrdersRecorder(_Recorder):
+    """
+    Submitted orders; symbols are stored as integer ids and order types / time in force / status as small
+    codes. Rows are numbered from the first order recorded (drained ones included); update() sets the
+    filled quantity and status of rows that have not been drained yet.
+    """
+    def __init__(self, symbols: list[str], capacity: int = 1024) -> None:
+        self.symbols = np.asarray(symbols, dtype=object)
+        self._sid = {s: j for j, s in enumerate(symbols)}
+        self._store = _ColumnStore(
+            {"ts": "M8[ns]", "sid": np.int32, "qty": np.float64, "order_type": np.int8, "tag": object,
+             "limit_price": np.float64, "stop_price": np.float64, "tif": np.int8,
+             "filled_qty": np.float64, "status": np.int8},
+            capacity,
+        )
+        self._drained = 0  # rows handed out by drain()
+
+    def record(self, ts, symbol: str, qty: float, order_type: OrderType = OrderType.MARKET, tag: str | None = None,
+               limit_price: float | None = None, stop_price: float | None = None,
+               tif: TimeInForce = TimeInForce.DAY) -> None:
+        st = self._store
+        k = st.reserve(1)
+        st._cols["ts"][k] = st.ts_value(ts)
+        st._cols["sid"][k] = self._sid[symbol]
+        st._cols["qty"][k] = qty
+        st._cols["order_type"][k] = _ORDER_TYPE_CODE[order_type]
+        st._cols["tag"][k] = tag
+        st._cols["limit_price"][k] = np.nan if limit_price is None else limit_price
+        st._cols["stop_price"][k] = np.nan if stop_price is None else stop_price
+        st._cols["tif"][k] = _TIF_CODE[tif]
+        st._cols["filled_qty"][k] = 0.0
+        st._cols["status"][k] = _STATUS_CODE[OrderStatus.CREATED]
+        st.n += 1
+
+    def record_many(self, ts, sids: np.ndarray, qty: np.ndarray, order_type: OrderType | np.ndarray = OrderType.MARKET,
+                    tag: np.ndarray | None = None, limit_price: np.ndarray | None = None,
+                    stop_price: np.ndarray | None = None, tif: TimeInForce | np.ndarray = TimeInForce.DAY) -> np.ndarray:
+        """
+        Orders submitted at the same ts, given as symbol ids and quantities; order_type and tif are one
+        enum member for all of them or arrays of codes (positions in the enum), as in OrderBatch.
+        Returns the row numbers of the orders.
+        """
+        st = self._store
+        size = len(sids)
+        k = st.reserve(size)
+        st._cols["ts"][k:k + size] = st.ts_value(ts)
+        st._cols["sid"][k:k + size] = sids
+        st._cols["qty"][k:k + size] = qty
+        st._cols["order_type"][k:k + size] = _codes(order_type, _ORDER_TYPE_CODE)
+        if tag is not None:
+            st._cols["tag"][k:k + size] = tag
+        st._cols["limit_price"][k:k + size] = np.nan if limit_price is None else limit_price
+        st._cols["stop_price"][k:k + size] = np.nan if stop_price is None else stop_price
+        st._cols["tif"][k:k + size] = _codes(tif, _TIF_CODE)
+        st._cols["filled_qty"][k:k + size] = 0.0
+        st._cols["status"][k:k + size] = _STATUS_CODE[OrderStatus.CREATED]
+        st.n += size
+        return np.arange(self._drained + k, self._drained + k + size)
+
+    def update(self, rows: np.ndarray, filled_qty: np.ndarray | None, status: OrderStatus | np.ndarray) -> None:
+        """
+        Sets the filled quantity (None -> unchanged) and status (enum member or codes) of recorded orders.
+        Rows already drained are skipped.
+        """
+        rows = np.asarray(rows, dtype=np.int64) - self._drained
+        keep = rows >= 0
+        st = self._store
+        if filled_qty is not None:
+            st._cols["filled_qty"][rows[keep]] = np.broadcast_to(filled_qty, rows.shape)[keep]
+        st._cols["status"][rows[keep]] = np.broadcast_to(_codes(status, _STATUS_CODE), rows.shape)[keep]
+
+    def to_frame(self) -> pd.DataFrame:
+        st = self._store
+        if st.n == 0:
+            return build_orders([])
+        order_types = np.asarray(_ORDER_TYPES, dtype=object)
+        return pd.DataFrame(
+            {
+                "symbol": self.symbols[st.column("sid")],
+                "qty": st.column("qty"),
+                "order_type": order_types[st.column("order_type")],
+                "tag": st.column("tag"),
+                "limit_price": st.column("limit_price"),
+                "stop_price": st.column("stop_price"),
+                "tif": np.asarray(_TIFS, dtype=object)[st.column("tif")],
+                "filled_qty": st.column("filled_qty"),
+                "status": np.asarray(_STATUSES, dtype=object)[st.column("status")],
+            },
+            index=st.ts_index("ts_submit"),
+        )
+
+    def clear(self) -> None:
+        # row numbers keep counting; the drained orders keep the filled quantity and status they had
+        self._drained += self._store.n
+        self._store.clear()
+
+
+class FillsRecorder(_Recorder):
+    """Executed fills; notional is derived when the frame is built, status is the order's after the fill"""
+    def __init__(self, symbols: list[str], capacity: int = 1024) -> None:
+        self.symbols = np.asarray(symbols, dtype=object)
+        self._sid = {s: j for j, s in enumerate(symbols)}
+        self._store = _ColumnStore(
+            {"ts": "M8[ns]", "sid": np.int32, "qty": np.float64, "price": np.float64,
+             "fees": np.float64, "slippage": np.float64, "tag": object, "status": np.int8},
+            capacity,
+        )
+
+    def record(self, ts, symbol: str, qty: float, price: float, fees: float = 0.0,
+               slippage: float = 0.0, tag: str | None = None, status: OrderStatus = OrderStatus.FILLED) -> None:
+        st = self._store
+        k = st.reserve(1)
+        st._cols["ts"][k] = st.ts_value(ts)
+        st._cols["sid"][k] = self._sid[symbol]
+        st._cols["qty"][k] = qty
+        st._cols["price"][k] = price
+        st._cols["fees"][k] = fees
+        st._cols["slippage"][k] = slippage
+        st._cols["tag"][k] = tag
+        st._cols["status"][k] = _STATUS_CODE[status]
+        st.n += 1
+
+    def record_many(self, ts, sids: np.ndarray, qty: np.ndarray, price: np.ndarray,
+                    fees: np.ndarray | float = 0.0, slippage: np.ndarray | float = 0.0,
+                    tag: np.ndarray | None = None, status: OrderStatus | np.ndarray = OrderStatus.FILLED) -> None:
+        """Fills executed at the same ts, given as symbol ids and arrays; status is one member or codes"""
+        st = self._store
+        size = len(sids)
+        k = st.reserve(size)
+        st._cols["ts"][k:k + size] = st.ts_value(ts)
+        st._cols["sid"][k:k + size] = sids
+        st._cols["qty"][k:k + size] = qty
+        st._cols["price"][k:k + size] = price
+        st._cols["fees"][k:k + size] = fees
+        st._cols["slippage"][k:k + size] = slippage
+        if tag is not None:
+            st._cols["tag"][k:k + size] = tag
+        st._cols["status"][k:k + size] = _codes(status, _STATUS_CODE)
+        st.n += size
+
+    def to_frame(self) -> pd.DataFrame:
+        st = self._store
+        if st.n == 0:
+            return build_fills([])
+        qty = st.column("qty")
+        price = st.column("price")
+        return pd.DataFrame(
+            {
+                "symbol": self.symbols[st.column("sid")],
+                "notional": np.abs(qty * price),
+                "qty": qty,
+                "price": price,
+                "fees": st.column("fees"),
+                "slippage": st.column("slippage"),
+                "tag": st.column("tag"),
+                "status": np.asarray(_STATUSES, dtype=object)[st.column("status")],
+            },
+            index=st.ts_index("ts_fill"),
+        )
+
+
+@dataclass
+class ResultRecorders:
+    """The four engine recorders, sized for one run"""
+    ledger: LedgerRecorder
+    targets: TargetsRecorder | SparseTargetsRecorder
+    orders: OrdersRecorder
+    fills: FillsRecorder
+
+    @classmethod
+    def for_run(cls, n_bars: int, symbols: list[str], sparse_targets: bool = False) -> ResultRecorders:
+        return cls(
+            ledger=LedgerRecorder(n_bars),
+            targets=SparseTargetsRecorder(n_bars, symbols) if sparse_targets else TargetsRecorder(n_bars, symbols),
+            orders=OrdersRecorder(symbols),
+            fills=FillsRecorder(symbols),
+        )
+
+    def memory_usage(self) -> dict[str, int]:
+        """Bytes held by each recorder's columns (object columns count pointers only)"""
+        usage = {
+            "ledger": self.ledger.nbytes,
+            "targets": self.targets.nbytes,
+            "orders": self.orders.nbytes,
+            "fills": self.fills.nbytes,
+        }
+        usage["total"] = sum(usage.values())
+        return usage
+
+    def drain(self) -> dict[str, pd.DataFrame]:
+        """{"ledger", "targets", "orders", "fills"} frames of the rows recorded since the last drain"""
+        return {
+            "ledger": self.ledger.drain(),
+            "targets": self.targets.drain(),
+            "orders": self.orders.drain(),
+            "fills": self.fills.drain(),
+        }
+
+    def build(self) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+        """(ledger, targets, orders, fills) DataFrames"""
+        return self.ledger.to_frame(), self.targets.to_frame(), self.orders.to_frame(), self.fills.to_frame()
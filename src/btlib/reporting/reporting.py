@@ -2,6 +2,7 @@ from __future__ import annotations
 from btlib.engine.accounting import close_enough_zero
 from typing import Any
 import pandas as pd
+from btlib.core.enums import OrderStatus, TimeInForce
 
 
 # ----------------------------
@@ -26,6 +27,16 @@ REQUIRED_ORDERS_COLS = [
     "tag",
 ]
 
+# limit/stop/time-in-force and outcome columns of the orders frame, with the values of a plain MARKET
+# order that has not traded yet
+OPTIONAL_ORDERS_COLS = {
+    "limit_price": float("nan"),
+    "stop_price": float("nan"),
+    "tif": TimeInForce.DAY,
+    "filled_qty": 0.0,
+    "status": OrderStatus.CREATED,
+}
+
 REQUIRED_FILLS_COLS = [
     "ts_fill",
     "symbol",
@@ -37,6 +48,11 @@ REQUIRED_FILLS_COLS = [
     "tag",
 ]
 
+# status of the order after each fill (PARTIALLY_FILLED while some of it is left)
+OPTIONAL_FILLS_COLS = {
+    "status": OrderStatus.FILLED,
+}
+
 TRADES_COLS = [
     "symbol",
     "entry_ts",
@@ -79,24 +95,30 @@ def build_ledger(rows: list[dict[str, Any]]) -> pd.DataFrame:
 def build_orders(rows: list[dict[str, Any]]) -> pd.DataFrame:
     if not rows:
         return _empty_df(
-            columns=[c for c in REQUIRED_ORDERS_COLS if c != "ts_submit"],
+            columns=[c for c in REQUIRED_ORDERS_COLS if c != "ts_submit"] + list(OPTIONAL_ORDERS_COLS),
             index_name="ts_submit",
         )
 
     df = pd.DataFrame(rows)
     _ensure_required_columns(df, REQUIRED_ORDERS_COLS, "orders")
+    for col, default in OPTIONAL_ORDERS_COLS.items():
+        if col not in df.columns:
+            df[col] = default
     return df.set_index("ts_submit").sort_index()
 
 
 def build_fills(rows: list[dict[str, Any]]) -> pd.DataFrame:
     if not rows:
         return _empty_df(
-            columns=[c for c in REQUIRED_FILLS_COLS if c != "ts_fill"],
+            columns=[c for c in REQUIRED_FILLS_COLS if c != "ts_fill"] + list(OPTIONAL_FILLS_COLS),
             index_name="ts_fill",
         )
 
     df = pd.DataFrame(rows)
     _ensure_required_columns(df, REQUIRED_FILLS_COLS, "fills")
+    for col, default in OPTIONAL_FILLS_COLS.items():
+        if col not in df.columns:
+            df[col] = default
 
     if "notional" not in df.columns or df["notional"].isna().any():
         df["notional"] = (df["qty"].astype(float) * df["price"].astype(float)).abs()
@@ -0,0 +1,5 @@
+from .sweep import run_sweep, run_one, parameter_grid, params_key, sweep_fingerprint, SweepRunner
+from .walk_forward import run_walk_forward, walk_forward_windows, stitch_equity, WalkForwardWindow, WalkForwardResult
+
+__all__ = ["run_sweep", "run_one", "parameter_grid", "params_key", "sweep_fingerprint", "SweepRunner",
+           "run_walk_forward", "walk_forward_windows", "stitch_equity", "WalkForwardWindow", "WalkForwardResult"]
\ No newline at end of file
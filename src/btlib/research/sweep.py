@@ -0,0 +1,348 @@
+from __future__ import annotations
+import itertools
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Callable, Iterable
+import pandas as pd
+from btlib.costs import CostModel
+from btlib.data.market_data import MarketData
+from btlib.data.shared import SharedMarketData, SharedMarketSpec, attach_market
+from btlib.engine.config import BacktestConfig
+from btlib.engine.engine import run_positions_only
+from btlib.engine.strategy_base import Strategy
+from btlib.execution import ExecutionModel
+from btlib.metrics.performance import PerformanceMetrics, performance_summary
+
+"""
+Parameter sweeps: run_positions_only over a grid of parameters in a process pool.
+MarketData is published once in shared memory; each worker attaches to it instead of
+receiving a pickled copy of the close frame.
+
+Factories receive the full parameter dict, so one grid can drive strategy and cost settings:
+    strategy_factory(params) -> Strategy
+    cost_factory(params) -> CostModel | None
+    cfg: BacktestConfig, or cfg(params) -> BacktestConfig
+Factories must be picklable (module-level functions or classes) when n_workers > 1.
+"""
+
+METRIC_COLS = [f for f in PerformanceMetrics.__dataclass_fields__]
+
+StrategyFactory = Callable[[dict[str, Any]], Strategy]
+CostFactory = Callable[[dict[str, Any]], CostModel | None]
+ExecutionFactory = Callable[[dict[str, Any]], ExecutionModel | None]
+
+
+def parameter_grid(grid: dict[str, Iterable[Any]] | list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Cartesian product of a {name: values} grid (a list of dicts is passed through)"""
+    if isinstance(grid, list):
+        return [dict(p) for p in grid]
+    names = list(grid.keys())
+    return [dict(zip(names, combo)) for combo in itertools.product(*(list(grid[k]) for k in names))]
+
+
+def params_key(params: dict[str, Any]) -> str:
+    """Stable identity of a parameter set, used to match checkpointed results"""
+    return json.dumps(params, sort_keys=True, default=str)
+
+
+def resolve_cfg(cfg: BacktestConfig | Callable[[dict[str, Any]], BacktestConfig], params: dict[str, Any]) -> BacktestConfig:
+    return cfg(params) if callable(cfg) else cfg
+
+
+def run_one(
+        market: MarketData,
+        params: dict[str, Any],
+        strategy_factory: StrategyFactory,
+        cfg: BacktestConfig | Callable[[dict[str, Any]], BacktestConfig],
+        cost_factory: CostFactory | None = None,
+        execution_factory: ExecutionFactory | None = None,
+        rf: float = 0.0,
+        periods_per_year: int = 252) -> dict[str, Any]:
+    """One grid point -> {"params", "metrics", "error"} record"""
+    try:
+        res = run_positions_only(
+            market=market,
+            strategy=strategy_factory(params),
+            cfg=resolve_cfg(cfg, params),
+            execution_model=execution_factory(params) if execution_factory else None,
+            cost_model=cost_factory(params) if cost_factory else None,
+        )
+        metrics = asdict(performance_summary(res.ledger, rf=rf, periods_per_year=periods_per_year))
+        metrics = {k: (None if v is None else float(v)) for k, v in metrics.items()}
+        return {"params": params, "metrics": metrics, "error": None}
+    except Exception as e:
+        return {"params": params, "metrics": {c: None for c in METRIC_COLS}, "error": f"{type(e).__name__}: {e}"}
+
+
+# ----------------------------
+# Worker side
+# ----------------------------
+
+_WORKER: dict[str, Any] = {}
+
+
+def _init_worker(spec: SharedMarketSpec) -> None:
+    market, shm = attach_market(spec)
+    _WORKER["market"] = market
+    _WORKER["shm"] = shm  # keeps the mapping alive for the worker's lifetime
+    _WORKER["windows"] = {}
+
+
+def _market_window(market: MarketData, cache: dict, window: tuple[int, int] | None) -> MarketData:
+    """Zero-copy MarketData over bars [start, stop), built once per window"""
+    if window is None:
+        return market
+    if window not in cache:
+        cache[window] = market.window(*window)
+    return cache[window]
+
+
+def _run_chunk(chunk: list[dict[str, Any]], kwargs: dict[str, Any], window: tuple[int, int] | None = None) -> list[dict[str, Any]]:
+    market = _market_window(_WORKER["market"], _WORKER["windows"], window)
+    return [run_one(market, params, **kwargs) for params in chunk]
+
+
+# ----------------------------
+# Checkpointing
+# ----------------------------
+
+def _callable_name(obj: Any) -> str | None:
+    return None if obj is None else f"{getattr(obj, '__module__', '?')}.{getattr(obj, '__qualname__', type(obj).__name__)}"
+
+
+def sweep_fingerprint(
+        market: MarketData,
+        cfg: BacktestConfig | Callable[[dict[str, Any]], BacktestConfig],
+        window: tuple[int, int] | None = None,
+        rf: float = 0.0,
+        periods_per_year: int = 252) -> dict[str, Any]:
+    """
+    What a sweep's results depend on besides the parameters: the bar window (and the market it indexes),
+    the config and the metric settings. Written as a checkpoint's header so a resume under different
+    settings is refused. A cfg callable is identified by its qualified name only.
+    """
+    index = market.timestamps()
+    return json.loads(json.dumps({
+        "market": {"bars": len(index), "symbols": len(market.symbols()), "first": index[0], "last": index[-1]},
+        "window": None if window is None else list(window),
+        "cfg": asdict(cfg) if isinstance(cfg, BacktestConfig) else _callable_name(cfg),
+        "rf": float(rf),
+        "periods_per_year": int(periods_per_year),
+    }, sort_keys=True, default=str))
+
+
+def _load_checkpoint(path: Path, header: dict[str, Any]) -> dict[str, dict[str, Any]]:
+    """
+    Finished runs of a checkpoint written for the same sweep_fingerprint; a new or empty file is
+    started with the header. Raises ValueError when the file belongs to another sweep.
+    """
+    done: dict[str, dict[str, Any]] = {}
+    if not path.exists() or path.stat().st_size == 0:
+        _append_checkpoint(path, [{"sweep": header}])
+        return done
+    with path.open() as fh:
+        for n, line in enumerate(fh):
+            line = line.strip()
+            if n == 0:
+                try:
+                    found = json.loads(line).get("sweep")
+                except (json.JSONDecodeError, AttributeError):
+                    found = None
+                if found != header:
+                    raise ValueError(
+                        f"Checkpoint {path} was written for a different sweep (window, config, metric settings "
+                        f"or market) or has no header: expected {header}, found {found}. "
+                        "Use another checkpoint path or delete the file."
+                    )
+                continue
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # partially written last line from an interrupted sweep
+            if record.get("error"):
+                continue  # failed runs are retried on resume
+            done[params_key(record["params"])] = record
+    return done
+
+
+def _append_checkpoint(path: Path, records: list[dict[str, Any]]) -> None:
+    with path.open("a") as fh:
+        for record in records:
+            fh.write(json.dumps(record, default=str) + "\n")
+        fh.flush()
+        os.fsync(fh.fileno())
+
+
+def _records_to_frame(records: list[dict[str, Any]]) -> pd.DataFrame:
+    rows = [{**r["params"], **r["metrics"], "error": r["error"]} for r in records]
+    df = pd.DataFrame(rows)
+    for c in METRIC_COLS:
+        if c in df.columns:
+            df[c] = df[c].astype(float)
+    return df
+
+
+class SweepRunner:
+    """
+    Reusable sweep executor: the shared-memory segment and process pool are created on the first
+    parallel run and kept until close(), so repeated sweeps (e.g. one per walk-forward window) pay
+    for them once. run() can restrict every run to a bar window of the market.
+    """
+    def __init__(
+            self,
+            market: MarketData,
+            strategy_factory: StrategyFactory,
+            cfg: BacktestConfig | Callable[[dict[str, Any]], BacktestConfig],
+            cost_factory: CostFactory | None = None,
+            execution_factory: ExecutionFactory | None = None,
+            n_workers: int | None = None,
+            chunksize: int | None = None,
+            rf: float = 0.0,
+            periods_per_year: int = 252) -> None:
+        self.market = market
+        self.kwargs = dict(
+            strategy_factory=strategy_factory,
+            cfg=cfg,
+            cost_factory=cost_factory,
+            execution_factory=execution_factory,
+            rf=rf,
+            periods_per_year=periods_per_year,
+        )
+        self.n_workers = (os.cpu_count() or 1) if n_workers is None else max(int(n_workers), 1)
+        self.chunksize = chunksize
+        self._windows: dict[tuple[int, int], MarketData] = {}
+        self._shared: SharedMarketData | None = None
+        self._pool: ProcessPoolExecutor | None = None
+        self._pool_size = 0
+
+    def _ensure_pool(self, n_tasks: int) -> ProcessPoolExecutor:
+        """
+        The worker pool, with no more workers than a run has tasks. A later run with more tasks than
+        the pool has workers restarts it larger (up to n_workers); the shared market is kept.
+        """
+        size = min(self.n_workers, n_tasks)
+        if self._pool is not None and size > self._pool_size:
+            self._pool.shutdown()
+            self._pool = None
+        if self._pool is None:
+            if self._shared is None:
+                self._shared = SharedMarketData(self.market)
+            self._pool = ProcessPoolExecutor(
+                max_workers=size, initializer=_init_worker, initargs=(self._shared.spec,)
+            )
+            self._pool_size = size
+        return self._pool
+
+    def run(
+            self,
+            param_grid: dict[str, Iterable[Any]] | list[dict[str, Any]],
+            window: tuple[int, int] | None = None,
+            checkpoint: str | os.PathLike | None = None) -> pd.DataFrame:
+        """Sweeps the grid over bars [start, stop) of the market (whole market if window is None)"""
+        grid = parameter_grid(param_grid)
+        if window is not None:
+            window = tuple(int(x) for x in window)
+
+        path = Path(checkpoint) if checkpoint is not None else None
+        if path is not None:
+            header = sweep_fingerprint(self.market, self.kwargs["cfg"], window, rf=self.kwargs["rf"],
+                                       periods_per_year=self.kwargs["periods_per_year"])
+            done = _load_checkpoint(path, header)
+        else:
+            done = {}
+        pending = [p for p in grid if params_key(p) not in done]
+
+        def finish(records: list[dict[str, Any]]) -> None:
+            for r in records:
+                done[params_key(r["params"])] = r
+            if path is not None:
+                _append_checkpoint(path, records)
+
+        if pending and (self.n_workers == 1 or len(pending) == 1):
+            market = _market_window(self.market, self._windows, window)
+            for params in pending:
+                finish([run_one(market, params, **self.kwargs)])
+        elif pending:
+            chunksize = self.chunksize
+            if chunksize is None:
+                chunksize = max(1, math.ceil(len(pending) / (4 * self.n_workers)))
+            chunks = [pending[k:k + chunksize] for k in range(0, len(pending), chunksize)]
+            pool = self._ensure_pool(len(chunks))
+            futures = [pool.submit(_run_chunk, chunk, self.kwargs, window) for chunk in chunks]
+            for fut in as_completed(futures):
+                finish(fut.result())
+
+        return _records_to_frame([done[params_key(p)] for p in grid])
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+            self._pool_size = 0
+        if self._shared is not None:
+            self._shared.close()
+            self._shared = None
+
+    def __enter__(self) -> SweepRunner:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def run_sweep(
+        market: MarketData,
+        strategy_factory: StrategyFactory,
+        param_grid: dict[str, Iterable[Any]] | list[dict[str, Any]],
+        cfg: BacktestConfig | Callable[[dict[str, Any]], BacktestConfig],
+        cost_factory: CostFactory | None = None,
+        execution_factory: ExecutionFactory | None = None,
+        n_workers: int | None = None,
+        chunksize: int | None = None,
+        checkpoint: str | os.PathLike | None = None,
+        rf: float = 0.0,
+        periods_per_year: int = 252) -> pd.DataFrame:
+    """
+    Runs run_positions_only for every point of a parameter grid and collects performance_summary results.
+
+    :param market: Market prices shared by every run
+    :type market: MarketData
+    :param strategy_factory: Builds a fresh strategy from a parameter dict
+    :type strategy_factory: StrategyFactory
+    :param param_grid: {name: values} grid or an explicit list of parameter dicts
+    :type param_grid: dict[str, Iterable[Any]] | list[dict[str, Any]]
+    :param cfg: Config for every run, or a callable building one from the parameters
+    :type cfg: BacktestConfig | Callable[[dict[str, Any]], BacktestConfig]
+    :param cost_factory: Builds the cost model from the parameters (None -> no costs)
+    :type cost_factory: CostFactory | None
+    :param execution_factory: Builds the execution model from the parameters (None -> NextCloseExecution)
+    :type execution_factory: ExecutionFactory | None
+    :param n_workers: Worker processes (None -> os.cpu_count(), 1 -> run in this process)
+    :type n_workers: int | None
+    :param chunksize: Grid points per task (None -> about 4 tasks per worker)
+    :type chunksize: int | None
+    :param checkpoint: JSON-lines file; finished runs are appended as they complete and skipped on resume.
+        Its header records sweep_fingerprint(); resuming with another window, config or metric settings
+        raises ValueError
+    :type checkpoint: str | os.PathLike | None
+    :return: One row per grid point (in grid order): parameters, PerformanceMetrics fields and an error column
+    :rtype: pd.DataFrame
+    """
+    with SweepRunner(
+        market,
+        strategy_factory,
+        cfg,
+        cost_factory=cost_factory,
+        execution_factory=execution_factory,
+        n_workers=n_workers,
+        chunksize=chunksize,
+        rf=rf,
+        periods_per_year=periods_per_year,
+    ) as runner:
+        return runner.run(param_grid, checkpoint=checkpoint)
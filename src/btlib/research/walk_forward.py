@@ -0,0 +1,213 @@
+from __future__ import annotations
+from dataclasses import dataclass, replace
+from typing import Any, Callable, Iterable
+import numpy as np
+import pandas as pd
+from btlib.data.market_data import MarketData
+from btlib.engine.config import BacktestConfig
+from btlib.engine.engine import BacktestResults, run_positions_only
+from btlib.metrics.performance import PerformanceMetrics, performance_summary
+from btlib.research.sweep import (
+    CostFactory,
+    ExecutionFactory,
+    StrategyFactory,
+    SweepRunner,
+    METRIC_COLS,
+    parameter_grid,
+    resolve_cfg,
+)
+
+"""
+Walk-forward optimization: search parameters on a train window, trade the winner on the
+following out-of-sample window, roll forward, and stitch the OOS ledgers into one equity curve.
+All windows are zero-copy MarketData.window() slices of one market.
+"""
+
+
+@dataclass(frozen=True)
+class WalkForwardWindow:
+    """Bar positions of one split; both ranges are half-open [start, stop)"""
+    train_start: int
+    train_stop: int
+    test_start: int
+    test_stop: int
+
+
+def walk_forward_windows(
+        timestamps: pd.DatetimeIndex,
+        train_bars: int,
+        test_bars: int,
+        step: int | None = None,
+        anchored: bool = False) -> list[WalkForwardWindow]:
+    """
+    Splits a timeline into train/test windows.
+
+    - rolling (default): train is the `train_bars` bars before each test window
+    - anchored: train always starts at bar 0 and grows
+    - step: bars between consecutive test windows (default test_bars, i.e. back-to-back OOS windows)
+    The last test window is truncated to the end of the timeline.
+    """
+    n = len(timestamps)
+    train_bars, test_bars = int(train_bars), int(test_bars)
+    step = test_bars if step is None else int(step)
+    if train_bars <= 0 or test_bars <= 0 or step <= 0:
+        raise ValueError("train_bars, test_bars and step must be positive")
+    if train_bars >= n:
+        raise ValueError(f"train_bars ({train_bars}) must be smaller than the number of bars ({n})")
+
+    windows = []
+    test_start = train_bars
+    while test_start < n:
+        windows.append(
+            WalkForwardWindow(
+                train_start=0 if anchored else test_start - train_bars,
+                train_stop=test_start,
+                test_start=test_start,
+                test_stop=min(test_start + test_bars, n),
+            )
+        )
+        test_start += step
+    return windows
+
+
+@dataclass
+class WalkForwardResult:
+    windows: pd.DataFrame        # one row per split: bounds, chosen params, train score, OOS metrics
+    ledger: pd.DataFrame         # concatenated OOS ledgers with a "window" column
+    equity: pd.Series            # OOS equity chained into one continuous curve
+    metrics: PerformanceMetrics  # performance_summary of the stitched curve
+    oos_results: list[BacktestResults]
+
+
+def stitch_equity(ledgers: list[pd.DataFrame], initial_equity: float) -> pd.Series:
+    """Chains OOS equity curves: each segment is rescaled to start where the previous one ended"""
+    pieces = []
+    level = float(initial_equity)
+    for ledger in ledgers:
+        eq = ledger["equity"].astype(float)
+        scaled = eq * (level / float(eq.iloc[0]))
+        pieces.append(scaled)
+        level = float(scaled.iloc[-1])
+    equity = pd.concat(pieces)
+    equity.name = "equity"
+    return equity
+
+
+def _select_best(train: pd.DataFrame, objective: str, maximize: bool) -> int:
+    scores = train[objective].astype(float).replace([np.inf, -np.inf], np.nan)
+    if scores.notna().sum() == 0:
+        errors = train["error"].dropna().unique().tolist()
+        raise ValueError(f"No valid train runs to select from (objective={objective!r}); errors: {errors[:3]}")
+    return int(scores.idxmax() if maximize else scores.idxmin())
+
+
+def run_walk_forward(
+        market: MarketData,
+        strategy_factory: StrategyFactory,
+        param_grid: dict[str, Iterable[Any]] | list[dict[str, Any]],
+        cfg: BacktestConfig | Callable[[dict[str, Any]], BacktestConfig],
+        train_bars: int,
+        test_bars: int,
+        step: int | None = None,
+        anchored: bool = False,
+        objective: str = "sharpe",
+        maximize: bool = True,
+        cost_factory: CostFactory | None = None,
+        execution_factory: ExecutionFactory | None = None,
+        n_workers: int | None = None,
+        chunksize: int | None = None,
+        rf: float = 0.0,
+        periods_per_year: int = 252) -> WalkForwardResult:
+    """
+    Walk-forward optimization over rolling or anchored train/test windows.
+
+    For each window the grid is swept (in parallel) on the train slice, the parameters with the best
+    `objective` (a PerformanceMetrics field) are run on the test slice, and the OOS ledgers are stitched.
+    Each OOS run replays the cfg.warmup_bars bars before the test window as warmup, so the strategy
+    starts the window with history but no positions; those bars are dropped from the OOS ledger.
+
+    :param market: Market prices; every train/test slice is a zero-copy window of it
+    :type market: MarketData
+    :param strategy_factory: Builds a fresh strategy from a parameter dict
+    :type strategy_factory: StrategyFactory
+    :param param_grid: {name: values} grid or an explicit list of parameter dicts
+    :type param_grid: dict[str, Iterable[Any]] | list[dict[str, Any]]
+    :param cfg: Config for every run, or a callable building one from the parameters
+    :type cfg: BacktestConfig | Callable[[dict[str, Any]], BacktestConfig]
+    :param train_bars: Bars per train window (initial size when anchored)
+    :type train_bars: int
+    :param test_bars: Bars per out-of-sample window
+    :type test_bars: int
+    :param objective: PerformanceMetrics field used to pick the winner
+    :type objective: str
+    :param maximize: Pick the largest objective (False -> smallest)
+    :type maximize: bool
+    :return: Per-window choices, stitched OOS ledger/equity and its metrics
+    :rtype: WalkForwardResult
+    """
+    if objective not in METRIC_COLS:
+        raise ValueError(f"objective must be one of {METRIC_COLS}, got {objective!r}")
+    windows = walk_forward_windows(market.timestamps(), train_bars, test_bars, step=step, anchored=anchored)
+    index = market.timestamps()
+    grid = parameter_grid(param_grid)
+
+    rows = []
+    ledgers = []
+    oos_results = []
+    with SweepRunner(
+        market,
+        strategy_factory,
+        cfg,
+        cost_factory=cost_factory,
+        execution_factory=execution_factory,
+        n_workers=n_workers,
+        chunksize=chunksize,
+        rf=rf,
+        periods_per_year=periods_per_year,
+    ) as runner:
+        for k, w in enumerate(windows):
+            train = runner.run(grid, window=(w.train_start, w.train_stop))
+            best = _select_best(train, objective, maximize)
+            params = grid[best]  # sweep rows come back in grid order
+
+            run_cfg = resolve_cfg(cfg, params)
+            lead = min(max(int(run_cfg.warmup_bars), 0), w.test_start)
+            oos_market = market.window(w.test_start - lead, w.test_stop)
+            res = run_positions_only(
+                market=oos_market,
+                strategy=strategy_factory(params),
+                cfg=replace(run_cfg, warmup_bars=lead),
+                execution_model=execution_factory(params) if execution_factory else None,
+                cost_model=cost_factory(params) if cost_factory else None,
+            )
+            test_ts = index[w.test_start:w.test_stop]
+            res = BacktestResults(
+                ledger=res.ledger.iloc[lead:],
+                targets=res.targets.iloc[lead:],
+                orders=res.orders[res.orders.index >= test_ts[0]],
+                fills=res.fills[res.fills.index >= test_ts[0]],
+                trades=res.trades,
+            )
+            oos_results.append(res)
+            ledgers.append(res.ledger.assign(window=k))
+
+            oos = performance_summary(res.ledger, rf=rf, periods_per_year=periods_per_year)
+            rows.append({
+                "window": k,
+                "train_start": index[w.train_start],
+                "train_end": index[w.train_stop - 1],
+                "test_start": test_ts[0],
+                "test_end": test_ts[-1],
+                "params": params,
+                f"train_{objective}": float(train.at[best, objective]),
+                **{f"oos_{c}": getattr(oos, c) for c in METRIC_COLS},
+            })
+
+    equity = stitch_equity(ledgers, initial_equity=float(resolve_cfg(cfg, rows[0]["params"]).initial_cash))
+    return WalkForwardResult(
+        windows=pd.DataFrame(rows).set_index("window"),
+        ledger=pd.concat(ledgers),
+        equity=equity,
+        metrics=performance_summary(equity.to_frame(), rf=rf, periods_per_year=periods_per_year),
+        oos_results=oos_results,
+    )
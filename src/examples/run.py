@@ -4,12 +4,12 @@ from btlib.execution import NextCloseExecution
 from btlib.engine import run_positions_only  # your function
 from examples.strategy import PairZScoreStrategy
 from btlib.metrics import performance_summary
-import yfinance as yf
+from btlib.data.cache import PriceCache, yfinance_fetcher
 import pandas as pd
 tickers=["AAPL","MSFT" ]
-close = yf.download(tickers, "2010-10-30","2025-10-30")["Close"]
-# Suppose you already built a close-price DataFrame with columns ["AAPL","MSFT"] etc.
-market = MarketData(close)
+# downloads once into ~/.cache/btlib; later runs only fetch dates the cache does not cover yet
+cache = PriceCache("~/.cache/btlib", fetcher=yfinance_fetcher)
+market = cache.market(tickers, "2010-10-30", "2025-10-30", field="Close")
 
 cfg = BacktestConfig(
     initial_cash=100_000.0,
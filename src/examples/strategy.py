@@ -1,5 +1,7 @@
 import numpy as np
 import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from btlib.data.history import HistoryView
 from btlib.engine.strategy_base import Strategy
 
 
@@ -39,7 +41,7 @@ class PairZScoreStrategy(Strategy):
             return 1.0
         return b
 
-    def on_bar(self, ts, data_upto_ts: pd.DataFrame, state):
+    def on_bar(self, ts, data_upto_ts: HistoryView | pd.DataFrame, state):
         # cheap guard
         if self.a not in data_upto_ts.columns or self.b not in data_upto_ts.columns:
             return {}
@@ -48,10 +50,14 @@ class PairZScoreStrategy(Strategy):
         if len(data_upto_ts) < self.lookback:
             return {}
 
-        window = data_upto_ts[[self.a, self.b]].iloc[-self.lookback:]
+        # History views hand out the last lookback rows without touching the rest of the history
+        if isinstance(data_upto_ts, HistoryView):
+            arr = data_upto_ts.tail_values(self.lookback, columns=[self.a, self.b])
+        else:
+            window = data_upto_ts[[self.a, self.b]].iloc[-self.lookback:]
+            arr = window.to_numpy(dtype=float, copy=False)  # shape: (lookback, 2)
 
         # Fast NaN/inf check on just the window
-        arr = window.to_numpy(dtype=float, copy=False)  # shape: (lookback, 2)
         if not np.isfinite(arr).all():
             return {}
 
@@ -108,3 +114,86 @@ class PairZScoreStrategy(Strategy):
             w_b *= scale
 
         return {self.a: float(w_a), self.b: float(w_b)}
+
+    def precompute(self, close: pd.DataFrame, start: int = 0) -> pd.DataFrame:
+        """
+        Whole-matrix version of on_bar for a fresh instance first called at bar `start`:
+        rolling beta and spread moments over every lookback window, then the sticky regime
+        in one pass over the bars.
+        """
+        n, L = len(close), self.lookback
+        if self.a not in close.columns or self.b not in close.columns:
+            return pd.DataFrame(index=close.index)
+        weights = pd.DataFrame(0.0, index=close.index, columns=[self.a, self.b])
+        if L < 2 or n < L:
+            return weights
+
+        pa = close[self.a].to_numpy(dtype=float)
+        pb = close[self.b].to_numpy(dtype=float)
+        bad = ~np.isfinite(pa) | ~np.isfinite(pb)
+        if self.use_log:
+            bad |= (pa <= 0.0) | (pb <= 0.0)
+        xa = np.where(bad, 1.0, pa)
+        xb = np.where(bad, 1.0, pb)
+        if self.use_log:
+            xa, xb = np.log(xa), np.log(xb)
+
+        # bars where on_bar gets past its guards (full, finite, positive window)
+        n_bad = np.concatenate([[0], np.cumsum(bad)])
+        valid = np.zeros(n, dtype=bool)
+        valid[L - 1:] = (n_bad[L:] - n_bad[:-L]) == 0
+        valid[:start] = False
+
+        # per-window OLS slope and centred moments, chunked to bound the (rows, L) temporaries
+        beta_fit = np.ones(n)
+        ma, mb = np.zeros(n), np.zeros(n)
+        caa, cbb, cab = np.zeros(n), np.zeros(n), np.zeros(n)
+        wa, wb = sliding_window_view(xa, L), sliding_window_view(xb, L)
+        rows = max(1, 2**20 // L)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for lo in range(0, len(wa), rows):
+                A, B = wa[lo:lo + rows], wb[lo:lo + rows]
+                t = slice(lo + L - 1, lo + L - 1 + len(A))
+                denom = np.einsum("ij,ij->i", B, B)
+                b = np.einsum("ij,ij->i", B, A) / denom
+                beta_fit[t] = np.where((denom > 0.0) & np.isfinite(denom) & np.isfinite(b), b, 1.0)
+                ma[t], mb[t] = A.mean(axis=1), B.mean(axis=1)
+                da, db = A - ma[t][:, None], B - mb[t][:, None]
+                caa[t] = np.einsum("ij,ij->i", da, da)
+                cbb[t] = np.einsum("ij,ij->i", db, db)
+                cab[t] = np.einsum("ij,ij->i", da, db)
+
+        # beta is refit on every refit_every-th valid bar and carried forward in between
+        if self.refit_every <= 1:
+            refit = valid
+        else:
+            refit = valid & (np.cumsum(valid) % self.refit_every == 0)
+        last_fit = np.maximum.accumulate(np.where(refit, np.arange(n), -1))
+        beta = np.where(last_fit >= 0, beta_fit[np.maximum(last_fit, 0)], 1.0)
+
+        var = (caa - 2.0 * beta * cab + beta * beta * cbb) / (L - 1)
+        sd = np.sqrt(np.maximum(var, 0.0))
+        active = valid & np.isfinite(sd) & (sd >= 1e-12)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            z = ((xa - ma) - beta * (xb - mb)) / sd
+
+        # Regime logic (sticky) only depends on the z path
+        regime = np.zeros(n)
+        r = 0
+        for t, zt in zip(np.flatnonzero(active).tolist(), z[active].tolist()):
+            if r == 0:
+                if zt > self.entry_z:
+                    r = -1
+                elif zt < -self.entry_z:
+                    r = +1
+            elif abs(zt) < self.exit_z:
+                r = 0
+            regime[t] = r
+
+        w_a = (self.gross_weight / 2.0) * regime
+        w_b = -(self.gross_weight / 2.0) * regime * beta
+        gross = np.abs(w_a) + np.abs(w_b)
+        scale = np.divide(self.gross_weight, gross, out=np.ones(n), where=gross > 1e-12)
+        weights[self.a] = w_a * scale
+        weights[self.b] = w_b * scale
+        return weights
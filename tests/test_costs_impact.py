@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from btlib.core.order_types import Fill
+from btlib.costs import CostModel, SimpleBpsCost, SqrtImpactCost, SpreadImpactCost, rolling_impact_stats
+from btlib.data.market_data import MarketData
+from btlib.engine import BacktestConfig, run_positions_only, run_weights_matrix
+
+
+def make_market(n=80, m=4, seed=3) -> MarketData:
+    rng = np.random.default_rng(seed)
+    idx = pd.date_range("2024-01-01", periods=n, freq="D")
+    cols = [f"S{j}" for j in range(m)]
+    close = pd.DataFrame(50.0 * np.exp(np.cumsum(rng.normal(0, 0.02, size=(n, m)), axis=0)), index=idx, columns=cols)
+    volume = pd.DataFrame(rng.uniform(1e4, 5e4, size=(n, m)), index=idx, columns=cols)
+    return MarketData(close, volume=volume)
+
+
+def test_stats_only_use_earlier_bars():
+    market = make_market()
+    stats = rolling_impact_stats(market, window=10)
+    close, volume = market.close, market.field_frame("volume")
+    i, j = 30, 2
+    ret = np.diff(np.log(close.iloc[i - 11:i, j].to_numpy()))
+    assert stats.vol[i, j] == pytest.approx(np.std(ret, ddof=1))
+    assert stats.adv[i, j] == pytest.approx(volume.iloc[i - 10:i, j].mean())
+    assert np.isnan(stats.vol[:11]).all() and np.isnan(stats.adv[:10]).all()
+
+    with pytest.raises(ValueError):
+        rolling_impact_stats(MarketData(close))
+
+
+def test_sqrt_impact_math_and_batch_matches_single():
+    market = make_market()
+    cm = SqrtImpactCost(coefficient=0.5, window=10, fees_bps=1.0, fallback_bps=20.0)
+    cm.prepare(market)
+    stats = cm._stats
+    ts = market.timestamps()[40]
+    sids = np.array([0, 3, 1])
+    qty = np.array([1_000.0, -4_000.0, 0.5])
+    price = np.array([50.0, 60.0, 40.0])
+    syms = np.array(market.symbols(), dtype=object)[sids]
+    fees, slip = cm.compute_many(ts, syms, qty, price, sids=sids, bar=40)
+    expected = np.abs(qty) * price * 0.5 * stats.vol[40, sids] * np.sqrt(np.abs(qty) / stats.adv[40, sids])
+    np.testing.assert_allclose(slip, expected)
+    np.testing.assert_allclose(fees, np.abs(qty) * price * 1e-4)
+    # by timestamp and symbol instead of bar and column
+    single = [cm.compute(Fill(ts, s, q, p)) for s, q, p in zip(syms, qty, price)]
+    np.testing.assert_allclose([c[1] for c in single], slip)
+    # warmup: no statistics yet -> fallback
+    _, warm = cm.compute_many(market.timestamps()[3], syms, qty, price, sids=sids, bar=3)
+    np.testing.assert_allclose(warm, np.abs(qty) * price * 20e-4)
+
+    capped = SqrtImpactCost(coefficient=100.0, window=10, max_impact_bps=50.0)
+    capped.prepare(market)
+    _, slip = capped.compute_many(ts, syms, qty, price, sids=sids, bar=40)
+    np.testing.assert_allclose(slip, np.abs(qty) * price * 50e-4)
+
+    with pytest.raises(ValueError):
+        SqrtImpactCost().compute(Fill(ts, "S0", 1.0, 1.0))  # not prepared
+    with pytest.raises(ValueError):
+        SqrtImpactCost(coefficient=-1.0)
+
+
+def test_spread_plus_impact_and_window_reuse():
+    market = make_market()
+    spreads = {s: 2.0 * (j + 1) for j, s in enumerate(market.symbols())}
+    cm = SpreadImpactCost(window=10, spread_bps=spreads)
+    cm.prepare(market)
+    base = SqrtImpactCost(window=10)
+    base.prepare(market)
+    sids = np.arange(4)
+    syms = np.array(market.symbols(), dtype=object)
+    qty, price = np.full(4, 500.0), np.full(4, 10.0)
+    _, slip = cm.compute_many(market.timestamps()[50], syms, qty, price, sids=sids, bar=50)
+    _, impact = base.compute_many(market.timestamps()[50], syms, qty, price, sids=sids, bar=50)
+    np.testing.assert_allclose(slip - impact, 5_000.0 * np.array([1.0, 2.0, 3.0, 4.0]) / 10_000.0)
+
+    # a window of the prepared market keeps the full-history statistics, shifted to its bars
+    stats = cm._stats
+    cm.prepare(market.window(40, 70))
+    assert cm._stats is stats and cm._offset == 40
+    _, again = cm.compute_many(market.timestamps()[50], syms, qty, price, sids=sids, bar=10)
+    np.testing.assert_allclose(again, slip)
+
+    # another market on the same timeline and symbols gets its own statistics
+    other = make_market(seed=4)
+    cm.prepare(other.window(40, 70))
+    assert cm._stats is not stats and cm._offset == 0
+    np.testing.assert_allclose(cm._stats.vol, rolling_impact_stats(other.window(40, 70), window=10).vol)
+
+    with pytest.raises(ValueError):
+        SpreadImpactCost(spread_bps={"S0": 1.0}).prepare(market)
+
+
+class PerFillBps(CostModel):
+    """SimpleBpsCost through the per-fill interface only"""
+    def compute(self, fill):
+        notional = abs(fill.qty) * fill.price
+        return notional * 1e-4, notional * 2e-4
+
+
+class Rotate:
+    def on_bar(self, ts, data_upto_ts, state):
+        k = len(data_upto_ts) % 4
+        return {s: (0.4 if j == k else 0.2) for j, s in enumerate(data_upto_ts.columns)}
+
+
+def test_engines_use_the_batch_interface():
+    market = make_market()
+    cfg = BacktestConfig(initial_cash=1_000_000.0)
+    fast = run_positions_only(market, Rotate(), cfg, cost_model=SimpleBpsCost(fees_bps=1.0, slippage_bps=2.0))
+    slow = run_positions_only(market, Rotate(), cfg, cost_model=PerFillBps())
+    pd.testing.assert_frame_equal(fast.fills, slow.fills)
+
+    cm = SpreadImpactCost(coefficient=0.8, window=15, spread_bps=4.0, fallback_bps=10.0)
+    res = run_positions_only(market, Rotate(), cfg, cost_model=cm)
+    fills = res.fills
+    assert (fills["slippage"] > fills["notional"] * 2e-4).all()
+    bars = market.timestamps().get_indexer(fills.index)
+    sids = pd.Index(market.symbols()).get_indexer(fills["symbol"])
+    q = fills["qty"].to_numpy()
+    stats = cm._stats
+    known = np.isfinite(stats.vol[bars, sids])
+    impact = np.where(known, 0.8 * stats.vol[bars, sids] * np.sqrt(np.abs(q) / stats.adv[bars, sids]), 10e-4)
+    np.testing.assert_allclose(fills["slippage"], fills["notional"] * (impact + 2e-4))
+
+    weights = res.targets
+    vec = run_weights_matrix(market, weights, cfg, cost_model=cm)
+    pd.testing.assert_frame_equal(vec.fills, res.fills)
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from btlib.core.order_types import Fill
+from btlib.costs import FeeTier, TieredFeeCost
+from btlib.data.market_data import MarketData
+from btlib.engine import BacktestConfig, run_many, run_positions_only
+
+RETAIL = [
+    FeeTier(min_volume=0, per_share=0.0035, min_ticket=0.35),
+    FeeTier(min_volume=300_000, per_share=0.002, min_ticket=0.35),
+    FeeTier(min_volume=3_000_000, per_share=0.0015, min_ticket=0.35),
+]
+EU = [FeeTier(min_volume=0, bps=5.0, min_ticket=3.0), FeeTier(min_volume=1_000_000, bps=3.0, min_ticket=3.0)]
+
+
+def make_cost(**kwargs) -> TieredFeeCost:
+    return TieredFeeCost(venues={"us": RETAIL, "eu": EU}, symbol_venue={"SAP": "eu", "ASML": "eu"},
+                         default_venue="us", **kwargs)
+
+
+def test_tier_breaks_within_and_across_batches():
+    cm = make_cost()
+    ts = pd.Timestamp("2024-03-04")
+    syms = np.array(["AAPL", "SAP", "MSFT", "AAPL"], dtype=object)
+    qty = np.array([200_000.0, 100.0, -150_000.0, 10.0])
+    price = np.array([100.0, 150.0, 50.0, 100.0])
+    fees, slippage = cm.compute_many(ts, syms, qty, price)
+    # us volume before each fill: 0, 200k, 350k -> tiers 1, 1, 2 for the us fills; eu: tier 1 on 15k notional
+    np.testing.assert_allclose(fees, [200_000 * 0.0035, 7.5, 150_000 * 0.0035, 0.35])
+    assert (slippage == 0.0).all()
+    assert cm.monthly_volume() == {"us": 350_010.0, "eu": 100.0}
+
+    fees, _ = cm.compute_many(ts + pd.Timedelta(days=1), np.array(["MSFT"], dtype=object), np.array([1_000.0]), np.array([10.0]))
+    assert fees.tolist() == [pytest.approx(2.0)]  # 350k shares this month -> second tier
+    # a new month starts from the first tier again
+    fees, _ = cm.compute_many(pd.Timestamp("2024-04-01"), np.array(["MSFT"], dtype=object), np.array([1_000.0]), np.array([10.0]))
+    assert fees.tolist() == [pytest.approx(3.5)]
+    assert cm.monthly_volume()["us"] == 1_000.0
+
+
+def test_notional_basis_cap_and_single_fill():
+    cm = make_cost(volume_basis="notional", max_bps=1.0, slippage_bps=2.0)
+    f = Fill(ts="2024-01-02", symbol="SAP", qty=10_000, price=100.0)
+    fees, slippage = cm.compute(f)
+    assert fees == pytest.approx(100.0)  # 5 bps = 500, capped at 1 bp of 1M notional
+    assert slippage == pytest.approx(200.0)
+    # the eu venue has now traded 1M of notional: the 3 bps tier, min ticket 3, cap 1 bp of 1000 = 0.1
+    fees, _ = cm.compute(Fill(ts="2024-01-03", symbol="ASML", qty=10, price=100.0))
+    assert fees == pytest.approx(0.1)
+
+
+def test_schedule_validation():
+    with pytest.raises(ValueError):
+        FeeTier(min_volume=0, bps=-1.0)
+    with pytest.raises(ValueError):
+        TieredFeeCost(venues={"us": [FeeTier(min_volume=100.0)]})
+    with pytest.raises(ValueError):
+        TieredFeeCost(venues={"us": [FeeTier(), FeeTier(min_volume=5.0), FeeTier(min_volume=5.0)]})
+    with pytest.raises(ValueError):
+        TieredFeeCost(venues={"us": RETAIL}, symbol_venue={"SAP": "eu"})
+    with pytest.raises(ValueError):
+        TieredFeeCost(venues={"us": RETAIL}, volume_basis="orders")
+    with pytest.raises(ValueError):
+        TieredFeeCost(venues={"us": RETAIL}, default_venue="xx").compute(Fill(ts="2024-01-02", symbol="A", qty=1, price=1.0))
+
+
+class Rotate:
+    def on_bar(self, ts, data_upto_ts, state):
+        k = len(data_upto_ts) % 3
+        return {s: (0.5 if j == k else 0.25) for j, s in enumerate(data_upto_ts.columns)}
+
+
+def test_engine_charges_tiered_fees():
+    rng = np.random.default_rng(1)
+    idx = pd.date_range("2024-01-25", periods=20, freq="D")
+    close = pd.DataFrame(20.0 * np.exp(np.cumsum(rng.normal(0, 0.02, size=(20, 3)), axis=0)),
+                         index=idx, columns=["AAPL", "SAP", "MSFT"])
+    market = MarketData(close)
+    cfg = BacktestConfig(initial_cash=2_000_000.0, allow_fractional_shares=False)
+    cm = make_cost(slippage_bps=1.0)
+    res = run_positions_only(market, Rotate(), cfg, cost_model=cm)
+    fills = res.fills
+
+    # replay the fills one at a time through a fresh schedule: same fees
+    ref = make_cost(slippage_bps=1.0)
+    expected = [ref.compute(Fill(ts, s, q, p)) for ts, s, q, p in
+                zip(fills.index, fills["symbol"], fills["qty"], fills["price"])]
+    np.testing.assert_allclose(fills["fees"], [e[0] for e in expected])
+    np.testing.assert_allclose(fills["slippage"], fills["notional"] * 1e-4)
+    # some us fills got past the first tier before February reset the volume
+    us = fills[fills["symbol"] != "SAP"]
+    per_share = us["fees"] / us["qty"].abs()
+    assert (per_share < 0.0035 - 1e-12).any() and np.isclose(per_share, 0.0035).any()
+
+    # a second run with the same instance starts from zero volume again
+    again = run_positions_only(market, Rotate(), cfg, cost_model=cm)
+    pd.testing.assert_frame_equal(again.fills, fills)
+
+
+class Hold:
+    def on_bar(self, ts, data_upto_ts, state):
+        return {s: 0.3 for s in data_upto_ts.columns}
+
+
+def test_run_many_keeps_volumes_per_entry():
+    rng = np.random.default_rng(2)
+    idx = pd.date_range("2024-01-25", periods=20, freq="D")
+    close = pd.DataFrame(20.0 * np.exp(np.cumsum(rng.normal(0, 0.02, size=(20, 3)), axis=0)),
+                         index=idx, columns=["AAPL", "SAP", "MSFT"])
+    market = MarketData(close)
+    cfg = BacktestConfig(initial_cash=2_000_000.0, allow_fractional_shares=False)
+    cm = make_cost()
+    together = run_many(market, [(Rotate(), cfg, cm), (Hold(), cfg, cm)])
+    for res, strategy in zip(together, [Rotate(), Hold()]):
+        solo = run_positions_only(market, strategy, cfg, cost_model=make_cost())
+        pd.testing.assert_frame_equal(res.fills, solo.fills)
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from btlib.costs import SimpleBpsCost
+from btlib.data.market_data import MarketData
+from btlib.engine import STAGES, BacktestConfig, run_positions_only
+
+
+class Rotate:
+    """Holds one symbol at a time, switching every bar so every stage has work"""
+    def on_bar(self, ts, data_upto_ts, state):
+        k = len(data_upto_ts) % len(data_upto_ts.columns)
+        return {data_upto_ts.columns[k]: 0.5}
+
+
+def make_market() -> MarketData:
+    idx = pd.date_range("2024-01-01", periods=25, freq="D")
+    close = pd.DataFrame(
+        {"AAPL": np.linspace(100, 110, 25), "MSFT": np.linspace(200, 190, 25), "GOOG": 50.0},
+        index=idx,
+    )
+    return MarketData(close)
+
+
+def test_timings_are_off_by_default():
+    res = run_positions_only(make_market(), Rotate(), BacktestConfig())
+    assert res.timings is None
+
+
+def test_stage_timings_cover_every_stage():
+    market = make_market()
+    cm = SimpleBpsCost(fees_bps=1.0)
+    plain = run_positions_only(market, Rotate(), BacktestConfig(), cost_model=cm)
+    res = run_positions_only(market, Rotate(), BacktestConfig(collect_timings=True, timings_per_bar=True), cost_model=cm)
+
+    pd.testing.assert_frame_equal(res.ledger, plain.ledger)
+    t = res.timings
+    assert list(t.total.index) == list(STAGES)
+    assert (t.total > 0).all()
+    assert t.n_bars == 25
+    assert t.per_bar.shape == (25, len(STAGES))
+    assert list(t.per_bar.index) == list(market.timestamps())
+    # per-bar rows add up to the totals; result building happens once, after the last bar
+    np.testing.assert_allclose(t.per_bar.sum().drop("results"), t.total.drop("results"))
+    assert t.per_bar["results"].eq(0.0).all()
+
+    summary = t.summary()
+    assert summary["share"].sum() == pytest.approx(1.0)
+    assert summary["total_s"].is_monotonic_decreasing
+
+
+def test_callback_reports_progress():
+    events = []
+    run_positions_only(
+        make_market(), Rotate(), BacktestConfig(initial_cash=1000.0, collect_timings=True),
+        log_every=10, callback=events.append,
+    )
+    assert [e.bar for e in events] == [1, 10, 20, 25]
+    assert events[0].equity == pytest.approx(1000.0)
+    assert all(e.n_bars == 25 and e.run == 0 for e in events)
+    assert events[-1].elapsed >= events[0].elapsed
+    assert set(events[-1].timings) == set(STAGES)
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from btlib.data.market_data import MarketData
+from btlib.engine import BacktestConfig, run_many, run_positions_only
+from btlib.costs import SimpleBpsCost
+
+
+class MomentumStrategy:
+    """Long the symbols that rose over the last `lookback` bars, short the rest"""
+    def __init__(self, lookback: int, gross: float):
+        self.lookback = lookback
+        self.gross = gross
+        self.calls = 0
+
+    def on_bar(self, ts, data_upto_ts, state):
+        self.calls += 1
+        px = np.asarray(data_upto_ts.tail_values(self.lookback + 1))
+        if len(px) <= self.lookback:
+            return {}
+        ret = px[-1] / px[0] - 1.0
+        w = np.where(ret > 0, 1.0, -1.0) * self.gross / px.shape[1]
+        return dict(zip(data_upto_ts.columns, w))
+
+
+def make_market() -> MarketData:
+    rng = np.random.default_rng(3)
+    idx = pd.date_range("2024-01-01", periods=30, freq="D")
+    close = pd.DataFrame(
+        100.0 * np.exp(np.cumsum(rng.normal(0, 0.02, size=(30, 3)), axis=0)),
+        index=idx,
+        columns=["AAPL", "MSFT", "GOOG"],
+    )
+    return MarketData(close)
+
+
+def make_runs():
+    return [
+        (MomentumStrategy(3, 1.0), BacktestConfig(initial_cash=10_000.0, warmup_bars=2), None),
+        (MomentumStrategy(5, 0.5), BacktestConfig(initial_cash=20_000.0, history_lookback=10),
+         SimpleBpsCost(fees_bps=5.0, slippage_bps=2.0)),
+        (MomentumStrategy(2, 1.5), BacktestConfig(initial_cash=10_000.0, compact_state=True, max_abs_weight=0.4),
+         SimpleBpsCost(fees_bps=1.0)),
+    ]
+
+
+def test_matches_separate_runs():
+    market = make_market()
+    together = run_many(market, make_runs())
+    assert len(together) == 3
+    for (strategy, cfg, cm), res in zip(make_runs(), together):
+        ref = run_positions_only(market, strategy, cfg, cost_model=cm)
+        pd.testing.assert_frame_equal(res.ledger, ref.ledger)
+        pd.testing.assert_frame_equal(res.targets, ref.targets)
+        pd.testing.assert_frame_equal(res.orders, ref.orders)
+        pd.testing.assert_frame_equal(res.fills, ref.fills)
+        pd.testing.assert_frame_equal(res.trades, ref.trades)
+
+
+def test_single_pass_calls_each_strategy_once_per_bar():
+    market = make_market()
+    runs = make_runs()
+    run_many(market, runs)
+    n = len(market.timestamps())
+    assert [s.calls for s, cfg, _ in runs] == [n - cfg.warmup_bars for _, cfg, _ in runs]
+
+
+def test_rejects_malformed_entries():
+    with pytest.raises(ValueError):
+        run_many(make_market(), [(MomentumStrategy(3, 1.0), BacktestConfig())])
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from btlib.data.market_data import MarketData
+from btlib.engine import BacktestConfig, Strategy, check_precompute, run_positions_only
+from examples.strategy import PairZScoreStrategy
+
+
+def make_market() -> MarketData:
+    rng = np.random.default_rng(5)
+    n = 400
+    idx = pd.date_range("2020-01-01", periods=n, freq="D")
+    common = np.cumsum(rng.normal(0, 0.01, n))
+    close = pd.DataFrame(
+        {
+            "AAPL": 100.0 * np.exp(common + rng.normal(0, 0.01, n)),
+            "MSFT": 80.0 * np.exp(common + rng.normal(0, 0.01, n)),
+        },
+        index=idx,
+    )
+    close.iloc[150, 0] = np.nan  # invalidates every window containing it
+    return MarketData(close)
+
+
+@pytest.mark.parametrize(
+    "params, warmup",
+    [
+        ({"lookback": 30}, 0),
+        ({"lookback": 30, "refit_every": 5}, 47),
+        ({"lookback": 20, "use_log": False, "entry_z": 1.5, "exit_z": 0.2}, 10),
+    ],
+)
+def test_pair_zscore_precompute_matches_on_bar(params, warmup):
+    market = make_market()
+    factory = lambda: PairZScoreStrategy("AAPL", "MSFT", **params)
+    diff = check_precompute(factory, market, BacktestConfig(warmup_bars=warmup))
+    assert diff.shape == (len(market.timestamps()), 2)
+    # the comparison is only meaningful if the strategy actually trades
+    assert (factory().precompute(market.close, start=warmup) != 0).any().any()
+
+
+class CountingRamp(Strategy):
+    """Stateless ramp into AAPL with a matrix version that is off by `bias` from bar 3 on"""
+    def __init__(self, bias: float = 0.0):
+        self.bias = bias
+        self.calls = 0
+
+    def on_bar(self, ts, data_upto_ts, state):
+        self.calls += 1
+        return {"AAPL": min(len(data_upto_ts) / 10.0, 1.0)}
+
+    def precompute(self, close, start=0):
+        w = np.minimum(np.arange(1, len(close) + 1) / 10.0, 1.0)
+        w[3:] += self.bias
+        return pd.DataFrame({"AAPL": w}, index=close.index)
+
+
+def test_engine_reads_precomputed_rows_instead_of_on_bar():
+    market = make_market()
+    strategy = CountingRamp()
+    res = run_positions_only(market, strategy, BacktestConfig(warmup_bars=2))
+    assert strategy.calls == 0
+    assert res.targets["AAPL"].iloc[:2].eq(0.0).all()
+    assert res.targets["AAPL"].iloc[2] == pytest.approx(0.3)
+
+    strategy = CountingRamp()
+    run_positions_only(market, strategy, BacktestConfig(use_precompute=False))
+    assert strategy.calls == len(market.timestamps())
+
+
+def test_check_precompute_reports_mismatch():
+    with pytest.raises(AssertionError, match="differ"):
+        check_precompute(lambda: CountingRamp(bias=0.01), make_market())
+
+
+def test_check_precompute_requires_matrix():
+    class OnBarOnly(Strategy):
+        pass
+
+    with pytest.raises(ValueError):
+        check_precompute(OnBarOnly, make_market())
@@ -0,0 +1,133 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from btlib.costs import FeeTier, SimpleBpsCost, SpreadImpactCost, TieredFeeCost
+from btlib.data import RingHistory
+from btlib.data.market_data import MarketData
+from btlib.engine import BacktestConfig, StreamingEngine, run_positions_only
+
+
+class MeanReversion:
+    """Short the symbols above their lookback mean, long the ones below"""
+    def __init__(self, lookback: int):
+        self.lookback = lookback
+        self.seen = []
+
+    def on_bar(self, ts, data_upto_ts, state):
+        assert data_upto_ts.last_ts == ts
+        self.seen.append(len(data_upto_ts))
+        px = data_upto_ts.tail_values(self.lookback)
+        if len(px) < self.lookback:
+            return {}
+        w = np.where(px[-1] > px.mean(axis=0), -0.3, 0.3)
+        return dict(zip(data_upto_ts.columns, w))
+
+
+def make_market() -> MarketData:
+    rng = np.random.default_rng(9)
+    idx = pd.date_range("2024-01-01 09:30", periods=50, freq="min")
+    close = pd.DataFrame(
+        100.0 * np.exp(np.cumsum(rng.normal(0, 0.01, size=(50, 3)), axis=0)),
+        index=idx,
+        columns=["AAPL", "MSFT", "GOOG"],
+    )
+    return MarketData(close)
+
+
+def replay(market, engine):
+    for ts, row in zip(market.timestamps(), market.values()):
+        engine.push_bar(ts, row)
+    return engine.finalize()
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_matches_run_positions_only(compact):
+    market = make_market()
+    cfg = BacktestConfig(initial_cash=10_000.0, warmup_bars=3, history_lookback=8, compact_state=compact)
+    cm = SimpleBpsCost(fees_bps=2.0, slippage_bps=1.0)
+    ref = run_positions_only(market, MeanReversion(5), cfg, cost_model=cm)
+
+    strategy = MeanReversion(5)
+    res = replay(market, StreamingEngine(market.symbols(), strategy, cfg, cost_model=cm))
+    assert max(strategy.seen) == 8
+
+    pd.testing.assert_frame_equal(res.ledger, ref.ledger, check_freq=False)
+    pd.testing.assert_frame_equal(res.targets, ref.targets, check_freq=False)
+    pd.testing.assert_frame_equal(res.orders, ref.orders)
+    pd.testing.assert_frame_equal(res.fills, ref.fills)
+    pd.testing.assert_frame_equal(res.trades, ref.trades)
+
+
+def test_writer_receives_every_row_in_chunks():
+    market = make_market()
+    cfg = BacktestConfig(initial_cash=10_000.0, history_lookback=6)
+    ref = run_positions_only(market, MeanReversion(4), cfg)
+
+    chunks = {}
+    engine = StreamingEngine(
+        market.symbols(), MeanReversion(4), cfg,
+        writer=lambda kind, frame: chunks.setdefault(kind, []).append(frame),
+        flush_every=7,
+    )
+    assert replay(market, engine) is None
+    assert len(engine.recorders.ledger) == 0
+    assert max(len(f) for f in chunks["ledger"]) <= 7
+    pd.testing.assert_frame_equal(pd.concat(chunks["ledger"]), ref.ledger, check_freq=False)
+    pd.testing.assert_frame_equal(pd.concat(chunks["fills"]), ref.fills)
+
+
+def test_push_bar_accepts_mappings_and_checks_order():
+    engine = StreamingEngine(["AAPL", "MSFT"], MeanReversion(2), BacktestConfig(), lookback=2)
+    engine.push_bar("2024-01-02", {"AAPL": 10.0, "MSFT": 20.0})
+    with pytest.raises(ValueError):
+        engine.push_bar("2024-01-01", {"AAPL": 10.0})
+    with pytest.raises(ValueError):
+        engine.push_bar("2024-01-03", {"IBM": 10.0})
+    with pytest.raises(ValueError):
+        StreamingEngine(["AAPL"], MeanReversion(2), BacktestConfig())  # unbounded history
+
+
+def test_ring_history_keeps_last_bars_contiguous():
+    ring = RingHistory(["a", "b"], capacity=3)
+    assert ring.view().empty
+    idx = pd.date_range("2024-01-01", periods=5, freq="D", tz="UTC")
+    for k, ts in enumerate(idx):
+        ring.append(ts, np.array([k, 10.0 * k]))
+    view = ring.view()
+    assert view.values[:, 0].tolist() == [2.0, 3.0, 4.0]
+    assert view.values.base is not None  # a slice of the ring, not a copy
+    assert list(view.index) == list(idx[2:])
+    with pytest.raises(ValueError):
+        view.values[0, 0] = 1.0
+
+
+def test_impact_and_tiered_costs_match_run_positions_only():
+    rng = np.random.default_rng(4)
+    market = make_market()
+    volume = pd.DataFrame(rng.uniform(1e3, 5e3, size=(50, 3)), index=market.timestamps(), columns=market.symbols())
+    market = MarketData(market.close, volume=volume)
+    cfg = BacktestConfig(initial_cash=100_000.0, warmup_bars=3, history_lookback=8)
+
+    def stream(cm):
+        engine = StreamingEngine(market.symbols(), MeanReversion(5), cfg, cost_model=cm)
+        for i, ts in enumerate(market.timestamps()):
+            engine.push_bar(ts, market.row(i), fields={"volume": market.field_row("volume", i)})
+        return engine.finalize()
+
+    cm = SpreadImpactCost(coefficient=0.5, window=10, spread_bps=3.0, fallback_bps=15.0)
+    ref = run_positions_only(market, MeanReversion(5), cfg, cost_model=cm)
+    res = stream(cm)
+    assert len(res.fills) == len(ref.fills)
+    np.testing.assert_allclose(res.fills["slippage"], ref.fills["slippage"], rtol=1e-9)
+    assert (res.fills["slippage"] != res.fills["notional"] * 15e-4 + res.fills["notional"] * 1.5e-4).any()
+    with pytest.raises(ValueError):
+        engine = StreamingEngine(market.symbols(), MeanReversion(5), cfg, cost_model=cm)
+        engine.push_bar(market.timestamps()[0], market.row(0))  # no volume
+
+    # a second streamed run with the same schedule starts from zero monthly volume again
+    tiered = TieredFeeCost(venues={"us": [FeeTier(per_share=0.01), FeeTier(min_volume=2_000, per_share=0.001)]},
+                           default_venue="us")
+    first = stream(tiered)
+    pd.testing.assert_frame_equal(stream(tiered).fills, first.fills)
+    pd.testing.assert_frame_equal(first.fills, run_positions_only(market, MeanReversion(5), cfg, cost_model=tiered).fills)
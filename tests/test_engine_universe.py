@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from btlib.data import MarketData, Universe
+from btlib.engine import BacktestConfig, run_positions_only
+from btlib.costs import SimpleBpsCost
+
+
+class EqualWeightAll:
+    """Equal weight on every symbol with a finite last price, member or not"""
+    def on_bar(self, ts, data_upto_ts, state):
+        last = np.asarray(data_upto_ts.tail_values(1))[0]
+        names = [s for s, p in zip(data_upto_ts.columns, last) if np.isfinite(p)]
+        return {s: 1.0 / max(len(names), 1) for s in names}
+
+
+def make_market() -> MarketData:
+    rng = np.random.default_rng(7)
+    idx = pd.date_range("2024-01-01", periods=40, freq="D")
+    close = pd.DataFrame(
+        100.0 * np.exp(np.cumsum(rng.normal(0, 0.02, size=(40, 5)), axis=0)),
+        index=idx,
+        columns=["A", "B", "C", "D", "E"],
+    )
+    close.loc[idx[27]:, "D"] = np.nan  # delisted two bars after leaving the universe
+    return MarketData(close)
+
+
+def intervals(idx):
+    return pd.DataFrame({
+        "symbol": ["A", "B", "C", "D", "E", "E"],
+        "start": [idx[0], idx[0], idx[10], idx[0], idx[0], idx[30]],
+        "end": [None, idx[20], None, idx[25], idx[5], None],
+    })
+
+
+def test_universe_from_intervals():
+    market = make_market()
+    idx = market.timestamps()
+    uni = Universe.from_intervals(intervals(idx), idx, market.symbols())
+    assert uni.active_symbols(0) == ["A", "B", "D", "E"]
+    assert uni.active_symbols(12) == ["A", "B", "C", "D"]
+    assert uni.active_symbols(22) == ["A", "C", "D"]
+    assert uni.active_symbols(35) == ["A", "C", "E"]
+    assert uni.max_active() == 4
+    mask = uni.to_mask()
+    assert Universe.from_mask(mask, idx, market.symbols()).to_mask().tolist() == mask.tolist()
+    sub = uni.window(10, 30)
+    assert sub.active_symbols(0) == uni.active_symbols(10)
+    with pytest.raises(ValueError):
+        Universe.from_intervals(pd.DataFrame({"symbol": ["Z"], "start": [idx[0]], "end": [None]}), idx, market.symbols())
+
+
+def test_full_membership_matches_dense_run():
+    market = make_market().window(0, 24)
+    everyone = Universe.from_mask(np.ones((24, 5), dtype=bool), market.timestamps(), market.symbols())
+    cfg = BacktestConfig(initial_cash=10_000.0, compact_state=True, warmup_bars=2)
+    dense = run_positions_only(market, EqualWeightAll(), cfg, cost_model=SimpleBpsCost(fees_bps=2.0))
+    sparse = run_positions_only(market.with_universe(everyone), EqualWeightAll(), cfg,
+                                cost_model=SimpleBpsCost(fees_bps=2.0))
+    assert all(isinstance(dt, pd.SparseDtype) for dt in sparse.targets.dtypes)
+    pd.testing.assert_frame_equal(sparse.targets.sparse.to_dense(), dense.targets)
+    pd.testing.assert_frame_equal(sparse.ledger, dense.ledger)
+    pd.testing.assert_frame_equal(sparse.orders, dense.orders)
+    pd.testing.assert_frame_equal(sparse.fills, dense.fills)
+
+
+def test_only_members_are_traded():
+    market = make_market()
+    idx = market.timestamps()
+    cfg = BacktestConfig(initial_cash=10_000.0, min_order_notional=0.0)
+    res = run_positions_only(market.with_universe(intervals(idx)), EqualWeightAll(), cfg)
+    targets = res.targets.sparse.to_dense()
+    uni = Universe.from_intervals(intervals(idx), idx, market.symbols())
+    assert ((targets != 0.0).to_numpy() <= uni.to_mask()).all()
+    # C only trades once it joins, E is closed when it leaves and reopened when it rejoins
+    assert res.orders[res.orders["symbol"] == "C"].index.min() == idx[10]
+    e_orders = res.orders[res.orders["symbol"] == "E"]
+    assert e_orders.index.min() == idx[0]
+    assert not ((e_orders.index > idx[5]) & (e_orders.index < idx[30])).any()
+    # D is flattened when it leaves; its later NaN prices do not stop trading or marking
+    assert res.ledger["equity"].notna().all()
+    assert not res.orders[(res.orders["symbol"] == "D") & (res.orders.index > idx[25])].shape[0]
+
+
+def test_sparse_targets_memory():
+    market = make_market()
+    res = run_positions_only(market.with_universe(intervals(market.timestamps())), EqualWeightAll(),
+                             BacktestConfig(initial_cash=10_000.0))
+    assert res.targets.shape == (40, 5)
+    assert res.targets.sparse.density < 0.8
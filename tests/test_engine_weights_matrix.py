@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from btlib.data.market_data import MarketData
+from btlib.engine import BacktestConfig, run_positions_only, run_weights_matrix
+from btlib.costs import SimpleBpsCost
+
+
+class MatrixRowStrategy:
+    """Replays one row of a weight matrix per bar through the regular on_bar path"""
+    def __init__(self, weights: pd.DataFrame):
+        self.weights = weights
+
+    def on_bar(self, ts, data_upto_ts, state):
+        return self.weights.loc[ts].to_dict()
+
+
+def make_market() -> MarketData:
+    rng = np.random.default_rng(7)
+    idx = pd.date_range("2024-01-01", periods=40, freq="D")
+    close = pd.DataFrame(
+        100.0 * np.exp(np.cumsum(rng.normal(0, 0.02, size=(40, 4)), axis=0)),
+        index=idx,
+        columns=["MSFT", "AAPL", "GOOG", "AMZN"],
+    )
+    close.iloc[10, 2] = np.nan  # missing mark for an un-held symbol
+    return MarketData(close)
+
+
+def make_weights(market: MarketData) -> pd.DataFrame:
+    rng = np.random.default_rng(11)
+    w = rng.uniform(-0.6, 0.6, size=(len(market.timestamps()), len(market.symbols())))
+    w[::5] = 0.0       # periodic flattening
+    w[3, 0] = 2.5      # clipped
+    w[7, 1] = 0.0001   # below min notional
+    return pd.DataFrame(w, index=market.timestamps(), columns=market.symbols())
+
+
+@pytest.mark.parametrize("fractional", [True, False])
+def test_matches_run_positions_only(fractional):
+    market = make_market()
+    weights = make_weights(market)
+    cfg = BacktestConfig(initial_cash=50_000.0, warmup_bars=2, allow_fractional_shares=fractional)
+    cm = SimpleBpsCost(fees_bps=5.0, slippage_bps=2.0)
+
+    ref = run_positions_only(market, MatrixRowStrategy(weights), cfg, cost_model=cm)
+    vec = run_weights_matrix(market, weights, cfg, cost_model=cm)
+
+    pd.testing.assert_frame_equal(vec.ledger, ref.ledger, check_exact=False, rtol=1e-10)
+    pd.testing.assert_frame_equal(vec.targets, ref.targets, check_exact=False)
+    assert list(vec.orders.columns) == list(ref.orders.columns)
+    assert list(vec.orders.index) == list(ref.orders.index)
+    assert vec.orders["symbol"].tolist() == ref.orders["symbol"].tolist()
+    assert np.allclose(vec.orders["qty"].to_numpy(float), ref.orders["qty"].to_numpy(float))
+    assert list(vec.fills.columns) == list(ref.fills.columns)
+    assert vec.fills["symbol"].tolist() == ref.fills["symbol"].tolist()
+    for c in ["qty", "price", "fees", "slippage", "notional"]:
+        assert np.allclose(vec.fills[c].to_numpy(float), ref.fills[c].to_numpy(float))
+    assert len(vec.trades) == len(ref.trades)
+
+
+def test_missing_rows_and_columns_mean_flat():
+    market = make_market()
+    weights = pd.DataFrame({"AAPL": [1.0]}, index=market.timestamps()[:1])
+    res = run_weights_matrix(market, weights, BacktestConfig())
+
+    assert res.targets.shape == (len(market.timestamps()), len(market.symbols()))
+    assert res.targets["AAPL"].iloc[0] == 1.0
+    assert (res.targets.iloc[1:] == 0.0).all().all()
+    # bought on bar 1, sold back on bar 2
+    assert res.fills["qty"].iloc[0] > 0 and res.fills["qty"].iloc[1] < 0
+
+
+def test_rejects_unknown_symbols_and_nan_weights():
+    market = make_market()
+    with pytest.raises(ValueError):
+        run_weights_matrix(market, pd.DataFrame({"TSLA": [1.0]}, index=market.timestamps()[:1]), BacktestConfig())
+    bad = make_weights(market)
+    bad.iloc[4, 1] = np.nan
+    with pytest.raises(ValueError):
+        run_weights_matrix(market, bad, BacktestConfig())
+
+
+def test_held_symbol_missing_mark_gives_nan_ledger_and_no_orders():
+    idx = pd.date_range("2024-01-01", periods=4, freq="D")
+    close = pd.DataFrame({"AAPL": [100.0, 101.0, np.nan, 103.0]}, index=idx)
+    market = MarketData(close)
+    weights = pd.DataFrame({"AAPL": [1.0, 0.5, 0.0, 0.0]}, index=idx)
+
+    res = run_weights_matrix(market, weights, BacktestConfig(warmup_bars=0))
+    assert np.isnan(res.ledger["equity"].iloc[2])
+    assert idx[2] not in res.orders.index
+
+    with pytest.raises(ValueError):
+        run_weights_matrix(market, weights, BacktestConfig(warmup_bars=0, fail_on_missing_marks=True))
@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from btlib.core import Order, OrderType, Fill
+from btlib.data import MarketData
+from btlib.engine import BacktestConfig, run_positions_only
+from btlib.execution import ExecutionModel, NextCloseExecution, OrderBatch, FillBatch
+from btlib.costs import SimpleBpsCost
+
+
+class LegacyNextClose(ExecutionModel):
+    """NextCloseExecution written against the per-order interface only"""
+    def simulate_fills(self, ts_fill, orders, bar_prices):
+        fills = []
+        for o in orders:
+            px = bar_prices.get(o.symbol)
+            if px is None or not np.isfinite(px) or px <= 0:
+                continue
+            fills.append(Fill(ts=ts_fill, symbol=o.symbol, qty=o.qty, price=float(px), tag=o.tag))
+        return fills
+
+
+class HalfFill(ExecutionModel):
+    """Fills half of every order 1% through the close, in reverse order"""
+    def simulate_fills(self, ts_fill, orders, bar_prices):
+        return [Fill(ts=ts_fill, symbol=o.symbol, qty=o.qty / 2, price=bar_prices[o.symbol] * 1.01)
+                for o in reversed(orders) if np.isfinite(bar_prices[o.symbol])]
+
+
+class EqualWeight:
+    def on_bar(self, ts, data_upto_ts, state):
+        last = np.asarray(data_upto_ts.tail_values(1))[0]
+        names = [s for s, p in zip(data_upto_ts.columns, last) if np.isfinite(p)]
+        # rebalance towards a drifting mix so there are orders on most bars
+        return {s: (0.5 + 0.5 * ((k + len(data_upto_ts)) % 2)) / len(names) for k, s in enumerate(names)}
+
+
+def make_market(n=60, m=6, seed=5) -> MarketData:
+    rng = np.random.default_rng(seed)
+    idx = pd.date_range("2024-01-01", periods=n, freq="D")
+    close = pd.DataFrame(100.0 * np.exp(np.cumsum(rng.normal(0, 0.02, size=(n, m)), axis=0)),
+                         index=idx, columns=[f"S{j}" for j in range(m)])
+    close.iloc[10, 2] = np.nan
+    return MarketData(close)
+
+
+def test_next_close_batch_matches_per_order():
+    market = make_market()
+    bar = market.bar(10)
+    batch = OrderBatch(market.timestamps()[9], np.array([0, 2, 5, 0]), np.array([1.0, -2.0, 3.0, 4.0]))
+    fb = NextCloseExecution().simulate_fills_batch(market.timestamps()[10], batch, bar)
+    assert fb.filled.tolist() == [True, False, True, True]
+    np.testing.assert_array_equal(fb.qty, [1.0, 0.0, 3.0, 4.0])
+    assert fb.price[0] == bar["S0"] and np.isnan(fb.price[1])
+
+    adapted = LegacyNextClose().simulate_fills_batch(market.timestamps()[10], batch, bar)
+    np.testing.assert_array_equal(adapted.qty, fb.qty)
+    np.testing.assert_array_equal(adapted.price, fb.price)
+
+
+def test_adapter_maps_fills_back_to_orders():
+    market = make_market()
+    bar = market.bar(3)
+    batch = OrderBatch(market.timestamps()[2], np.array([1, 4]), np.array([10.0, -4.0]), np.array(["a", "b"], dtype=object))
+    assert [o.tag for o in batch.to_orders(market.symbols())] == ["a", "b"]
+    fb = HalfFill().simulate_fills_batch(market.timestamps()[3], batch, bar)
+    np.testing.assert_array_equal(fb.qty, [5.0, -2.0])
+    np.testing.assert_allclose(fb.price, [bar["S1"] * 1.01, bar["S4"] * 1.01])
+
+    class Stray(ExecutionModel):
+        def simulate_fills(self, ts_fill, orders, bar_prices):
+            return [Fill(ts=ts_fill, symbol="S0", qty=1.0, price=1.0)]
+
+    with pytest.raises(ValueError):
+        Stray().simulate_fills_batch(market.timestamps()[3], batch, bar)
+
+
+def test_batch_model_answers_per_order_calls_with_dicts():
+    ts = pd.Timestamp("2024-01-02")
+    orders = [Order(ts=ts, order_type=OrderType.MARKET, symbol=s, qty=q) for s, q in [("A", 1.0), ("B", 2.0), ("C", 3.0)]]
+    fills = NextCloseExecution().simulate_fills(ts, orders, {"A": 10.0, "B": np.nan})
+    assert [(f.symbol, f.qty, f.price) for f in fills] == [("A", 1.0, 10.0)]
+    assert len(FillBatch.none(3).qty) == 3
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_engine_results_match_legacy_model(compact):
+    market = make_market()
+    cfg = BacktestConfig(initial_cash=100_000.0, warmup_bars=2, compact_state=compact, fail_on_missing_marks=False)
+    cost = SimpleBpsCost(fees_bps=1.0, slippage_bps=2.0)
+    batch = run_positions_only(market, EqualWeight(), cfg, NextCloseExecution(), cost)
+    legacy = run_positions_only(market, EqualWeight(), cfg, LegacyNextClose(), cost)
+    assert len(batch.fills) > 50
+    pd.testing.assert_frame_equal(batch.fills, legacy.fills)
+    pd.testing.assert_frame_equal(batch.orders, legacy.orders)
+    pd.testing.assert_frame_equal(batch.ledger, legacy.ledger)
+
+    half = run_positions_only(market, EqualWeight(), cfg, HalfFill(), cost)
+    assert (half.fills["qty"].abs() > 0).all()
+    assert half.fills.index[0] == batch.fills.index[0]
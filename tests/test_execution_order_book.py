@@ -0,0 +1,185 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from btlib.core import Order, OrderType, OrderStatus, TimeInForce
+from btlib.data import MarketData, BarPrices
+from btlib.engine import BacktestConfig, run_positions_only
+from btlib.execution import NextCloseExecution, OrderBatch, OrderBook
+
+SYMBOLS = ["A", "B"]
+IOC = list(TimeInForce).index(TimeInForce.IOC)
+T0 = pd.Timestamp("2024-01-02 10:00")
+
+
+def bar(close, high=None, low=None) -> BarPrices:
+    close = np.asarray(close, dtype=float)
+    fields = {"high": np.asarray(high if high is not None else close, dtype=float),
+              "low": np.asarray(low if low is not None else close, dtype=float)}
+    return BarPrices(SYMBOLS, {s: j for j, s in enumerate(SYMBOLS)}, close, fields=fields)
+
+
+def order(sym, qty, order_type=OrderType.LIMIT, tif=TimeInForce.GTC, **prices) -> Order:
+    return Order(ts=T0, order_type=order_type, symbol=sym, qty=qty, tif=tif, **prices)
+
+
+def submit(book, *orders):
+    return book.submit(OrderBatch.from_orders(list(orders), {s: j for j, s in enumerate(SYMBOLS)}, T0))
+
+
+def step(book, ts, b):
+    book.begin_bar(ts)
+    ids, batch = book.candidates(b)
+    fills = NextCloseExecution().simulate_fills_batch(ts, batch, b)
+    book.settle(ids, fills)
+    return {int(i): (float(q), float(p)) for i, q, p in zip(ids, fills.qty, fills.price) if q != 0.0}
+
+
+def test_order_validation():
+    with pytest.raises(ValueError):
+        order("A", 1.0)  # LIMIT without a limit price
+    with pytest.raises(ValueError):
+        order("A", 1.0, OrderType.MARKET, limit_price=10.0)
+    with pytest.raises(ValueError):
+        order("A", 1.0, OrderType.STOP_LIMIT, stop_price=10.0)
+    assert order("A", 1.0, OrderType.STOP_LIMIT, stop_price=10.0, limit_price=10.5).tif is TimeInForce.GTC
+
+
+def test_limits_rest_until_the_range_reaches_them():
+    book = OrderBook(SYMBOLS)
+    buy, sell = submit(book, order("A", 10.0, limit_price=95.0), order("A", -5.0, limit_price=110.0))
+    t1 = T0 + pd.Timedelta("5min")
+    ids, batch = book.candidates(bar([100.0, 50.0], high=[104.0, 51.0], low=[96.0, 49.0]))
+    assert len(ids) == 0 and book.resting() == 2
+
+    # low touches the buy limit but the close is above it: candidate, not filled at the close
+    assert step(book, t1, bar([97.0, 50.0], high=[100.0, 51.0], low=[94.0, 49.0])) == {}
+    assert step(book, t1 + pd.Timedelta("5min"), bar([94.5, 50.0], low=[94.0, 49.0])) == {int(buy): (10.0, 94.5)}
+    assert book.status(int(buy)) is OrderStatus.FILLED
+    assert step(book, t1 + pd.Timedelta("10min"), bar([111.0, 50.0])) == {int(sell): (-5.0, 111.0)}
+    assert len(book) == 0 and book.resting() == 0
+
+
+def test_stops_convert_when_triggered():
+    book = OrderBook(SYMBOLS)
+    stop, stop_limit = submit(
+        book,
+        order("B", 3.0, OrderType.STOP, stop_price=55.0),
+        order("B", -2.0, OrderType.STOP_LIMIT, stop_price=45.0, limit_price=44.0),
+    )
+    t = T0 + pd.Timedelta("5min")
+    # high crosses the buy stop but the bar closes below it: the stop is now a market order
+    assert step(book, t, bar([50.0, 54.0], high=[50.0, 56.0], low=[50.0, 53.0])) == {int(stop): (3.0, 54.0)}
+    # low crosses the sell stop; the close is below the stop-limit's limit, so it rests as a limit
+    assert step(book, t + pd.Timedelta("5min"), bar([50.0, 43.0], low=[50.0, 42.0])) == {}
+    assert book.to_frame().loc[int(stop_limit), "order_type"] is OrderType.LIMIT
+    assert step(book, t + pd.Timedelta("10min"), bar([50.0, 44.5])) == {int(stop_limit): (-2.0, 44.5)}
+
+
+def test_time_in_force():
+    book = OrderBook(SYMBOLS)
+    ioc, day, gtc = submit(
+        book,
+        order("A", 1.0, tif=TimeInForce.IOC, limit_price=90.0),
+        order("A", 1.0, tif=TimeInForce.DAY, limit_price=90.0),
+        order("A", 1.0, tif=TimeInForce.GTC, limit_price=90.0),
+    )
+    far = bar([100.0, 50.0])
+    step(book, T0 + pd.Timedelta("5min"), far)
+    step(book, T0 + pd.Timedelta("10min"), far)
+    assert book.status(int(ioc)) is OrderStatus.CANCELED
+    assert book.status(int(day)) is OrderStatus.CREATED
+    expired = book.begin_bar(pd.Timestamp("2024-01-03 09:30"))
+    assert expired.tolist() == [int(day)] and book.status(int(day)) is OrderStatus.EXPIRED
+    assert book.status(int(gtc)) is OrderStatus.CREATED and len(book) == 1
+    assert book.cancel([gtc]) == 1 and len(book) == 0
+
+
+def test_ioc_market_orders_skip_the_indexes():
+    book = OrderBook(SYMBOLS)
+    gtc = submit(book, order("A", 4.0, limit_price=90.0))[0]
+    n = 5
+    quick = book.submit(OrderBatch(T0, np.array([0, 1, 0, 1, 0]), np.array([1.0, -2.0, 3.0, 4.0, -5.0]),
+                                   tif=np.full(n, IOC, dtype=np.int8)))
+    assert book.resting() == 1 and len(book._market) == 0 and len(book) == n + 1
+    assert book.cancel([quick[4]]) == 1
+
+    book.begin_bar(T0 + pd.Timedelta("5min"))
+    b = bar([100.0, 50.0])
+    ids, batch = book.candidates(b)
+    np.testing.assert_array_equal(ids, quick[:4])
+    # a partial fill of the first order and nothing for the third: both are cancelled by end_bar
+    fills = NextCloseExecution().simulate_fills_batch(T0, batch, b)
+    fills.qty[0], fills.qty[2] = 0.5, 0.0
+    np.testing.assert_array_equal(book.settle(ids, fills), [False, True, False, True])
+    assert book.status(int(quick[0])) is OrderStatus.PARTIALLY_FILLED
+    np.testing.assert_array_equal(np.sort(book.end_bar()), quick[[0, 2]])
+    statuses = [book.status(int(i)).name for i in quick]
+    assert statuses == ["CANCELED", "FILLED", "CANCELED", "FILLED", "CANCELED"]
+    assert len(book) == 1 and book.status(int(gtc)) is OrderStatus.CREATED
+
+    # without end_bar, the next begin_bar cancels them; compaction keeps the ids of the next batch in step
+    book.submit(OrderBatch(T0, np.array([1]), np.array([1.0]), tif=np.full(1, IOC, dtype=np.int8)))
+    book.compact()
+    assert book.n == 2 and book.to_frame()["qty"].tolist() == [4.0, 1.0]
+    book.begin_bar(T0 + pd.Timedelta("10min"))
+    ids, _ = book.candidates(b)
+    assert ids.tolist() == [1]
+    assert book.begin_bar(T0 + pd.Timedelta("15min")).tolist() == [1]
+    assert book.status(1) is OrderStatus.CANCELED and len(book) == 1
+
+
+def test_many_resting_orders_and_compaction():
+    rng = np.random.default_rng(0)
+    book = OrderBook(SYMBOLS)
+    n = 6000
+    limits = np.round(rng.uniform(50.0, 90.0, n), 2)
+    batch = OrderBatch(T0, rng.integers(0, 2, n), np.ones(n), order_type=np.full(n, 1, dtype=np.int8),
+                       limit_price=limits, stop_price=np.full(n, np.nan), tif=np.full(n, 1, dtype=np.int8))
+    book.submit(batch)
+    ts = T0
+    for k in range(5):
+        ts += pd.Timedelta("5min")
+        book.begin_bar(ts)
+        ids, _ = book.candidates(bar([100.0, 100.0]))
+        assert len(ids) == 0
+    # a dip to 60 on A: exactly the A buy limits at or above 60 are candidates, in submission order
+    dip = bar([60.0, 100.0], low=[60.0, 100.0])
+    ids, cand = book.candidates(dip)
+    expected = np.flatnonzero((batch.sids == 0) & (limits >= 60.0))
+    np.testing.assert_array_equal(ids, expected)
+    fills = NextCloseExecution().simulate_fills_batch(ts, cand, dip)
+    assert book.settle(ids, fills).all()
+    book.compact()
+    assert book.n == len(book) == n - len(expected)
+    ids, _ = book.candidates(bar([55.0, 100.0], low=[55.0, 100.0]))
+    assert len(ids) == int(((batch.sids == 0) & (limits >= 55.0) & (limits < 60.0)).sum())
+
+
+class BuyTheDip:
+    """Rests one GTC buy limit 3% under the first close, then holds"""
+    def __init__(self):
+        self.sent = False
+
+    def on_bar(self, ts, data_upto_ts, state):
+        if self.sent:
+            return []
+        self.sent = True
+        px = float(data_upto_ts.tail_values(1)[0, 0])
+        return [Order(ts=ts, order_type=OrderType.LIMIT, symbol="A", qty=10.0,
+                      limit_price=round(px * 0.97, 2), tif=TimeInForce.GTC, tag="dip")]
+
+
+def test_engine_rests_strategy_orders():
+    idx = pd.date_range("2024-01-01", periods=6, freq="D")
+    close = pd.DataFrame({"A": [100.0, 99.0, 98.0, 96.0, 97.0, 99.0]}, index=idx)
+    low = pd.DataFrame({"A": [99.0, 98.0, 97.5, 96.5, 96.0, 98.0]}, index=idx)
+    market = MarketData(close, high=close + 1.0, low=low)
+    res = run_positions_only(market, BuyTheDip(), BacktestConfig(initial_cash=10_000.0))
+    assert len(res.orders) == 1
+    row = res.orders.iloc[0]
+    assert row["order_type"] is OrderType.LIMIT and row["tif"] is TimeInForce.GTC and row["limit_price"] == 97.0
+    # the low first reaches 97 on bar 2 but the close (98) is above the limit; bar 3 closes at 96
+    assert res.fills.index.tolist() == [idx[3]]
+    assert res.fills.iloc[0]["price"] == 96.0 and res.fills.iloc[0]["tag"] == "dip"
+    assert res.ledger["n_positions"].iloc[-1] == 1
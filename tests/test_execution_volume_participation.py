@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from btlib.core import Order, OrderType, OrderStatus, TimeInForce
+from btlib.data import MarketData, BarPrices
+from btlib.engine import BacktestConfig, run_positions_only
+from btlib.execution import OrderBatch, OrderBook, VolumeParticipationExecution
+
+SYMBOLS = ["A", "B", "C"]
+T0 = pd.Timestamp("2024-01-02 10:00")
+
+
+def bar(close, volume) -> BarPrices:
+    return BarPrices(SYMBOLS, {s: j for j, s in enumerate(SYMBOLS)}, np.asarray(close, dtype=float),
+                     fields={"volume": np.asarray(volume, dtype=float)})
+
+
+def test_cap_is_shared_first_come_first_served():
+    model = VolumeParticipationExecution(max_participation=0.1)
+    batch = OrderBatch(T0, np.array([0, 1, 0, 2, 0]), np.array([30.0, -5.0, -50.0, 7.0, 40.0]))
+    fb = model.simulate_fills_batch(T0, batch, bar([10.0, 20.0, np.nan], [500.0, 1000.0, 1000.0]))
+    # A: cap 50 -> 30 to the first order, 20 to the second, none to the third; C has no price
+    np.testing.assert_array_equal(fb.qty, [30.0, -5.0, -20.0, 0.0, 0.0])
+    np.testing.assert_array_equal(fb.price[:3], [10.0, 20.0, 10.0])
+    assert np.isnan(fb.price[3:]).all()
+
+    whole = VolumeParticipationExecution(max_participation=0.1, whole_shares=True)
+    fb = whole.simulate_fills_batch(T0, OrderBatch(T0, np.array([1]), np.array([100.0])), bar([1.0, 1.0, 1.0], [0.0, 55.0, 0.0]))
+    assert fb.qty.tolist() == [5.0]
+
+    with pytest.raises(ValueError):
+        VolumeParticipationExecution(max_participation=1.5)
+    no_volume = BarPrices.from_row(SYMBOLS, [1.0, 1.0, 1.0])
+    with pytest.raises(ValueError):
+        model.simulate_fills_batch(T0, batch, no_volume)
+
+
+def test_remainder_carries_until_time_in_force_runs_out():
+    book = OrderBook(SYMBOLS)
+    orders = [Order(ts=T0, order_type=OrderType.MARKET, symbol="A", qty=100.0, tif=TimeInForce.DAY),
+              Order(ts=T0, order_type=OrderType.MARKET, symbol="B", qty=-100.0, tif=TimeInForce.GTC)]
+    day, gtc = book.submit(OrderBatch.from_orders(orders, {s: j for j, s in enumerate(SYMBOLS)}, T0))
+    model = VolumeParticipationExecution(max_participation=0.5)
+    b = bar([10.0, 10.0, 10.0], [60.0, 60.0, 60.0])
+    for k in (1, 2):
+        book.begin_bar(T0 + pd.Timedelta(minutes=5 * k))
+        ids, batch = book.candidates(b)
+        book.settle(ids, model.simulate_fills_batch(T0, batch, b))
+        assert book.end_bar().size == 0
+    frame = book.to_frame()
+    assert frame["filled"].tolist() == [60.0, -60.0]
+    assert (frame["status"] == OrderStatus.PARTIALLY_FILLED).all()
+    np.testing.assert_array_equal(book.open_qty(), [40.0, -40.0, 0.0])
+
+    # the next session: the DAY remainder expires, the GTC one fills
+    expired = book.begin_bar(pd.Timestamp("2024-01-03 10:00"))
+    assert expired.tolist() == [int(day)] and book.status(int(day)) is OrderStatus.EXPIRED
+    busy = bar([10.0, 10.0, 10.0], [80.0, 80.0, 80.0])
+    ids, batch = book.candidates(busy)
+    assert book.settle(ids, model.simulate_fills_batch(T0, batch, busy)).all()
+    assert book.status(int(gtc)) is OrderStatus.FILLED and len(book) == 0
+
+
+def test_ioc_remainder_is_cancelled_at_the_end_of_its_bar():
+    book = OrderBook(SYMBOLS)
+    (oid,) = book.submit(OrderBatch(T0, np.array([2]), np.array([100.0]), tif=np.array([2], dtype=np.int8)))
+    b = bar([10.0, 10.0, 10.0], [0.0, 0.0, 100.0])
+    book.begin_bar(T0 + pd.Timedelta("5min"))
+    ids, batch = book.candidates(b)
+    book.settle(ids, VolumeParticipationExecution().simulate_fills_batch(T0, batch, b))
+    assert book.status(int(oid)) is OrderStatus.PARTIALLY_FILLED
+    assert book.end_bar().tolist() == [int(oid)] and book.status(int(oid)) is OrderStatus.CANCELED
+    assert book.open_qty().sum() == 0.0
+
+
+class AllIn:
+    def on_bar(self, ts, data_upto_ts, state):
+        return {"A": 1.0}
+
+
+def flat_market(n=8, volume=200.0) -> MarketData:
+    idx = pd.date_range("2024-01-01", periods=n, freq="D")
+    close = pd.DataFrame({"A": np.full(n, 10.0), "B": np.full(n, 5.0)}, index=idx)
+    return MarketData(close, volume=pd.DataFrame(volume, index=idx, columns=close.columns))
+
+
+@pytest.mark.parametrize("tif", [TimeInForce.IOC, TimeInForce.GTC])
+def test_engine_builds_a_large_position_over_several_bars(tif):
+    cfg = BacktestConfig(initial_cash=1_000.0, allow_fractional_shares=False, rebalance_tif=tif)
+    res = run_positions_only(flat_market(), AllIn(), cfg, VolumeParticipationExecution(max_participation=0.25))
+    # 100 shares wanted, 50 per bar: two bars of fills, never more than the target
+    assert res.fills["qty"].tolist() == [50.0, 50.0]
+    assert res.fills["status"].tolist() == [OrderStatus.PARTIALLY_FILLED, OrderStatus.FILLED]
+    assert res.ledger["cash"].iloc[-1] == 0.0
+    orders = res.orders
+    if tif is TimeInForce.GTC:
+        # one order, carried over in the book
+        assert orders["qty"].tolist() == [100.0] and orders["status"].tolist() == [OrderStatus.FILLED]
+    else:
+        # each bar re-sizes the rest of the target as a new IOC order
+        assert orders["qty"].tolist() == [100.0, 50.0]
+        assert orders["status"].tolist() == [OrderStatus.CANCELED, OrderStatus.FILLED]
+    assert orders["filled_qty"].sum() == 100.0
+
+
+def test_next_close_orders_report_filled_status():
+    cfg = BacktestConfig(initial_cash=1_000.0)
+    res = run_positions_only(flat_market(), AllIn(), cfg)
+    assert res.orders["status"].tolist() == [OrderStatus.FILLED]
+    assert res.orders["filled_qty"].tolist() == res.orders["qty"].tolist()
+    assert (res.fills["status"] == OrderStatus.FILLED).all()
@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+import pyarrow.parquet as pq
+
+from btlib.data.arrow_io import read_arrow, read_parquet, write_arrow, write_parquet, write_partitioned
+from btlib.data.market_data import MarketData
+
+
+def make_market(tz=None) -> MarketData:
+    rng = np.random.default_rng(1)
+    idx = pd.date_range("2021-11-01", periods=120, freq="D", tz=tz)
+    close = pd.DataFrame(rng.uniform(10, 20, size=(120, 3)), index=idx, columns=["AAPL", "MSFT", "GOOG"])
+    close.iloc[5, 1] = np.nan
+    return MarketData(close)
+
+
+def test_parquet_round_trip_with_symbol_and_range_selection(tmp_path):
+    market = make_market()
+    path = tmp_path / "close.parquet"
+    write_parquet(market, path, row_group_size=16)
+
+    out = read_parquet(path, symbols=["GOOG", "AAPL"], start="2021-12-15", end="2022-01-10")
+    expected = market.close.loc["2021-12-15":"2022-01-10", ["GOOG", "AAPL"]]
+    pd.testing.assert_frame_equal(out.close, expected, check_freq=False)
+    pd.testing.assert_frame_equal(MarketData.from_parquet(path).close, market.close, check_freq=False)
+
+    with pytest.raises(ValueError):
+        read_parquet(path, symbols=["IBM"])
+
+
+def test_unsorted_parquet_is_sorted_on_load(tmp_path):
+    market = make_market()
+    shuffled = market.close.sample(frac=1.0, random_state=0)
+    table = pa.table({"ts": pa.array(shuffled.index), **{s: shuffled[s].to_numpy() for s in shuffled.columns}})
+    pq.write_table(table, tmp_path / "raw.parquet")  # no sorting metadata
+
+    out = read_parquet(tmp_path / "raw.parquet", start="2021-12-01")
+    pd.testing.assert_frame_equal(out.close, market.close.loc["2021-12-01":], check_freq=False)
+
+
+@pytest.mark.parametrize("tz", [None, "America/New_York"])
+def test_arrow_ipc_slices_sorted_files(tmp_path, tz):
+    market = make_market(tz)
+    path = tmp_path / "close.arrow"
+    write_arrow(market, path)
+
+    out = MarketData.from_arrow(path, symbols=["MSFT"], start="2021-11-03", end="2021-11-20")
+    pd.testing.assert_frame_equal(out.close, market.close.loc["2021-11-03":"2021-11-20", ["MSFT"]], check_freq=False)
+    assert read_arrow(path).close.index.tz == market.close.index.tz
+
+
+def _root(arr: np.ndarray):
+    while isinstance(arr, np.ndarray) and arr.base is not None:
+        arr = arr.base
+    return arr
+
+
+def test_arrow_ipc_columns_are_not_copied_when_contiguous(tmp_path):
+    market = make_market()
+    path = tmp_path / "close.arrow"
+    write_arrow(market, path)
+    out = read_arrow(path, start="2021-11-10")
+    # a single float64 chunk is wrapped in place: the column's memory is the Arrow buffer
+    assert all(isinstance(_root(out.close[s].to_numpy()), pa.Array) for s in out.symbols())
+
+    # several record batches cannot be viewed as one array: copied once, values unchanged
+    table = pa.table({"ts": pa.array(market.close.index), **{s: market.close[s].to_numpy() for s in market.symbols()}})
+    with pa.OSFile(str(tmp_path / "batches.arrow"), "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        for batch in table.to_batches(max_chunksize=50):
+            writer.write_batch(batch)
+    out = read_arrow(tmp_path / "batches.arrow")
+    assert not isinstance(_root(out.close["AAPL"].to_numpy()), pa.Array)
+    pd.testing.assert_frame_equal(out.close, market.close, check_freq=False)
+
+
+def test_partitioned_directory_reads_only_requested_partitions(tmp_path):
+    market = make_market()
+    write_partitioned(market, tmp_path / "prices")
+    assert sorted(p.name for p in (tmp_path / "prices" / "symbol=AAPL").iterdir()) == ["year=2021", "year=2022"]
+
+    out = MarketData.from_partitioned(tmp_path / "prices", symbols=["MSFT", "AAPL"], start="2022-01-05", end="2022-02-01")
+    pd.testing.assert_frame_equal(out.close, market.close.loc["2022-01-05":"2022-02-01", ["MSFT", "AAPL"]], check_freq=False)
+
+    everything = MarketData.from_partitioned(tmp_path / "prices")
+    pd.testing.assert_frame_equal(everything.close, market.close[["AAPL", "GOOG", "MSFT"]], check_freq=False)
@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from btlib.data import MarketData, align_asof
+from btlib.engine import BacktestConfig, run_positions_only
+
+
+def make_market() -> MarketData:
+    idx = pd.date_range("2024-01-01", periods=60, freq="D")
+    close = pd.DataFrame(100.0 + np.arange(60 * 3).reshape(60, 3), index=idx, columns=["A", "B", "C"])
+    return MarketData(close)
+
+
+def fundamentals(seed: int = 3) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    rows = 40
+    return pd.DataFrame({
+        "symbol": rng.choice(["A", "B", "C", "Z"], size=rows),
+        "ts": pd.Timestamp("2023-12-20") + pd.to_timedelta(rng.integers(0, 80 * 24, size=rows), unit="h"),
+        "value": rng.normal(size=rows),
+    })
+
+
+def expected_merge_asof(data: pd.DataFrame, idx: pd.DatetimeIndex, symbols: list[str], lag) -> np.ndarray:
+    data = data.assign(available=data["ts"] + pd.Timedelta(lag)).sort_values("available")
+    bars = pd.DataFrame({"bar_ts": idx})
+    out = np.full((len(idx), len(symbols)), np.nan)
+    for j, sym in enumerate(symbols):
+        rows = data[data["symbol"] == sym]
+        joined = pd.merge_asof(bars, rows[["available", "value"]], left_on="bar_ts", right_on="available")
+        out[:, j] = joined["value"].to_numpy()
+    return out
+
+
+@pytest.mark.parametrize("lag", ["0s", "36h", "10D"])
+def test_matches_merge_asof_with_lag(lag):
+    market = make_market()
+    data = fundamentals()
+    got = align_asof(data, market.timestamps(), market.symbols(), lag=lag)
+    want = expected_merge_asof(data, market.timestamps(), market.symbols(), lag)
+    np.testing.assert_array_equal(got, want)
+
+
+def test_wide_frame_publication_column_and_max_age():
+    market = make_market()
+    idx = market.timestamps()
+    wide = pd.DataFrame({"A": [1.0, np.nan, 3.0], "B": [10.0, 20.0, np.nan]},
+                        index=pd.DatetimeIndex(["2024-01-05", "2024-01-10", "2024-01-20"]))
+    got = align_asof(wide, idx, market.symbols(), lag="1D")
+    assert np.isnan(got[idx.get_loc(pd.Timestamp("2024-01-05")), 0])
+    assert got[idx.get_loc(pd.Timestamp("2024-01-06")), 0] == 1.0
+    assert got[idx.get_loc(pd.Timestamp("2024-01-20")), 0] == 1.0  # NaN observations do not overwrite
+    assert got[idx.get_loc(pd.Timestamp("2024-01-21")), 0] == 3.0
+    assert got[-1, 1] == 20.0
+    assert np.isnan(got[:, 2]).all()
+
+    aged = align_asof(wide, idx, market.symbols(), lag="1D", max_age="5D")
+    assert aged[idx.get_loc(pd.Timestamp("2024-01-11")), 0] == 1.0
+    assert np.isnan(aged[idx.get_loc(pd.Timestamp("2024-01-12")), 0])
+
+    long = pd.DataFrame({"symbol": ["A", "A"], "ts": pd.to_datetime(["2024-01-02", "2024-01-03"]),
+                         "published": pd.to_datetime(["2024-01-15", pd.NaT]), "value": [1.0, 2.0]})
+    got = align_asof(long, idx, market.symbols(), lag="2D", available_column="published")
+    assert got[idx.get_loc(pd.Timestamp("2024-01-05")), 0] == 2.0
+    assert got[idx.get_loc(pd.Timestamp("2024-01-15")), 0] == 1.0  # latest published wins
+    with pytest.raises(ValueError):
+        align_asof(long.assign(published=pd.Timestamp("2023-01-01")), idx, market.symbols(),
+                   available_column="published")
+
+
+def test_dataset_survives_window_and_history_view():
+    market = make_market().with_dataset("eps", fundamentals(), lag="2D")
+    assert market.datasets() == ["eps"]
+    with pytest.raises(ValueError):
+        market.with_dataset("close", fundamentals())
+    sub = market.window(10, 40)
+    np.testing.assert_array_equal(sub.dataset("eps"), market.dataset("eps")[10:40])
+    view = market.history(20, lookback=5)
+    np.testing.assert_array_equal(view.data("eps").values, market.dataset("eps")[16:21])
+    assert view.data("eps").values.flags.writeable is False
+    with pytest.raises(KeyError):
+        view.data("missing")
+
+
+class RecordEps:
+    """Weights from the last visible eps; remembers what it saw"""
+    def __init__(self):
+        self.seen = {}
+
+    def on_bar(self, ts, data_upto_ts, state):
+        eps = data_upto_ts.data("eps")
+        assert eps.index[-1] == ts
+        self.seen[ts] = eps.tail_values(1)[0].copy()
+        last = np.nan_to_num(self.seen[ts])
+        return {s: 0.3 for s, v in zip(data_upto_ts.columns, last) if v > 0}
+
+
+def test_engine_sees_only_published_values():
+    data = fundamentals()
+    market = make_market().with_dataset("eps", data, lag="3D")
+    strat = RecordEps()
+    run_positions_only(market, strat, BacktestConfig(initial_cash=10_000.0))
+    idx = market.timestamps()
+    available = data["ts"] + pd.Timedelta("3D")
+    for ts, row in strat.seen.items():
+        for j, sym in enumerate(market.symbols()):
+            visible = data[(data["symbol"] == sym) & (available <= ts)]
+            if visible.empty:
+                assert np.isnan(row[j])
+            else:
+                assert row[j] == visible.loc[available[visible.index].idxmax(), "value"]
+    assert len(strat.seen) == len(idx)
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from btlib.data.cache import PriceCache, frame_fetcher
+
+
+def make_source() -> pd.DataFrame:
+    idx = pd.bdate_range("2020-01-01", "2022-12-31")
+    rng = np.random.default_rng(2)
+    return pd.DataFrame(rng.uniform(10, 20, size=(len(idx), 3)), index=idx, columns=["AAPL", "MSFT", "GOOG"])
+
+
+class CountingFetcher:
+    def __init__(self, source):
+        self.fetch = frame_fetcher({"close": source})
+        self.calls = []
+
+    def __call__(self, symbols, start, end, field):
+        self.calls.append((tuple(symbols), start, end))
+        return self.fetch(symbols, start, end, field)
+
+
+def test_fetches_only_missing_ranges_and_merges(tmp_path):
+    source = make_source()
+    fetcher = CountingFetcher(source)
+    cache = PriceCache(tmp_path, fetcher)
+
+    first = cache.get(["AAPL", "MSFT"], "2021-01-01", "2021-07-01")
+    pd.testing.assert_frame_equal(first, source.loc["2021-01-01":"2021-06-30", ["AAPL", "MSFT"]], check_freq=False)
+    assert len(fetcher.calls) == 1
+
+    fetcher.calls.clear()
+    wider = cache.get(["AAPL", "MSFT", "GOOG"], "2020-06-01", "2022-01-01")
+    pd.testing.assert_frame_equal(wider, source.loc["2020-06-01":"2021-12-31"], check_freq=False)
+    # both edges for the cached pair (batched), the whole range for the new symbol
+    ts = pd.Timestamp
+    assert sorted(fetcher.calls) == sorted([
+        (("AAPL", "MSFT"), ts("2020-06-01"), ts("2021-01-01")),
+        (("AAPL", "MSFT"), ts("2021-07-01"), ts("2022-01-01")),
+        (("GOOG",), ts("2020-06-01"), ts("2022-01-01")),
+    ])
+    # adjacent coverage is merged into one partition per series
+    assert len(cache._partitions("AAPL", "close")) == 1
+    assert cache.missing("AAPL", "2020-06-01", "2022-01-01") == []
+
+
+def test_reopened_cache_serves_without_fetcher(tmp_path):
+    source = make_source()
+    PriceCache(tmp_path, CountingFetcher(source)).get(["GOOG"], "2020-01-01", "2021-01-01")
+
+    offline = PriceCache(tmp_path)
+    out = offline.get(["GOOG"], "2020-03-01", "2020-04-01")
+    pd.testing.assert_frame_equal(out, source.loc["2020-03-01":"2020-03-31", ["GOOG"]], check_freq=False)
+    assert offline.market(["GOOG"], "2020-03-01", "2020-04-01").symbols() == ["GOOG"]
+    with pytest.raises(KeyError):
+        offline.get(["GOOG"], "2020-06-01", "2021-06-01")
+
+
+def test_lru_eviction_respects_size_cap(tmp_path):
+    source = make_source()
+    cache = PriceCache(tmp_path, CountingFetcher(source))
+    cache.get(["AAPL"], "2020-01-01", "2021-01-01")
+    one_series = cache.nbytes
+
+    cache = PriceCache(tmp_path, CountingFetcher(source), max_bytes=int(2.5 * one_series))
+    cache.get(["MSFT"], "2020-01-01", "2021-01-01")
+    cache.get(["AAPL"], "2020-01-01", "2021-01-01")  # AAPL is now more recent than MSFT
+    cache.get(["GOOG"], "2020-01-01", "2021-01-01")
+    assert cache.nbytes <= cache.max_bytes
+    assert cache.missing("MSFT", "2020-01-01", "2021-01-01") != []
+    assert cache.missing("AAPL", "2020-01-01", "2021-01-01") == []
+    assert not any((tmp_path / "close" / "MSFT").iterdir())
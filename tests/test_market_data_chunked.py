@@ -0,0 +1,153 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from btlib.costs import SimpleBpsCost, SpreadImpactCost
+from btlib.data import BlockStore, BlockStoreWriter, ChunkedMarketData, ParquetBarWriter, write_block_store
+from btlib.data.market_data import MarketData
+from btlib.engine import BacktestConfig, run_chunked, run_positions_only
+
+
+class Breakout:
+    """Long symbols at their lookback high, flat otherwise"""
+    def __init__(self, lookback: int):
+        self.lookback = lookback
+
+    def on_bar(self, ts, data_upto_ts, state):
+        px = data_upto_ts.tail_values(self.lookback)
+        if len(px) < self.lookback:
+            return {}
+        at_high = px[-1] >= px.max(axis=0)
+        return {s: 0.3 for s, hit in zip(data_upto_ts.columns, at_high) if hit}
+
+
+def make_market(tz=None) -> MarketData:
+    rng = np.random.default_rng(8)
+    idx = pd.date_range("2024-01-02 09:30", periods=95, freq="min", tz=tz)
+    close = pd.DataFrame(
+        100.0 * np.exp(np.cumsum(rng.normal(0, 0.003, size=(95, 4)), axis=0)),
+        index=idx,
+        columns=["AAPL", "MSFT", "GOOG", "AMZN"],
+    )
+    return MarketData(close)
+
+
+def make_ohlcv_market() -> MarketData:
+    market = make_market()
+    rng = np.random.default_rng(9)
+    volume = pd.DataFrame(rng.uniform(1e3, 5e3, size=market.values().shape), index=market.timestamps(),
+                          columns=market.symbols())
+    return MarketData(market.close, high=market.close * 1.001, low=market.close * 0.999, volume=volume)
+
+
+def test_block_store_round_trip(tmp_path):
+    market = make_market("America/New_York")
+    with BlockStoreWriter(tmp_path, market.symbols()) as w:
+        w.append(market.close.iloc[:40])
+        w.append(market.close.iloc[40:])
+        with pytest.raises(ValueError):
+            w.append(market.close.iloc[10:20])  # not after the last bar
+    store = BlockStore(tmp_path)
+    assert store.symbols() == market.symbols()
+    pd.testing.assert_index_equal(store.timestamps(), market.timestamps(), check_exact=True, exact=False)
+    np.testing.assert_array_equal(store.read(30, 50), market.values()[30:50])
+
+
+def test_blocks_hold_current_block_plus_tail(tmp_path):
+    market = make_market()
+    write_block_store(market, tmp_path, dtype=np.float32)
+    chunked = ChunkedMarketData.open(tmp_path, block_bars=20, lookback=6)
+    blocks = list(chunked.blocks())
+    assert [b.start for b in blocks] == [0, 20, 40, 60, 80]
+    assert [b.offset for b in blocks] == [0, 6, 6, 6, 6]
+    assert max(len(b.index) for b in blocks) == 26
+    assert blocks[-1].stop == len(market.timestamps())
+    np.testing.assert_array_equal(blocks[2].values, market.values()[34:60].astype(np.float32))
+
+
+@pytest.mark.parametrize("block_bars", [7, 20, 200])
+def test_run_chunked_matches_run_positions_only(tmp_path, block_bars):
+    market = make_market()
+    write_block_store(market, tmp_path)
+    cfg = BacktestConfig(initial_cash=10_000.0, warmup_bars=2, history_lookback=5)
+    cm = SimpleBpsCost(fees_bps=1.0)
+    ref = run_positions_only(market, Breakout(5), cfg, cost_model=cm)
+
+    chunked = ChunkedMarketData.open(tmp_path, block_bars=block_bars, lookback=4)
+    res = run_chunked(chunked, Breakout(5), cfg, cost_model=cm)
+    pd.testing.assert_frame_equal(res.ledger, ref.ledger, check_freq=False)
+    pd.testing.assert_frame_equal(res.orders, ref.orders)
+    pd.testing.assert_frame_equal(res.fills, ref.fills)
+
+    chunks = []
+    assert run_chunked(chunked, Breakout(5), cfg, cost_model=cm, flush_every=30,
+                       writer=lambda kind, f: chunks.append(f) if kind == "ledger" else None) is None
+    pd.testing.assert_frame_equal(pd.concat(chunks), ref.ledger, check_freq=False)
+
+
+def test_run_chunked_requires_a_covering_tail(tmp_path):
+    write_block_store(make_market(), tmp_path)
+    chunked = ChunkedMarketData.open(tmp_path, block_bars=10, lookback=2)
+    with pytest.raises(ValueError):
+        run_chunked(chunked, Breakout(5), BacktestConfig(history_lookback=5))
+    with pytest.raises(ValueError):
+        run_chunked(chunked, Breakout(5), BacktestConfig())
+
+
+def test_block_store_keeps_other_fields(tmp_path):
+    market = make_ohlcv_market()
+    write_block_store(market, tmp_path)
+    store = BlockStore(tmp_path)
+    assert store.fields() == ["high", "low", "close", "volume"]
+    np.testing.assert_array_equal(store.read(10, 30, "volume"), market.field("volume")[10:30])
+    with pytest.raises(ValueError):
+        with BlockStoreWriter(tmp_path / "partial", market.symbols(), fields=("close", "volume")) as w:
+            w.append(market.close)  # volume missing
+
+    chunked = ChunkedMarketData.open(tmp_path, block_bars=20, lookback=6, fields=("close", "volume"))
+    blocks = list(chunked.blocks())
+    assert sorted(blocks[2].fields) == ["volume"]
+    np.testing.assert_array_equal(blocks[2].field("volume"), market.field("volume")[34:60])
+
+
+def test_run_chunked_with_market_impact(tmp_path):
+    market = make_ohlcv_market()
+    write_block_store(market, tmp_path)
+    cfg = BacktestConfig(initial_cash=100_000.0, warmup_bars=2, history_lookback=5)
+    cm = SpreadImpactCost(coefficient=0.5, window=10, spread_bps=3.0, fallback_bps=15.0)
+    ref = run_positions_only(market, Breakout(5), cfg, cost_model=cm)
+
+    res = run_chunked(ChunkedMarketData.open(tmp_path, block_bars=20, lookback=4), Breakout(5), cfg, cost_model=cm)
+    np.testing.assert_allclose(res.fills["slippage"], ref.fills["slippage"], rtol=1e-9)
+    with pytest.raises(ValueError):
+        run_chunked(ChunkedMarketData.open(tmp_path, block_bars=20, lookback=4, fields=("close",)),
+                    Breakout(5), cfg, cost_model=cm)
+
+
+def test_chunked_over_partitioned_bars(tmp_path):
+    pytest.importorskip("pyarrow")
+    market = make_ohlcv_market()
+    frames = {f: market.field_frame(f) for f in ("high", "low", "close", "volume")}
+    frames["open"] = market.close
+    bars = pd.concat({f: frame.stack() for f, frame in frames.items()}, axis=1).rename_axis(["ts", "symbol"])
+    bars = bars.drop(index=(market.timestamps()[30], "MSFT")).reset_index()
+    writer = ParquetBarWriter(tmp_path)
+    writer("1min", bars.iloc[:200])
+    writer("1min", bars.iloc[200:])
+    close = market.close.copy()
+    close.loc[market.timestamps()[30], "MSFT"] = np.nan
+
+    chunked = ChunkedMarketData.from_partitioned(tmp_path / "1min", fields=("close", "volume"), block_bars=20,
+                                                 lookback=4)
+    assert chunked.symbols() == sorted(market.symbols())
+    pd.testing.assert_index_equal(chunked.timestamps(), market.timestamps(), exact=False)
+    blocks = list(chunked.blocks())
+    got = np.concatenate([b.values[b.offset:] for b in blocks])
+    np.testing.assert_array_equal(got, close[chunked.symbols()].to_numpy())
+
+    cfg = BacktestConfig(initial_cash=100_000.0, warmup_bars=2, history_lookback=5)
+    cm = SpreadImpactCost(coefficient=0.5, window=10, spread_bps=3.0, fallback_bps=15.0)
+    ref = run_positions_only(MarketData(close, volume=market.field_frame("volume")), Breakout(5), cfg, cost_model=cm)
+    res = run_chunked(chunked, Breakout(5), cfg, cost_model=cm)
+    pd.testing.assert_frame_equal(res.ledger, ref.ledger, check_freq=False)
+    np.testing.assert_allclose(res.fills["slippage"], ref.fills["slippage"], rtol=1e-9)
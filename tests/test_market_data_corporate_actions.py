@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from btlib.data import MarketData, adjust_prices
+
+
+def _raw():
+    idx = pd.date_range("2024-01-01", periods=8, freq="D")
+    close = pd.DataFrame(
+        {
+            "A": [100.0, 102.0, 104.0, 52.0, 53.0, 54.0, 55.0, 56.0],
+            "B": [50.0, 51.0, np.nan, 49.0, 50.0, 51.0, 52.0, 53.0],
+        },
+        index=idx,
+    )
+    splits = pd.DataFrame({"symbol": ["A"], "ex_date": [idx[3]], "ratio": [2.0]})
+    dividends = pd.DataFrame({
+        "symbol": ["A", "B", "B", "ZZZ"],
+        "ex_date": [idx[6], idx[3], idx[5] + pd.Timedelta(hours=12), idx[2]],
+        "amount": [1.1, 0.5, 0.26, 1.0],
+    })
+    return close, splits, dividends
+
+
+def _reference(close, splits, dividends):
+    """Row-by-row adjustment: walk back from each event and scale earlier rows"""
+    back = close.copy()
+    total = close.copy()
+    for _, ev in splits.iterrows():
+        if ev.symbol not in close.columns:
+            continue
+        before = close.index < ev.ex_date
+        back.loc[before, ev.symbol] /= ev.ratio
+        total.loc[before, ev.symbol] /= ev.ratio
+    for _, ev in dividends.iterrows():
+        if ev.symbol not in close.columns:
+            continue
+        before = close.index < ev.ex_date
+        prev = close.loc[before, ev.symbol].dropna().iloc[-1]
+        total.loc[before, ev.symbol] *= 1 - ev.amount / prev
+    return back, total
+
+
+def test_matches_row_by_row_reference():
+    close, splits, dividends = _raw()
+    adj = adjust_prices(close, splits, dividends)
+    back, total = _reference(close, splits, dividends)
+    pd.testing.assert_frame_equal(adj.back_adjusted, back, check_freq=False)
+    pd.testing.assert_frame_equal(adj.total_return, total, check_freq=False)
+    # last bar is on the current share basis
+    assert adj.total_return.iloc[-1].equals(close.iloc[-1])
+    # the split no longer shows up as a -50% return
+    assert adj.back_adjusted["A"].pct_change().iloc[3] == pytest.approx(0.0)
+
+
+def test_total_return_includes_dividends():
+    close, _, dividends = _raw()
+    adj = adjust_prices(close, dividends=dividends)
+    a = adj.total_return["A"]
+    raw = close["A"]
+    # the ex-date return is measured from the prior close less the dividend
+    assert a.iloc[6] / a.iloc[5] == pytest.approx(raw.iloc[6] / (raw.iloc[5] - 1.1))
+    assert np.isnan(adj.total_return.loc[close.index[2], "B"])
+
+
+def test_cache_roundtrip(tmp_path):
+    close, splits, dividends = _raw()
+    first = adjust_prices(close, splits, dividends, cache_dir=tmp_path)
+    files = list(tmp_path.glob("adjusted-*.npz"))
+    assert len(files) == 1
+    again = adjust_prices(MarketData(close), splits, dividends, cache_dir=tmp_path)
+    pd.testing.assert_frame_equal(first.total_return, again.total_return)
+    adjust_prices(close, splits, dividends.iloc[:1], cache_dir=tmp_path)
+    assert len(list(tmp_path.glob("adjusted-*.npz"))) == 2
+    md = again.market("back_adjusted")
+    assert md.symbols() == ["A", "B"]
+
+
+def test_rejects_bad_events():
+    close, splits, dividends = _raw()
+    with pytest.raises(ValueError):
+        adjust_prices(close, splits=splits.drop(columns="ratio"))
+    with pytest.raises(ValueError):
+        adjust_prices(close, splits=splits.assign(ratio=0.0))
+    with pytest.raises(ValueError):
+        adjust_prices(close, dividends=dividends.assign(amount=500.0))
@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from btlib.data.market_data import MarketData
+from btlib.data.history import HistoryView
+from btlib.engine import BacktestConfig, run_positions_only
+
+
+def make_market() -> MarketData:
+    idx = pd.date_range("2024-01-01", periods=5, freq="D")
+    close = pd.DataFrame(
+        {"AAPL": [100.0, 101.0, np.nan, 103.0, 104.0], "MSFT": [200.0, 201.0, 202.0, 203.0, 204.0]},
+        index=idx,
+    )
+    return MarketData(close)
+
+
+def test_view_matches_slice_upto():
+    md = make_market()
+    window = md.history_window()
+    for i, ts in enumerate(md.timestamps()):
+        view = window.view(i)
+        expected = md.slice_upto(ts)
+        assert len(view) == len(expected)
+        assert view.index.equals(expected.index)
+        assert np.array_equal(view.values, expected.to_numpy(dtype=float), equal_nan=True)
+        pd.testing.assert_frame_equal(view.to_frame(), expected)
+
+
+def test_view_is_read_only_and_shares_buffer():
+    md = make_market()
+    view = md.history(2)
+    assert np.shares_memory(view.values, md.values())
+    with pytest.raises(ValueError):
+        view.values[0, 0] = 1.0
+    assert view.last_ts == md.timestamps()[2]
+
+
+def test_bounded_lookback_and_tail():
+    md = make_market()
+    view = md.history(4, lookback=2)
+    assert list(view.index) == list(md.timestamps()[3:5])
+    assert view.tail_values(5, columns=["MSFT"]).ravel().tolist() == [203.0, 204.0]
+    assert view.column("AAPL").tolist() == [103.0, 104.0]
+
+
+def test_empty_view_before_first_bar():
+    md = make_market()
+    view = md.history_window().view(-1)
+    assert view.empty
+    assert list(view.columns) == md.symbols()
+
+
+def test_dataframe_api_is_delegated():
+    md = make_market()
+    view = md.history(3)
+    assert view.to_frame() is view.to_frame()  # built once
+    assert view["MSFT"].iloc[-1] == 203.0
+    assert view.iloc[-1]["MSFT"] == 203.0
+
+
+def test_engine_passes_bounded_views():
+    seen = []
+
+    class Recorder:
+        def on_bar(self, ts, data_upto_ts, state):
+            assert isinstance(data_upto_ts, HistoryView)
+            assert data_upto_ts.last_ts == ts
+            seen.append(len(data_upto_ts))
+            return {}
+
+    md = make_market()
+    run_positions_only(md, Recorder(), BacktestConfig(history_lookback=3))
+    assert seen == [1, 2, 3, 3, 3]
+
+
+def test_frame_style_strategy_runs_unchanged():
+    class MeanReversion:
+        """Written against slice_upto() frames: tail(), reductions and arithmetic on the history"""
+        def on_bar(self, ts, data_upto_ts, state):
+            if len(data_upto_ts) < 2:
+                return {}
+            mean = data_upto_ts.tail(2).mean()
+            rel = (data_upto_ts / 2).iloc[-1] * 2 / mean - 1.0
+            return {s: (0.2 if r < 0 else 0.4) for s, r in rel.items() if np.isfinite(r)}
+
+    md = make_market()
+    view = md.history(3)
+    pd.testing.assert_frame_equal(view.tail(2), md.slice_upto(md.timestamps()[3]).tail(2))
+    pd.testing.assert_frame_equal(np.log(view), np.log(view.to_frame()))
+    assert np.asarray(view) is view.values
+    assert (view - view.to_frame()).abs().max().max() == 0.0
+    frame = view.to_frame()
+    pd.testing.assert_frame_equal(view == 101.0, frame == 101.0)
+    pd.testing.assert_frame_equal(view != 101.0, frame != 101.0)
+    pd.testing.assert_frame_equal(view == view, frame == frame)
+    pd.testing.assert_frame_equal(view != frame, frame != frame)
+    with pytest.raises(TypeError):
+        hash(view)
+
+    strat = MeanReversion()
+    res = run_positions_only(md, strat, BacktestConfig())
+    for ts in md.timestamps():
+        targets = strat.on_bar(ts, md.slice_upto(ts), None)
+        for s, w in targets.items():
+            assert res.targets.loc[ts, s] == pytest.approx(w)
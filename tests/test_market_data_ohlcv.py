@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from btlib.data.market_data import MarketData
+from btlib.engine import BacktestConfig, run_positions_only
+
+
+def make_frames() -> dict[str, pd.DataFrame]:
+    rng = np.random.default_rng(4)
+    idx = pd.date_range("2024-01-01", periods=20, freq="D")
+    close = pd.DataFrame(100 + rng.normal(0, 1, size=(20, 2)).cumsum(axis=0), index=idx, columns=["AAPL", "MSFT"])
+    return {
+        "open": close.shift(1).fillna(close),
+        "high": close + 1.0,
+        "low": close - 1.0,
+        "close": close,
+        "volume": pd.DataFrame(rng.integers(1_000, 5_000, size=(20, 2)), index=idx, columns=["AAPL", "MSFT"]),
+    }
+
+
+def test_fields_are_aligned_arrays_with_row_access():
+    frames = make_frames()
+    # columns in a different order and rows reversed are aligned to close
+    high = frames["high"][["MSFT", "AAPL"]].iloc[::-1]
+    market = MarketData(frames["close"], high=high, volume=frames["volume"])
+
+    assert market.fields() == ["high", "close", "volume"]
+    np.testing.assert_array_equal(market.field("high"), frames["high"].to_numpy())
+    row = market.field_row("volume", 3)
+    np.testing.assert_array_equal(row, frames["volume"].iloc[3].to_numpy(dtype=float))
+    assert row.base is not None and not row.flags.writeable
+    assert np.shares_memory(market.close.to_numpy(), market.values())
+    pd.testing.assert_frame_equal(market.field_frame("high"), frames["high"].astype(float))
+    with pytest.raises(KeyError):
+        market.field("open")
+
+
+def test_float32_storage_halves_memory():
+    frames = make_frames()
+    full = MarketData.from_ohlcv(frames)
+    compact = MarketData.from_ohlcv({k.upper(): v for k, v in frames.items()}, dtype=np.float32)
+    assert compact.fields() == ["open", "high", "low", "close", "volume"]
+    assert compact.field("close").dtype == np.float32
+    assert compact.nbytes * 2 == full.nbytes
+    np.testing.assert_allclose(compact.values(), full.values(), rtol=1e-6)
+
+    # the engine runs on float32 storage
+    class Hold:
+        def on_bar(self, ts, data_upto_ts, state):
+            return {"AAPL": 0.5}
+    res = run_positions_only(compact, Hold(), BacktestConfig())
+    assert np.isfinite(res.ledger["equity"]).all()
+
+
+def test_windows_slice_every_field_and_multiindex_input():
+    frames = make_frames()
+    multi = pd.concat({k.capitalize(): v for k, v in frames.items()}, axis=1)  # yfinance-style columns
+    market = MarketData.from_ohlcv(multi)
+    sub = market.window(5, 10)
+    np.testing.assert_array_equal(sub.field("low"), market.field("low")[5:10])
+    assert np.shares_memory(sub.field("low"), market.field("low"))
+
+
+def test_mismatched_fields_raise():
+    frames = make_frames()
+    with pytest.raises(ValueError):
+        MarketData(frames["close"], open=frames["open"].iloc[1:])
+    with pytest.raises(ValueError):
+        MarketData(frames["close"], low=frames["low"][["AAPL"]])
+    with pytest.raises(TypeError):
+        MarketData(frames["close"], dtype=np.int32)
@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from btlib.core import PortfolioState, ArrayPortfolioState, Order
+from btlib.core.enums import OrderType
+from btlib.data import MarketData, BarPrices
+from btlib.engine import BacktestConfig
+from btlib.engine.rebalance import targets_to_orders
+from btlib.execution import NextCloseExecution
+
+
+def _market(n=6, m=5, seed=0):
+    rng = np.random.default_rng(seed)
+    idx = pd.date_range("2024-01-01", periods=n, freq="D")
+    close = pd.DataFrame(100 + rng.normal(0, 5, size=(n, m)), index=idx, columns=[f"S{k}" for k in range(m)][::-1])
+    close.iloc[2, 1] = np.nan
+    close.iloc[3, 2] = -1.0
+    return MarketData(close)
+
+
+def test_bar_matches_price_dict():
+    market = _market()
+    for i, ts in enumerate(market.timestamps()):
+        bar = market.bar(i)
+        expected = market.close.loc[ts].to_dict()
+        assert set(bar) == set(expected)
+        for sym, px in expected.items():
+            assert sym in bar
+            assert (np.isnan(px) and np.isnan(bar[sym])) or bar.get(sym) == px
+        assert market.get_price_dict(ts) == pytest.approx(expected, nan_ok=True)
+    assert market.bar(0).get("ZZZ") is None
+    assert "ZZZ" not in market.bar(0)
+
+
+def test_valid_mask_and_positions():
+    market = _market()
+    mask = market.valid_mask()
+    assert not mask.flags.writeable
+    assert not mask[2, 1] and not mask[3, 2]
+    assert mask.sum() == mask.size - 2
+    ts = market.timestamps()[3]
+    assert market.position(ts) == 3
+    assert market.row(3) is not None and not market.row(3).flags.writeable
+    assert market.symbol_index()["S4"] == 0
+    assert market.tradable_symbols(market.timestamps()[2]) == ["S4", "S2", "S1", "S0"]
+    with pytest.raises(KeyError):
+        market.position(pd.Timestamp("1990-01-01"))
+    assert market.window(2, 5).valid_mask().shape == (3, 5)
+
+
+@pytest.mark.parametrize("fractional", [True, False])
+@pytest.mark.parametrize("compact", [False, True])
+def test_targets_to_orders_bar_matches_dict(fractional, compact):
+    market = _market(seed=3)
+    cfg = BacktestConfig(min_order_notional=50.0, allow_fractional_shares=fractional, max_abs_weight=0.4)
+    rng = np.random.default_rng(1)
+    for i, ts in enumerate(market.timestamps()):
+        targets = {s: float(w) for s, w in zip(market.symbols(), rng.uniform(-0.6, 0.6, len(market.symbols())))}
+
+        def state():
+            if compact:
+                st = ArrayPortfolioState(ts, 10_000.0, market.symbols())
+                st.apply_fill("S0", 10.0, 100.0)
+            else:
+                st = PortfolioState(ts=ts, cash=9_000.0, positions={})
+                st.get_position("S0").qty = 10.0
+                st.get_position("S0").avg_price = 100.0
+            return st
+
+        expected = targets_to_orders(ts, targets, state(), market.get_price_dict(ts), cfg)
+        got = targets_to_orders(ts, targets, state(), market.bar(i), cfg)
+        assert [(o.symbol, o.qty) for o in got] == [(o.symbol, o.qty) for o in expected]
+
+
+def test_targets_to_orders_bar_rejects_unknown_and_nan():
+    market = _market()
+    ts = market.timestamps()[0]
+    st = PortfolioState(ts=ts, cash=1000.0, positions={})
+    with pytest.raises(ValueError):
+        targets_to_orders(ts, {"ZZZ": 0.1}, st, market.bar(0), BacktestConfig())
+    with pytest.raises(ValueError):
+        targets_to_orders(ts, {"S1": np.nan}, st, market.bar(0), BacktestConfig())
+
+
+def test_next_close_fills_from_bar():
+    market = _market()
+    ts = market.timestamps()[2]
+    orders = [Order(ts=ts, order_type=OrderType.MARKET, symbol=s, qty=1.0) for s in ["S0", "S3", "ZZZ"]]
+    fills = NextCloseExecution().simulate_fills(ts, orders, market.bar(2))
+    assert [f.symbol for f in fills] == ["S0"]
+    assert fills[0].price == market.close.loc[ts, "S0"]
+
+
+def test_bar_prices_from_row():
+    bar = BarPrices.from_row(["B", "A"], np.array([1.0, np.nan]))
+    assert bar.is_valid("B") and not bar.is_valid("A") and not bar.is_valid("C")
+    assert list(bar.order) == [1, 0]
+    assert bar.to_dict()["B"] == 1.0
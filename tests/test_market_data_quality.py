@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from btlib.data import MarketData
+from btlib.data.validators import validate_price_frame
+
+
+def _close():
+    idx = pd.date_range("2024-01-01", periods=10, freq="D")
+    return pd.DataFrame(
+        {
+            # listed from bar 2, one 2-bar gap at bars 5-6
+            "A": [np.nan, np.nan, 10, 11, 12, np.nan, np.nan, 13, 14, 15],
+            # stale for bars 1-5, non-positive at bar 8
+            "B": [5, 6, 6, 6, 6, 6, 7, 8, -1, 9],
+            # never valid
+            "C": [np.nan] * 10,
+        },
+        index=idx,
+        dtype=float,
+    )
+
+
+def test_tradable_ids_per_bar():
+    q = MarketData(_close()).quality()
+    assert q.tradable_symbols(0) == ["B"]
+    assert q.tradable_symbols(2) == ["A", "B"]
+    assert q.tradable_symbols(8) == ["A"]
+    assert q.n_tradable(5) == 1
+    for i in range(10):
+        assert list(q.tradable_ids(i)) == list(np.flatnonzero(q.valid[i]))
+
+
+def test_first_last_valid_and_gaps():
+    md = MarketData(_close())
+    q = md.quality()
+    assert q.first_valid_bar("A") == 2 and q.last_valid_bar("A") == 9
+    assert q.first_valid_bar("C") is None and q.last_valid_bar("C") is None
+    gaps = q.gaps()
+    assert gaps["symbol"].tolist() == ["A", "B"]
+    assert gaps["bars"].tolist() == [2, 1]
+    assert gaps.iloc[0]["start"] == md.timestamps()[5]
+    assert gaps.iloc[0]["end"] == md.timestamps()[6]
+    with pytest.raises(KeyError):
+        q.first_valid_bar("Z")
+
+
+def test_stale_runs_and_report():
+    md = MarketData(_close())
+    stale = md.quality(stale_bars=5).stale_runs()
+    assert stale["symbol"].tolist() == ["B"]
+    assert stale.iloc[0]["bars"] == 5
+    assert stale.iloc[0]["start"] == md.timestamps()[1]
+    assert md.quality(stale_bars=6).stale_runs().empty
+
+    report = md.quality().report()
+    assert report.loc["A", "coverage"] == pytest.approx(0.6)
+    assert report.loc["A", "listed_coverage"] == pytest.approx(6 / 8)
+    assert report.loc["A", "n_gaps"] == 1 and report.loc["A", "max_gap"] == 2
+    assert report.loc["B", "max_stale_run"] == 5
+    assert report.loc["C", "coverage"] == 0.0 and pd.isna(report.loc["C", "first_valid"])
+
+
+def test_quality_is_built_once():
+    md = MarketData(_close())
+    assert md.quality() is md.quality()
+    assert md.quality().valid is md.valid_mask()
+
+
+def test_validate_min_coverage():
+    close = _close()
+    validate_price_frame(close)
+    with pytest.raises(ValueError, match="C"):
+        validate_price_frame(close, min_coverage=0.5)
+    validate_price_frame(close[["A", "B"]], min_coverage=0.5)
+    with pytest.raises(ValueError):
+        MarketData(close, min_coverage=0.1)
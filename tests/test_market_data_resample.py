@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from btlib.data import BarResampler, resample_stream, iter_csv, bars_to_wide
+
+
+def make_ticks(n=2000, tz=None, seed=0):
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp("2024-03-08 14:00", tz=tz)
+    ts = start + pd.to_timedelta(np.sort(rng.integers(0, 3 * 24 * 3600, n)), unit="s")
+    return pd.DataFrame({
+        "ts": ts,
+        "symbol": rng.choice(["AAA", "BBB", "CCC"], n),
+        "price": 100 + rng.normal(0, 1, n).cumsum(),
+        "size": rng.integers(1, 100, n).astype(float),
+    })
+
+
+def pandas_reference(ticks, freq, tz=None):
+    frames = []
+    for sym, g in ticks.groupby("symbol"):
+        s = g.set_index("ts")
+        if tz is not None:
+            s.index = s.index.tz_convert(tz)
+        r = s["price"].resample(freq)
+        bars = pd.DataFrame({
+            "open": r.first(), "high": r.max(), "low": r.min(), "close": r.last(),
+            "volume": s["size"].resample(freq).sum(),
+        }).dropna(subset=["close"])
+        bars["symbol"] = sym
+        frames.append(bars.reset_index())
+    out = pd.concat(frames).sort_values(["ts", "symbol"]).reset_index(drop=True)
+    return out[["ts", "symbol", "open", "high", "low", "close", "volume"]]
+
+
+def chunks(frame, size):
+    for k in range(0, len(frame), size):
+        yield frame.iloc[k:k + size]
+
+
+@pytest.mark.parametrize("freq", ["5min", "1h", "1D"])
+@pytest.mark.parametrize("chunk", [13, 97, 10_000])
+def test_matches_pandas_resample(freq, chunk):
+    ticks = make_ticks()
+    out = pd.concat(list(BarResampler(freq).resample(chunks(ticks, chunk))), ignore_index=True)
+    pd.testing.assert_frame_equal(out, pandas_reference(ticks, freq), check_dtype=False)
+
+
+def test_session_daily_in_exchange_tz():
+    ticks = make_ticks(tz="UTC")
+    r = BarResampler("1D", tz="America/New_York")
+    out = pd.concat(list(r.resample(chunks(ticks, 333))), ignore_index=True)
+    ref = pandas_reference(ticks, "1D", tz="America/New_York")
+    pd.testing.assert_frame_equal(out, ref, check_dtype=False)
+    assert str(out["ts"].dt.tz) == "America/New_York"
+
+
+def test_minute_bars_to_hourly_in_one_pass():
+    ticks = make_ticks()
+    minute = pd.concat(list(BarResampler("1min").resample([ticks])), ignore_index=True)
+    got = {}
+    resample_stream(chunks(minute, 50), {"1h": BarResampler("1h"), "4h": BarResampler("4h")},
+                    lambda name, bars: got.setdefault(name, []).append(bars))
+    for freq in ("1h", "4h"):
+        out = pd.concat(got[freq], ignore_index=True)
+        pd.testing.assert_frame_equal(out, pandas_reference(ticks, freq), check_dtype=False)
+
+
+def test_rejects_out_of_order_chunks():
+    ticks = make_ticks()
+    r = BarResampler("1h")
+    r.push(ticks.iloc[100:200])
+    with pytest.raises(ValueError):
+        r.push(ticks.iloc[:100])
+
+
+def test_csv_to_parquet_roundtrip(tmp_path):
+    pytest.importorskip("pyarrow")
+    from btlib.data import ParquetBarWriter, read_bars
+    ticks = make_ticks()
+    path = tmp_path / "ticks.csv"
+    ticks.to_csv(path, index=False)
+    resample_stream(iter_csv(path, chunksize=300), {"1h": BarResampler("1h")}, ParquetBarWriter(tmp_path / "bars"))
+    md = read_bars(tmp_path / "bars" / "1h")
+    ref = pandas_reference(ticks, "1h")
+    expected = bars_to_wide(ref, "close")
+    pd.testing.assert_frame_equal(md.close, expected, check_freq=False, check_names=False, check_index_type=False)
+    assert md.fields() == ["open", "high", "low", "close", "volume"]
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from btlib.core import ArrayPortfolioState, PortfolioState, Fill
+from btlib.data.market_data import MarketData
+from btlib.engine import BacktestConfig, run_positions_only
+from btlib.engine.accounting import apply_fill, mark_to_market
+from btlib.costs import SimpleBpsCost
+
+SYMBOLS = ["AAPL", "MSFT", "GOOG"]
+
+
+def test_apply_fills_matches_dict_accounting():
+    rng = np.random.default_rng(3)
+    ts = pd.Timestamp("2024-01-01")
+    ref = PortfolioState(ts=ts, cash=10_000.0, positions={})
+    arr = ArrayPortfolioState(ts=ts, cash=10_000.0, symbols=SYMBOLS)
+
+    # open, add, reduce, close and flip, including repeated symbols in one batch
+    for _ in range(20):
+        sids = rng.integers(0, len(SYMBOLS), size=4)
+        qty = rng.choice([-15.0, -5.0, 5.0, 10.0], size=4)
+        px = rng.uniform(50.0, 150.0, size=4)
+        for j, q, p in zip(sids, qty, px):
+            apply_fill(ref, Fill(ts=ts, symbol=SYMBOLS[j], qty=q, price=p, fees=0.5))
+        arr.apply_fills(sids, qty, px, fees=0.5)
+
+    assert arr.cash == pytest.approx(ref.cash)
+    for j, sym in enumerate(SYMBOLS):
+        pos = ref.positions.get(sym)
+        assert arr.qty[j] == pytest.approx(0.0 if pos is None else pos.qty)
+        if pos is not None:
+            assert arr.avg_price[j] == pytest.approx(pos.avg_price)
+
+
+def test_mark_returns_all_aggregates():
+    ts = pd.Timestamp("2024-01-01")
+    arr = ArrayPortfolioState(ts=ts, cash=1_000.0, symbols=SYMBOLS)
+    arr.apply_fill("AAPL", 10.0, 100.0)
+    arr.apply_fill("MSFT", -5.0, 200.0)
+    arr.apply_fill("AAPL", -4.0, 110.0)
+
+    pf = mark_to_market(arr, np.array([120.0, 190.0, np.nan]))  # un-held NaN is fine
+    assert pf["net_exposure"] == pytest.approx(6 * 120.0 - 5 * 190.0)
+    assert pf["gross_exposure"] == pytest.approx(6 * 120.0 + 5 * 190.0)
+    assert pf["equity"] == pytest.approx(arr.cash + pf["net_exposure"])
+    assert pf["leverage"] == pytest.approx(pf["gross_exposure"] / pf["equity"])
+    assert pf["realized_pnl"] == pytest.approx(4 * 10.0)
+    assert pf["unrealized_pnl"] == pytest.approx(6 * 20.0 + 5 * 10.0)
+    assert pf["n_positions"] == 2
+
+    # dict marks give the same result
+    assert arr.mark({"AAPL": 120.0, "MSFT": 190.0}) == pf
+    with pytest.raises(KeyError):
+        arr.equity({"AAPL": 120.0})
+    with pytest.raises(ValueError):
+        arr.mark(np.array([np.nan, 190.0, 1.0]))
+
+
+def test_engine_compact_state_matches_dict_state():
+    rng = np.random.default_rng(5)
+    idx = pd.date_range("2024-01-01", periods=30, freq="D")
+    close = pd.DataFrame(100 + rng.normal(0, 1, size=(30, 3)).cumsum(axis=0), index=idx, columns=SYMBOLS)
+    market = MarketData(close)
+    weights = pd.DataFrame(rng.uniform(-0.3, 0.3, size=(30, 3)), index=idx, columns=SYMBOLS)
+
+    class Replay:
+        def on_bar(self, ts, data_upto_ts, state):
+            return weights.loc[ts].to_dict()
+
+    cm = SimpleBpsCost(fees_bps=3.0, slippage_bps=1.0)
+    ref = run_positions_only(market, Replay(), BacktestConfig(), cost_model=cm)
+    out = run_positions_only(market, Replay(), BacktestConfig(compact_state=True), cost_model=cm)
+
+    pd.testing.assert_frame_equal(out.ledger, ref.ledger, check_exact=False, rtol=1e-10)
+    assert np.allclose(out.fills["qty"].to_numpy(float), ref.fills["qty"].to_numpy(float))
@@ -150,3 +150,31 @@ def test_omitted_symbol_flattens_existing_holding():
 
     assert "MSFT" in od
     assert math.isclose(od["MSFT"].qty, -10.0, rel_tol=0, abs_tol=1e-9)
+
+
+def test_bar_path_registers_the_same_flat_positions_as_dict_path():
+    from btlib.data.bar import BarPrices
+
+    ts = pd.Timestamp("2024-01-02")
+    symbols = ["A", "B", "C", "D"]
+    prices = {"A": 100.0, "B": 50.0, "C": float("nan"), "D": 20.0}
+    bar = BarPrices(symbols, {s: j for j, s in enumerate(symbols)}, np.array([prices[s] for s in symbols]))
+    cfg = _cfg(min_order_notional=0.0)
+    targets = {"A": 0.3, "B": 0.0, "C": 0.2}
+
+    by_dict = PortfolioState(ts=ts, cash=1000.0, positions={})
+    by_dict.get_position("D").qty = 5.0
+    by_bar = PortfolioState(ts=ts, cash=1000.0, positions={})
+    by_bar.get_position("D").qty = 5.0
+    expected = targets_to_orders(ts, targets, by_dict, prices, cfg)
+    orders = targets_to_orders(ts, targets, by_bar, bar, cfg)
+
+    assert [(o.symbol, o.qty) for o in orders] == [(o.symbol, o.qty) for o in expected]
+    # flat B is tradable but gets no order: both paths still register it, C (no mark) is skipped
+    assert sorted(by_bar.positions) == sorted(by_dict.positions) == ["A", "B", "D"]
+    # so a later missing mark for B is caught on both paths
+    later = {"A": 101.0, "B": float("nan"), "C": 10.0, "D": 21.0}
+    with pytest.raises(ValueError):
+        by_dict.equity(later)
+    with pytest.raises(ValueError):
+        by_bar.equity(BarPrices(symbols, bar.index, np.array([later[s] for s in symbols])))
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+
+from btlib.core.enums import OrderStatus, OrderType
+from btlib.reporting.reporting import build_fills, build_ledger, build_orders, build_targets
+from btlib.reporting.recorders import (
+    FillsRecorder,
+    LedgerRecorder,
+    OrdersRecorder,
+    ResultRecorders,
+    SparseTargetsRecorder,
+    TargetsRecorder,
+)
+
+SYMBOLS = ["AAPL", "MSFT"]
+IDX = pd.date_range("2024-01-01", periods=3, freq="D")
+
+
+def test_ledger_matches_row_builder():
+    rows = []
+    rec = LedgerRecorder(capacity=3)
+    for k, ts in enumerate(IDX):
+        row = {"ts": ts, "cash": 100.0 - k, "equity": 100.0 + k, "gross_exposure": 1.0 * k,
+               "net_exposure": -1.0 * k, "leverage": 0.01 * k, "n_positions": k}
+        rows.append(row)
+        rec.record(**row)
+    pd.testing.assert_frame_equal(rec.to_frame(), build_ledger(rows), check_freq=False)
+
+
+def test_targets_dense_rows():
+    rec = TargetsRecorder(capacity=1, symbols=SYMBOLS)  # grows past capacity
+    rows = []
+    for k, ts in enumerate(IDX):
+        rec.next_row(ts)[1] = 0.5 * k
+        rows.append({"ts": ts, "AAPL": 0.0, "MSFT": 0.5 * k})
+    pd.testing.assert_frame_equal(rec.to_frame(), build_targets(rows, SYMBOLS), check_freq=False)
+    assert TargetsRecorder(3, SYMBOLS).to_frame().empty
+
+
+def test_orders_and_fills_match_row_builders():
+    orders, fills = OrdersRecorder(SYMBOLS, capacity=1), FillsRecorder(SYMBOLS, capacity=1)
+    order_rows, fill_rows = [], []
+    for k, ts in enumerate(IDX):
+        orders.record(ts, "MSFT", 2.0 + k, OrderType.MARKET, "t")
+        order_rows.append({"ts_submit": ts, "symbol": "MSFT", "qty": 2.0 + k, "order_type": OrderType.MARKET, "tag": "t"})
+        fills.record_many(ts, np.array([0, 1]), np.array([1.0, -2.0]), np.array([10.0, 20.0]), 0.1, 0.2)
+        for sym, q, p in [("AAPL", 1.0, 10.0), ("MSFT", -2.0, 20.0)]:
+            fill_rows.append({"ts_fill": ts, "symbol": sym, "notional": abs(q * p), "qty": q, "price": p,
+                              "fees": 0.1, "slippage": 0.2, "tag": None})
+
+    pd.testing.assert_frame_equal(orders.to_frame(), build_orders(order_rows))
+    pd.testing.assert_frame_equal(fills.to_frame(), build_fills(fill_rows))
+    pd.testing.assert_frame_equal(OrdersRecorder(SYMBOLS).to_frame(), build_orders([]))
+    pd.testing.assert_frame_equal(FillsRecorder(SYMBOLS).to_frame(), build_fills([]))
+
+
+def test_timezone_is_preserved():
+    rec = LedgerRecorder(capacity=2)
+    idx = pd.date_range("2024-01-01 09:30", periods=2, freq="min", tz="America/New_York")
+    for ts in idx:
+        rec.record(ts, 1.0, 1.0, 0.0, 0.0, 0.0, 0)
+    assert list(rec.to_frame().index) == list(idx)
+
+
+def test_memory_usage_reports_columns():
+    rec = ResultRecorders.for_run(n_bars=100, symbols=SYMBOLS)
+    usage = rec.memory_usage()
+    assert usage["targets"] >= 100 * len(SYMBOLS) * 8
+    assert usage["ledger"] >= 100 * 7 * 8
+    assert usage["total"] == sum(v for k, v in usage.items() if k != "total")
+
+
+def test_drain_empties_and_keeps_appending():
+    rec = ResultRecorders.for_run(n_bars=3, symbols=SYMBOLS, sparse_targets=True)
+    rows = rec.orders.record_many(IDX[0], np.array([0, 1]), np.array([1.0, 2.0]), OrderType.MARKET)
+    rec.targets.record_sparse(IDX[0], np.array([1]), np.array([0.5]))
+    first = rec.drain()
+    assert len(first["orders"]) == 2 and first["targets"]["MSFT"].tolist() == [0.5]
+    assert all(len(r) == 0 for r in (rec.ledger, rec.targets, rec.orders, rec.fills))
+
+    # order rows keep counting across drains; updates of drained rows are ignored
+    more = rec.orders.record_many(IDX[1], np.array([1]), np.array([3.0]), OrderType.MARKET)
+    assert more.tolist() == [rows[-1] + 1]
+    rec.orders.update(np.r_[rows, more], np.array([1.0, 2.0, 3.0]), OrderStatus.FILLED)
+    rec.targets.record(IDX[1], np.array([0.2, 0.0]))
+    second = rec.drain()
+    assert second["orders"]["status"].tolist() == [OrderStatus.FILLED]
+    assert first["orders"]["status"].tolist() == [OrderStatus.CREATED] * 2
+    assert second["targets"].index.tolist() == [IDX[1]] and second["targets"]["AAPL"].tolist() == [0.2]
+    assert isinstance(SparseTargetsRecorder(1, SYMBOLS).drain(), pd.DataFrame)
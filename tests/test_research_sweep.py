@@ -0,0 +1,221 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from btlib.costs import SimpleBpsCost, SqrtImpactCost
+from btlib.data import MarketData, Universe
+from btlib.data.shared import SharedMarketData, attach_market
+from btlib.engine import BacktestConfig
+from btlib.execution import VolumeParticipationExecution
+from btlib.research.sweep import SweepRunner, parameter_grid, run_sweep
+
+CALLS = []
+
+
+class MomentumStrategy:
+    """Long the symbol when its close is above its `lookback`-bar mean"""
+    def __init__(self, lookback: int, weight: float):
+        self.lookback = lookback
+        self.weight = weight
+
+    def on_bar(self, ts, data_upto_ts, state):
+        px = data_upto_ts.tail_values(self.lookback, columns=["AAPL"]).ravel()
+        if len(px) < self.lookback:
+            return {}
+        return {"AAPL": self.weight if px[-1] > px.mean() else 0.0}
+
+
+def strategy_factory(params):
+    CALLS.append(params)
+    return MomentumStrategy(params["lookback"], params["weight"])
+
+
+def cost_factory(params):
+    return SimpleBpsCost(fees_bps=params["fees_bps"])
+
+
+def make_market() -> MarketData:
+    rng = np.random.default_rng(1)
+    idx = pd.date_range("2024-01-01", periods=60, freq="D")
+    close = pd.DataFrame({"AAPL": 100 * np.exp(np.cumsum(rng.normal(0, 0.02, 60)))}, index=idx)
+    return MarketData(close)
+
+
+class EqualWeight:
+    """The same weight on every symbol; the universe decides which of them get orders"""
+    def __init__(self, weight: float):
+        self.weight = weight
+
+    def on_bar(self, ts, data_upto_ts, state):
+        return {s: self.weight for s in data_upto_ts.columns}
+
+
+def equal_weight_factory(params):
+    return EqualWeight(params["weight"])
+
+
+def make_universe_market() -> MarketData:
+    rng = np.random.default_rng(2)
+    idx = pd.date_range("2024-01-01", periods=60, freq="D")
+    cols = ["A", "B", "C", "D"]
+    close = pd.DataFrame(100 * np.exp(np.cumsum(rng.normal(0, 0.02, (60, 4)), axis=0)), index=idx, columns=cols)
+    market = MarketData(close)
+    return market.with_universe(Universe.from_mask(rng.random((60, 4)) < 0.5, idx, cols))
+
+
+def make_ohlcv_market() -> MarketData:
+    rng = np.random.default_rng(3)
+    idx = pd.date_range("2024-01-01", periods=60, freq="D")
+    cols = ["A", "B", "C"]
+    close = pd.DataFrame(100 * np.exp(np.cumsum(rng.normal(0, 0.02, (60, 3)), axis=0)), index=idx, columns=cols)
+    volume = pd.DataFrame(rng.uniform(50, 500, (60, 3)), index=idx, columns=cols)
+    market = MarketData(close, high=close * 1.01, low=close * 0.99, volume=volume, dtype=np.float32)
+    return market.with_dataset("score", rng.normal(size=(60, 3)))
+
+
+class ScoreWeighted:
+    """Long the symbols with a positive score"""
+    def __init__(self, weight: float):
+        self.weight = weight
+
+    def on_bar(self, ts, data_upto_ts, state):
+        score = data_upto_ts.data("score").tail_values(1)[0]
+        return {s: (self.weight if x > 0 else 0.0) for s, x in zip(data_upto_ts.columns, score)}
+
+
+def score_factory(params):
+    return ScoreWeighted(params["weight"])
+
+
+def participation_factory(params):
+    return VolumeParticipationExecution(max_participation=params["participation"])
+
+
+def impact_factory(params):
+    return SqrtImpactCost(window=5, fallback_bps=10.0)
+
+
+GRID = {"lookback": [3, 5, 10], "weight": [0.5, 1.0], "fees_bps": [0.0, 10.0]}
+
+
+def test_parameter_grid_is_cartesian_product():
+    grid = parameter_grid(GRID)
+    assert len(grid) == 12
+    assert grid[0] == {"lookback": 3, "weight": 0.5, "fees_bps": 0.0}
+
+
+def test_parallel_matches_serial():
+    market = make_market()
+    serial = run_sweep(market, strategy_factory, GRID, BacktestConfig(), cost_factory=cost_factory, n_workers=1)
+    parallel = run_sweep(market, strategy_factory, GRID, BacktestConfig(), cost_factory=cost_factory,
+                         n_workers=2, chunksize=3)
+
+    assert len(serial) == 12
+    assert serial["error"].isna().all()
+    pd.testing.assert_frame_equal(serial, parallel)
+    # higher fees never help
+    by_fee = serial.set_index(["lookback", "weight", "fees_bps"])["total_return"].unstack("fees_bps")
+    assert (by_fee[10.0] <= by_fee[0.0] + 1e-12).all()
+
+
+def test_parallel_matches_serial_with_universe():
+    market = make_universe_market()
+    grid = {"weight": [0.1, 0.2, 0.25]}
+    serial = run_sweep(market, equal_weight_factory, grid, BacktestConfig(), n_workers=1)
+    parallel = run_sweep(market, equal_weight_factory, grid, BacktestConfig(), n_workers=2, chunksize=1)
+    pd.testing.assert_frame_equal(serial, parallel)
+    everyone = run_sweep(market.with_universe(None), equal_weight_factory, grid, BacktestConfig(), n_workers=1)
+    assert not np.allclose(everyone["total_return"], serial["total_return"])
+
+
+def test_parallel_matches_serial_with_fields_and_datasets():
+    market = make_ohlcv_market()
+    grid = {"weight": [0.2, 0.3], "participation": [0.05, 0.5]}
+    kwargs = dict(cost_factory=impact_factory, execution_factory=participation_factory)
+    serial = run_sweep(market, score_factory, grid, BacktestConfig(), n_workers=1, **kwargs)
+    parallel = run_sweep(market, score_factory, grid, BacktestConfig(), n_workers=2, chunksize=1, **kwargs)
+    assert serial["error"].isna().all()
+    pd.testing.assert_frame_equal(serial, parallel)
+
+
+def test_pool_grows_when_a_later_grid_has_more_tasks():
+    small = {"lookback": [3, 5], "weight": [1.0], "fees_bps": [0.0]}
+    with SweepRunner(make_market(), strategy_factory, BacktestConfig(), cost_factory=cost_factory,
+                     n_workers=3, chunksize=1) as runner:
+        out = runner.run(small)
+        first = runner._pool
+        assert first._max_workers == 2
+        out_big = runner.run(GRID)
+        assert runner._pool is not first and runner._pool._max_workers == 3
+        big = runner._pool
+        runner.run(small)
+        assert runner._pool is big
+    assert out["error"].isna().all()
+    assert out_big["error"].isna().all() and len(out_big) == 12
+
+
+def test_resume_skips_finished_runs(tmp_path):
+    market = make_market()
+    ckpt = tmp_path / "sweep.jsonl"
+    partial = [p for p in parameter_grid(GRID) if p["lookback"] == 3]
+    first = run_sweep(market, strategy_factory, partial, BacktestConfig(), cost_factory=cost_factory,
+                      n_workers=1, checkpoint=ckpt)
+
+    CALLS.clear()
+    full = run_sweep(market, strategy_factory, GRID, BacktestConfig(), cost_factory=cost_factory,
+                     n_workers=1, checkpoint=ckpt)
+    assert len(CALLS) == 12 - len(partial)
+    assert all(p["lookback"] != 3 for p in CALLS)
+    pd.testing.assert_frame_equal(full[full["lookback"] == 3].reset_index(drop=True), first)
+
+
+def test_resume_refuses_a_checkpoint_from_another_window_or_config(tmp_path):
+    market = make_market()
+    ckpt = tmp_path / "sweep.jsonl"
+    with SweepRunner(market, strategy_factory, BacktestConfig(), cost_factory=cost_factory, n_workers=1) as runner:
+        runner.run(GRID, window=(0, 40), checkpoint=ckpt)
+        CALLS.clear()
+        runner.run(GRID, window=(0, 40), checkpoint=ckpt)
+        assert CALLS == []
+        with pytest.raises(ValueError, match="different sweep"):
+            runner.run(GRID, window=(10, 50), checkpoint=ckpt)
+    with pytest.raises(ValueError, match="different sweep"):
+        run_sweep(market, strategy_factory, GRID, BacktestConfig(initial_cash=5_000.0), cost_factory=cost_factory,
+                  n_workers=1, checkpoint=ckpt)
+
+
+def test_failed_runs_are_reported_not_raised():
+    market = make_market()
+    out = run_sweep(market, strategy_factory, [{"lookback": 3}], BacktestConfig(), n_workers=1)
+    assert out["error"].iloc[0].startswith("KeyError")
+    assert np.isnan(out["sharpe"].iloc[0])
+
+
+def test_shared_market_attaches_without_copy():
+    market = make_market()
+    with SharedMarketData(market) as shared:
+        attached, shm = attach_market(shared.spec)
+        assert np.shares_memory(attached.values(), np.ndarray(shared.spec.shape, buffer=shm.buf))
+        pd.testing.assert_frame_equal(attached.close, market.close, check_freq=False)
+        del attached
+        shm.close()
+
+    market = make_universe_market()
+    with SharedMarketData(market) as shared:
+        attached, shm = attach_market(shared.spec)
+        assert np.array_equal(attached.universe.to_mask(), market.universe.to_mask())
+        assert attached.universe.active_ids(7).tolist() == market.universe.active_ids(7).tolist()
+        del attached
+        shm.close()
+
+    market = make_ohlcv_market()
+    with SharedMarketData(market) as shared:
+        attached, shm = attach_market(shared.spec)
+        assert attached.fields() == market.fields() and attached.datasets() == ["score"]
+        for name in market.fields():
+            assert attached.field(name).dtype == np.float32
+            assert np.array_equal(attached.field(name), market.field(name))
+        assert np.array_equal(attached.dataset("score"), market.dataset("score"))
+        assert np.array_equal(attached.bar(4).field("low"), market.field_row("low", 4))
+        del attached
+        shm.close()
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from btlib.data.market_data import MarketData
+from btlib.engine import BacktestConfig
+from btlib.research.walk_forward import run_walk_forward, stitch_equity, walk_forward_windows
+
+
+class MeanReversion:
+    def __init__(self, lookback: int):
+        self.lookback = lookback
+
+    def on_bar(self, ts, data_upto_ts, state):
+        px = data_upto_ts.tail_values(self.lookback, columns=["AAPL"]).ravel()
+        if len(px) < self.lookback:
+            return {}
+        return {"AAPL": 1.0 if px[-1] < px.mean() else 0.0}
+
+
+def strategy_factory(params):
+    return MeanReversion(params["lookback"])
+
+
+def make_market(n: int = 120) -> MarketData:
+    rng = np.random.default_rng(2)
+    idx = pd.date_range("2024-01-01", periods=n, freq="D")
+    close = pd.DataFrame({"AAPL": 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))}, index=idx)
+    return MarketData(close)
+
+
+def test_rolling_and_anchored_windows():
+    idx = pd.date_range("2024-01-01", periods=10, freq="D")
+    rolling = walk_forward_windows(idx, train_bars=4, test_bars=3)
+    assert [(w.train_start, w.train_stop, w.test_start, w.test_stop) for w in rolling] == [
+        (0, 4, 4, 7),
+        (3, 7, 7, 10),
+    ]
+    anchored = walk_forward_windows(idx, train_bars=4, test_bars=2, anchored=True)
+    assert [w.train_start for w in anchored] == [0, 0, 0]
+    assert [w.test_stop for w in anchored] == [6, 8, 10]
+    with pytest.raises(ValueError):
+        walk_forward_windows(idx, train_bars=10, test_bars=2)
+
+
+def test_stitch_equity_is_continuous():
+    idx = pd.date_range("2024-01-01", periods=4, freq="D")
+    a = pd.DataFrame({"equity": [100.0, 110.0]}, index=idx[:2])
+    b = pd.DataFrame({"equity": [100.0, 90.0]}, index=idx[2:])
+    eq = stitch_equity([a, b], initial_equity=100.0)
+    assert eq.tolist() == pytest.approx([100.0, 110.0, 110.0, 99.0])
+
+
+@pytest.mark.parametrize("n_workers", [1, 2])
+def test_walk_forward_oos_covers_test_bars(n_workers):
+    market = make_market()
+    cfg = BacktestConfig(initial_cash=10_000.0, warmup_bars=10)
+    grid = {"lookback": [3, 5, 10]}
+
+    res = run_walk_forward(market, strategy_factory, grid, cfg, train_bars=40, test_bars=20, n_workers=n_workers)
+
+    assert len(res.windows) == 4
+    assert all(p["lookback"] in grid["lookback"] for p in res.windows["params"])
+    assert list(res.equity.index) == list(market.timestamps()[40:])
+    assert res.equity.iloc[0] == pytest.approx(cfg.initial_cash)
+    assert np.isfinite(res.equity).all()
+    # each OOS window starts flat: the warmup lead-in never trades
+    for k, oos in enumerate(res.oos_results):
+        assert oos.ledger.index[0] == res.windows.loc[k, "test_start"]
+        assert oos.ledger["equity"].iloc[0] == pytest.approx(cfg.initial_cash)
+
+
+def test_walk_forward_serial_matches_parallel():
+    market = make_market()
+    cfg = BacktestConfig(warmup_bars=5)
+    grid = {"lookback": [3, 5]}
+    serial = run_walk_forward(market, strategy_factory, grid, cfg, train_bars=50, test_bars=35, n_workers=1)
+    parallel = run_walk_forward(market, strategy_factory, grid, cfg, train_bars=50, test_bars=35, n_workers=2)
+    pd.testing.assert_series_equal(serial.equity, parallel.equity)